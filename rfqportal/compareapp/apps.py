@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CompareappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'compareapp'
+
+    def ready(self):
+        # Connects the signals that keep the supplier resolution index, the
+        # certification catalog, the quote scores and the page cache current,
+        # and the one that counts each request's database queries
+        from . import certifications, metrics, page_cache, quote_scoring, supplier_resolution  # noqa: F401
@@ -0,0 +1,114 @@
+import json
+import math
+import threading
+
+import httpx
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values (list): Sample values.
+        pct (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 for an empty sample.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize_run(latencies_ms, duration_s, failed=0):
+    """
+    Summarize one benchmark run.
+
+    Args:
+        latencies_ms (list): Per-request latencies in milliseconds.
+        duration_s (float): Wall time of the whole run.
+        failed (int): Number of failed requests.
+
+    Returns:
+        dict: Request count, throughput and latency percentiles.
+    """
+    return {
+        "requests": len(latencies_ms),
+        "failed": failed,
+        "duration_s": round(duration_s, 3),
+        "throughput_rps": round(len(latencies_ms) / duration_s, 2) if duration_s else 0.0,
+        "p50_ms": round(percentile(latencies_ms, 50), 1),
+        "p95_ms": round(percentile(latencies_ms, 95), 1),
+        "max_ms": round(max(latencies_ms, default=0.0), 1),
+    }
+
+def same_value(value, expected):
+    """
+    Compare an extracted field value with its label, ignoring case, list
+    order and float rounding.
+
+    Returns:
+        bool: True if they match.
+    """
+    if isinstance(expected, float):
+        return isinstance(value, (int, float)) and math.isclose(value, expected, abs_tol=0.005)
+    if isinstance(expected, list):
+        return isinstance(value, list) and sorted(str(item).casefold() for item in value) == sorted(item.casefold() for item in expected)
+    return str(value).strip().casefold() == str(expected).strip().casefold()
+
+def field_precision(extractions, labels):
+    """
+    Per-field precision of extractions against labeled values.
+
+    A field counts as filled when the extraction has a non-empty value for it.
+
+    Args:
+        extractions (list): Extracted data dicts (None for a failed extraction).
+        labels (list): The expected field values for each, in the same order.
+
+    Returns:
+        dict: Field name to filled, correct and precision, plus "overall".
+    """
+    fields = {}
+    for extracted, expected in zip(extractions, labels):
+        for name, expected_value in expected.items():
+            entry = fields.setdefault(name, {"filled": 0, "correct": 0})
+            value = (extracted or {}).get(name)
+            if value in (None, "", []):
+                continue
+            entry["filled"] += 1
+            entry["correct"] += same_value(value, expected_value)
+    for entry in fields.values():
+        entry["precision"] = round(entry["correct"] / entry["filled"], 4) if entry["filled"] else 0.0
+    filled = sum(entry["filled"] for entry in fields.values())
+    correct = sum(entry["correct"] for entry in fields.values())
+    fields["overall"] = {"filled": filled, "correct": correct, "precision": round(correct / filled, 4) if filled else 0.0}
+    return fields
+
+class UsageRecorder(httpx.BaseTransport):
+    """
+    httpx transport wrapper that adds up the token usage reported by
+    /responses calls, for benchmarks against the fake or the real API.
+    """
+    def __init__(self, transport):
+        self.transport = transport
+        self.calls = 0
+        self.usage = {"input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request):
+        response = self.transport.handle_request(request)
+        is_json = response.headers.get("content-type", "").startswith("application/json")
+        if request.method == "POST" and request.url.path.endswith("/responses") and response.status_code == 200 and is_json:
+            response.read()
+            usage = json.loads(response.content).get("usage") or {}
+            with self._lock:
+                self.calls += 1
+                self.usage["input_tokens"] += usage.get("input_tokens", 0)
+                self.usage["output_tokens"] += usage.get("output_tokens", 0)
+                self.usage["cached_tokens"] += (usage.get("input_tokens_details") or {}).get("cached_tokens", 0)
+        return response
+
+    def close(self):
+        self.transport.close()
@@ -0,0 +1,105 @@
+import re
+import unicodedata
+
+# Separators in stored certification lists ("Organic, Kosher and Halal")
+CERTIFICATION_SEPARATOR = re.compile(r"\s*(?:[,;/\n+]|&|\band\b)\s*", re.IGNORECASE)
+NO_CERTIFICATION = frozenset({"", "none", "n a", "na", "nil", "null"})
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+# "FSSC22000" and "ISO-22000" match "FSSC 22000" and "ISO 22000"
+LETTERS_THEN_DIGITS = re.compile(r"(?<=[a-z])(?=[0-9])")
+# Words that do not make one certification different from another
+FILLER_WORDS = frozenset({"certificate", "certification", "certified", "cert", "the"})
+
+# Other spellings and names of the same certification, by key, with the
+# canonical spelling. Keys not listed here are their own certification.
+CERTIFICATION_ALIASES = {
+    "organic": "Organic",
+    "organically grown": "Organic",
+    "usda organic": "USDA Organic",
+    "nop organic": "USDA Organic",
+    "national organic program": "USDA Organic",
+    "eu organic": "EU Organic",
+    "kosher": "Kosher",
+    "ou kosher": "Kosher",
+    "kosher ou": "Kosher",
+    "ou": "Kosher",
+    "kosher pareve": "Kosher",
+    "halal": "Halal",
+    "non gmo": "Non-GMO",
+    "nongmo": "Non-GMO",
+    "non gmo project verified": "Non-GMO",
+    "gmo free": "Non-GMO",
+    "fair trade": "Fair Trade",
+    "fairtrade": "Fair Trade",
+    "gluten free": "Gluten-Free",
+    "sqf": "SQF",
+    "brc": "BRCGS",
+    "brcgs": "BRCGS",
+    "brc global standard": "BRCGS",
+    "fssc 22000": "FSSC 22000",
+    "iso 22000": "ISO 22000",
+    "iso 9001": "ISO 9001",
+    "gfsi": "GFSI",
+    "haccp": "HACCP",
+    "gmp": "GMP",
+    "rainforest alliance": "Rainforest Alliance",
+}
+
+def certification_key(name):
+    """
+    Reduce a certification name to the form used to match it.
+
+    Case, accents, punctuation and words like "certified" are ignored, and
+    digits are split from a preceding word, so "Certified FSSC-22000" and
+    "fssc22000" both become "fssc 22000".
+
+    Args:
+        name (str): The certification as written.
+
+    Returns:
+        str: Space-separated lowercase tokens, or "" for a blank name.
+    """
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = LETTERS_THEN_DIGITS.sub(" ", text)
+    tokens = [token for token in NON_ALPHANUMERIC.sub(" ", text).split() if token not in FILLER_WORDS]
+    return " ".join(tokens)
+
+def canonical_certification(name):
+    """
+    Resolve a certification name through the aliases.
+
+    Args:
+        name (str): The certification as written.
+
+    Returns:
+        tuple: The canonical key and spelling, or None for a blank name or
+        one meaning "none".
+    """
+    key = certification_key(name)
+    if key in NO_CERTIFICATION:
+        return None
+    canonical = CERTIFICATION_ALIASES.get(key)
+    if canonical is None:
+        return key, name.strip(" .")
+    return certification_key(canonical), canonical
+
+def parse_certification_list(text):
+    """
+    Split and canonicalize a stored certification list.
+
+    Args:
+        text (str): E.g. "Certified Organic, OU Kosher and Halal".
+
+    Returns:
+        dict: Canonical key to canonical spelling, in order, without repeats.
+    """
+    certifications = {}
+    if certification_key(text) in NO_CERTIFICATION:  # "N/A" would otherwise split into "N" and "A"
+        return certifications
+    for name in CERTIFICATION_SEPARATOR.split(text):
+        canonical = canonical_certification(name)
+        if canonical is not None:
+            certifications.setdefault(*canonical)
+    return certifications
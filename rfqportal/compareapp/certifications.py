@@ -0,0 +1,138 @@
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .certification_names import parse_certification_list
+from .models import RFQ, Certification, Quote, QuoteCertification, RFQCertification
+
+BATCH_SIZE = 1000
+
+def catalog_ids(certifications):
+    """
+    Look up certifications in the catalog, adding those not in it yet.
+
+    Args:
+        certifications (dict): Canonical key to canonical spelling.
+
+    Returns:
+        dict: Canonical key to Certification id.
+    """
+    if not certifications:
+        return {}
+    ids = dict(Certification.objects.filter(key__in=certifications).values_list("key", "id"))
+    missing = [Certification(key=key, name=name) for key, name in certifications.items() if key not in ids]
+    if missing:
+        # A concurrent writer may add the same certification; the unique key keeps one
+        Certification.objects.bulk_create(missing, ignore_conflicts=True)
+        ids = dict(Certification.objects.filter(key__in=certifications).values_list("key", "id"))
+    return ids
+
+def _sync(owners, text_of, through, owner_field):
+    """
+    Make the catalog links of each owner match its certification text.
+
+    Args:
+        owners (list): Quotes or RFQs.
+        text_of (callable): Returns an owner's certification text.
+        through (Model): QuoteCertification or RFQCertification.
+        owner_field (str): "quote" or "rfq".
+    """
+    parsed = {owner.pk: parse_certification_list(text_of(owner)) for owner in owners}
+    ids = catalog_ids({key: name for certifications in parsed.values() for key, name in certifications.items()})
+    wanted = {(owner_id, ids[key]) for owner_id, certifications in parsed.items() for key in certifications}
+    linked = set(through.objects.filter(**{f"{owner_field}_id__in": parsed}).values_list(f"{owner_field}_id", "certification_id"))
+
+    stale = linked - wanted
+    for owner_id in {owner_id for owner_id, _ in stale}:
+        through.objects.filter(**{f"{owner_field}_id": owner_id}).filter(
+            certification_id__in=[certification_id for stale_owner, certification_id in stale if stale_owner == owner_id]
+        ).delete()
+    through.objects.bulk_create(
+        [through(**{f"{owner_field}_id": owner_id, "certification_id": certification_id}) for owner_id, certification_id in wanted - linked],
+        ignore_conflicts=True,
+    )
+
+def sync_quote_certifications(quotes):
+    """
+    Link quotes to the catalog entries of their certifications text.
+
+    Args:
+        quotes (list): The quotes, with their certifications loaded.
+    """
+    _sync(quotes, lambda quote: quote.certifications, QuoteCertification, "quote")
+
+def sync_rfq_certifications(rfqs):
+    """
+    Link RFQs to the catalog entries of their required_certifications text.
+
+    Args:
+        rfqs (list): The RFQs, with their required_certifications loaded.
+    """
+    _sync(rfqs, lambda rfq: rfq.required_certifications, RFQCertification, "rfq")
+
+def compliant_quotes(rfq_id, quotes=None):
+    """
+    Filter quotes down to those holding every certification an RFQ requires.
+
+    Runs as one query: a quote is kept unless one of the RFQ's required
+    certifications has no link to it, which both through tables answer
+    from their unique indexes.
+
+    Args:
+        rfq_id (int): The RFQ whose requirements apply.
+        quotes (QuerySet): The quotes to filter; defaults to the RFQ's own.
+            Pass Quote.objects.all() to search quotes for every RFQ.
+
+    Returns:
+        QuerySet: The compliant quotes.
+    """
+    if quotes is None:
+        quotes = Quote.objects.filter(rfq_id=rfq_id)
+    held = QuoteCertification.objects.filter(quote_id=OuterRef(OuterRef("pk"))).values("certification_id")
+    missing = RFQCertification.objects.filter(rfq_id=rfq_id).exclude(certification_id__in=held)
+    return quotes.filter(~Exists(missing))
+
+def rebuild_certification_catalog():
+    """
+    Link every quote and RFQ again, e.g. after changing the aliases, and
+    drop catalog entries nothing links to.
+
+    Returns:
+        dict: The number of quotes, RFQs and catalog entries.
+    """
+    counts = {"quotes": 0, "rfqs": 0}
+    for model, sync, field, name in (
+        (Quote, sync_quote_certifications, "certifications", "quotes"),
+        (RFQ, sync_rfq_certifications, "required_certifications", "rfqs"),
+    ):
+        batch = []
+        for owner in model.objects.only("id", field).iterator(chunk_size=BATCH_SIZE):
+            batch.append(owner)
+            if len(batch) >= BATCH_SIZE:
+                sync(batch)
+                counts[name] += len(batch)
+                batch = []
+        if batch:
+            sync(batch)
+            counts[name] += len(batch)
+    Certification.objects.filter(quotes__isnull=True, rfqs__isnull=True).delete()
+    counts["certifications"] = Certification.objects.count()
+    return counts
+
+# Quotes and RFQs saved one at a time are linked through signals. Bulk
+# writes send none; their callers call sync_quote_certifications themselves.
+@receiver(post_save, sender=Quote, dispatch_uid="quote_certifications_save")
+def _link_saved_quote(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "certifications" not in update_fields):
+        return
+    if created and not instance.certifications:
+        return
+    sync_quote_certifications([instance])
+
+@receiver(post_save, sender=RFQ, dispatch_uid="rfq_certifications_save")
+def _link_saved_rfq(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "required_certifications" not in update_fields):
+        return
+    if created and not instance.required_certifications:
+        return
+    sync_rfq_certifications([instance])
@@ -0,0 +1,65 @@
+import re
+import unicodedata
+
+# Legal-form words that do not distinguish one company from another
+LEGAL_SUFFIXES = frozenset({
+    "ag", "bv", "co", "company", "corp", "corporation", "gmbh", "inc", "incorporated", "kg", "limited",
+    "llc", "llp", "lp", "ltd", "nv", "oy", "plc", "pte", "pty", "sa", "sarl", "sas", "spa", "srl",
+})
+
+# Shared mailbox providers say nothing about which company a contact works for
+FREE_MAIL_DOMAINS = frozenset({
+    "aol.com", "gmail.com", "gmx.com", "googlemail.com", "hotmail.com", "icloud.com", "live.com",
+    "mail.com", "me.com", "msn.com", "outlook.com", "proton.me", "protonmail.com", "qq.com",
+    "yahoo.com", "yandex.com",
+})
+
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+# Dotted abbreviations such as "S.A." or "L.L.C." become "sa" and "llc"
+DOTTED_ABBREVIATION = re.compile(r"\b(?:[a-z]\.){2,}")
+
+def normalize_company_name(name):
+    """
+    Reduce a company name to the form used to match suppliers.
+
+    Case, accents, punctuation, "&" versus "and", a leading "the" and
+    trailing legal forms (Inc, LLC, GmbH, ...) are ignored, so "ACME, Inc."
+    and "Acme Incorporated" both become "acme". A name made only of
+    legal-form words keeps its last word.
+
+    Args:
+        name (str): The company name.
+
+    Returns:
+        str: Space-separated lowercase tokens, or "" for a blank name.
+    """
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = DOTTED_ABBREVIATION.sub(lambda match: match.group(0).replace(".", ""), text)
+    text = text.replace("&", " and ")
+    tokens = NON_ALPHANUMERIC.sub(" ", text).split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+def email_domain(email):
+    """
+    Return the company domain of a contact email address.
+
+    Args:
+        email (str): The email address.
+
+    Returns:
+        str: The lowercased domain, or None for blank addresses and free
+        mail providers.
+    """
+    if not email or "@" not in email:
+        return None
+    domain = email.rsplit("@", 1)[1].strip().lower().rstrip(".")
+    if domain.startswith("www."):
+        domain = domain[4:]
+    if not domain or domain in FREE_MAIL_DOMAINS:
+        return None
+    return domain
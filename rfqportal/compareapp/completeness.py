@@ -0,0 +1,56 @@
+# Fields a quote needs before it can be compared, read from its supplier and from the quote
+SUPPLIER_CHECKED_FIELDS = ("main_contact_name", "main_contact_email", "main_contact_phone", "hq_address", "payment_terms")
+QUOTE_CHECKED_FIELDS = ("date_submitted", "price_per", "country_of_origin", "certifications", "minimum_order_quantity")
+CHECKED_FIELDS = SUPPLIER_CHECKED_FIELDS + QUOTE_CHECKED_FIELDS
+
+# The bit each checked field sets in a missing_fields mask. Bits are stored,
+# so new fields go at the end of their tuple and are backfilled with
+# rebuild_missing_fields.
+FIELD_BITS = {field: 1 << index for index, field in enumerate(CHECKED_FIELDS)}
+SUPPLIER_FIELDS_MASK = sum(FIELD_BITS[field] for field in SUPPLIER_CHECKED_FIELDS)
+QUOTE_FIELDS_MASK = sum(FIELD_BITS[field] for field in QUOTE_CHECKED_FIELDS)
+
+def missing_mask(instance, fields):
+    """
+    Bitmask of the fields that are blank on an instance.
+
+    Args:
+        instance (Model): A supplier or quote.
+        fields (tuple): The checked fields of its model.
+
+    Returns:
+        int: The FIELD_BITS of the blank fields, or'ed together.
+    """
+    mask = 0
+    for field in fields:
+        if not getattr(instance, field):
+            mask |= FIELD_BITS[field]
+    return mask
+
+def missing_field_names(mask):
+    """
+    Args:
+        mask (int): A missing_fields mask.
+
+    Returns:
+        list: The names of the missing fields, in CHECKED_FIELDS order.
+    """
+    return [field for field in CHECKED_FIELDS if mask & FIELD_BITS[field]]
+
+def masks_with(field, fields):
+    """
+    Every mask over the given fields that has a field's bit set, so a
+    field can be matched with an indexed IN lookup.
+
+    Args:
+        field (str): The missing field.
+        fields (tuple): The checked fields the masks cover.
+
+    Returns:
+        list: The masks, in increasing order.
+    """
+    bits = [FIELD_BITS[other] for other in fields if other != field]
+    masks = [FIELD_BITS[field]]
+    for bit in bits:
+        masks += [mask | bit for mask in masks]
+    return sorted(masks)
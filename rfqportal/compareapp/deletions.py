@@ -0,0 +1,40 @@
+import threading
+from contextlib import contextmanager
+
+# RFQs being deleted by this thread. Their quotes and emails are deleted
+# first, and the signal receivers of those rows skip the work (re-ranking,
+# page cache bumps) that the RFQ's own delete makes moot.
+_deleting = threading.local()
+
+@contextmanager
+def deleting_rfqs(rfq_ids):
+    """
+    Mark RFQs as being deleted by this thread for the duration of the block.
+
+    The marks are removed on the way out even if the delete fails, so a
+    rolled-back delete cannot leave its RFQ marked.
+
+    Args:
+        rfq_ids (iterable): IDs of the RFQs being deleted.
+    """
+    if not hasattr(_deleting, "rfq_ids"):
+        _deleting.rfq_ids = set()
+    # RFQs already marked by an enclosing delete are left for it to unmark
+    marked = set(rfq_ids) - _deleting.rfq_ids
+    _deleting.rfq_ids |= marked
+    try:
+        yield
+    finally:
+        _deleting.rfq_ids -= marked
+
+def is_rfq_being_deleted(rfq_id):
+    """
+    Tell whether this thread is deleting an RFQ.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+
+    Returns:
+        bool: True inside deleting_rfqs for that RFQ.
+    """
+    return rfq_id in getattr(_deleting, "rfq_ids", ())
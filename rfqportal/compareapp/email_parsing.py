@@ -0,0 +1,69 @@
+import re
+from email import policy
+from email.parser import BytesParser
+
+# mbox files separate messages with a "From " line at the start of a line;
+# "From " at the start of a body line is escaped as ">From " by mbox writers.
+MBOX_SEPARATOR = re.compile(rb"^From .*\r?\n", re.MULTILINE)
+
+def _message_to_text(message):
+    """
+    Render a parsed email message as plain text for extraction.
+
+    The sender, date and subject headers are kept because they often carry
+    the supplier contact and submission date.
+
+    Args:
+        message (email.message.EmailMessage): The parsed message.
+
+    Returns:
+        str: Headers followed by the best available body part.
+    """
+    lines = []
+    for header in ("From", "Date", "Subject"):
+        if message[header]:
+            lines.append(f"{header}: {message[header]}")
+
+    body = message.get_body(preferencelist=("plain", "html"))
+    content = body.get_content() if body is not None else ""
+    return "\n".join(lines) + "\n\n" + content.strip()
+
+def parse_eml(data):
+    """
+    Parse a single RFC 822 (.eml) message.
+
+    Args:
+        data (bytes): The raw message.
+
+    Returns:
+        str: The message as plain text.
+    """
+    return _message_to_text(BytesParser(policy=policy.default).parsebytes(data))
+
+def parse_mbox(data):
+    """
+    Split an mbox file into messages.
+
+    Args:
+        data (bytes): The raw mbox file.
+
+    Returns:
+        list: The messages as plain text, in file order.
+    """
+    chunks = [chunk for chunk in MBOX_SEPARATOR.split(data) if chunk.strip()]
+    return [parse_eml(re.sub(rb"^>From ", b"From ", chunk, flags=re.MULTILINE)) for chunk in chunks]
+
+def parse_email_upload(uploaded_file):
+    """
+    Parse an uploaded .eml or .mbox file.
+
+    Args:
+        uploaded_file (UploadedFile): The uploaded file.
+
+    Returns:
+        list: The messages as plain text.
+    """
+    data = uploaded_file.read()
+    if uploaded_file.name.lower().endswith(".eml"):
+        return [parse_eml(data)]
+    return parse_mbox(data)
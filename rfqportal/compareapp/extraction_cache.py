@@ -0,0 +1,205 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .llm_routing import model_tiers
+from .llm_services import PROMPT_VERSION
+from .models import ExtractionCacheEntry
+
+QUOTE_MARKER = re.compile(r"^(\s*>)+", re.MULTILINE)
+SUBJECT_PREFIX = re.compile(r"^\s*((re|fwd?|aw|wg)\s*:\s*)+", re.IGNORECASE | re.MULTILINE)
+FORWARD_BANNER = re.compile(r"^-+\s*(forwarded|original) message\s*-+$", re.IGNORECASE | re.MULTILINE)
+WHITESPACE = re.compile(r"\s+")
+
+# In-process counters; persistent totals are kept on the cache rows
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "latency_saved_ms": 0}
+
+def normalize_email_text(email_text):
+    """
+    Normalize an email so trivially different copies hash the same.
+
+    Case, Unicode compatibility forms, whitespace, quote markers, reply and
+    forward prefixes and forwarded-message banners are all ignored.
+
+    Args:
+        email_text (str): The raw email content.
+
+    Returns:
+        str: The normalized text.
+    """
+    text = unicodedata.normalize("NFKC", email_text or "")
+    text = QUOTE_MARKER.sub("", text)
+    text = FORWARD_BANNER.sub("", text)
+    text = SUBJECT_PREFIX.sub("", text)
+    return WHITESPACE.sub(" ", text).strip().casefold()
+
+def routing_version():
+    """
+    The model tiers extraction is routed through, which every routed
+    extraction depends on: changing the tiers starts a new cache.
+
+    Returns:
+        str: The tiers, comma-separated, cheapest first.
+    """
+    return ",".join(model_tiers())
+
+def cache_key(email_text, model=None, prompt_version=PROMPT_VERSION):
+    """
+    Compute the content address of an extraction.
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): The model, or comma-separated model tiers, that produced
+            the extraction; defaults to routing_version().
+        prompt_version (str): The extraction prompt version.
+
+    Returns:
+        str: Hex sha256 digest.
+    """
+    payload = "\x1f".join([model or routing_version(), prompt_version, normalize_email_text(email_text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def get_cached_extractions(email_texts, model=None):
+    """
+    Look up cached extractions for several emails with a single query.
+
+    Args:
+        email_texts (list): The raw email contents.
+        model (str): As for cache_key.
+
+    Returns:
+        list: Cached extracted data dict for each email, or None on a miss.
+    """
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return [None] * len(email_texts)
+
+    model = model or routing_version()
+    keys = [cache_key(email_text, model) for email_text in email_texts]
+    cutoff = timezone.now() - timedelta(seconds=settings.EXTRACTION_CACHE_TTL)
+    entries = {
+        entry["key"]: entry
+        for entry in ExtractionCacheEntry.objects.filter(key__in=set(keys), created_at__gte=cutoff).values(
+            "key", "data", "latency_ms"
+        )
+    }
+    if entries:
+        ExtractionCacheEntry.objects.filter(key__in=entries.keys()).update(
+            hit_count=F("hit_count") + 1, last_used_at=timezone.now()
+        )
+
+    hits = [entries[key] for key in keys if key in entries]
+    with _stats_lock:
+        _stats["hits"] += len(hits)
+        _stats["misses"] += len(keys) - len(hits)
+        _stats["latency_saved_ms"] += sum(entry["latency_ms"] or 0 for entry in hits)
+    return [entries[key]["data"] if key in entries else None for key in keys]
+
+def get_cached_extraction(email_text, model=None):
+    """
+    Look up the cached extraction for an email.
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): As for cache_key.
+
+    Returns:
+        dict: Cached extracted data, or None on a miss.
+    """
+    return get_cached_extractions([email_text], model)[0]
+
+def store_extractions(items, model=None):
+    """
+    Cache freshly extracted data and evict old entries.
+
+    Only store output that passed validation: a failed extraction kept from
+    the last model tier would otherwise be served without another try.
+
+    Args:
+        items (list): (email_text, data dict, latency_ms) tuples.
+        model (str): As for cache_key.
+    """
+    if not settings.EXTRACTION_CACHE_ENABLED or not items:
+        return
+
+    model = model or routing_version()
+    ExtractionCacheEntry.objects.bulk_create(
+        [
+            ExtractionCacheEntry(
+                key=cache_key(email_text, model),
+                model=model,
+                prompt_version=PROMPT_VERSION,
+                data=data,
+                latency_ms=latency_ms,
+            )
+            for email_text, data, latency_ms in items
+        ],
+        ignore_conflicts=True,  # A concurrent worker may have cached the same email first
+    )
+    evict_extraction_cache()
+
+def store_extraction(email_text, data, latency_ms=None, model=None):
+    """
+    Cache freshly extracted data for an email.
+
+    Args:
+        email_text (str): The raw email content.
+        data (dict): The extracted data.
+        latency_ms (int): Duration of the LLM call.
+        model (str): As for cache_key.
+    """
+    store_extractions([(email_text, data, latency_ms)], model)
+
+def evict_extraction_cache():
+    """
+    Drop expired entries, then least recently used entries above the size limit.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.EXTRACTION_CACHE_TTL)
+    removed, _ = ExtractionCacheEntry.objects.filter(created_at__lt=cutoff).delete()
+
+    excess = ExtractionCacheEntry.objects.count() - settings.EXTRACTION_CACHE_MAX_ENTRIES
+    if excess > 0:
+        stale_ids = list(
+            ExtractionCacheEntry.objects.order_by("last_used_at", "id").values_list("id", flat=True)[:excess]
+        )
+        removed += ExtractionCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+    return removed
+
+def get_cache_stats():
+    """
+    Report cache effectiveness.
+
+    Returns:
+        dict: In-process hit/miss counters plus persistent totals: the number
+            of entries, lifetime hits, and the LLM latency those hits avoided.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+
+    totals = ExtractionCacheEntry.objects.aggregate(
+        total_hits=Sum("hit_count"),
+        total_latency_saved_ms=Sum(F("hit_count") * F("latency_ms")),
+    )
+    stats["entries"] = ExtractionCacheEntry.objects.count()
+    stats["total_hits"] = totals["total_hits"] or 0
+    stats["total_latency_saved_ms"] = totals["total_latency_saved_ms"] or 0
+    return stats
+
+def reset_cache_stats():
+    """
+    Reset the in-process hit/miss counters.
+    """
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,499 @@
+import asyncio
+import collections
+import email
+import email.policy
+import itertools
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+SAMPLE_EXTRACTION = {
+    "supplier_company_name": "Acme Ingredients",
+    "main_contact_name": "Jane Smith",
+    "main_contact_email": "jane@acme.example",
+    "main_contact_phone": "555-0100",
+    "hq_address": "1 Market St, Springfield",
+    "payment_terms": "Net 30",
+    "date_submitted": "2025-01-15",
+    "price_per": 1.2,
+    "country_of_origin": "USA",
+    "certifications": ["Organic", "Kosher"],
+    "minimum_order_quantity": 10000,
+}
+
+EMAIL_MARKER = "Here is the email:"
+FILE_CONTENT_PATH = re.compile(r"/files/([^/]+)/content$")
+BATCH_PATH = re.compile(r"/batches/([^/]+)$")
+
+def request_email_text(body):
+    """
+    Recover the email text from an extraction request body.
+
+    Args:
+        body (dict): The JSON body sent to /responses.
+
+    Returns:
+        str: The email embedded in the user prompt.
+    """
+    prompt = body["input"][-1]["content"]
+    return prompt.split(EMAIL_MARKER, 1)[-1].strip()
+
+def estimated_usage(body, output):
+    """
+    Estimate token usage for a request the way the API would count it, at
+    about four characters per token.
+
+    Args:
+        body (dict): The JSON body sent to /responses.
+        output (dict): Structured output the model "returned".
+
+    Returns:
+        dict: input_tokens, output_tokens and cached_tokens.
+    """
+    prompt = "".join(message["content"] for message in body.get("input", []))
+    return {"input_tokens": len(prompt) // 4, "output_tokens": len(json.dumps(output)) // 4, "cached_tokens": 0}
+
+def response_payload(output, model="o4-mini", status="completed", incomplete_reason=None, usage=None):
+    """
+    Build a Responses API payload whose output text is the given JSON object.
+
+    Args:
+        output (dict): Structured output the model "returned".
+        model (str): Model name to report.
+        status (str): Response status.
+        incomplete_reason (str): incomplete_details.reason for incomplete responses.
+        usage (dict): Token usage; estimated from the output size if omitted.
+
+    Returns:
+        dict: The JSON payload.
+    """
+    text = json.dumps(output)
+    usage = usage or {"input_tokens": 400, "output_tokens": len(text) // 4, "cached_tokens": 0}
+    return {
+        "id": f"resp_{time.monotonic_ns()}",
+        "object": "response",
+        "created_at": time.time(),
+        "status": status,
+        "model": model,
+        "incomplete_details": {"reason": incomplete_reason} if incomplete_reason else None,
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_fake",
+                "status": status,
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": usage["input_tokens"],
+            "input_tokens_details": {"cached_tokens": usage.get("cached_tokens", 0)},
+            "output_tokens": usage["output_tokens"],
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": usage["input_tokens"] + usage["output_tokens"],
+        },
+    }
+
+def stream_events(payload, chunk_size=8):
+    """
+    Break a Responses API payload into the server-sent events of a streamed response.
+
+    Args:
+        payload (dict): A completed payload from response_payload.
+        chunk_size (int): Characters of output text per delta event.
+
+    Returns:
+        list: The encoded SSE frames.
+    """
+    message = payload["output"][0]
+    text = message["content"][0]["text"]
+    in_progress = {**payload, "status": "in_progress", "output": [], "usage": None}
+    empty_part = {"type": "output_text", "text": "", "annotations": []}
+    location = {"item_id": message["id"], "output_index": 0, "content_index": 0}
+    events = [
+        {"type": "response.created", "response": in_progress},
+        {"type": "response.in_progress", "response": in_progress},
+        {"type": "response.output_item.added", "output_index": 0, "item": {**message, "status": "in_progress", "content": []}},
+        {"type": "response.content_part.added", **location, "part": empty_part},
+        *(
+            {"type": "response.output_text.delta", **location, "delta": text[start:start + chunk_size]}
+            for start in range(0, len(text), chunk_size)
+        ),
+        {"type": "response.output_text.done", **location, "text": text},
+        {"type": "response.content_part.done", **location, "part": message["content"][0]},
+        {"type": "response.output_item.done", "output_index": 0, "item": message},
+        {"type": f"response.{payload['status']}", "response": payload},
+    ]
+    return [
+        f"event: {event['type']}\ndata: {json.dumps({**event, 'sequence_number': number})}\n\n".encode("utf-8")
+        for number, event in enumerate(events)
+    ]
+
+class PacedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """
+    Response body that sends its chunks with a pause between each, like tokens
+    arriving from a model.
+    """
+    def __init__(self, chunks, interval=0.0):
+        self.chunks = chunks
+        self.interval = interval
+
+    def __iter__(self):
+        for position, chunk in enumerate(self.chunks):
+            if position and self.interval:
+                time.sleep(self.interval)
+            yield chunk
+
+    async def __aiter__(self):
+        for position, chunk in enumerate(self.chunks):
+            if position and self.interval:
+                await asyncio.sleep(self.interval)
+            yield chunk
+
+def multipart_fields(request):
+    """
+    Decode a multipart/form-data request body.
+
+    Args:
+        request (httpx.Request): The request.
+
+    Returns:
+        dict: Field name to (filename, content bytes).
+    """
+    header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode("ascii")
+    message = email.message_from_bytes(header + request.content, policy=email.policy.HTTP)
+    return {
+        part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    }
+
+@dataclass
+class Fault:
+    """
+    A failure a FakeOpenAI answers one /responses request with.
+
+    Args:
+        status (int): HTTP error status to return, e.g. 429 or 503.
+        retry_after (float): Seconds to send in the Retry-After header.
+        code (str): error.code of the error body, e.g. "insufficient_quota".
+        timeout (bool): Raise a read timeout instead of answering.
+        incomplete_reason (str): Answer with an incomplete response instead;
+            for "max_output_tokens" the output JSON is cut off half way.
+    """
+    status: int = None
+    retry_after: float = None
+    code: str = None
+    timeout: bool = False
+    incomplete_reason: str = None
+
+class FakeTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that answers from a FakeOpenAI, for sync and async clients.
+    """
+    def __init__(self, fake):
+        self.fake = fake
+
+    def handle_request(self, request):
+        request.read()
+        return self.fake.handle(request)
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        return await self.fake.handle_async(request)
+
+class FakeOpenAI:
+    """
+    In-process stand-in for the OpenAI HTTP API.
+
+    Use transport() with compareapp.llm_client.set_transport for tests, or
+    serve() to expose it on a local port for OPENAI_BASE_URL.
+
+    Batches (/files and /batches) run the responder over every request of
+    the input file once they have been retrieved batch_polls times. A
+    responder that raises fails that request; requests beyond batch_limit
+    are left unprocessed and the batch ends up "expired", as a batch that
+    outlives its completion window does.
+
+    Args:
+        responder (callable): Called with (email_text, request body) and
+            returns the structured output dict. Defaults to SAMPLE_EXTRACTION.
+        latency (float): Seconds to wait before answering each request (for
+            streamed responses, before the first event).
+        stream_interval (float): Seconds between the events of a streamed response.
+        batch_polls (int): Retrievals before a batch finishes.
+        batch_limit (int): Requests processed per batch, or None for all.
+        faults (list): Faults to answer the next /responses requests with,
+            one each, in order. More can be queued with inject().
+    """
+    def __init__(self, responder=None, latency=0.0, stream_interval=0.0, batch_polls=1, batch_limit=None, faults=None):
+        self.responder = responder or (lambda email_text, body: SAMPLE_EXTRACTION)
+        self.latency = latency
+        self.stream_interval = stream_interval
+        self.batch_polls = batch_polls
+        self.batch_limit = batch_limit
+        self.faults = collections.deque(faults or ())
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.files = {}
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def transport(self):
+        """
+        Returns:
+            FakeTransport: A transport answering requests in-process.
+        """
+        return FakeTransport(self)
+
+    def inject(self, *faults):
+        """
+        Queue faults for the next /responses requests.
+
+        Args:
+            *faults (Fault): One fault per request.
+        """
+        with self._lock:
+            self.faults.extend(faults)
+
+    def _next_fault(self):
+        with self._lock:
+            return self.faults.popleft() if self.faults else None
+
+    def _begin(self, request):
+        is_json = request.headers.get("content-type", "").startswith("application/json")
+        body = json.loads(request.content) if request.content and is_json else {}
+        with self._lock:
+            self.requests.append({"method": request.method, "path": request.url.path, "body": body})
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return body
+
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def handle(self, request):
+        """
+        Answer one HTTP request.
+
+        Args:
+            request (httpx.Request): The request sent by the OpenAI client.
+
+        Returns:
+            httpx.Response: The fake API response.
+        """
+        body = self._begin(request)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            return self.route(request, body)
+        finally:
+            self._end()
+
+    async def handle_async(self, request):
+        """
+        Answer one HTTP request without blocking the event loop.
+        """
+        body = self._begin(request)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self.route(request, body)
+        finally:
+            self._end()
+
+    def route(self, request, body):
+        path = request.url.path.rstrip("/")
+        file_content = FILE_CONTENT_PATH.search(path)
+        batch = BATCH_PATH.search(path)
+        if request.method == "POST" and path.endswith("/responses"):
+            fault = self._next_fault()
+            if fault is not None and (fault.status or fault.timeout):
+                return self.fault_response(request, fault)
+            output = self.responder(request_email_text(body), body)
+            if fault is not None and fault.incomplete_reason:
+                payload = response_payload(
+                    output, model=body.get("model", "o4-mini"), status="incomplete",
+                    incomplete_reason=fault.incomplete_reason, usage=estimated_usage(body, output),
+                )
+                if fault.incomplete_reason == "max_output_tokens":
+                    content = payload["output"][0]["content"][0]
+                    content["text"] = content["text"][:len(content["text"]) // 2]
+            else:
+                payload = response_payload(output, model=body.get("model", "o4-mini"), usage=estimated_usage(body, output))
+            if body.get("stream"):
+                return httpx.Response(
+                    200,
+                    headers={"content-type": "text/event-stream"},
+                    stream=PacedStream(stream_events(payload), self.stream_interval),
+                )
+            return httpx.Response(200, json=payload)
+        if request.method == "POST" and path.endswith("/files"):
+            return httpx.Response(200, json=self.create_file(multipart_fields(request)))
+        if request.method == "GET" and file_content and file_content.group(1) in self.files:
+            return httpx.Response(200, content=self.files[file_content.group(1)]["content"])
+        if request.method == "POST" and path.endswith("/batches"):
+            return httpx.Response(200, json=self.create_batch(body))
+        if request.method == "GET" and batch and batch.group(1) in self.batches:
+            return httpx.Response(200, json=self.poll_batch(batch.group(1)))
+        return httpx.Response(404, json={"error": {"message": f"No fake route for {request.url.path}"}})
+
+    def fault_response(self, request, fault):
+        """
+        Returns:
+            httpx.Response: The error response for a fault.
+
+        Raises:
+            httpx.ReadTimeout: For a timeout fault.
+        """
+        if fault.timeout:
+            raise httpx.ReadTimeout("Fake read timeout", request=request)
+        headers = {"retry-after": str(fault.retry_after)} if fault.retry_after is not None else {}
+        error = {"message": f"Fake error {fault.status}", "type": "server_error", "code": fault.code}
+        return httpx.Response(fault.status, headers=headers, json={"error": error})
+
+    def _next_id(self, prefix):
+        with self._lock:
+            return f"{prefix}_{next(self._ids)}"
+
+    def add_file(self, content, filename="file.jsonl", purpose="batch"):
+        file_id = self._next_id("file")
+        self.files[file_id] = {"filename": filename, "purpose": purpose, "content": content}
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def create_file(self, fields):
+        filename, content = fields["file"]
+        return self.add_file(content, filename, fields["purpose"][1].decode("utf-8"))
+
+    def create_batch(self, body):
+        batch_id = self._next_id("batch")
+        lines = self.files[body["input_file_id"]]["content"].decode("utf-8").splitlines()
+        self.batches[batch_id] = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "errors": None,
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "validating",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": len([line for line in lines if line.strip()]), "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+            "polls": 0,
+        }
+        return self._batch_payload(batch_id)
+
+    def _batch_payload(self, batch_id):
+        return {key: value for key, value in self.batches[batch_id].items() if key != "polls"}
+
+    def poll_batch(self, batch_id):
+        batch = self.batches[batch_id]
+        batch["polls"] += 1
+        if batch["status"] in ("validating", "in_progress"):
+            if batch["polls"] >= self.batch_polls:
+                self.run_batch(batch)
+            else:
+                batch["status"] = "in_progress"
+        return self._batch_payload(batch_id)
+
+    def run_batch(self, batch):
+        """
+        Answer every request in a batch and write its output and error files.
+        """
+        output, errors = [], []
+        lines = [json.loads(line) for line in self.files[batch["input_file_id"]]["content"].decode("utf-8").splitlines() if line.strip()]
+        for position, line in enumerate(lines):
+            result = {"id": self._next_id("batch_req"), "custom_id": line["custom_id"], "response": None, "error": None}
+            if self.batch_limit is not None and position >= self.batch_limit:
+                result["error"] = {
+                    "code": "batch_expired",
+                    "message": "This request could not be executed before the completion window expired.",
+                }
+                errors.append(result)
+                continue
+            body = line["body"]
+            try:
+                extracted = self.responder(request_email_text(body), body)
+                payload = response_payload(extracted, model=body.get("model", "o4-mini"), usage=estimated_usage(body, extracted))
+            except Exception as exc:
+                result["response"] = {"status_code": 500, "request_id": result["id"], "body": {"error": {"message": str(exc), "type": "server_error"}}}
+                errors.append(result)
+            else:
+                result["response"] = {"status_code": 200, "request_id": result["id"], "body": payload}
+                output.append(result)
+
+        def jsonl(results):
+            return "".join(json.dumps(result) + "\n" for result in results).encode("utf-8")
+
+        batch["status"] = "expired" if self.batch_limit is not None and len(lines) > self.batch_limit else "completed"
+        batch["output_file_id"] = self.add_file(jsonl(output), "batch_output.jsonl", "batch_output")["id"] if output else None
+        batch["error_file_id"] = self.add_file(jsonl(errors), "batch_errors.jsonl", "batch_output")["id"] if errors else None
+        batch["request_counts"] = {"total": len(lines), "completed": len(output), "failed": len(errors)}
+        batch["completed_at" if batch["status"] == "completed" else "expired_at"] = int(time.time())
+
+    @contextmanager
+    def serve(self):
+        """
+        Serve the fake API over HTTP on a free localhost port.
+
+        Yields:
+            str: Base URL to use as OPENAI_BASE_URL.
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = httpx.Request(
+                    self.command,
+                    f"http://{self.headers.get('Host', 'localhost')}{self.path}",
+                    headers=dict(self.headers),
+                    content=self.rfile.read(length),
+                )
+                response = fake.handle(request)
+                content = response.read()
+                self.send_response(response.status_code)
+                for name, value in response.headers.items():
+                    if name.lower() not in ("content-length", "transfer-encoding", "connection"):
+                        self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_DELETE = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -39,4 +39,38 @@ class RFQForm(forms.ModelForm):
         required_certifications = self.cleaned_data.get('required_certifications')
         if not isinstance(required_certifications, str):
             raise forms.ValidationError("Required certifications must be a comma-separated string.")
-        return required_certifications
\ No newline at end of file
+        return required_certifications
+
+class RFQFilterForm(forms.Form):
+    STATUS_ACTIVE = 'active'
+    STATUS_EXPIRED = 'expired'
+    STATUS_ALL = 'all'
+    STATUS_CHOICES = [
+        (STATUS_ACTIVE, 'Active'),
+        (STATUS_EXPIRED, 'Expired'),
+        (STATUS_ALL, 'All'),
+    ]
+
+    status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
+    item = forms.CharField(max_length=255, required=False)
+    due_after = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    due_before = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+    page_size = forms.IntegerField(min_value=1, max_value=100, required=False, widget=forms.HiddenInput)
+
+    def clean_status(self):
+        # Expired RFQs are kept for analysis but hidden unless asked for
+        return self.cleaned_data.get('status') or self.STATUS_ACTIVE
+
+class SupplierFilterForm(forms.Form):
+    company_name = forms.CharField(max_length=255, required=False)
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+    page_size = forms.IntegerField(min_value=1, max_value=100, required=False, widget=forms.HiddenInput)
+
+class UsageReportForm(forms.Form):
+    DEFAULT_DAYS = 30
+
+    days = forms.IntegerField(min_value=1, max_value=3650, required=False)
+
+    def clean_days(self):
+        return self.cleaned_data.get('days') or self.DEFAULT_DAYS
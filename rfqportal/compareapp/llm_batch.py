@@ -0,0 +1,128 @@
+import json
+from dataclasses import dataclass
+
+from pydantic import ValidationError
+
+from .llm_client import get_client
+from .llm_resilience import call_with_retries
+from .llm_services import DEFAULT_MODEL, EXTRACTION_TEXT_FORMAT, EmailData, build_extraction_input, default_date_submitted
+
+BATCH_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+
+# OpenAI batch statuses after which no more results will arrive
+TERMINAL_BATCH_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    data: EmailData = None
+    error: str = None
+    model: str = None
+    usage: dict = None  # The response's usage block
+
+def build_batch_request(custom_id, email_text, model=DEFAULT_MODEL):
+    """
+    Build one line of a Batch API input file for an extraction.
+
+    Args:
+        custom_id (str): Identifier echoed back in the result line.
+        email_text (str): The raw email content.
+        model (str): The OpenAI model to use.
+
+    Returns:
+        dict: The request line.
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "input": build_extraction_input(email_text),
+            "text": {"format": EXTRACTION_TEXT_FORMAT},
+        },
+    }
+
+def submit_batch(requests, metadata=None):
+    """
+    Upload batch requests as a JSONL file and start a batch over them.
+
+    Args:
+        requests (list): Lines from build_batch_request.
+        metadata (dict): String key/value pairs stored on the batch.
+
+    Returns:
+        Batch: The created OpenAI batch.
+    """
+    client = get_client()
+    content = "\n".join(json.dumps(request) for request in requests).encode("utf-8")
+    # Batch API calls have their own limits, outside the realtime rate limiter
+    input_file = call_with_retries(
+        lambda: client.files.create(file=("extraction-batch.jsonl", content, "application/jsonl"), purpose="batch"),
+        rate_limited=False,
+    )
+    return call_with_retries(
+        lambda: client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+            metadata=metadata,
+        ),
+        rate_limited=False,
+    )
+
+def retrieve_batch(batch_id):
+    """
+    Returns:
+        Batch: The current state of an OpenAI batch.
+    """
+    return call_with_retries(lambda: get_client().batches.retrieve(batch_id), rate_limited=False)
+
+def download_batch_file(file_id):
+    """
+    Download a batch output or error file.
+
+    Args:
+        file_id (str): The file ID.
+
+    Returns:
+        list: The decoded JSONL lines.
+    """
+    content = call_with_retries(lambda: get_client().files.content(file_id).text, rate_limited=False)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+def parse_batch_result(line):
+    """
+    Turn one line of a batch output or error file into an extraction result.
+
+    Args:
+        line (dict): The decoded result line.
+
+    Returns:
+        BatchResult: The extracted data, or the reason the request failed.
+    """
+    custom_id = line.get("custom_id")
+    if line.get("error"):
+        error = line["error"]
+        return BatchResult(custom_id, error=f"{error.get('code')}: {error.get('message')}")
+
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = (body.get("error") or {}).get("message")
+        return BatchResult(custom_id, error=message or f"Request failed with HTTP {response.get('status_code')}")
+    if body.get("status") != "completed":
+        reason = (body.get("incomplete_details") or {}).get("reason") or body.get("status")
+        return BatchResult(custom_id, error=f"Incomplete response: {reason}")
+
+    text = "".join(
+        content.get("text", "")
+        for item in body.get("output", []) if item.get("type") == "message"
+        for content in item.get("content", []) if content.get("type") == "output_text"
+    )
+    try:
+        data = default_date_submitted(EmailData.model_validate_json(text))
+    except ValidationError as exc:
+        return BatchResult(custom_id, error=f"Extracted data did not match the schema ({exc.error_count()} errors)")
+    return BatchResult(custom_id, data=data, model=body.get("model"), usage=body.get("usage"))
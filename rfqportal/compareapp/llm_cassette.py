@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+
+MODE_REPLAY = "replay"
+MODE_RECORD = "record"
+MODE_AUTO = "auto"
+MODES = (MODE_REPLAY, MODE_RECORD, MODE_AUTO)
+
+CASSETTE_VERSION = 1
+# Response headers worth keeping; the rest (cookies, org ids, rate limit counters) are dropped
+RECORDED_HEADERS = ("content-type", "retry-after", "retry-after-ms", "x-request-id")
+# Status for requests missing from the cassette in replay mode; not retried by llm_resilience
+MISS_STATUS = 400
+
+_lock = threading.Lock()
+_cassette = None
+
+def request_key(method, path, content):
+    """
+    Identify a request independently of header and JSON key order.
+
+    Returns:
+        str: Method, path and a hash of the body.
+    """
+    try:
+        canonical = json.dumps(json.loads(content), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:  # Not JSON, e.g. a batch file upload
+        canonical = content
+    return f"{method} {path} {hashlib.sha256(canonical).hexdigest()[:16]}"
+
+class Cassette:
+    """
+    Recorded OpenAI API interactions, kept in a JSON file.
+
+    Identical requests recorded several times are replayed in the order
+    they were recorded, repeating the last one once all have been used.
+
+    Args:
+        path (str): The cassette file; created on the first recording.
+        mode (str): "replay" answers only from the file, "record" calls the
+            API and records every response, "auto" replays what was
+            recorded and records the rest.
+        latency (float): Seconds each replayed response takes, or None to
+            take as long as the recorded call did.
+    """
+    def __init__(self, path, mode=MODE_REPLAY, latency=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}.")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.interactions = []
+        self._by_key = {}
+        self._played = {}
+        self._lock = threading.Lock()
+        if self.path.exists() and mode != MODE_RECORD:
+            for interaction in json.loads(self.path.read_text(encoding="utf-8"))["interactions"]:
+                self._add(interaction)
+
+    def __len__(self):
+        return len(self.interactions)
+
+    def _add(self, interaction):
+        self.interactions.append(interaction)
+        self._by_key.setdefault(interaction["key"], []).append(interaction)
+
+    def find(self, key):
+        """
+        Returns:
+            dict: The next recorded interaction for the request, or None.
+        """
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                return None
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+            return recorded[min(played, len(recorded) - 1)]
+
+    def record(self, key, request, response, duration):
+        """
+        Add an interaction and write the cassette file.
+
+        Args:
+            key (str): The request_key.
+            request (httpx.Request): The request sent.
+            response (httpx.Response): Its response, already read.
+            duration (float): Seconds the call took.
+        """
+        try:
+            body = json.loads(request.content)
+        except ValueError:
+            body = None
+        interaction = {
+            "key": key,
+            "request": {"method": request.method, "path": request.url.path, "body": body},
+            "response": {
+                "status_code": response.status_code,
+                "headers": {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+                "body": response.content.decode("utf-8", errors="replace"),
+            },
+            "duration_s": round(duration, 4),
+        }
+        with self._lock:
+            self._add(interaction)
+            self.save()
+
+    def save(self):
+        """
+        Write the cassette atomically, so readers never see half a file.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        temporary.write_text(
+            json.dumps({"version": CASSETTE_VERSION, "interactions": self.interactions}, indent=1),
+            encoding="utf-8",
+        )
+        os.replace(temporary, self.path)
+
+    def delay(self, interaction):
+        """
+        Returns:
+            float: Seconds to wait before replaying the interaction.
+        """
+        return interaction["duration_s"] if self.latency is None else self.latency
+
+def replayed_response(interaction):
+    response = interaction["response"]
+    return httpx.Response(response["status_code"], headers=response["headers"], content=response["body"].encode("utf-8"))
+
+def missing_response(key):
+    return httpx.Response(MISS_STATUS, json={"error": {
+        "message": f"No recorded response for {key}. Record the cassette again.",
+        "type": "cassette_miss",
+        "code": None,
+        "param": None,
+    }})
+
+class CassetteTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport that records OpenAI API calls to a Cassette and replays
+    them, for sync and async clients.
+
+    Args:
+        cassette (Cassette): Where interactions are kept.
+        transport (httpx.BaseTransport): The transport recorded calls go
+            through (an async one for async clients); unused in replay mode.
+    """
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        self.transport = transport
+
+    def _replay(self, request):
+        """
+        Returns:
+            tuple: The request key and the interaction to replay, or None if
+                the call must go to the API.
+        """
+        key = request_key(request.method, request.url.path, request.content)
+        if self.cassette.mode == MODE_RECORD:
+            return key, None
+        return key, self.cassette.find(key)
+
+    def handle_request(self, request):
+        request.read()
+        key, interaction = self._replay(request)
+        if interaction is not None:
+            time.sleep(self.cassette.delay(interaction))
+            return replayed_response(interaction)
+        if self.cassette.mode == MODE_REPLAY or self.transport is None:
+            return missing_response(key)
+
+        started = time.monotonic()
+        response = self.transport.handle_request(request)
+        try:
+            response.read()
+        finally:
+            response.close()
+        self.cassette.record(key, request, response, time.monotonic() - started)
+        return response
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        key, interaction = self._replay(request)
+        if interaction is not None:
+            await asyncio.sleep(self.cassette.delay(interaction))
+            return replayed_response(interaction)
+        if self.cassette.mode == MODE_REPLAY or self.transport is None:
+            return missing_response(key)
+
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        try:
+            await response.aread()
+        finally:
+            await response.aclose()
+        self.cassette.record(key, request, response, time.monotonic() - started)
+        return response
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+
+def get_cassette():
+    """
+    Return the cassette configured by OPENAI_CASSETTE, shared by the sync
+    and async clients.
+
+    Returns:
+        Cassette: The cassette, or None if OPENAI_CASSETTE is not set.
+    """
+    global _cassette
+    if not settings.OPENAI_CASSETTE:
+        return None
+    latency = settings.OPENAI_CASSETTE_LATENCY
+    latency = None if latency < 0 else latency
+    with _lock:
+        configured = (Path(settings.OPENAI_CASSETTE), settings.OPENAI_CASSETTE_MODE, latency)
+        if _cassette is None or (_cassette.path, _cassette.mode, _cassette.latency) != configured:
+            _cassette = Cassette(*configured)
+        return _cassette
+
+def wrap_transport(transport):
+    """
+    Put the configured cassette, if any, in front of a network transport.
+
+    Args:
+        transport: The httpx transport the client would otherwise use.
+
+    Returns:
+        The transport to give the client.
+    """
+    cassette = get_cassette()
+    return transport if cassette is None else CassetteTransport(cassette, transport)
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+import httpx
+from django.conf import settings
+from openai import AsyncOpenAI, OpenAI
+
+from .llm_cassette import wrap_transport
+from .llm_resilience import reset_circuit_breaker
+from .metrics import instrument_transport
+
+# One client per process: its httpx pool keeps TLS connections to the API
+# alive between extraction calls. OpenAI clients are safe to share between
+# threads. Async clients and their pools belong to the event loop that
+# created them, so those are kept per loop.
+_lock = threading.Lock()
+_client = None
+_transport = None
+_semaphore = None
+_async_clients = weakref.WeakKeyDictionary()
+_async_semaphores = weakref.WeakKeyDictionary()
+
+def _limits(max_connections=None):
+    return httpx.Limits(
+        max_connections=max_connections or settings.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+    )
+
+def _timeout():
+    return httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
+
+def _build_client():
+    transport = instrument_transport(_transport or wrap_transport(httpx.HTTPTransport(limits=_limits())))
+    http_client = httpx.Client(transport=transport, timeout=_timeout())
+    return OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL or None,
+        http_client=http_client,
+        timeout=_timeout(),
+        max_retries=0,  # Retries are left to compareapp.llm_resilience
+    )
+
+def get_client():
+    """
+    Return the process-wide OpenAI client, creating it on first use.
+
+    Returns:
+        OpenAI: The shared client.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+def _build_async_client():
+    transport = instrument_transport(_transport or wrap_transport(httpx.AsyncHTTPTransport(limits=_limits(settings.OPENAI_ASYNC_MAX_CONNECTIONS))))
+    http_client = httpx.AsyncClient(transport=transport, timeout=_timeout())
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        base_url=settings.OPENAI_BASE_URL or None,
+        http_client=http_client,
+        timeout=_timeout(),
+        max_retries=0,  # Retries are left to compareapp.llm_resilience
+    )
+
+def get_async_client():
+    """
+    Return the AsyncOpenAI client for the running event loop.
+
+    Must be called from a coroutine.
+
+    Returns:
+        AsyncOpenAI: The shared client for this loop.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = _build_async_client()
+    return client
+
+def set_transport(transport):
+    """
+    Route all OpenAI traffic through a custom httpx transport.
+
+    Tests use this to substitute an in-process fake server
+    (see compareapp.fake_openai). Pass None to restore the network transport.
+    The transport must support async requests too if the async client is used.
+
+    Args:
+        transport (httpx.BaseTransport): The transport to use, or None.
+    """
+    global _transport
+    with _lock:
+        _transport = transport
+    reset_client()
+
+def reset_client():
+    """
+    Close the shared client so the next call rebuilds it, and the circuit
+    breaker, from current settings.
+    """
+    global _client, _semaphore
+    with _lock:
+        client, _client, _semaphore = _client, None, None
+        # Async clients can only be closed from their own loop; drop them and let them be collected
+        _async_clients.clear()
+        _async_semaphores.clear()
+    reset_circuit_breaker()
+    if client is not None:
+        client.close()
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        with _lock:
+            if _semaphore is None:
+                _semaphore = threading.BoundedSemaphore(settings.OPENAI_MAX_CONCURRENCY)
+    return _semaphore
+
+@contextmanager
+def llm_slot():
+    """
+    Limit the number of LLM calls in flight from this process.
+
+    Blocks until one of OPENAI_MAX_CONCURRENCY slots is free.
+    """
+    semaphore = _get_semaphore()
+    with semaphore:
+        yield
+
+@asynccontextmanager
+async def allm_slot():
+    """
+    Async counterpart of llm_slot, bounded by OPENAI_ASYNC_MAX_CONCURRENCY.
+
+    Waiting coroutines hold no thread, so this limit can be far higher
+    than the thread-based one.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        semaphore = _async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _async_semaphores[loop] = asyncio.Semaphore(settings.OPENAI_ASYNC_MAX_CONCURRENCY)
+    async with semaphore:
+        yield
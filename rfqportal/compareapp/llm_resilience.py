@@ -0,0 +1,466 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import httpx
+import openai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+
+from .metrics import LLM_UNAVAILABLE, record_llm_retry
+from .models import RateLimitBucket
+
+# Status codes worth retrying: request timeout, conflict, rate limit and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+# A 429 with this code means the account is out of credit; waiting will not help
+QUOTA_EXHAUSTED_CODE = "insufficient_quota"
+
+REQUESTS_BUCKET = "openai-requests"
+TOKENS_BUCKET = "openai-tokens"
+# Concurrent takes that lost the race re-read the bucket this many times
+BUCKET_UPDATE_ATTEMPTS = 5
+
+class LLMUnavailableError(Exception):
+    """
+    The LLM provider could not serve a request: transient failures outlasted
+    the retries, the rate limit wait was too long, or the circuit is open.
+
+    Attributes:
+        retry_after (float): Seconds after which trying again may succeed.
+    """
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpenError(LLMUnavailableError):
+    """
+    Raised without calling the provider while the circuit breaker is open.
+    """
+
+class IncompleteResponseError(Exception):
+    """
+    The model stopped before finishing its output.
+
+    Attributes:
+        reason (str): incomplete_details.reason, e.g. "max_output_tokens".
+    """
+    def __init__(self, reason):
+        super().__init__(f"Response incomplete: {reason}")
+        self.reason = reason
+
+# Define helpers that classify provider errors
+def is_transient(exc):
+    """
+    Tell whether an OpenAI client error may go away if the call is retried.
+
+    Args:
+        exc (Exception): The error raised by the call.
+
+    Returns:
+        bool: True for timeouts, connection errors, rate limits and 5xx responses.
+    """
+    if isinstance(exc, (openai.APIConnectionError, httpx.TransportError)):
+        # APIConnectionError includes APITimeoutError; a dropped stream surfaces as a bare httpx error
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        if exc.status_code == 429 and getattr(exc, "code", None) == QUOTA_EXHAUSTED_CODE:
+            return False
+        return exc.status_code in RETRYABLE_STATUS_CODES or exc.status_code >= 500
+    return False
+
+def retry_after(exc):
+    """
+    Read the delay the provider asked for from an error response.
+
+    Understands retry-after-ms, and retry-after as seconds or an HTTP date.
+
+    Args:
+        exc (Exception): The error raised by the call.
+
+    Returns:
+        float: Seconds to wait, or None if the response did not say.
+    """
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        if headers.get("retry-after"):
+            value = headers["retry-after"]
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def backoff_delay(attempt, requested=None):
+    """
+    Seconds to wait before a retry: exponential backoff with full jitter,
+    but never less than the provider asked for.
+
+    Args:
+        attempt (int): Number of the failed attempt, from 0.
+        requested (float): Delay from the provider's Retry-After header.
+
+    Returns:
+        float: The delay.
+    """
+    ceiling = min(settings.OPENAI_RETRY_MAX_DELAY, settings.OPENAI_RETRY_BASE_DELAY * 2 ** attempt)
+    delay = random.uniform(0, ceiling)
+    if requested is not None:
+        delay = max(delay, requested)
+    return delay
+
+# Define the circuit breaker
+class CircuitBreaker:
+    """
+    Stop calling the provider after repeated transient failures.
+
+    Closed: calls go through and consecutive transient failures are counted.
+    Open: calls fail fast with CircuitOpenError for reset_timeout seconds.
+    Half-open: one trial call goes through; success closes the circuit and
+    failure opens it again.
+
+    Args:
+        failure_threshold (int): Consecutive failures that open the circuit.
+        reset_timeout (float): Seconds the circuit stays open.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self):
+        """
+        Returns:
+            bool: True if this call is the half-open trial.
+
+        Raises:
+            CircuitOpenError: If the call should not be made.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return False
+            if state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            remaining = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError("The LLM provider is failing; calls are paused.", retry_after=remaining or self.reset_timeout)
+
+    def release_trial(self):
+        """
+        Give up the half-open trial without a result, e.g. when the call
+        was never made, so another caller can make it.
+        """
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logging.warning(f"Opening the LLM circuit after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+                self.trial_in_flight = False
+
+# One breaker per process: each worker notices an outage after its own few failures
+_breaker_lock = threading.Lock()
+_breaker = None
+
+def get_circuit_breaker():
+    """
+    Returns:
+        CircuitBreaker: The process-wide breaker, built from settings on first use.
+    """
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(settings.OPENAI_CIRCUIT_FAILURE_THRESHOLD, settings.OPENAI_CIRCUIT_RESET_TIMEOUT)
+    return _breaker
+
+def reset_circuit_breaker():
+    """
+    Close the circuit and rebuild the breaker from current settings on next use.
+    """
+    global _breaker
+    with _breaker_lock:
+        _breaker = None
+
+# Define the shared rate limiter
+class TokenBucket:
+    """
+    Token bucket kept in the database, so every web process and extraction
+    worker draws from the same allowance.
+
+    The bucket refills continuously at rate tokens per second up to
+    capacity. Takes are a read followed by a conditional UPDATE on the row's
+    version, so no row locking support is needed from the database.
+
+    Args:
+        name (str): Row name of the bucket.
+        rate (float): Tokens added per second.
+        capacity (float): Most tokens the bucket holds, i.e. the largest burst.
+    """
+    def __init__(self, name, rate, capacity):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+
+    def _row(self):
+        row = RateLimitBucket.objects.filter(name=self.name).values("tokens", "updated_at", "version").first()
+        if row is None:
+            try:
+                RateLimitBucket.objects.create(name=self.name, tokens=self.capacity, updated_at=time.time())
+            except IntegrityError:
+                pass  # Created by another process in the meantime
+            row = RateLimitBucket.objects.filter(name=self.name).values("tokens", "updated_at", "version").first()
+        return row
+
+    def try_take(self, tokens):
+        """
+        Take tokens if the bucket holds enough.
+
+        Args:
+            tokens (float): Tokens to take; more than capacity is taken as capacity.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the seconds until they will be available.
+        """
+        tokens = min(tokens, self.capacity)
+        for _ in range(BUCKET_UPDATE_ATTEMPTS):
+            row = self._row()
+            now = time.time()
+            available = min(self.capacity, row["tokens"] + max(0.0, now - row["updated_at"]) * self.rate)
+            if available < tokens:
+                return (tokens - available) / self.rate
+            taken = RateLimitBucket.objects.filter(name=self.name, version=row["version"]).update(
+                tokens=available - tokens, updated_at=now, version=row["version"] + 1
+            )
+            if taken:
+                return 0.0
+        return 1 / self.rate  # Heavily contended: back off as for an empty bucket
+
+def _buckets(tokens):
+    """
+    The buckets a call draws from and what it takes from each.
+
+    Returns:
+        list: (TokenBucket, amount) pairs for the configured limits.
+    """
+    burst = settings.OPENAI_RATE_LIMIT_BURST
+    buckets = []
+    if settings.OPENAI_RATE_LIMIT_RPM:
+        rate = settings.OPENAI_RATE_LIMIT_RPM / 60
+        buckets.append((TokenBucket(REQUESTS_BUCKET, rate, max(1.0, rate * burst)), 1))
+    if settings.OPENAI_RATE_LIMIT_TPM and tokens:
+        rate = settings.OPENAI_RATE_LIMIT_TPM / 60
+        buckets.append((TokenBucket(TOKENS_BUCKET, rate, max(1.0, rate * burst)), tokens))
+    return buckets
+
+def _rate_limit_wait(tokens):
+    """
+    Take from every configured bucket, waiting for them to refill.
+
+    Returns:
+        float: Seconds to wait before trying again, or 0 once everything was taken.
+    """
+    for bucket, amount in _buckets(tokens):
+        wait = bucket.try_take(amount)
+        if wait:
+            return wait
+    return 0.0
+
+def _check_rate_limit_wait(wait, waited):
+    if waited + wait > settings.OPENAI_RATE_LIMIT_MAX_WAIT:
+        raise LLMUnavailableError("The LLM rate limit is exhausted.", retry_after=wait)
+
+def acquire_rate_limit(tokens=0):
+    """
+    Wait until the shared rate limits allow one more request.
+
+    Args:
+        tokens (int): Estimated tokens the request will use.
+
+    Raises:
+        LLMUnavailableError: If the wait would exceed OPENAI_RATE_LIMIT_MAX_WAIT.
+    """
+    waited = 0.0
+    while wait := _rate_limit_wait(tokens):
+        _check_rate_limit_wait(wait, waited)
+        time.sleep(wait)
+        waited += wait
+
+async def aacquire_rate_limit(tokens=0):
+    """
+    Async variant of acquire_rate_limit; waits without blocking the event loop.
+    """
+    waited = 0.0
+    while wait := await sync_to_async(_rate_limit_wait)(tokens):
+        _check_rate_limit_wait(wait, waited)
+        await asyncio.sleep(wait)
+        waited += wait
+
+# Define the retry loop
+class Attempt:
+    """
+    One try at a provider call, used as a context manager inside retrying().
+
+    Transient errors are recorded and suppressed so the loop can retry;
+    anything else propagates unchanged.
+    """
+    def __init__(self, number, breaker):
+        self.number = number
+        self.breaker = breaker
+        self.error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None or not is_transient(exc):
+            # A bad request or an invalid output still shows the provider is up
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        self.error = exc
+        return True
+
+def _next_delay(attempt):
+    """
+    Returns:
+        float: Seconds to wait before the next attempt.
+
+    Raises:
+        LLMUnavailableError: If the attempts are used up or the provider asked
+            for a longer wait than OPENAI_RETRY_MAX_DELAY.
+    """
+    requested = retry_after(attempt.error)
+    if attempt.number >= settings.OPENAI_MAX_RETRIES or (requested or 0) > settings.OPENAI_RETRY_MAX_DELAY:
+        LLM_UNAVAILABLE.inc()
+        raise LLMUnavailableError(
+            f"The LLM call failed after {attempt.number + 1} attempt(s): {attempt.error}",
+            retry_after=requested or settings.OPENAI_RETRY_MAX_DELAY,
+        ) from attempt.error
+    delay = backoff_delay(attempt.number, requested)
+    record_llm_retry(attempt.error)
+    logging.info(f"Retrying the LLM call in {delay:.2f}s after: {attempt.error}")
+    return delay
+
+def retrying(tokens=0, rate_limited=True):
+    """
+    Yield attempts at a provider call until one gets through.
+
+    Each attempt first checks the circuit breaker and, if rate_limited,
+    takes from the shared rate limits. Use it as:
+
+        for attempt in retrying(tokens):
+            with attempt:
+                response = client.responses.parse(...)
+
+    Args:
+        tokens (int): Estimated tokens per call, for the tokens-per-minute limit.
+        rate_limited (bool): False for calls outside the realtime limits (Batch API).
+
+    Yields:
+        Attempt: Context manager wrapping one try.
+
+    Raises:
+        LLMUnavailableError: If no attempt got through.
+    """
+    breaker = get_circuit_breaker()
+    number = 0
+    while True:
+        trial = breaker.before_call()
+        if rate_limited:
+            try:
+                acquire_rate_limit(tokens)
+            except BaseException:
+                if trial:
+                    breaker.release_trial()  # No attempt was made to report on
+                raise
+        attempt = Attempt(number, breaker)
+        yield attempt
+        if attempt.error is None:
+            return
+        time.sleep(_next_delay(attempt))
+        number += 1
+
+async def aretrying(tokens=0, rate_limited=True):
+    """
+    Async variant of retrying, used with async for.
+    """
+    breaker = get_circuit_breaker()
+    number = 0
+    while True:
+        trial = breaker.before_call()
+        if rate_limited:
+            try:
+                await aacquire_rate_limit(tokens)
+            except BaseException:
+                if trial:
+                    breaker.release_trial()
+                raise
+        attempt = Attempt(number, breaker)
+        yield attempt
+        if attempt.error is None:
+            return
+        await asyncio.sleep(_next_delay(attempt))
+        number += 1
+
+def call_with_retries(function, tokens=0, rate_limited=True):
+    """
+    Call function() under retrying().
+
+    Returns:
+        The function's result.
+    """
+    for attempt in retrying(tokens, rate_limited):
+        with attempt:
+            return function()
+
+def output_token_budgets():
+    """
+    The max_output_tokens to try in turn when a response runs out of output
+    tokens: OPENAI_MAX_OUTPUT_TOKENS, doubled up to OPENAI_MAX_OUTPUT_TOKENS_LIMIT.
+
+    Returns:
+        list: The budgets, smallest first.
+    """
+    budget = settings.OPENAI_MAX_OUTPUT_TOKENS
+    budgets = [budget]
+    while budget < settings.OPENAI_MAX_OUTPUT_TOKENS_LIMIT:
+        budget = min(budget * 2, settings.OPENAI_MAX_OUTPUT_TOKENS_LIMIT)
+        budgets.append(budget)
+    return budgets
@@ -0,0 +1,208 @@
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.conf import settings
+
+from .llm_services import (
+    DEFAULT_MODEL, aextract_email_data, astream_email_data, extract_email_data, is_missing, stream_email_data,
+)
+from .usage import ExtractionUsage, collecting_usage
+
+# Fields an extraction must have for a quote to be compared at all
+REQUIRED_FIELDS = ("supplier_company_name", "price_per", "minimum_order_quantity")
+EMAIL_ADDRESS = re.compile(r"^[^@\s]+@[^@\s]+\.[A-Za-z]{2,}$")
+
+@dataclass
+class TierCall:
+    """
+    One extraction call made while routing an email.
+    """
+    model: str
+    tier: int
+    latency_ms: int
+    problems: list
+    accepted: bool
+
+@dataclass
+class ExtractionOutcome:
+    """
+    The result of routing an email through the model tiers.
+
+    Attributes:
+        data (EmailData): The accepted extraction; if no tier passed
+            validation, the last valid output, or None.
+        calls (list): TierCall for each model tried, cheapest first.
+        usage (ExtractionUsage): Tokens and cost of every call made.
+    """
+    data: object = None
+    calls: list = field(default_factory=list)
+    usage: ExtractionUsage = field(default_factory=ExtractionUsage)
+
+    @property
+    def model(self):
+        """
+        Returns:
+            str: The model whose output was kept, or None.
+        """
+        return self.calls[-1].model if self.data is not None and self.calls else None
+
+    @property
+    def validated(self):
+        """
+        Returns:
+            bool: True if the kept output passed validation, rather than
+            being the last tier's best effort.
+        """
+        return self.data is not None and passed_validation(self.calls)
+
+    @property
+    def escalated(self):
+        return len(self.calls) > 1
+
+    def record(self, tier, model, data, started, known=None, last=False):
+        """
+        Validate a tier's output and add its call.
+
+        Returns:
+            bool: True if the output was accepted and no further tier is needed.
+        """
+        problems = ["output did not match the schema"] if data is None else validate_extraction(data, known)
+        accepted = data is not None and (not problems or last)
+        self.calls.append(TierCall(model, tier, int((time.monotonic() - started) * 1000), problems, accepted))
+        if data is not None:
+            self.data = data
+            self.usage.model = model
+        return data is not None and not problems
+
+def passed_validation(calls):
+    """
+    Args:
+        calls (list): The TierCall list of one routed extraction.
+
+    Returns:
+        bool: True if the last model tried gave output that passed validation.
+    """
+    return bool(calls) and not calls[-1].problems
+
+def model_tiers():
+    """
+    Returns:
+        list: The models to try in turn, cheapest first (EXTRACTION_MODEL_TIERS).
+    """
+    return list(settings.EXTRACTION_MODEL_TIERS) or [DEFAULT_MODEL]
+
+def validate_extraction(data, known=None):
+    """
+    Check an extraction for the mistakes a weaker model makes.
+
+    Required fields must be present, price and MOQ must be plausible numbers,
+    the contact email must look like an address and the date must be ISO.
+
+    Args:
+        data (EmailData): The extraction.
+        known (dict): Field values already known from the rule-based
+            extractor; these take the place of the model's.
+
+    Returns:
+        list: Problems found, empty if the extraction looks right.
+    """
+    values = {**data.dict(), **(known or {})}
+    problems = [f"{name} is missing" for name in REQUIRED_FIELDS if is_missing(values.get(name))]
+
+    price = values.get("price_per")
+    if not is_missing(price) and not (0 < price <= settings.EXTRACTION_MAX_PLAUSIBLE_PRICE):
+        problems.append(f"price_per {price} is implausible")
+    quantity = values.get("minimum_order_quantity")
+    if not is_missing(quantity) and not (0 < quantity <= settings.EXTRACTION_MAX_PLAUSIBLE_QUANTITY):
+        problems.append(f"minimum_order_quantity {quantity} is implausible")
+
+    email_address = values.get("main_contact_email")
+    if not is_missing(email_address) and not EMAIL_ADDRESS.match(email_address.strip()):
+        problems.append(f"main_contact_email {email_address!r} is not an address")
+    submitted = values.get("date_submitted")
+    if not is_missing(submitted):
+        try:
+            date.fromisoformat(submitted)
+        except ValueError:
+            problems.append(f"date_submitted {submitted!r} is not a date")
+    return problems
+
+# Define routing functions. Each tier is only called if the cheaper one's
+# output failed validation; LLMUnavailableError from any tier propagates.
+def extract_with_routing(email_text, known=None):
+    """
+    Extract an email with the cheapest model whose output passes validation.
+
+    Args:
+        email_text (str): The email content (already preprocessed).
+        known (dict): Confident rule-based field values, see validate_extraction.
+
+    Returns:
+        ExtractionOutcome: The kept data and the calls made.
+    """
+    outcome = ExtractionOutcome()
+    tiers = model_tiers()
+    with collecting_usage(outcome.usage):
+        for tier, model in enumerate(tiers):
+            started = time.monotonic()
+            data = extract_email_data(email_text, model)
+            if outcome.record(tier, model, data, started, known, last=tier == len(tiers) - 1):
+                break
+    return outcome
+
+async def aextract_with_routing(email_text, known=None):
+    """
+    Async variant of extract_with_routing.
+    """
+    outcome = ExtractionOutcome()
+    tiers = model_tiers()
+    with collecting_usage(outcome.usage):
+        for tier, model in enumerate(tiers):
+            started = time.monotonic()
+            data = await aextract_email_data(email_text, model)
+            if outcome.record(tier, model, data, started, known, last=tier == len(tiers) - 1):
+                break
+    return outcome
+
+def stream_with_routing(email_text, known=None):
+    """
+    Streaming variant of extract_with_routing.
+
+    Yields ("fields", dict) as each tier generates its output, starting over
+    when a tier is escalated, then ("result", ExtractionOutcome).
+    """
+    outcome = ExtractionOutcome()
+    tiers = model_tiers()
+    with collecting_usage(outcome.usage):
+        for tier, model in enumerate(tiers):
+            started = time.monotonic()
+            data = None
+            for event, value in stream_email_data(email_text, model):
+                if event == "fields":
+                    yield event, value
+                else:
+                    data = value
+            if outcome.record(tier, model, data, started, known, last=tier == len(tiers) - 1):
+                break
+    yield "result", outcome
+
+async def astream_with_routing(email_text, known=None):
+    """
+    Async variant of stream_with_routing.
+    """
+    outcome = ExtractionOutcome()
+    tiers = model_tiers()
+    with collecting_usage(outcome.usage):
+        for tier, model in enumerate(tiers):
+            started = time.monotonic()
+            data = None
+            async for event, value in astream_email_data(email_text, model):
+                if event == "fields":
+                    yield event, value
+                else:
+                    data = value
+            if outcome.record(tier, model, data, started, known, last=tier == len(tiers) - 1):
+                break
+    yield "result", outcome
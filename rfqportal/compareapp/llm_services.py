@@ -1,43 +1,42 @@
 import logging
-from django.conf import settings
-from openai import OpenAI
-import json
 from datetime import datetime
+import jiter
 from pydantic import BaseModel
+from .llm_client import get_client, get_async_client, llm_slot, allm_slot
+from .llm_resilience import IncompleteResponseError, LLMUnavailableError, aretrying, output_token_budgets, retrying
+from .metrics import record_llm_usage
+from .usage import record_usage
 
-def extract_email_data(email_text: str, model: str = "o4-mini") -> dict:
-    """
-    Extracts structured data from a supplier email using GPT-4.
+DEFAULT_MODEL = "o4-mini"
 
-    Args:
-        email_text (str): The raw email content.
-        model (str): The OpenAI model to use (default is "o4-mini").
+# Bump whenever the prompt or schema changes so cached extractions are not reused
+PROMPT_VERSION = "1"
 
-    Returns:
-        dict: A dictionary with keys: supplier_company_name, main_contact_name, 
-              main_contact_email, hq_address, payment_terms, date_submitted, 
-              price_per, country_of_origin, certifications, 
-              minimum_order_quantity.
-    """
-    class EmailData(BaseModel):
-        supplier_company_name: str
-        main_contact_name: str
-        main_contact_email: str
-        main_contact_phone: str
-        hq_address: str
-        payment_terms: str
-        date_submitted: str
-        price_per: float
-        country_of_origin: str
-        certifications: list[str]
-        minimum_order_quantity: int
-
-
-    # Set up OpenAI API key
-    client = OpenAI(api_key = settings.OPENAI_API_KEY)
-    system_prompt = "You are a helpful assistant that extracts structured data from emails."
-
-    user_prompt = f"""
+# Rough characters per token of English text, for estimates where exact counts are not needed
+CHARS_PER_TOKEN = 4
+
+# Stream events that carry the final response
+FINAL_STREAM_EVENTS = {"response.completed", "response.incomplete", "response.failed"}
+
+# What models write instead of leaving a field empty
+MISSING_VALUES = {"", "null", "none", "n/a", "na", "unknown", "not provided", "not specified", "not mentioned"}
+
+class EmailData(BaseModel):
+    supplier_company_name: str
+    main_contact_name: str
+    main_contact_email: str
+    main_contact_phone: str
+    hq_address: str
+    payment_terms: str
+    date_submitted: str
+    price_per: float
+    country_of_origin: str
+    certifications: list[str]
+    minimum_order_quantity: int
+
+SYSTEM_PROMPT = "You are a helpful assistant that extracts structured data from emails."
+
+USER_PROMPT_TEMPLATE = """
         Process the following email and extract a JSON object with the following fields:
         - supplier_company_name: The name of the supplier's company.
         - main_contact_name: The name of the main contact person at the supplier's company.
@@ -57,36 +56,332 @@ def extract_email_data(email_text: str, model: str = "o4-mini") -> dict:
 
         {email_text}
     """
+
+def build_extraction_input(email_text: str) -> list:
+    """
+    Builds the Responses API input messages for an extraction request.
+
+    Args:
+        email_text (str): The raw email content.
+
+    Returns:
+        list: System and user messages.
+    """
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(email_text=email_text)}
+    ]
+
+def strict_text_format(model):
+    """
+    Builds the Responses API text format asking for JSON matching a model.
+
+    Strict mode requires every property to be listed as required and no
+    others to be allowed. The models used here have no nested models, so
+    the schema has no $defs to close as well.
+
+    Args:
+        model (type): The pydantic model.
+
+    Returns:
+        dict: The json_schema text format.
+    """
+    schema = model.model_json_schema()
+    schema["required"] = list(schema["properties"])
+    schema["additionalProperties"] = False
+    return {"type": "json_schema", "name": model.__name__, "schema": schema, "strict": True}
+
+# Responses are requested with a strict JSON schema, but validated here: the
+# SDK's parse helpers raise on the truncated JSON of an incomplete response
+# before its status can be checked.
+EXTRACTION_TEXT_FORMAT = strict_text_format(EmailData)
+
+def _extraction_request(email_text, model, max_output_tokens):
+    """
+    Keyword arguments for responses.create.
+
+    Returns:
+        tuple: The arguments and the estimated tokens the call will use,
+            counted against the tokens-per-minute limit.
+    """
+    input_messages = build_extraction_input(email_text)
+    estimated_tokens = sum(len(message["content"]) for message in input_messages) // CHARS_PER_TOKEN + max_output_tokens
+    return {
+        "model": model,
+        "input": input_messages,
+        "text": {"format": EXTRACTION_TEXT_FORMAT},
+        "max_output_tokens": max_output_tokens,
+    }, estimated_tokens
+
+def _ran_out_of_output(response, max_output_tokens, budgets):
+    """
+    Tell whether a response stopped at max_output_tokens and a larger budget is left to try.
+    """
+    if response.status != "incomplete" or response.incomplete_details is None:
+        return False
+    if response.incomplete_details.reason != "max_output_tokens" or max_output_tokens == budgets[-1]:
+        return False
+    logging.warning(f"Extraction ran out of output tokens at {max_output_tokens}; retrying with a larger budget.")
+    return True
+
+def is_missing(value):
+    """
+    Tell whether an extracted value is empty or a stand-in for "not given".
+    """
+    return value is None or (isinstance(value, str) and value.strip().lower() in MISSING_VALUES)
+
+def default_date_submitted(data):
+    """
+    Fill in today's date when the model gave none.
+
+    The strict schema makes every field a string, so the model answers ""
+    (or "unknown" and the like) rather than the null the prompt asks for.
+
+    Args:
+        data (EmailData): The extraction, updated in place.
+
+    Returns:
+        EmailData: The same extraction.
+    """
+    if is_missing(data.date_submitted):
+        data.date_submitted = datetime.today().strftime('%Y-%m-%d')
+    return data
+
+def _record_usage(response, streamed=False):
+    """
+    Add a response's tokens to the extraction being accounted for (see
+    compareapp.usage), and to the metrics for streamed responses, whose body
+    the metrics transport does not read.
+    """
+    if response.usage is None:
+        return
+    usage = response.usage.model_dump()
+    if streamed:
+        record_llm_usage(response.model, usage)
+    record_usage(response.model, usage)
+
+def _parse_extraction_response(response):
+    """
+    Pulls the validated EmailData out of a Responses API result.
+
+    Args:
+        response (Response): The final response.
+
+    Returns:
+        EmailData: The extracted data.
+
+    Raises:
+        IncompleteResponseError: If the model stopped early, because the
+            output ran out of tokens (max_output_tokens) or was halted on
+            restricted content (content_filter).
+        ValidationError: If the output does not match EmailData.
+    """
+    if response.status == "incomplete":
+        reason = response.incomplete_details.reason if response.incomplete_details else None
+        raise IncompleteResponseError(reason or "unknown")
+    if response.status != "completed":
+        raise ValueError(f"Unexpected response status: {response.status}")
+
+    data = default_date_submitted(EmailData.model_validate_json(response.output_text))
+    logging.info("Successfully extracted data.")
+    return data
+
+def extract_email_data(email_text: str, model: str = DEFAULT_MODEL) -> EmailData | None:
+    """
+    Extracts structured data from a supplier email with an OpenAI model.
+
+    Transient failures (timeouts, 429s, 5xx) are retried with backoff, and a
+    response that runs out of output tokens is retried with a larger
+    max_output_tokens (see compareapp.llm_resilience).
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): The OpenAI model to use (default is "o4-mini").
+
+    Returns:
+        EmailData: The extracted supplier and quote fields, or None if the
+            call failed or the output did not validate. A date_submitted the
+            model left blank is today's.
+
+    Raises:
+        LLMUnavailableError: If the provider could not be reached.
+    """
+    # Shared client: connections are kept alive and reused across calls and threads
+    client = get_client()
+    budgets = output_token_budgets()
+
     try:
-        logging.info(f"Sending prompt to OpenAI:")
-        response = client.responses.parse(
-            model=model,
-            input=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            text_format=EmailData
-        )
-        logging.info(f"Received response from OpenAI: {response}")
-
-        # Check if the conversation was too long for the context window, resulting in incomplete JSON 
-        if response.status == "incomplete" and response.incomplete_details.reason == "max_output_tokens":
-            # your code should handle this error case
-            pass
-
-        # Check if the model's output included restricted content, so the generation of JSON was halted and may be partial
-        if response.status == "incomplete" and response.incomplete_details.reason == "content_filter":
-            # your code should handle this error case
-            pass
-
-        if response.status == "completed":         
-            data = response.output_parsed
-            if data.date_submitted is None:
-                data.date_submitted = datetime.today().strftime('%Y-%m-%d')
-            logging.info("Successfully extracted data.")
-       
+        for max_output_tokens in budgets:
+            request, estimated_tokens = _extraction_request(email_text, model, max_output_tokens)
+            logging.info(f"Sending prompt to OpenAI:")
+            for attempt in retrying(estimated_tokens):
+                with attempt, llm_slot():
+                    response = client.responses.create(**request)
+            logging.debug(f"Received response from OpenAI: {response}")
+            _record_usage(response)
+            if not _ran_out_of_output(response, max_output_tokens, budgets):
+                return _parse_extraction_response(response)
+
+    except LLMUnavailableError:
+        raise
     except Exception as api_err:
             logging.warning(f"API call failed: {api_err}")
             return None
 
-    return data
\ No newline at end of file
+async def aextract_email_data(email_text: str, model: str = DEFAULT_MODEL) -> EmailData | None:
+    """
+    Async variant of extract_email_data for the ASGI views.
+
+    The request is awaited on the event loop's AsyncOpenAI client, so many
+    extractions can be in flight without holding a thread each.
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): The OpenAI model to use (default is "o4-mini").
+
+    Returns:
+        EmailData: The extracted data, or None if the call failed.
+
+    Raises:
+        LLMUnavailableError: If the provider could not be reached.
+    """
+    client = get_async_client()
+    budgets = output_token_budgets()
+
+    try:
+        for max_output_tokens in budgets:
+            request, estimated_tokens = _extraction_request(email_text, model, max_output_tokens)
+            logging.info(f"Sending prompt to OpenAI:")
+            async for attempt in aretrying(estimated_tokens):
+                with attempt:
+                    async with allm_slot():
+                        response = await client.responses.create(**request)
+            logging.debug(f"Received response from OpenAI: {response}")
+            _record_usage(response)
+            if not _ran_out_of_output(response, max_output_tokens, budgets):
+                return _parse_extraction_response(response)
+
+    except LLMUnavailableError:
+        raise
+    except Exception as api_err:
+            logging.warning(f"API call failed: {api_err}")
+            return None
+
+def _partial_fields(text):
+    """
+    Parse the JSON object generated so far.
+
+    Unfinished strings are kept, so values fill in as they stream.
+
+    Args:
+        text (str): The output text received so far.
+
+    Returns:
+        dict: The fields present so far, or None if nothing parses yet.
+    """
+    try:
+        value = jiter.from_json(text.encode("utf-8"), partial_mode="trailing-strings")
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+def stream_email_data(email_text: str, model: str = DEFAULT_MODEL):
+    """
+    Streaming variant of extract_email_data.
+
+    Yields ("fields", dict) each time the partially generated JSON gains or
+    extends a field, then ("result", EmailData) once the response is
+    complete. The result is parsed from the final response and validated
+    against EmailData like extract_email_data's; it is None if the call
+    failed or the output did not validate. A retried call starts its fields
+    over from the first.
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): The OpenAI model to use (default is "o4-mini").
+
+    Raises:
+        LLMUnavailableError: If the provider could not be reached.
+    """
+    client = get_client()
+    budgets = output_token_budgets()
+    data = None
+
+    try:
+        for max_output_tokens in budgets:
+            request, estimated_tokens = _extraction_request(email_text, model, max_output_tokens)
+            logging.info(f"Streaming prompt to OpenAI:")
+            for attempt in retrying(estimated_tokens):
+                with attempt, llm_slot():
+                    with client.responses.create(**request, stream=True) as stream:
+                        text, fields, response = "", {}, None
+                        for event in stream:
+                            if event.type == "response.output_text.delta":
+                                text += event.delta
+                                partial = _partial_fields(text)
+                                if partial and partial != fields:
+                                    fields = partial
+                                    yield "fields", fields
+                            elif event.type in FINAL_STREAM_EVENTS:
+                                response = event.response
+            logging.debug(f"Received response from OpenAI: {response}")
+            if response is None:
+                raise ValueError("The stream ended without a final response.")
+            _record_usage(response, streamed=True)
+            if not _ran_out_of_output(response, max_output_tokens, budgets):
+                data = _parse_extraction_response(response)
+                break
+
+    except LLMUnavailableError:
+        raise
+    except Exception as api_err:
+            logging.warning(f"API call failed: {api_err}")
+            data = None
+
+    yield "result", data
+
+async def astream_email_data(email_text: str, model: str = DEFAULT_MODEL):
+    """
+    Async variant of stream_email_data for the ASGI views.
+
+    Args:
+        email_text (str): The raw email content.
+        model (str): The OpenAI model to use (default is "o4-mini").
+    """
+    client = get_async_client()
+    budgets = output_token_budgets()
+    data = None
+
+    try:
+        for max_output_tokens in budgets:
+            request, estimated_tokens = _extraction_request(email_text, model, max_output_tokens)
+            logging.info(f"Streaming prompt to OpenAI:")
+            async for attempt in aretrying(estimated_tokens):
+                with attempt:
+                    async with allm_slot():
+                        async with await client.responses.create(**request, stream=True) as stream:
+                            text, fields, response = "", {}, None
+                            async for event in stream:
+                                if event.type == "response.output_text.delta":
+                                    text += event.delta
+                                    partial = _partial_fields(text)
+                                    if partial and partial != fields:
+                                        fields = partial
+                                        yield "fields", fields
+                                elif event.type in FINAL_STREAM_EVENTS:
+                                    response = event.response
+            logging.debug(f"Received response from OpenAI: {response}")
+            if response is None:
+                raise ValueError("The stream ended without a final response.")
+            _record_usage(response, streamed=True)
+            if not _ran_out_of_output(response, max_output_tokens, budgets):
+                data = _parse_extraction_response(response)
+                break
+
+    except LLMUnavailableError:
+        raise
+    except Exception as api_err:
+            logging.warning(f"API call failed: {api_err}")
+            data = None
+
+    yield "result", data
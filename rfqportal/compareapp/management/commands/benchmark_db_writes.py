@@ -0,0 +1,117 @@
+import itertools
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+
+from compareapp.benchmarking import summarize_run
+from compareapp.fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from compareapp.llm_client import set_transport
+from compareapp.models import RFQ, Supplier
+from compareapp.services import process_email_text
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent process_email_text write throughput on the configured database "
+        "(DB_ENGINE), with the LLM stubbed out. Run once per backend or SQLite mode to compare."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writes", type=int, default=500, help="Emails to process.")
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers, like extraction worker threads.")
+        parser.add_argument("--suppliers", type=int, default=50, help="Distinct suppliers the emails come from.")
+        parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the stub LLM takes per call.")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        supplier_prefix = f"Benchmark Supplier {run_id}-"
+        supplier_count = max(1, options["suppliers"])
+
+        def respond(email_text, body):
+            index = int(email_text.rsplit(" ", 1)[-1])
+            return {**SAMPLE_EXTRACTION, "supplier_company_name": f"{supplier_prefix}{index % supplier_count}"}
+
+        fake = FakeOpenAI(responder=respond, latency=options["llm_latency"])
+        set_transport(fake.transport())
+        rfq = RFQ.objects.create(item="Benchmark RFQ")
+        overrides = override_settings(EXTRACTION_CACHE_ENABLED=False, OPENAI_MAX_CONCURRENCY=max(1, options["threads"]))
+        try:
+            with overrides:
+                results = self.run(rfq, options["writes"], max(1, options["threads"]))
+        finally:
+            rfq.delete()
+            Supplier.objects.filter(company_name__startswith=supplier_prefix).delete()
+            set_transport(None)
+
+        results["database"] = self.describe_database()
+        results["threads"] = options["threads"]
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        database = results["database"]
+        self.stdout.write(
+            f"{database['vendor']} ({', '.join(f'{key}={value}' for key, value in database.items() if key != 'vendor')}): "
+            f"{results['requests']} writes from {results['threads']} threads in {results['duration_s']}s "
+            f"({results['throughput_rps']} writes/s, p50 {results['p50_ms']}ms, p95 {results['p95_ms']}ms, "
+            f"{results['failed']} failed)"
+        )
+        for message, count in results["errors"].items():
+            self.stdout.write(self.style.WARNING(f"  {count} x {message}"))
+
+    def run(self, rfq, total, threads):
+        indexes = itertools.count()
+        lock = threading.Lock()
+        latencies, errors = [], Counter()
+
+        def writer():
+            try:
+                while True:
+                    with lock:
+                        index = next(indexes)
+                    if index >= total:
+                        return
+                    started = time.monotonic()
+                    try:
+                        result = process_email_text(f"DB benchmark email {index}", rfq)
+                        error = None if result["status"] == "success" else result["message"]
+                    except Exception as exc:
+                        error = f"{type(exc).__name__}: {exc}"
+                    with lock:
+                        latencies.append((time.monotonic() - started) * 1000)
+                        if error:
+                            errors[error] += 1
+            finally:
+                # Each writer thread owns its own database connection
+                if threading.current_thread() is not threading.main_thread():
+                    connection.close()
+
+        started = time.monotonic()
+        if threads == 1:
+            writer()
+        else:
+            pool = [threading.Thread(target=writer) for _ in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+        results = summarize_run(latencies, time.monotonic() - started, sum(errors.values()))
+        results["errors"] = dict(errors.most_common(5))
+        return results
+
+    def describe_database(self):
+        settings_dict = connection.settings_dict
+        description = {"vendor": connection.vendor, "conn_max_age": settings_dict["CONN_MAX_AGE"]}
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("PRAGMA journal_mode")
+                description["journal_mode"] = cursor.fetchone()[0]
+            description["transaction_mode"] = settings_dict["OPTIONS"].get("transaction_mode", "DEFERRED")
+        return description
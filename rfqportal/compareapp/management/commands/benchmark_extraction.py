@@ -0,0 +1,199 @@
+import itertools
+import json
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import override_settings
+
+from compareapp.benchmarking import UsageRecorder, field_precision, summarize_run
+from compareapp.fake_openai import FakeOpenAI
+from compareapp.llm_cassette import MODE_RECORD, MODE_REPLAY, Cassette, CassetteTransport
+from compareapp.llm_client import set_transport
+from compareapp.models import RFQ, Email, ExtractionModelCall, Supplier
+from compareapp.preprocessing import preprocess_email
+from compareapp.services import process_email_text
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "benchmark_data" / "quote_emails.json"
+
+
+def _loaded(extracted_data):
+    # Email.extracted_data holds the extraction as a JSON string
+    return json.loads(extracted_data) if isinstance(extracted_data, str) else extracted_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a labeled corpus of quote emails through the full extraction pipeline at one or more "
+        "concurrency levels and report latency, throughput, tokens per email and per-field precision "
+        "as JSON. Offline by default: model responses are replayed from a cassette or a file (or the labels)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            default=str(DEFAULT_CORPUS),
+            help="JSON list of {\"email\": ..., \"expected\": {...}} samples.",
+        )
+        parser.add_argument(
+            "--responses",
+            default=None,
+            help="JSON list of {\"email\": ..., \"output\": {...}} recorded model outputs to replay. "
+                 "Defaults to replaying each sample's labels.",
+        )
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Worker threads for each run.")
+        parser.add_argument(
+            "--cassette",
+            default=None,
+            help="Replay the API calls recorded in this cassette file; with --live, record them to it.",
+        )
+        parser.add_argument(
+            "--llm-latency",
+            type=float,
+            default=None,
+            help="Seconds each replayed call takes (default: 0, or the recorded time for a cassette).",
+        )
+        parser.add_argument("--http", action="store_true", help="Serve the replay over localhost HTTP instead of in-process.")
+        parser.add_argument("--live", action="store_true", help="Call the configured OpenAI API instead of replaying.")
+        parser.add_argument("--output", default=None, help="Also write the JSON results to this file.")
+
+    def handle(self, *args, **options):
+        samples = json.loads(Path(options["corpus"]).read_text(encoding="utf-8"))
+        if not samples:
+            raise CommandError("The corpus is empty.")
+        concurrency = [max(1, threads) for threads in options["concurrency"]]
+
+        with ExitStack() as stack:
+            if options["cassette"]:
+                mode = MODE_RECORD if options["live"] else MODE_REPLAY
+                cassette = Cassette(options["cassette"], mode, latency=options["llm_latency"])
+                if mode == MODE_REPLAY and not len(cassette):
+                    raise CommandError(f"The cassette {options['cassette']} is empty or missing; record it with --live.")
+                source = f"cassette_{mode}"
+                recorder = UsageRecorder(CassetteTransport(cassette, httpx.HTTPTransport()))
+            elif options["live"]:
+                source = "live"
+                recorder = UsageRecorder(httpx.HTTPTransport())
+            else:
+                fake = FakeOpenAI(responder=self.replay(samples, options["responses"]), latency=options["llm_latency"] or 0.0)
+                if options["http"]:
+                    source = "replay_http"
+                    stack.enter_context(override_settings(OPENAI_BASE_URL=stack.enter_context(fake.serve())))
+                    recorder = UsageRecorder(httpx.HTTPTransport())
+                else:
+                    source = "replay"
+                    recorder = UsageRecorder(fake.transport())
+            stack.enter_context(override_settings(EXTRACTION_CACHE_ENABLED=False))
+            set_transport(recorder)
+            stack.callback(set_transport, None)
+
+            runs, extractions = [], None
+            for threads in concurrency:
+                with override_settings(OPENAI_MAX_CONCURRENCY=threads):
+                    run, run_extractions = self.run(samples, threads, recorder)
+                runs.append(run)
+                extractions = extractions or run_extractions
+
+        results = {
+            "corpus": str(options["corpus"]),
+            "emails": len(samples),
+            "source": source,
+            "model_tiers": list(settings.EXTRACTION_MODEL_TIERS),
+            "rule_extraction": settings.RULE_EXTRACTION_ENABLED,
+            "preprocessing": settings.EMAIL_PREPROCESSING_ENABLED,
+            "llm_latency_s": None if options["live"] else options["llm_latency"],
+            "cassette": options["cassette"],
+            "runs": runs,
+            "precision": field_precision(extractions, [sample["expected"] for sample in samples]),
+        }
+        output = json.dumps(results, indent=2)
+        if options["output"]:
+            Path(options["output"]).write_text(output + "\n", encoding="utf-8")
+        self.stdout.write(output)
+
+    def replay(self, samples, responses_path):
+        """
+        Build a responder answering each email with its recorded output.
+
+        The server sees the prompt text, so each output is keyed by both the
+        raw and the preprocessed email. Unknown emails get an empty output,
+        which fails validation like a bad model answer would.
+        """
+        if responses_path:
+            recorded = json.loads(Path(responses_path).read_text(encoding="utf-8"))
+        else:
+            recorded = [{"email": sample["email"], "output": sample["expected"]} for sample in samples]
+        outputs = {}
+        for entry in recorded:
+            outputs[entry["email"].strip()] = entry["output"]
+            outputs[preprocess_email(entry["email"], settings.EMAIL_TOKEN_BUDGET or None).text.strip()] = entry["output"]
+        return lambda email_text, body: outputs.get(email_text.strip(), {})
+
+    def run(self, samples, threads, recorder):
+        """
+        Process every sample with the given number of threads, then delete
+        the rows it wrote.
+
+        Returns:
+            tuple: The run's results and the extracted data of each sample
+                (None where extraction failed).
+        """
+        indexes = itertools.count()
+        lock = threading.Lock()
+        latencies, quote_ids = [], [None] * len(samples)
+        calls_before, usage_before = recorder.calls, dict(recorder.usage)
+        last_supplier = Supplier.objects.aggregate(last=Max("pk"))["last"] or 0
+        last_model_call = ExtractionModelCall.objects.aggregate(last=Max("pk"))["last"] or 0
+        rfq = RFQ.objects.create(item="Extraction benchmark")
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        index = next(indexes)
+                    if index >= len(samples):
+                        return
+                    started = time.monotonic()
+                    try:
+                        result = process_email_text(samples[index]["email"], rfq)
+                    except Exception:
+                        result = {"status": "fail"}
+                    with lock:
+                        latencies.append((time.monotonic() - started) * 1000)
+                        quote_ids[index] = result.get("quote_id")
+            finally:
+                # Each worker thread owns its own database connection
+                if threading.current_thread() is not threading.main_thread():
+                    connection.close()
+
+        started = time.monotonic()
+        try:
+            if threads == 1:
+                worker()
+            else:
+                pool = [threading.Thread(target=worker) for _ in range(threads)]
+                for thread in pool:
+                    thread.start()
+                for thread in pool:
+                    thread.join()
+            duration = time.monotonic() - started
+            stored = dict(Email.objects.filter(related_quote__rfq=rfq).values_list("related_quote_id", "extracted_data"))
+        finally:
+            rfq.delete()
+            Supplier.objects.filter(pk__gt=last_supplier, suppliers__isnull=True).delete()
+            ExtractionModelCall.objects.filter(pk__gt=last_model_call).delete()
+
+        results = summarize_run(latencies, duration, sum(quote_id is None for quote_id in quote_ids))
+        results["concurrency"] = threads
+        results["llm_calls"] = recorder.calls - calls_before
+        tokens = {name: recorder.usage[name] - usage_before[name] for name in recorder.usage}
+        results["tokens"] = tokens
+        results["tokens_per_email"] = {name: round(count / len(samples), 1) for name, count in tokens.items()}
+        extractions = [_loaded(stored[quote_id]) if quote_id in stored else None for quote_id in quote_ids]
+        return results, extractions
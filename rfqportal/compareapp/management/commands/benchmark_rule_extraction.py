@@ -0,0 +1,127 @@
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from compareapp.benchmarking import same_value, summarize_run
+from compareapp.fake_openai import FakeOpenAI
+from compareapp.llm_client import set_transport
+from compareapp.llm_services import DEFAULT_MODEL
+from compareapp.models import RFQ
+from compareapp.rule_extraction import extract_with_rules
+from compareapp.services import process_email_text
+
+DEFAULT_CORPUS = Path(__file__).resolve().parents[2] / "benchmark_data" / "quote_emails.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Process a corpus of labeled quote emails with and without the rule-based extractor, "
+        "against a stub LLM, and report the LLM calls avoided, latency saved and rule accuracy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--corpus",
+            default=str(DEFAULT_CORPUS),
+            help="JSON list of {\"email\": ..., \"expected\": {...}} samples.",
+        )
+        parser.add_argument("--llm-latency", type=float, default=2.0, help="Seconds the stub LLM takes per call.")
+        parser.add_argument("--threshold", type=float, default=None, help="Override RULE_EXTRACTION_MIN_CONFIDENCE.")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        samples = json.loads(Path(options["corpus"]).read_text(encoding="utf-8"))
+        expected = {sample["email"].strip(): sample["expected"] for sample in samples}
+
+        # The stub LLM answers every email with its labeled fields (it sees the email stripped)
+        fake = FakeOpenAI(responder=lambda email_text, body: expected[email_text], latency=options["llm_latency"])
+        set_transport(fake.transport())
+        # One model tier, so the LLM call counts only reflect the rules
+        overrides = {"EXTRACTION_CACHE_ENABLED": False, "EXTRACTION_MODEL_TIERS": [DEFAULT_MODEL]}
+        if options["threshold"] is not None:
+            overrides["RULE_EXTRACTION_MIN_CONFIDENCE"] = options["threshold"]
+        try:
+            with override_settings(**overrides):
+                with override_settings(RULE_EXTRACTION_ENABLED=False):
+                    baseline = self.run(fake, samples)
+                with_rules = self.run(fake, samples)
+                accuracy = self.rule_accuracy(samples)
+        finally:
+            set_transport(None)
+
+        results = {
+            "emails": len(samples),
+            "llm_latency_s": options["llm_latency"],
+            "llm_only": baseline,
+            "rules_first": with_rules,
+            "llm_calls_avoided": baseline["llm_calls"] - with_rules["llm_calls"],
+            "latency_saved_ms": round(baseline["total_ms"] - with_rules["total_ms"], 1),
+            "rules": accuracy,
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(
+            f"{results['emails']} emails: {results['llm_calls_avoided']} LLM calls avoided "
+            f"({with_rules['llm_calls']} of {baseline['llm_calls']} still made), "
+            f"{results['latency_saved_ms']}ms saved in total."
+        )
+        for label, run in (("LLM only", baseline), ("Rules first", with_rules)):
+            self.stdout.write(
+                f"  {label}: p50 {run['p50_ms']}ms, p95 {run['p95_ms']}ms, {run['failed']} failed"
+            )
+        self.stdout.write(
+            f"  Rules filled {accuracy['fields_filled']} of {accuracy['fields_total']} fields "
+            f"with {accuracy['accuracy']:.1%} accuracy."
+        )
+        for field, count in accuracy["wrong_fields"].items():
+            self.stdout.write(self.style.WARNING(f"  {count} x wrong {field}"))
+
+    def run(self, fake, samples):
+        """
+        Process every sample inside a rolled back transaction.
+        """
+        calls_before = len(fake.requests)
+        latencies, failed = [], 0
+        started = time.monotonic()
+        with transaction.atomic():
+            rfq = RFQ.objects.create(item="Rule extraction benchmark")
+            for sample in samples:
+                email_started = time.monotonic()
+                if process_email_text(sample["email"], rfq)["status"] != "success":
+                    failed += 1
+                latencies.append((time.monotonic() - email_started) * 1000)
+            transaction.set_rollback(True)
+        results = summarize_run(latencies, time.monotonic() - started, failed)
+        results["llm_calls"] = len(fake.requests) - calls_before
+        results["total_ms"] = round(sum(latencies), 1)
+        return results
+
+    def rule_accuracy(self, samples):
+        """
+        Compare the fields the rules were confident of with the labels.
+        """
+        filled, correct, total, wrong = 0, 0, 0, Counter()
+        started = time.monotonic()
+        for sample in samples:
+            rules = extract_with_rules(sample["email"])
+            total += len(sample["expected"])
+            for name in rules.confident_fields():
+                filled += 1
+                if same_value(rules.values[name], sample["expected"][name]):
+                    correct += 1
+                else:
+                    wrong[name] += 1
+        return {
+            "fields_total": total,
+            "fields_filled": filled,
+            "accuracy": round(correct / filled, 4) if filled else 0.0,
+            "wrong_fields": dict(wrong.most_common()),
+            "mean_rule_time_ms": round((time.monotonic() - started) * 1000 / max(1, len(samples)), 3),
+        }
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+
+from compareapp.benchmarking import summarize_run
+from compareapp.fake_openai import FakeOpenAI
+from compareapp.llm_client import set_transport
+from compareapp.models import RFQ
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare quote-email extraction throughput of the sync (WSGI, thread per request) "
+        "and async (ASGI, one event loop) views against a stubbed LLM endpoint. Both sides post "
+        "to the same streaming extraction view, and every row is written to a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per mode.")
+        parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds the stub LLM takes per call.")
+        parser.add_argument("--wsgi-workers", type=int, default=8, help="Thread pool size for the WSGI run.")
+        parser.add_argument("--asgi-concurrency", type=int, default=200, help="Concurrent requests for the ASGI run.")
+        parser.add_argument("--json", action="store_true", help="Emit results as JSON.")
+
+    def handle(self, *args, **options):
+        fake = FakeOpenAI(latency=options["llm_latency"])
+        set_transport(fake.transport())
+        overrides = override_settings(
+            ALLOWED_HOSTS=["*"],
+            EXTRACTION_CACHE_ENABLED=False,
+            OPENAI_MAX_CONCURRENCY=options["wsgi_workers"],
+            OPENAI_ASYNC_MAX_CONCURRENCY=options["asgi_concurrency"],
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory, self.throwaway_database(directory), overrides:
+                rfq = RFQ.objects.create(item="Benchmark RFQ")
+                results = {
+                    "llm_latency_s": options["llm_latency"],
+                    "wsgi": self.run_wsgi(rfq, options["requests"], options["wsgi_workers"]),
+                    "asgi": asyncio.run(self.run_asgi(rfq, options["requests"], options["asgi_concurrency"])),
+                }
+        finally:
+            set_transport(None)
+
+        results["wsgi"]["workers"] = options["wsgi_workers"]
+        results["asgi"]["concurrency"] = options["asgi_concurrency"]
+        results["asgi_speedup"] = round(
+            results["asgi"]["throughput_rps"] / results["wsgi"]["throughput_rps"], 2
+        ) if results["wsgi"]["throughput_rps"] else None
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode in ("wsgi", "asgi"):
+            run = results[mode]
+            self.stdout.write(
+                f"{mode.upper()}: {run['requests']} requests in {run['duration_s']}s "
+                f"({run['throughput_rps']} req/s, p50 {run['p50_ms']}ms, p95 {run['p95_ms']}ms, {run['failed']} failed)"
+            )
+        self.stdout.write(self.style.SUCCESS(f"ASGI speedup: {results['asgi_speedup']}x"))
+
+    @contextmanager
+    def throwaway_database(self, directory):
+        """
+        Create a test database for the run and destroy it afterwards, so the
+        benchmark never writes to the live one. An SQLite test database is
+        kept in a file, as the request threads need their own connections.
+        """
+        if connection.vendor == "sqlite":
+            connection.settings_dict["TEST"]["NAME"] = str(Path(directory) / "benchmark.sqlite3")
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={connection.alias}, serialized_aliases=set())
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+    def run_wsgi(self, rfq, total, workers):
+        url = reverse("stream-quote-email", args=[rfq.id])
+        local = threading.local()
+
+        def send(index):
+            if not hasattr(local, "client"):
+                local.client = Client(raise_request_exception=False)
+            started = time.monotonic()
+            response = local.client.post(url, data={"email_content": f"WSGI benchmark email {index}"})
+            ok = response.status_code == 200 and succeeded(b"".join(response.streaming_content))
+            return (time.monotonic() - started) * 1000, ok
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            outcomes = list(executor.map(send, range(total)))
+        return summarize_run(
+            [latency for latency, _ in outcomes], time.monotonic() - started, sum(1 for _, ok in outcomes if not ok)
+        )
+
+    async def run_asgi(self, rfq, total, concurrency):
+        url = reverse("async-stream-quote-email", args=[rfq.id])
+        client = AsyncClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def send(index):
+            async with semaphore:
+                started = time.monotonic()
+                response = await client.post(url, data={"email_content": f"ASGI benchmark email {index}"})
+                ok = response.status_code == 200 and succeeded(b"".join([chunk async for chunk in response.streaming_content]))
+                return (time.monotonic() - started) * 1000, ok
+
+        started = time.monotonic()
+        outcomes = await asyncio.gather(*(send(index) for index in range(total)))
+        return summarize_run(
+            [latency for latency, _ in outcomes], time.monotonic() - started, sum(1 for _, ok in outcomes if not ok)
+        )
+
+
+def succeeded(content):
+    """
+    Tell whether a streamed extraction ended with a saved quote.
+    """
+    done = content.decode().rsplit("event: done\ndata: ", 1)
+    return len(done) == 2 and json.loads(done[1])["status"] == "success"
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from compareapp.services import get_email_token_stats
+
+
+class Command(BaseCommand):
+    help = "Report the tokens saved by preprocessing emails before extraction."
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(get_email_token_stats(), indent=2))
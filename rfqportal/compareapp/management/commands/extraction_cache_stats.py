@@ -0,0 +1,21 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from compareapp.extraction_cache import evict_extraction_cache, get_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Report extraction cache size, lifetime hits and the LLM latency they saved."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--evict",
+            action="store_true",
+            help="Remove expired and least recently used entries before reporting.",
+        )
+
+    def handle(self, *args, **options):
+        if options["evict"]:
+            self.stdout.write(f"Evicted {evict_extraction_cache()} entries.")
+        self.stdout.write(json.dumps(get_cache_stats(), indent=2))
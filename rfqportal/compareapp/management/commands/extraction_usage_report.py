@@ -0,0 +1,21 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from compareapp.services import get_extraction_usage_report
+
+
+class Command(BaseCommand):
+    help = "Report extraction tokens, spend and latency in total, per RFQ, per supplier and per day."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Only count emails stored in the last N days (0 for all).")
+        parser.add_argument("--limit", type=int, default=50, help="Most expensive RFQs and suppliers to list.")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"]) if options["days"] else None
+        report = get_extraction_usage_report(since=since, limit=options["limit"])
+        self.stdout.write(json.dumps(report, indent=2, cls=DjangoJSONEncoder))
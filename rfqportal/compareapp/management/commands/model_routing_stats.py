@@ -0,0 +1,18 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from compareapp.services import get_model_routing_stats
+
+
+class Command(BaseCommand):
+    help = "Report per-tier latency and the escalation rate of extraction model routing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Only count calls from the last N days.")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options["days"]) if options["days"] else None
+        self.stdout.write(json.dumps(get_model_routing_stats(since), indent=2))
@@ -0,0 +1,26 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from compareapp.page_cache import get_page_cache_stats, invalidate_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Report page cache hits and misses by page. The counters are kept by each server "
+        "process; this command reports its own, so call get_page_cache_stats() in a running "
+        "server for live numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--invalidate",
+            action="store_true",
+            help="Drop every cached page, e.g. after editing data with SQL.",
+        )
+
+    def handle(self, *args, **options):
+        if options["invalidate"]:
+            invalidate_all()
+            self.stdout.write("Invalidated every cached page.")
+        self.stdout.write(json.dumps(get_page_cache_stats(), indent=2))
@@ -0,0 +1,23 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from compareapp.certifications import rebuild_certification_catalog
+from compareapp.page_cache import invalidate_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Link every quote and RFQ to the certification catalog again. Run after changing "
+        "CERTIFICATION_ALIASES or after writing certifications without signals (e.g. queryset.update)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        counts = rebuild_certification_catalog()
+        invalidate_all()  # Cached comparisons may filter on the old links
+        self.stdout.write(json.dumps({
+            **counts,
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }, indent=2))
@@ -0,0 +1,48 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from compareapp.completeness import SUPPLIER_CHECKED_FIELDS, missing_mask
+from compareapp.models import Quote, Supplier
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the missing_fields masks of every supplier and quote. Run after adding a "
+        "checked field or after writing suppliers or quotes without save() (e.g. queryset.update)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        suppliers = self.rebuild(
+            Supplier.objects.only("id", "missing_fields", *SUPPLIER_CHECKED_FIELDS),
+            lambda supplier: missing_mask(supplier, SUPPLIER_CHECKED_FIELDS),
+        )
+        # Quotes read their supplier's mask, so suppliers are rebuilt first
+        quotes = self.rebuild(Quote.objects.select_related("supplier"), lambda quote: quote.compute_missing_fields())
+        self.stdout.write(json.dumps({
+            "suppliers_updated": suppliers,
+            "quotes_updated": quotes,
+            "incomplete_quotes": Quote.objects.filter(missing_fields__gt=0).count(),
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }, indent=2))
+
+    def rebuild(self, queryset, compute):
+        changed = []
+        updated = 0
+        for instance in queryset.iterator(chunk_size=BATCH_SIZE):
+            mask = compute(instance)
+            if instance.missing_fields != mask:
+                instance.missing_fields = mask
+                changed.append(instance)
+            if len(changed) >= BATCH_SIZE:
+                queryset.model.objects.bulk_update(changed, ["missing_fields"])
+                updated += len(changed)
+                changed = []
+        if changed:
+            queryset.model.objects.bulk_update(changed, ["missing_fields"])
+            updated += len(changed)
+        return updated
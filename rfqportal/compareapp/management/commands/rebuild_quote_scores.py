@@ -0,0 +1,26 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from compareapp.models import QuoteScore
+from compareapp.page_cache import invalidate_all
+from compareapp.quote_scoring import rebuild_quote_scores, score_weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Score and rank the quotes of every RFQ again. Run after changing the QUOTE_SCORE_*_WEIGHT "
+        "settings or after writing quotes without signals (e.g. queryset.update)."
+    )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rfqs = rebuild_quote_scores()
+        invalidate_all()  # Cached comparisons show the old scores
+        self.stdout.write(json.dumps({
+            "rfqs": rfqs,
+            "quotes": QuoteScore.objects.count(),
+            "weights": dict(zip(("price", "moq", "certifications"), (round(weight, 4) for weight in score_weights()))),
+            "duration_ms": int((time.monotonic() - started) * 1000),
+        }, indent=2))
@@ -0,0 +1,75 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from compareapp.company_names import normalize_company_name
+from compareapp.models import Supplier
+from compareapp.supplier_resolution import build_supplier_index, reset_supplier_index
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every supplier's normalized name and rebuild the supplier resolution index. "
+        "Run after changing the name normalization rules. Running servers pick up the changes "
+        "when their own index expires (SUPPLIER_INDEX_MAX_AGE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--resolve",
+            metavar="NAME",
+            help="Show the supplier this company name resolves to.",
+        )
+        parser.add_argument(
+            "--email",
+            help="Contact email to use with --resolve.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            help="Match threshold to use with --resolve (default SUPPLIER_MATCH_THRESHOLD).",
+        )
+
+    def handle(self, *args, **options):
+        updated = self.renormalize()
+        reset_supplier_index()
+
+        started = time.monotonic()
+        index = build_supplier_index()
+        report = {
+            "normalized_names_updated": updated,
+            "build_ms": int((time.monotonic() - started) * 1000),
+            **index.stats(),
+        }
+
+        if options["resolve"]:
+            match = index.match(options["resolve"], options["email"], options["threshold"])
+            report["resolve"] = None
+            if match is not None:
+                report["resolve"] = {
+                    "supplier_id": match.supplier_id,
+                    "company_name": Supplier.objects.filter(pk=match.supplier_id).values_list("company_name", flat=True).first(),
+                    "score": round(match.score, 3),
+                    "reason": match.reason,
+                }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def renormalize(self):
+        changed = []
+        updated = 0
+        for supplier in Supplier.objects.only("id", "company_name", "normalized_name").iterator(chunk_size=BATCH_SIZE):
+            normalized = normalize_company_name(supplier.company_name)
+            if supplier.normalized_name != normalized:
+                supplier.normalized_name = normalized
+                changed.append(supplier)
+            if len(changed) >= BATCH_SIZE:
+                Supplier.objects.bulk_update(changed, ["normalized_name"])
+                updated += len(changed)
+                changed = []
+        if changed:
+            Supplier.objects.bulk_update(changed, ["normalized_name"])
+            updated += len(changed)
+        return updated
@@ -0,0 +1,60 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from compareapp.services import extraction_batch_due, poll_extraction_batches, submit_extraction_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Submit non-urgent extraction jobs to the OpenAI Batch API and collect finished batches. "
+        "A batch is submitted once OPENAI_BATCH_MIN_REQUESTS jobs are waiting or the oldest has "
+        "waited OPENAI_BATCH_MAX_WAIT seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.OPENAI_BATCH_POLL_INTERVAL,
+            help="Seconds between checks.",
+        )
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Submit every waiting job now, regardless of the batching thresholds.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run a single submit-and-collect pass, then exit.",
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        try:
+            while True:
+                close_old_connections()
+                self.run_once(options["flush"])
+                if options["once"] or self.stop.wait(options["poll_interval"]):
+                    return
+        except KeyboardInterrupt:
+            pass
+
+    def run_once(self, flush):
+        while flush or extraction_batch_due():
+            batch = submit_extraction_batch()
+            if batch is None:
+                break
+            self.stdout.write(
+                f"Batch {batch.id}: {batch.status}, {batch.request_count} request(s) sent, "
+                f"{batch.succeeded_count} answered from cache."
+            )
+            if batch.status == batch.STATUS_FAILED:
+                break
+        for batch in poll_extraction_batches():
+            self.stdout.write(
+                f"Batch {batch.id} ({batch.openai_status}): {batch.succeeded_count} succeeded, {batch.failed_count} failed."
+            )
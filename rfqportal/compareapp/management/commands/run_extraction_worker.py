@@ -0,0 +1,81 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from compareapp.services import claim_next_extraction_job, run_extraction_job, requeue_stale_extraction_jobs
+
+
+class Command(BaseCommand):
+    help = "Drain the extraction job queue with a pool of concurrent workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.EXTRACTION_WORKER_CONCURRENCY,
+            help="Number of jobs to process concurrently.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.EXTRACTION_WORKER_POLL_INTERVAL,
+            help="Seconds an idle worker waits before checking the queue again.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        requeued = requeue_stale_extraction_jobs(settings.EXTRACTION_JOB_TIMEOUT)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        if workers == 1:
+            self.work(options["poll_interval"], options["once"])
+        else:
+            threads = [
+                threading.Thread(target=self.work, args=(options["poll_interval"], options["once"]), daemon=True)
+                for _ in range(workers)
+            ]
+            for thread in threads:
+                thread.start()
+            try:
+                for thread in threads:
+                    while thread.is_alive():
+                        thread.join(timeout=0.5)
+            except KeyboardInterrupt:
+                self.stop.set()
+                for thread in threads:
+                    thread.join()
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {self.processed} job(s)."))
+
+    def work(self, poll_interval, once):
+        try:
+            while not self.stop.is_set():
+                # Outside the request cycle, so apply CONN_MAX_AGE and connection health checks here
+                close_old_connections()
+                job = claim_next_extraction_job()
+                if job is None:
+                    if once:
+                        return
+                    self.stop.wait(poll_interval)
+                    continue
+                job = run_extraction_job(job)
+                logging.info(f"Extraction job {job.id} finished with status {job.status}")
+                with self.lock:
+                    self.processed += 1
+        finally:
+            # Each worker thread owns its own database connection
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
@@ -0,0 +1,393 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Upper bounds of the histogram buckets; Prometheus adds +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry_lock = threading.Lock()
+_registry = []
+
+# Query count and time of the request being handled, if any. Context
+# variables follow the request into sync_to_async threads.
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """
+    A metric family kept in this process and exposed by render_metrics.
+
+    Values are kept per tuple of label values, under one lock per family,
+    so recording costs a dict lookup and an addition.
+
+    Args:
+        name (str): The Prometheus metric name.
+        documentation (str): The HELP text.
+        labelnames (tuple): Names of the labels every value is recorded with.
+        register (bool): False to leave it out of render_metrics.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), register=True):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if register:
+            with _registry_lock:
+                _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or 'none'}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """
+        Returns:
+            list: (suffix, label values, extra labels, value) tuples.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0)]
+        return [("", key, (), value) for key, value in values]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(self.labelnames, key, extra)} {_number(value)}")
+        return lines
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(Metric):
+    """
+    A value that goes up and down. If collect is given, it is called at
+    each scrape and returns {label values tuple: value} instead.
+    """
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, register=True):
+        super().__init__(name, documentation, labelnames, register)
+        self.collect = collect
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.collect is None:
+            return super().samples()
+        return [("", key, (), value) for key, value in sorted(self.collect().items())]
+
+class Histogram(Metric):
+    """
+    Counts of observations in fixed buckets, with their sum.
+
+    Args:
+        buckets (tuple): Increasing upper bounds.
+    """
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, register=True):
+        super().__init__(name, documentation, labelnames, register)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                # One count per bucket, one for +Inf, then the sum
+                values = self._values[key] = [0] * (len(self.buckets) + 2)
+            values[index] += 1
+            values[-1] += value
+
+    def snapshot(self, **labels):
+        """
+        Returns:
+            dict: The count and sum of the observations with these labels.
+        """
+        with self._lock:
+            values = self._values.get(self._key(labels))
+            if values is None:
+                return {"count": 0, "sum": 0}
+            return {"count": sum(values[:-1]), "sum": values[-1]}
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(values)) for key, values in sorted(self._values.items())]
+        samples = []
+        for key, values in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), values[:-1]):
+                cumulative += count
+                samples.append(("_bucket", key, (("le", _number(bound)),), cumulative))
+            samples.append(("_sum", key, (), values[-1]))
+            samples.append(("_count", key, (), cumulative))
+        return samples
+
+def _extraction_queue():
+    # Imported here so the module can be loaded before the app registry
+    from django.db.models import Count
+    from .models import ExtractionJob
+
+    statuses = (ExtractionJob.STATUS_QUEUED, ExtractionJob.STATUS_RUNNING)
+    depth = {(mode, status): 0 for mode, _ in ExtractionJob.MODE_CHOICES for status in statuses}
+    counts = (
+        ExtractionJob.objects.filter(status__in=statuses)
+        .values_list("mode", "status").annotate(count=Count("id")).order_by()
+    )
+    for mode, status, count in counts:
+        depth[(mode, status)] = count
+    return depth
+
+HTTP_REQUEST_DURATION = Histogram(
+    "rfqportal_http_request_duration_seconds", "Time to handle a request, by view.",
+    ("view", "method", "status"),
+)
+HTTP_DB_QUERIES = Histogram(
+    "rfqportal_http_db_queries", "Database queries run while handling a request, by view.",
+    ("view",), buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_DB_DURATION = Histogram(
+    "rfqportal_http_db_duration_seconds", "Time spent in database queries while handling a request, by view.",
+    ("view",),
+)
+LLM_REQUEST_DURATION = Histogram(
+    "rfqportal_llm_request_duration_seconds",
+    "Time of each OpenAI API call, to the end of the body (or the headers, for streams).",
+    ("endpoint", "status"),
+)
+LLM_REQUESTS_IN_FLIGHT = Gauge("rfqportal_llm_requests_in_flight", "OpenAI API calls in progress in this process.")
+LLM_TOKENS = Counter("rfqportal_llm_tokens_total", "Tokens reported by the Responses API, by model and kind.", ("model", "kind"))
+LLM_RETRIES = Counter("rfqportal_llm_retries_total", "LLM calls retried after a transient error, by error.", ("error",))
+LLM_UNAVAILABLE = Counter("rfqportal_llm_unavailable_total", "LLM calls given up on after their retries.")
+EXTRACTION_QUEUE_DEPTH = Gauge(
+    "rfqportal_extraction_jobs", "Extraction jobs waiting or running, by mode and status.",
+    ("mode", "status"), collect=_extraction_queue,
+)
+
+def record_llm_usage(model, usage):
+    """
+    Count the tokens of a Responses API call.
+
+    Args:
+        model (str): The model that answered.
+        usage (dict): The response's usage block, or None.
+    """
+    if not usage:
+        return
+    cached = (usage.get("input_tokens_details") or {}).get("cached_tokens") or 0
+    reasoning = (usage.get("output_tokens_details") or {}).get("reasoning_tokens") or 0
+    LLM_TOKENS.inc(usage.get("input_tokens") or 0, model=model, kind="input")
+    LLM_TOKENS.inc(cached, model=model, kind="cached")
+    LLM_TOKENS.inc(usage.get("output_tokens") or 0, model=model, kind="output")
+    LLM_TOKENS.inc(reasoning, model=model, kind="reasoning")
+
+def record_llm_retry(error):
+    """
+    Count a retried LLM call.
+
+    Args:
+        error (Exception): The transient error; its status code, or its
+            class for timeouts and connection errors, is the label.
+    """
+    LLM_RETRIES.inc(error=getattr(error, "status_code", None) or type(error).__name__)
+
+def _endpoint(request):
+    # "/v1/responses" -> "responses"; ids in batch and file paths are dropped
+    parts = [part for part in request.url.path.split("/") if part and part != "v1"]
+    return parts[0] if parts else "unknown"
+
+def _is_json(response):
+    return response.headers.get("content-type", "").startswith("application/json")
+
+def _record_llm_response(request, response, started):
+    endpoint = _endpoint(request)
+    LLM_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint, status=response.status_code)
+    if endpoint == "responses" and response.status_code == 200 and _is_json(response):
+        try:
+            body = json.loads(response.content)
+        except ValueError:
+            return
+        record_llm_usage(body.get("model") or "unknown", body.get("usage"))
+
+class MetricsTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    httpx transport wrapper timing every OpenAI API call and counting the
+    tokens Responses API calls report, for sync and async clients.
+
+    JSON bodies are read here, which the client would do next anyway;
+    streamed bodies are left to the client, and their usage is recorded by
+    llm_services from the final event.
+
+    Args:
+        transport: The transport the calls go through.
+    """
+    def __init__(self, transport):
+        self.transport = transport
+
+    def handle_request(self, request):
+        started = time.perf_counter()
+        LLM_REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = self.transport.handle_request(request)
+            if _is_json(response):
+                response.read()
+        except Exception:
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=_endpoint(request), status="error")
+            raise
+        finally:
+            LLM_REQUESTS_IN_FLIGHT.dec()
+        _record_llm_response(request, response, started)
+        return response
+
+    async def handle_async_request(self, request):
+        started = time.perf_counter()
+        LLM_REQUESTS_IN_FLIGHT.inc()
+        try:
+            response = await self.transport.handle_async_request(request)
+            if _is_json(response):
+                await response.aread()
+        except Exception:
+            LLM_REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=_endpoint(request), status="error")
+            raise
+        finally:
+            LLM_REQUESTS_IN_FLIGHT.dec()
+        _record_llm_response(request, response, started)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def instrument_transport(transport):
+    """
+    Put MetricsTransport in front of an OpenAI client's transport.
+
+    Args:
+        transport: The httpx transport the client would otherwise use.
+
+    Returns:
+        The transport to give the client.
+    """
+    return MetricsTransport(transport) if settings.METRICS_ENABLED else transport
+
+def _record_query(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - started
+
+@receiver(connection_created, dispatch_uid="metrics_record_queries")
+def _install_query_recorder(sender, connection, **kwargs):
+    # Wrappers outlive reconnects, so install this one only once per connection
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+def start_request():
+    """
+    Start counting the queries of a request in the current context.
+
+    Returns:
+        tuple: The token for finish_request and the [count, seconds] list
+            the queries are added to.
+    """
+    queries = [0, 0.0]
+    return _request_queries.set(queries), queries
+
+def finish_request(token, queries, view, method, status, duration):
+    """
+    Record a handled request and stop counting its queries.
+
+    Args:
+        token: The token returned by start_request.
+        queries (list): The [count, seconds] list returned by start_request.
+        view (str): The URL name of the view.
+        method (str): The HTTP method.
+        status (int): The response status code.
+        duration (float): Seconds the request took.
+    """
+    _request_queries.reset(token)
+    HTTP_REQUEST_DURATION.observe(duration, view=view, method=method, status=status)
+    HTTP_DB_QUERIES.observe(queries[0], view=view)
+    HTTP_DB_DURATION.observe(queries[1], view=view)
+
+def render_metrics():
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    Returns:
+        str: The exposition, ending with a newline.
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def reset_metrics():
+    """
+    Clear the values recorded in this process.
+    """
+    with _registry_lock:
+        metrics = list(_registry)
+    for metric in metrics:
+        metric.reset()
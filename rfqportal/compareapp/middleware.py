@@ -0,0 +1,49 @@
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import finish_request, start_request
+
+def _view_name(request):
+    # Unresolved paths share one label, so scanners cannot add series
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "unmatched"
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Record the latency and database queries of every request by view
+    (compareapp.metrics), for the sync and async views alike.
+
+    Installed first in MIDDLEWARE so the time spent in the other middleware
+    counts too.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            if not settings.METRICS_ENABLED:
+                return await get_response(request)
+            started = time.perf_counter()
+            token, queries = start_request()
+            status = 500
+            try:
+                response = await get_response(request)
+                status = response.status_code
+                return response
+            finally:
+                finish_request(token, queries, _view_name(request), request.method, status, time.perf_counter() - started)
+    else:
+        def middleware(request):
+            if not settings.METRICS_ENABLED:
+                return get_response(request)
+            started = time.perf_counter()
+            token, queries = start_request()
+            status = 500
+            try:
+                response = get_response(request)
+                status = response.status_code
+                return response
+            finally:
+                finish_request(token, queries, _view_name(request), request.method, status, time.perf_counter() - started)
+    return middleware
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0003_extractioncacheentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rfq',
+            index=models.Index(fields=['due_date'], name='rfq_due_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['company_name', 'id'], name='supplier_name_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:02
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+SUPPLIER_DETAIL_FIELDS = (
+    'main_contact_name', 'main_contact_email', 'main_contact_phone', 'hq_address', 'payment_terms',
+)
+
+
+def merge_case_insensitive_duplicate_suppliers(apps, schema_editor):
+    """
+    Fold suppliers whose names differ only by case into the oldest one,
+    so the case-insensitive unique constraint can be added.
+    """
+    Supplier = apps.get_model('compareapp', 'Supplier')
+    Quote = apps.get_model('compareapp', 'Quote')
+
+    groups = {}
+    for supplier in Supplier.objects.order_by('id'):
+        groups.setdefault(supplier.company_name.lower(), []).append(supplier)
+
+    for keeper, *duplicates in groups.values():
+        if not duplicates:
+            continue
+        for duplicate in duplicates:
+            for field in SUPPLIER_DETAIL_FIELDS:
+                if not getattr(keeper, field) and getattr(duplicate, field):
+                    setattr(keeper, field, getattr(duplicate, field))
+        keeper.save()
+        duplicate_ids = [duplicate.id for duplicate in duplicates]
+        Quote.objects.filter(supplier_id__in=duplicate_ids).update(supplier_id=keeper.id)
+        Supplier.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0004_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_insensitive_duplicate_suppliers, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['rfq', 'supplier'], name='quote_rfq_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['date_submitted'], name='quote_date_submitted_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='supplier',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('company_name'), name='supplier_company_name_ci_unique'),
+        ),
+    ]
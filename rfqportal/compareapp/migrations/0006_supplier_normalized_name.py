@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:05
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# A frozen copy of compareapp.company_names.normalize_company_name as this
+# migration shipped, so later changes to it do not change what it writes.
+LEGAL_SUFFIXES = frozenset({
+    "ag", "bv", "co", "company", "corp", "corporation", "gmbh", "inc", "incorporated", "kg", "limited",
+    "llc", "llp", "lp", "ltd", "nv", "oy", "plc", "pte", "pty", "sa", "sarl", "sas", "spa", "srl",
+})
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+DOTTED_ABBREVIATION = re.compile(r"\b(?:[a-z]\.){2,}")
+
+
+def normalize_company_name(name):
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = DOTTED_ABBREVIATION.sub(lambda match: match.group(0).replace(".", ""), text)
+    text = text.replace("&", " and ")
+    tokens = NON_ALPHANUMERIC.sub(" ", text).split()
+    if len(tokens) > 1 and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def populate_normalized_names(apps, schema_editor):
+    Supplier = apps.get_model('compareapp', 'Supplier')
+    suppliers = list(Supplier.objects.only('id', 'company_name'))
+    for supplier in suppliers:
+        supplier.normalized_name = normalize_company_name(supplier.company_name)
+    Supplier.objects.bulk_update(suppliers, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0005_supplier_name_constraint_quote_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(populate_normalized_names, migrations.RunPython.noop),
+    ]
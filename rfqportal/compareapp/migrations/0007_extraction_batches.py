@@ -0,0 +1,55 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0006_supplier_normalized_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('submitted', 'Submitted'), ('collecting', 'Collecting results'), ('completed', 'Completed'), ('failed', 'Failed')], default='submitted', max_length=20)),
+                ('model', models.CharField(max_length=100)),
+                ('openai_batch_id', models.CharField(blank=True, max_length=100, null=True, unique=True)),
+                ('openai_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('input_file_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('output_file_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('error_file_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('succeeded_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='extractionjob',
+            name='extractionjob_status_idx',
+        ),
+        migrations.AddField(
+            model_name='extractionjob',
+            name='mode',
+            field=models.CharField(choices=[('realtime', 'Realtime'), ('batch', 'Batch')], default='realtime', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='extractionjob',
+            index=models.Index(fields=['mode', 'status', 'created_at'], name='extractionjob_mode_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='extractionbatch',
+            index=models.Index(fields=['status'], name='extractionbatch_status_idx'),
+        ),
+        migrations.AddField(
+            model_name='extractionjob',
+            name='batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='compareapp.extractionbatch'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0007_extraction_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='original_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='reduced_tokens',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='truncated',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0008_email_token_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('tokens', models.FloatField()),
+                ('updated_at', models.FloatField()),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='extractionjob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0009_llm_resilience'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionModelCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('tier', models.PositiveSmallIntegerField()),
+                ('latency_ms', models.PositiveIntegerField()),
+                ('accepted', models.BooleanField()),
+                ('problems', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
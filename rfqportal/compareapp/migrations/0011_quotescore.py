@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0010_extractionmodelcall'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuoteScore',
+            fields=[
+                ('quote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='compareapp.quote')),
+                ('price_per', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('price_score', models.FloatField(default=0.0)),
+                ('moq_fit', models.FloatField(default=0.0)),
+                ('certification_coverage', models.FloatField(default=0.0)),
+                ('missing_certifications', models.JSONField(default=list)),
+                ('landed_cost', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True)),
+                ('score', models.FloatField(default=0.0)),
+                ('rank', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rfq', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quote_scores', to='compareapp.rfq')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rfq', 'rank'], name='quotescore_rfq_rank_idx')],
+            },
+        ),
+    ]
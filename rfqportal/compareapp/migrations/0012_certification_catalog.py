@@ -0,0 +1,151 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:48
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A frozen copy of compareapp.certification_names.parse_certification_list
+# as this migration shipped, so later changes to it do not change what it writes.
+CERTIFICATION_SEPARATOR = re.compile(r"\s*(?:[,;/\n+]|&|\band\b)\s*", re.IGNORECASE)
+NO_CERTIFICATION = frozenset({"", "none", "n a", "na", "nil", "null"})
+NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+LETTERS_THEN_DIGITS = re.compile(r"(?<=[a-z])(?=[0-9])")
+FILLER_WORDS = frozenset({"certificate", "certification", "certified", "cert", "the"})
+CERTIFICATION_ALIASES = {
+    "organic": "Organic",
+    "organically grown": "Organic",
+    "usda organic": "USDA Organic",
+    "nop organic": "USDA Organic",
+    "national organic program": "USDA Organic",
+    "eu organic": "EU Organic",
+    "kosher": "Kosher",
+    "ou kosher": "Kosher",
+    "kosher ou": "Kosher",
+    "ou": "Kosher",
+    "kosher pareve": "Kosher",
+    "halal": "Halal",
+    "non gmo": "Non-GMO",
+    "nongmo": "Non-GMO",
+    "non gmo project verified": "Non-GMO",
+    "gmo free": "Non-GMO",
+    "fair trade": "Fair Trade",
+    "fairtrade": "Fair Trade",
+    "gluten free": "Gluten-Free",
+    "sqf": "SQF",
+    "brc": "BRCGS",
+    "brcgs": "BRCGS",
+    "brc global standard": "BRCGS",
+    "fssc 22000": "FSSC 22000",
+    "iso 22000": "ISO 22000",
+    "iso 9001": "ISO 9001",
+    "gfsi": "GFSI",
+    "haccp": "HACCP",
+    "gmp": "GMP",
+    "rainforest alliance": "Rainforest Alliance",
+}
+
+
+def certification_key(name):
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = LETTERS_THEN_DIGITS.sub(" ", text)
+    tokens = [token for token in NON_ALPHANUMERIC.sub(" ", text).split() if token not in FILLER_WORDS]
+    return " ".join(tokens)
+
+
+def canonical_certification(name):
+    key = certification_key(name)
+    if key in NO_CERTIFICATION:
+        return None
+    canonical = CERTIFICATION_ALIASES.get(key)
+    if canonical is None:
+        return key, name.strip(" .")
+    return certification_key(canonical), canonical
+
+
+def parse_certification_list(text):
+    certifications = {}
+    if certification_key(text) in NO_CERTIFICATION:
+        return certifications
+    for name in CERTIFICATION_SEPARATOR.split(text):
+        canonical = canonical_certification(name)
+        if canonical is not None:
+            certifications.setdefault(*canonical)
+    return certifications
+
+
+def link_certifications(apps, schema_editor):
+    Certification = apps.get_model('compareapp', 'Certification')
+    catalog = {}
+    for model_name, text_field, through_name, owner_field in (
+        ('Quote', 'certifications', 'QuoteCertification', 'quote_id'),
+        ('RFQ', 'required_certifications', 'RFQCertification', 'rfq_id'),
+    ):
+        model = apps.get_model('compareapp', model_name)
+        through = apps.get_model('compareapp', through_name)
+        links = []
+        for owner_id, text in model.objects.values_list('id', text_field).iterator(chunk_size=1000):
+            for key, name in parse_certification_list(text).items():
+                if key not in catalog:
+                    catalog[key] = Certification.objects.create(key=key, name=name).id
+                links.append(through(**{owner_field: owner_id, 'certification_id': catalog[key]}))
+        through.objects.bulk_create(links, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0011_quotescore'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Certification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RFQCertification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='compareapp.certification')),
+                ('rfq', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='compareapp.rfq')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuoteCertification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('certification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='compareapp.certification')),
+                ('quote', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='compareapp.quote')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quote',
+            name='catalog_certifications',
+            field=models.ManyToManyField(blank=True, related_name='quotes', through='compareapp.QuoteCertification', to='compareapp.certification'),
+        ),
+        migrations.AddField(
+            model_name='rfq',
+            name='catalog_certifications',
+            field=models.ManyToManyField(blank=True, related_name='rfqs', through='compareapp.RFQCertification', to='compareapp.certification'),
+        ),
+        migrations.AddConstraint(
+            model_name='rfqcertification',
+            constraint=models.UniqueConstraint(fields=('rfq', 'certification'), name='rfqcertification_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='quotecertification',
+            index=models.Index(fields=['certification', 'quote'], name='quotecert_cert_quote_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='quotecertification',
+            constraint=models.UniqueConstraint(fields=('quote', 'certification'), name='quotecertification_unique'),
+        ),
+        migrations.RunPython(link_certifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+# A frozen copy of the compareapp.completeness fields and bits as this
+# migration shipped, so later changes to them do not change what it writes.
+SUPPLIER_CHECKED_FIELDS = ('main_contact_name', 'main_contact_email', 'main_contact_phone', 'hq_address', 'payment_terms')
+QUOTE_CHECKED_FIELDS = ('date_submitted', 'price_per', 'country_of_origin', 'certifications', 'minimum_order_quantity')
+FIELD_BITS = {field: 1 << index for index, field in enumerate(SUPPLIER_CHECKED_FIELDS + QUOTE_CHECKED_FIELDS)}
+
+
+def missing_mask(instance, fields):
+    mask = 0
+    for field in fields:
+        if not getattr(instance, field):
+            mask |= FIELD_BITS[field]
+    return mask
+
+
+def populate_missing_fields(apps, schema_editor):
+    Supplier = apps.get_model('compareapp', 'Supplier')
+    Quote = apps.get_model('compareapp', 'Quote')
+    supplier_masks = {}
+    suppliers = list(Supplier.objects.only('id', *SUPPLIER_CHECKED_FIELDS))
+    for supplier in suppliers:
+        supplier.missing_fields = supplier_masks[supplier.id] = missing_mask(supplier, SUPPLIER_CHECKED_FIELDS)
+    Supplier.objects.bulk_update(suppliers, ['missing_fields'], batch_size=1000)
+    quotes = list(Quote.objects.only('id', 'supplier_id', *QUOTE_CHECKED_FIELDS))
+    for quote in quotes:
+        quote.missing_fields = missing_mask(quote, QUOTE_CHECKED_FIELDS) | supplier_masks.get(quote.supplier_id, 0)
+    Quote.objects.bulk_update(quotes, ['missing_fields'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0012_certification_catalog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quote',
+            name='missing_fields',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='missing_fields',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='quote',
+            index=models.Index(fields=['rfq', 'missing_fields'], name='quote_rfq_missing_fields_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['missing_fields'], name='supplier_missing_fields_idx'),
+        ),
+        migrations.RunPython(populate_missing_fields, migrations.RunPython.noop),
+    ]
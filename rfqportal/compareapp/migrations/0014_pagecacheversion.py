@@ -0,0 +1,30 @@
+# Generated by Django 4.2.20 on 2026-10-18 13:58
+
+import uuid
+
+from django.db import migrations, models
+
+
+def create_global_version(apps, schema_editor):
+    # Every page cache key includes this stamp; a new database gets a new one
+    PageCacheVersion = apps.get_model('compareapp', 'PageCacheVersion')
+    PageCacheVersion.objects.create(scope='all', version=uuid.uuid4().hex)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0013_missing_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCacheVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True)),
+                ('version', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.RunPython(create_global_version, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.20 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compareapp', '0014_pagecacheversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='email',
+            name='cached_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='cost_usd',
+            field=models.DecimalField(decimal_places=6, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='extraction_model',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='extraction_source',
+            field=models.CharField(blank=True, choices=[('llm', 'LLM'), ('batch', 'Batch'), ('cache', 'Cache'), ('rules', 'Rules')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='input_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='email',
+            name='output_tokens',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
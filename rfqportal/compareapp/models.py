@@ -1,4 +1,13 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
+
+from .company_names import normalize_company_name
+from .completeness import QUOTE_CHECKED_FIELDS, QUOTE_FIELDS_MASK, SUPPLIER_CHECKED_FIELDS, missing_mask
+from .deletions import deleting_rfqs
+
+# Enables company_name__lower lookups, which match the case-insensitive index below
+models.CharField.register_lookup(Lower)
 
 class Supplier(models.Model):
     id = models.AutoField(primary_key=True)  # Add an ID field as the primary key
@@ -8,16 +17,90 @@ class Supplier(models.Model):
     main_contact_phone = models.CharField(max_length=20, null=True, blank=True)
     hq_address = models.TextField(null=True, blank=True)
     payment_terms = models.CharField(max_length=255, null=True, blank=True)
+    # company_name without case, punctuation or legal suffixes; used to match extracted suppliers
+    normalized_name = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    # Bitmask of the checked fields left blank (see compareapp.completeness)
+    missing_fields = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Alphabetical keyset pagination and name-prefix filtering on the supplier list
+            models.Index(fields=["company_name", "id"], name="supplier_name_idx"),
+            # "Suppliers missing payment terms" as an IN lookup over the masks with that bit
+            models.Index(fields=["missing_fields"], name="supplier_missing_fields_idx"),
+        ]
+        constraints = [
+            # One supplier per case-insensitive name, so concurrent workers cannot create duplicates.
+            # Its index also serves company_name__lower lookups.
+            models.UniqueConstraint(Lower("company_name"), name="supplier_company_name_ci_unique"),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_company_name(self.company_name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "company_name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        mask_changed = False
+        if update_fields is None or not set(update_fields).isdisjoint(SUPPLIER_CHECKED_FIELDS):
+            mask = missing_mask(self, SUPPLIER_CHECKED_FIELDS)
+            # A new supplier has no quotes yet
+            mask_changed = not self._state.adding and (
+                "missing_fields" in self.get_deferred_fields() or mask != self.missing_fields
+            )
+            self.missing_fields = mask
+            if update_fields is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "missing_fields"}
+        super().save(*args, **kwargs)
+        if mask_changed:
+            # Each quote carries its supplier's bits as well as its own
+            Quote.objects.filter(supplier_id=self.pk).update(
+                missing_fields=F("missing_fields").bitand(QUOTE_FIELDS_MASK).bitor(self.missing_fields)
+            )
 
     def __str__(self):
         return self.company_name
 
+class Certification(models.Model):
+    """
+    A certification in the normalized catalog. Quotes and RFQs link to it
+    through the canonical form of their certification text
+    (compareapp.certification_names), kept in sync by compareapp.certifications.
+    """
+    key = models.CharField(max_length=100, unique=True)  # certification_key of the canonical name
+    name = models.CharField(max_length=100)  # Canonical spelling
+
+    def __str__(self):
+        return self.name
+
+class RFQQuerySet(models.QuerySet):
+    def delete(self):
+        # Marked for the signal receivers of the quotes and emails deleted with them
+        with deleting_rfqs(self.values_list("pk", flat=True)):
+            return super().delete()
+
 class RFQ(models.Model):
     item = models.CharField(max_length=255)
     due_date = models.DateField(null=True, blank=True)
     amount_required_lbs = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     ship_to_location = models.TextField(null=True, blank=True)
     required_certifications = models.TextField(null=True, blank=True)  # List of certifications
+    # required_certifications resolved to the catalog
+    catalog_certifications = models.ManyToManyField(
+        Certification, through="RFQCertification", related_name="rfqs", blank=True
+    )
+
+    class Meta:
+        indexes = [
+            # Active/expired and due-date range filters on the RFQ list
+            models.Index(fields=["due_date"], name="rfq_due_date_idx"),
+        ]
+
+    objects = RFQQuerySet.as_manager()
+
+    def delete(self, *args, **kwargs):
+        # Marked for the signal receivers of the quotes and emails deleted with it
+        with deleting_rfqs([self.pk]):
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"RFQ for {self.item} (Due: {self.due_date})"
@@ -30,14 +113,249 @@ class Quote(models.Model):
     country_of_origin = models.CharField(max_length=255, null=True, blank=True)
     certifications = models.TextField(null=True, blank=True)  # List of certifications
     minimum_order_quantity = models.BigIntegerField(null=True, blank=True)
+    # certifications resolved to the catalog
+    catalog_certifications = models.ManyToManyField(
+        Certification, through="QuoteCertification", related_name="quotes", blank=True
+    )
+    # Bitmask of the checked fields blank on the quote or its supplier (see compareapp.completeness)
+    missing_fields = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["rfq", "supplier"], name="quote_rfq_supplier_idx"),
+            models.Index(fields=["date_submitted"], name="quote_date_submitted_idx"),
+            # Incomplete quotes of an RFQ: rfq = X AND missing_fields > 0
+            models.Index(fields=["rfq", "missing_fields"], name="quote_rfq_missing_fields_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or not set(update_fields).isdisjoint({"supplier", *QUOTE_CHECKED_FIELDS}):
+            self.missing_fields = self.compute_missing_fields()
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "missing_fields"}
+        super().save(*args, **kwargs)
+
+    def compute_missing_fields(self):
+        """
+        Bitmask of the checked fields blank on this quote or its supplier.
+
+        Uses the supplier's stored mask, from the loaded supplier if there
+        is one and with a query otherwise.
+        """
+        if Quote.supplier.is_cached(self):
+            supplier_mask = self.supplier.missing_fields
+        else:
+            supplier_mask = Supplier.objects.filter(pk=self.supplier_id).values_list("missing_fields", flat=True).first() or 0
+        return missing_mask(self, QUOTE_CHECKED_FIELDS) | supplier_mask
 
     def __str__(self):
         return f"Quote by {self.supplier.company_name} for {self.rfq.item}"
 
+class RFQCertification(models.Model):
+    rfq = models.ForeignKey(RFQ, on_delete=models.CASCADE)
+    certification = models.ForeignKey(Certification, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # Its index serves "what does this RFQ require"
+            models.UniqueConstraint(fields=["rfq", "certification"], name="rfqcertification_unique"),
+        ]
+
+class QuoteCertification(models.Model):
+    quote = models.ForeignKey(Quote, on_delete=models.CASCADE)
+    certification = models.ForeignKey(Certification, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # Its index serves the "does this quote hold it" probe of compliance queries
+            models.UniqueConstraint(fields=["quote", "certification"], name="quotecertification_unique"),
+        ]
+        indexes = [
+            # Every quote holding a certification, across all RFQs
+            models.Index(fields=["certification", "quote"], name="quotecert_cert_quote_idx"),
+        ]
+
 class Email(models.Model):
+    # Where the extracted data came from: a realtime LLM call, an OpenAI
+    # batch, the extraction cache or the rule-based extractor alone
+    SOURCE_LLM = "llm"
+    SOURCE_BATCH = "batch"
+    SOURCE_CACHE = "cache"
+    SOURCE_RULES = "rules"
+    SOURCE_CHOICES = [
+        (SOURCE_LLM, "LLM"),
+        (SOURCE_BATCH, "Batch"),
+        (SOURCE_CACHE, "Cache"),
+        (SOURCE_RULES, "Rules"),
+    ]
+
     related_quote = models.ForeignKey(Quote, on_delete=models.CASCADE, related_name="emails", null=True, blank=True)
     extracted_data = models.JSONField(null=True, blank=True)  # JSON field to store extracted quote or supplier data
     content = models.TextField(null=True, blank=True)
+    # Size of the email before and after preprocessing for the extraction prompt
+    original_tokens = models.PositiveIntegerField(null=True, blank=True)
+    reduced_tokens = models.PositiveIntegerField(null=True, blank=True)
+    truncated = models.BooleanField(default=False)  # Cut to fit EMAIL_TOKEN_BUDGET
+    # What the extraction cost (compareapp.usage); null source for emails stored before this was kept
+    extraction_source = models.CharField(max_length=10, choices=SOURCE_CHOICES, null=True, blank=True)
+    extraction_model = models.CharField(max_length=100, null=True, blank=True)  # The model whose output was kept
+    input_tokens = models.PositiveIntegerField(default=0)  # Summed over every LLM call made for the email
+    cached_tokens = models.PositiveIntegerField(default=0)  # Part of input_tokens, billed at the cached rate
+    output_tokens = models.PositiveIntegerField(default=0)  # Includes reasoning tokens
+    cost_usd = models.DecimalField(max_digits=12, decimal_places=6, default=0)  # At OPENAI_MODEL_PRICES when extracted
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)  # Null when no LLM was called
+    created_at = models.DateTimeField(auto_now_add=True, null=True, db_index=True)
 
     def __str__(self):
         return f"Email related to Quote ID {self.related_quote.id if self.related_quote else 'N/A'}"
+
+class QuoteScore(models.Model):
+    """
+    A quote's place in its RFQ's comparison matrix, kept up to date by
+    compareapp.quote_scoring whenever a quote or its RFQ changes.
+    """
+    quote = models.OneToOneField(Quote, on_delete=models.CASCADE, primary_key=True, related_name="score")
+    rfq = models.ForeignKey(RFQ, on_delete=models.CASCADE, related_name="quote_scores")
+    price_per = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # Copied to rescore without a join
+    price_score = models.FloatField(default=0.0)  # Lowest price in the RFQ divided by this one
+    moq_fit = models.FloatField(default=0.0)  # 1 if the MOQ is within amount_required_lbs
+    certification_coverage = models.FloatField(default=0.0)  # Share of the required certifications held
+    missing_certifications = models.JSONField(default=list)
+    landed_cost = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)  # Price of what must be bought
+    score = models.FloatField(default=0.0)  # Weighted sum of the scores above, from 0 to 1
+    rank = models.PositiveIntegerField(default=0)  # 1 for the best quote of the RFQ
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["rfq", "rank"], name="quotescore_rfq_rank_idx"),
+        ]
+
+    def __str__(self):
+        return f"Quote {self.quote_id} ranked {self.rank} (score {self.score:.2f})"
+
+class ExtractionBatch(models.Model):
+    """
+    A group of non-urgent extraction jobs sent through the OpenAI Batch API.
+    """
+    STATUS_SUBMITTED = "submitted"
+    STATUS_COLLECTING = "collecting"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_SUBMITTED, "Submitted"),
+        (STATUS_COLLECTING, "Collecting results"),
+        (STATUS_COMPLETED, "Completed"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_SUBMITTED)
+    model = models.CharField(max_length=100)
+    openai_batch_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    openai_status = models.CharField(max_length=20, null=True, blank=True)  # validating, in_progress, completed, expired, ...
+    input_file_id = models.CharField(max_length=100, null=True, blank=True)
+    output_file_id = models.CharField(max_length=100, null=True, blank=True)
+    error_file_id = models.CharField(max_length=100, null=True, blank=True)
+    request_count = models.PositiveIntegerField(default=0)
+    succeeded_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status"], name="extractionbatch_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Extraction batch {self.id} ({self.status})"
+
+class ExtractionJob(models.Model):
+    # Realtime jobs are run by the extraction workers; batch jobs wait for
+    # the next OpenAI Batch API submission, at lower cost but up to 24 hours
+    MODE_REALTIME = "realtime"
+    MODE_BATCH = "batch"
+    MODE_CHOICES = [
+        (MODE_REALTIME, "Realtime"),
+        (MODE_BATCH, "Batch"),
+    ]
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    rfq = models.ForeignKey(RFQ, on_delete=models.CASCADE, related_name="extraction_jobs")
+    email_text = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_REALTIME)
+    batch = models.ForeignKey(ExtractionBatch, on_delete=models.SET_NULL, related_name="jobs", null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)  # Result dict returned by process_email_text
+    error = models.TextField(null=True, blank=True)
+    quote = models.ForeignKey(Quote, on_delete=models.SET_NULL, related_name="extraction_jobs", null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    run_after = models.DateTimeField(null=True, blank=True)  # Set when a job is requeued because the LLM was unavailable
+
+    class Meta:
+        indexes = [
+            # Workers and batch submission poll for the oldest queued job of their mode
+            models.Index(fields=["mode", "status", "created_at"], name="extractionjob_mode_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"Extraction job {self.id} for RFQ {self.rfq_id} ({self.status})"
+
+class ExtractionCacheEntry(models.Model):
+    key = models.CharField(max_length=64, unique=True)  # sha256 of normalized email text, model and prompt version
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=20)
+    data = models.JSONField()  # Extracted fields, as returned by extract_email_data
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)  # Duration of the LLM call that produced the entry
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Extraction cache entry {self.key[:12]} ({self.model})"
+
+class RateLimitBucket(models.Model):
+    # Token buckets shared by every process calling the OpenAI API (compareapp.llm_resilience)
+    name = models.CharField(max_length=50, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()  # Unix time of the last take; the bucket refills from here
+    version = models.PositiveIntegerField(default=0)  # Incremented by each take, for conditional updates
+
+    def __str__(self):
+        return f"Rate limit bucket {self.name} ({self.tokens:.1f} tokens)"
+
+class PageCacheVersion(models.Model):
+    # Version stamps of the cached pages (compareapp.page_cache), shared by every process.
+    # A write replaces its scopes' stamps, so pages cached under the old ones are never read again.
+    scope = models.CharField(max_length=100, unique=True)  # E.g. "rfqs" or "rfq:42"
+    version = models.CharField(max_length=32)  # Random, so stamps are not reused after a database reset
+
+    def __str__(self):
+        return f"Page cache version {self.scope} ({self.version[:8]})"
+
+class ExtractionModelCall(models.Model):
+    # One LLM call made while routing an email through the model tiers (compareapp.llm_routing)
+    model = models.CharField(max_length=100)
+    tier = models.PositiveSmallIntegerField()  # 0 for the cheapest model
+    latency_ms = models.PositiveIntegerField()
+    accepted = models.BooleanField()  # False if the output failed validation and was escalated
+    problems = models.JSONField(default=list)  # Validation problems found in the output
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model} call ({'accepted' if self.accepted else 'escalated'})"
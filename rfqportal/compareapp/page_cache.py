@@ -0,0 +1,212 @@
+import hashlib
+import json
+import threading
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .deletions import is_rfq_being_deleted
+from .models import RFQ, Email, PageCacheVersion, Quote, Supplier
+
+PAGE_CACHE_ALIAS = "pages"
+
+# Version scopes. Every key includes ALL_SCOPE, so bumping it drops every page.
+ALL_SCOPE = "all"
+RFQS_SCOPE = "rfqs"
+SUPPLIERS_SCOPE = "suppliers"
+
+_MISSING = object()
+
+# In-process hit/miss counters by page name
+_stats_lock = threading.Lock()
+_stats = {}
+
+def rfq_scope(rfq_id):
+    """
+    The scope of an RFQ's quote comparison: the RFQ, its quotes, their
+    suppliers and their emails.
+    """
+    return f"rfq:{rfq_id}"
+
+def bump_versions(scopes):
+    """
+    Give scopes new version stamps, so the pages cached under the old ones
+    are never read again.
+
+    Call it after the data the pages show has been written, in the same
+    transaction where there is one: a page rendered before then is cached
+    under the old stamp, not the new one. Rows derived from other rows
+    (e.g. the quote scores) bump again once they are written.
+
+    Args:
+        scopes (iterable): The scopes written to.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    PageCacheVersion.objects.bulk_create(
+        [PageCacheVersion(scope=scope, version=uuid.uuid4().hex) for scope in sorted(scopes)],
+        update_conflicts=True, unique_fields=["scope"], update_fields=["version"],
+    )
+
+def invalidate_all():
+    """
+    Drop every cached page, e.g. after recomputing the quote scores.
+    """
+    bump_versions([ALL_SCOPE])
+
+def _versions(scopes):
+    """
+    Read the current stamps of scopes with one query.
+
+    Scopes never written to have an empty stamp. That is safe because the
+    random ALL_SCOPE stamp, created with the database, is part of every key.
+    """
+    versions = dict(PageCacheVersion.objects.filter(scope__in=[ALL_SCOPE, *scopes]).values_list("scope", "version"))
+    if ALL_SCOPE not in versions:
+        # E.g. the table was flushed; one process creates the stamp, the rest read it
+        PageCacheVersion.objects.bulk_create([PageCacheVersion(scope=ALL_SCOPE, version=uuid.uuid4().hex)], ignore_conflicts=True)
+        versions[ALL_SCOPE] = PageCacheVersion.objects.get(scope=ALL_SCOPE).version
+    return [versions[ALL_SCOPE], *(versions.get(scope, "") for scope in scopes)]
+
+def _page_key(name, params, versions):
+    payload = json.dumps([params, versions], sort_keys=True, default=str)
+    return f"page:{name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+def _count(name, hit):
+    with _stats_lock:
+        counters = _stats.setdefault(name, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+def cached_page(name, scopes, params, compute):
+    """
+    Return a page or its data from the page cache, computing and storing
+    it on a miss.
+
+    The key holds the current version stamps of the scopes the page reads,
+    so a write to any of them makes the next request a miss.
+
+    Args:
+        name (str): The page, e.g. "rfq-list".
+        scopes (list): The scopes whose data the page shows.
+        params (object): JSON-serializable request parameters the page
+            depends on, e.g. the query string.
+        compute (callable): Builds the value on a miss. Exceptions (e.g.
+            Http404) are not cached.
+
+    Returns:
+        object: The cached or computed value.
+    """
+    if not settings.PAGE_CACHE_ENABLED:
+        return compute()
+    cache = caches[PAGE_CACHE_ALIAS]
+    key = _page_key(name, params, _versions(scopes))
+    value = cache.get(key, _MISSING)
+    _count(name, value is not _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, settings.PAGE_CACHE_TTL)
+    return value
+
+async def acached_page(name, scopes, params, compute):
+    """
+    Async variant of cached_page.
+
+    Args:
+        compute (callable): Returns an awaitable that builds the value.
+
+    Returns:
+        object: The cached or computed value.
+    """
+    if not settings.PAGE_CACHE_ENABLED:
+        return await compute()
+    cache = caches[PAGE_CACHE_ALIAS]
+    key = _page_key(name, params, await sync_to_async(_versions)(scopes))
+    value = await cache.aget(key, _MISSING)
+    _count(name, value is not _MISSING)
+    if value is _MISSING:
+        value = await compute()
+        await cache.aset(key, value, settings.PAGE_CACHE_TTL)
+    return value
+
+def get_page_cache_stats():
+    """
+    Report page cache effectiveness since the process started.
+
+    Returns:
+        dict: Hits, misses and hit rate in total and for each page.
+    """
+    with _stats_lock:
+        pages = {name: dict(counters) for name, counters in _stats.items()}
+    total = {
+        "hits": sum(counters["hits"] for counters in pages.values()),
+        "misses": sum(counters["misses"] for counters in pages.values()),
+    }
+    for counters in [total, *pages.values()]:
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = counters["hits"] / lookups if lookups else 0.0
+    return {**total, "pages": pages}
+
+def reset_page_cache_stats():
+    """
+    Reset the in-process hit/miss counters.
+    """
+    with _stats_lock:
+        _stats.clear()
+
+def _quote_rfq_id(quote_id):
+    return Quote.objects.filter(pk=quote_id).values_list("rfq_id", flat=True).first()
+
+@receiver(post_save, sender=RFQ, dispatch_uid="page_cache_rfq_save")
+@receiver(post_delete, sender=RFQ, dispatch_uid="page_cache_rfq_delete")
+def _bump_rfq(sender, instance, **kwargs):
+    bump_versions([RFQS_SCOPE, rfq_scope(instance.pk)])
+
+@receiver(pre_save, sender=Quote, dispatch_uid="page_cache_quote_pre_save")
+def _remember_quote_rfq(sender, instance, update_fields=None, raw=False, **kwargs):
+    # A full save may move the quote to another RFQ, whose page then changes too
+    if raw or instance._state.adding or (update_fields is not None and "rfq" not in update_fields):
+        return
+    instance._page_cache_previous_rfq_id = _quote_rfq_id(instance.pk)
+
+@receiver(post_save, sender=Quote, dispatch_uid="page_cache_quote_save")
+def _bump_saved_quote(sender, instance, **kwargs):
+    previous = instance.__dict__.pop("_page_cache_previous_rfq_id", None)
+    bump_versions({rfq_scope(rfq_id) for rfq_id in (instance.rfq_id, previous) if rfq_id is not None})
+
+@receiver(post_delete, sender=Quote, dispatch_uid="page_cache_quote_delete")
+def _bump_deleted_quote(sender, instance, **kwargs):
+    # Deleting the RFQ bumps its scope once
+    if is_rfq_being_deleted(instance.rfq_id):
+        return
+    bump_versions([rfq_scope(instance.rfq_id)])
+
+@receiver(post_save, sender=Supplier, dispatch_uid="page_cache_supplier_save")
+def _bump_saved_supplier(sender, instance, created, raw=False, **kwargs):
+    scopes = [SUPPLIERS_SCOPE]
+    if not created and not raw:
+        # Every comparison showing one of the supplier's quotes
+        rfq_ids = Quote.objects.filter(supplier_id=instance.pk).values_list("rfq_id", flat=True).distinct()
+        scopes += [rfq_scope(rfq_id) for rfq_id in rfq_ids]
+    bump_versions(scopes)
+
+@receiver(post_delete, sender=Supplier, dispatch_uid="page_cache_supplier_delete")
+def _bump_deleted_supplier(sender, instance, **kwargs):
+    # Its quotes were deleted first, bumping their RFQs
+    bump_versions([SUPPLIERS_SCOPE])
+
+@receiver(post_save, sender=Email, dispatch_uid="page_cache_email_save")
+@receiver(post_delete, sender=Email, dispatch_uid="page_cache_email_delete")
+def _bump_email(sender, instance, raw=False, **kwargs):
+    if raw or instance.related_quote_id is None:
+        return
+    if Email.related_quote.is_cached(instance):
+        rfq_id = instance.related_quote.rfq_id
+    else:
+        rfq_id = _quote_rfq_id(instance.related_quote_id)
+    if rfq_id is not None and not is_rfq_being_deleted(rfq_id):
+        bump_versions([rfq_scope(rfq_id)])
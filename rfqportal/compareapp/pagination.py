@@ -0,0 +1,109 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+def encode_cursor(values):
+    """
+    Encode the ordering values of the last row on a page as an opaque cursor.
+
+    Args:
+        values (list): JSON-serializable ordering values.
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor.
+
+    Returns:
+        list: The ordering values, or None if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+def _keyset_filter(model, ordering, values):
+    """
+    Build the "after this row" condition for a keyset ordering.
+
+    For ordering (a, b, id) this is
+    a > va OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid),
+    with < for descending fields.
+    """
+    condition = Q()
+    for position, name in enumerate(ordering):
+        field_name = name.lstrip("-")
+        lookup = "lt" if name.startswith("-") else "gt"
+        value = model._meta.get_field(field_name).to_python(values[position])
+        step = Q(**{f"{field_name}__{lookup}": value})
+        for previous, previous_value in zip(ordering[:position], values[:position]):
+            previous_name = previous.lstrip("-")
+            step &= Q(**{previous_name: model._meta.get_field(previous_name).to_python(previous_value)})
+        condition |= step
+    return condition
+
+def keyset_paginate(queryset, ordering, cursor=None, page_size=25):
+    """
+    Return one page of a queryset using keyset (cursor) pagination.
+
+    Unlike OFFSET pagination, the database seeks straight to the cursor
+    position through the index on the ordering columns, so every page costs
+    the same regardless of how deep it is or how large the table grows.
+
+    Args:
+        queryset (QuerySet): The filtered queryset.
+        ordering (tuple): Field names, "-" prefixed for descending. The fields
+            must be non-nullable and the last one unique (normally "id").
+        cursor (str): Cursor from a previous page's next_cursor, or None.
+        page_size (int): Rows per page.
+
+    Returns:
+        KeysetPage: The rows and the cursor for the following page.
+    """
+    queryset = queryset.order_by(*ordering)
+    values = decode_cursor(cursor) if cursor else None
+    if values is not None and len(values) == len(ordering):
+        try:
+            queryset = queryset.filter(_keyset_filter(queryset.model, ordering, values))
+        except (ValidationError, TypeError, ValueError):
+            # Malformed cursor values: start from the first page
+            pass
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor([
+            _cursor_value(getattr(last, name.lstrip("-"))) for name in ordering
+        ])
+    return KeysetPage(items=rows, next_cursor=next_cursor)
+
+def _cursor_value(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, float, str, bool)):
+        return str(value)
+    return value
@@ -0,0 +1,315 @@
+import functools
+import math
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+from .llm_services import CHARS_PER_TOKEN, DEFAULT_MODEL
+
+try:
+    import tiktoken
+except ImportError:  # Optional: without it token counts are estimated from the length
+    tiktoken = None
+
+# Share of the token budget kept from the top of a long email; the rest comes
+# from the bottom, where the sign-off and contact details are
+HEAD_SHARE = 0.8
+TRUNCATION_MARKER = "[... {tokens} tokens omitted ...]"
+
+HTML_TAG = re.compile(r"<(?:html|body|div|p|br|table|span|font)\b", re.IGNORECASE)
+REPLY_HEADER = re.compile(
+    r"^(?:On\b.{0,200}\bwrote:|-{2,}\s*Original Message\s*-{2,})$", re.IGNORECASE
+)
+REPLY_HEADER_START = re.compile(r"^On\b.{0,200}$")
+FORWARD_BANNER = re.compile(r"^(?:-{2,}\s*Forwarded message\s*-{2,}|Begin forwarded message:)$", re.IGNORECASE)
+HEADER_LINE = re.compile(r"^(?:From|Sent|To|Cc|Subject|Date):", re.IGNORECASE)
+QUOTED_LINE = re.compile(r"^\s*>")
+SIGNATURE_DELIMITER = "-- "
+# Lines after a "-- " delimiter worth keeping: name, title, company, phone, address
+SIGNATURE_MAX_LINES = 6
+BOILERPLATE_LINE = re.compile(
+    r"^(?:sent from my \w+|sent from (?:mail|outlook|yahoo mail) for|get outlook for|"
+    r"\[(?:cid:|image:)[^\]]*\]|https?://\S+|please consider the environment before printing.*)$",
+    re.IGNORECASE,
+)
+# A disclaimer runs from one of these to the end of its paragraph
+DISCLAIMER_START = re.compile(
+    r"^(?:confidentiality notice|disclaimer|privileged (?:and|&) confidential|"
+    r"this (?:e-?mail|message)(?: and any (?:files|attachments)(?: transmitted with it)?)? "
+    r"(?:is|are|may be|contains?)\b.*\b(?:confidential|intended|privileged)|"
+    r"if you (?:are not the intended recipient|have received this (?:e-?mail|message) in error)|"
+    r"to unsubscribe|you are receiving this)",
+    re.IGNORECASE,
+)
+SEPARATOR_LINE = re.compile(r"^[\s\-_=*~#]{3,}$")
+INLINE_WHITESPACE = re.compile(r"[ \t ]+")
+
+@dataclass(frozen=True)
+class PreprocessedEmail:
+    """
+    An email reduced for the extraction prompt, with its token counts.
+    """
+    text: str
+    original_tokens: int
+    tokens: int
+    truncated: bool = False
+
+@functools.lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(DEFAULT_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:  # The encoding files could not be downloaded
+        return None
+
+def count_tokens(text):
+    """
+    Count the tokens of a text for the extraction model.
+
+    Uses tiktoken when installed, otherwise estimates from the length.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The token count.
+    """
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+class _HTMLText(HTMLParser):
+    BLOCK_TAGS = {"address", "blockquote", "br", "div", "h1", "h2", "h3", "h4", "li", "p", "table", "td", "th", "tr"}
+    # Quoted replies are wrapped in <blockquote> by most mail clients
+    SKIPPED_TAGS = {"blockquote", "head", "script", "style", "title"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+def html_to_text(html):
+    """
+    Render HTML email content as plain text, without quoted replies.
+
+    Args:
+        html (str): The HTML.
+
+    Returns:
+        str: The text, one line per block element.
+    """
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.parts)
+
+# Define the pipeline stages. Each takes and yields lines, so an email
+# streams through them without intermediate copies.
+def strip_quoted_replies(lines):
+    """
+    Drop ">" quoted lines and everything from the first reply header on.
+
+    Forwarded messages are kept: a forwarded supplier quote is the content.
+    """
+    body_started = False
+    pending = None
+    for line in lines:
+        stripped = line.strip()
+        if pending is not None:
+            # "On Mon, Jan 6, 2025 at 9:00 AM Jane <jane@x.com>" is often wrapped before "wrote:"
+            if stripped.lower().endswith("wrote:"):
+                return
+            yield pending
+            pending = None
+        if REPLY_HEADER.match(stripped):
+            return
+        if FORWARD_BANNER.match(stripped):
+            body_started = False  # The forwarded message's headers follow
+            yield line
+            continue
+        if body_started and HEADER_LINE.match(stripped) and stripped.lower().startswith("from:"):
+            return  # Outlook-style header block of the quoted message
+        if QUOTED_LINE.match(line):
+            continue
+        if REPLY_HEADER_START.match(stripped) and not stripped.endswith(":"):
+            pending = line
+            continue
+        if stripped and not HEADER_LINE.match(stripped):
+            body_started = True
+        yield line
+    if pending is not None:
+        yield pending
+
+def strip_boilerplate(lines):
+    """
+    Drop disclaimers, mobile client footers, image placeholders, bare links
+    and the tail of long signatures. The first lines of a signature are kept
+    because they usually carry the contact's name, company and phone.
+    """
+    in_disclaimer = False
+    signature_lines = None
+    for line in lines:
+        stripped = line.strip()
+        if in_disclaimer:
+            in_disclaimer = bool(stripped)
+            continue
+        if DISCLAIMER_START.match(stripped):
+            in_disclaimer = True
+            continue
+        if BOILERPLATE_LINE.match(stripped):
+            continue
+        if line.rstrip("\n") == SIGNATURE_DELIMITER or stripped == "--":
+            signature_lines = 0
+            continue
+        if signature_lines is not None and stripped:
+            signature_lines += 1
+            if signature_lines > SIGNATURE_MAX_LINES:
+                continue
+        yield line
+
+def collapse_whitespace(lines):
+    """
+    Collapse runs of spaces, drop separator rules and repeated blank lines.
+    """
+    blank = True  # Also drops leading blank lines
+    for line in lines:
+        line = INLINE_WHITESPACE.sub(" ", line).strip()
+        if SEPARATOR_LINE.match(line):
+            continue
+        if not line:
+            if not blank:
+                blank = True
+                yield ""
+            continue
+        blank = False
+        yield line
+
+PIPELINE = (strip_quoted_replies, strip_boilerplate, collapse_whitespace)
+
+def _split_line(line, max_tokens):
+    """
+    Cut a line into pieces of at most max_tokens tokens (estimated from the
+    length without tiktoken).
+    """
+    encoding = _encoding()
+    if encoding is None:
+        size = max_tokens * CHARS_PER_TOKEN
+        return [line[start:start + size] for start in range(0, len(line), size)]
+    tokens = encoding.encode(line, disallowed_special=())
+    return [encoding.decode(tokens[start:start + max_tokens]) for start in range(0, len(tokens), max_tokens)]
+
+def _join_pieces(pieces):
+    lines, current = [], ""
+    for text, _, ends_line in pieces:
+        current += text
+        if ends_line:
+            lines.append(current)
+            current = ""
+    if current:
+        lines.append(current)
+    return lines
+
+def _truncate(lines, token_budget):
+    """
+    Keep the head and tail of the lines within the budget.
+
+    Lines too long to fit the tail's share are cut into pieces first, so an
+    email written on one long line still keeps its start and end.
+
+    Returns:
+        tuple: The kept lines and the number of tokens omitted.
+    """
+    counts = [count_tokens(line) + 1 for line in lines]  # +1 for the newline
+    if sum(counts) <= token_budget:
+        return lines, 0
+
+    token_budget -= count_tokens(TRUNCATION_MARKER.format(tokens=sum(counts))) + 1
+    head_budget = int(token_budget * HEAD_SHARE)
+    piece_budget = max(1, (token_budget - head_budget) // 2)
+    pieces = []  # (text, tokens, whether it ends its line)
+    for line, count in zip(lines, counts):
+        if count - 1 <= piece_budget:
+            pieces.append((line, count, True))
+            continue
+        parts = _split_line(line, piece_budget)
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            pieces.append((part, count_tokens(part) + last, last))
+
+    head, used = [], 0
+    for piece in pieces:
+        if used + piece[1] > head_budget:
+            break
+        head.append(piece)
+        used += piece[1]
+    tail, tail_used = [], 0
+    for piece in reversed(pieces[len(head):]):
+        if used + tail_used + piece[1] > token_budget:
+            break
+        tail.append(piece)
+        tail_used += piece[1]
+    tail.reverse()
+    omitted = sum(piece[1] for piece in pieces) - used - tail_used
+    return _join_pieces(head) + [TRUNCATION_MARKER.format(tokens=omitted)] + _join_pieces(tail), omitted
+
+@functools.lru_cache(maxsize=256)
+def preprocess_email(email_text, token_budget=None):
+    """
+    Reduce an email to the part worth sending to the LLM.
+
+    HTML is converted to text, then quoted reply chains, disclaimers and
+    boilerplate are removed and whitespace is collapsed. If the result is
+    still over token_budget, the middle is cut out.
+
+    Args:
+        email_text (str): The raw email content.
+        token_budget (int): Most tokens to keep, or None for no limit.
+
+    Returns:
+        PreprocessedEmail: The reduced text and its token counts.
+    """
+    email_text = email_text or ""
+    text = html_to_text(email_text) if HTML_TAG.search(email_text) else email_text
+    lines = text.splitlines()
+    for stage in PIPELINE:
+        lines = stage(lines)
+    lines = list(lines)
+    while lines and not lines[-1]:
+        lines.pop()
+
+    if not any(lines):
+        lines = [text.strip()]  # Nothing but quotes and boilerplate: send it all
+
+    truncated = False
+    if token_budget:
+        lines, omitted = _truncate(lines, token_budget)
+        truncated = omitted > 0
+    reduced = "\n".join(lines)
+    return PreprocessedEmail(
+        text=reduced,
+        original_tokens=count_tokens(email_text),
+        tokens=count_tokens(reduced),
+        truncated=truncated,
+    )
@@ -0,0 +1,212 @@
+import math
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .certification_names import parse_certification_list
+from .deletions import is_rfq_being_deleted
+from .models import RFQ, Quote, QuoteScore
+from .page_cache import bump_versions, rfq_scope
+
+# Saves limited (by update_fields) to other fields leave the scores as they are
+SCORED_QUOTE_FIELDS = {"rfq", "price_per", "certifications", "minimum_order_quantity"}
+SCORED_RFQ_FIELDS = {"amount_required_lbs", "required_certifications"}
+# MOQ fit of a quote that gives no MOQ: neither a fit nor a miss
+UNKNOWN_MOQ_FIT = 0.5
+# Recomputed scores are rounded so unchanged quotes are not rewritten
+SCORE_DIGITS = 4
+
+def moq_fit(minimum_order_quantity, amount_required):
+    """
+    How well a quote's MOQ fits the amount the RFQ needs.
+
+    Returns:
+        float: 1 if the MOQ is no more than the amount required (or the
+            RFQ has none), otherwise the amount required over the MOQ.
+    """
+    if not amount_required:
+        return 1.0
+    if not minimum_order_quantity:
+        return UNKNOWN_MOQ_FIT
+    return min(1.0, float(amount_required) / minimum_order_quantity)
+
+def certification_coverage(offered, required):
+    """
+    Certifications match through their aliases, so "OU Kosher" covers
+    "Kosher".
+
+    Returns:
+        tuple: The share of the required certifications offered (1 if none
+            are required) and the names of those missing.
+    """
+    required = parse_certification_list(required)
+    if not required:
+        return 1.0, []
+    offered = parse_certification_list(offered)
+    missing = [name for key, name in required.items() if key not in offered]
+    return 1 - len(missing) / len(required), missing
+
+def landed_cost(price_per, minimum_order_quantity, amount_required):
+    """
+    The cost of buying what the RFQ needs from a quote: the larger of the
+    amount required and the MOQ, at the quoted price.
+
+    Returns:
+        Decimal: The cost, or None if the price or the amount is unknown.
+    """
+    if price_per is None or not amount_required:
+        return None
+    quantity = max(Decimal(amount_required), Decimal(minimum_order_quantity or 0))
+    return (Decimal(price_per) * quantity).quantize(Decimal("0.01"))
+
+def score_weights():
+    """
+    Returns:
+        tuple: The price, MOQ and certification weights, scaled to sum to 1.
+    """
+    weights = (
+        settings.QUOTE_SCORE_PRICE_WEIGHT, settings.QUOTE_SCORE_MOQ_WEIGHT, settings.QUOTE_SCORE_CERTIFICATION_WEIGHT,
+    )
+    total = sum(weights)
+    return tuple(weight / total for weight in weights) if total > 0 else (1.0, 0.0, 0.0)
+
+def _score_quote(score, quote, rfq):
+    """
+    Set the scores that depend only on the quote and its RFQ.
+    """
+    score.rfq_id = rfq.id
+    score.price_per = quote.price_per
+    score.moq_fit = round(moq_fit(quote.minimum_order_quantity, rfq.amount_required_lbs), SCORE_DIGITS)
+    coverage, score.missing_certifications = certification_coverage(quote.certifications, rfq.required_certifications)
+    score.certification_coverage = round(coverage, SCORE_DIGITS)
+    score.landed_cost = landed_cost(quote.price_per, quote.minimum_order_quantity, rfq.amount_required_lbs)
+
+def _rank(scores):
+    """
+    Normalize prices against the lowest in the RFQ, weight the scores and
+    rank the quotes, best first. Ties go to the lower price, then the
+    earlier quote.
+
+    Returns:
+        set: Quote ids whose price score, score or rank changed.
+    """
+    prices = [score.price_per for score in scores if score.price_per and score.price_per > 0]
+    best_price = min(prices, default=None)
+    price_weight, moq_weight, certification_weight = score_weights()
+    changed = set()
+    for score in scores:
+        price_score = float(best_price / score.price_per) if best_price and score.price_per and score.price_per > 0 else 0.0
+        values = (
+            round(price_score, SCORE_DIGITS),
+            round(price_weight * price_score + moq_weight * score.moq_fit + certification_weight * score.certification_coverage, SCORE_DIGITS),
+        )
+        if values != (score.price_score, score.score):
+            score.price_score, score.score = values
+            changed.add(score.quote_id)
+
+    ordered = sorted(scores, key=lambda score: (-score.score, score.price_per if score.price_per else math.inf, score.quote_id))
+    for rank, score in enumerate(ordered, start=1):
+        if score.rank != rank:
+            score.rank = rank
+            changed.add(score.quote_id)
+    return changed
+
+def update_quote_scores(rfq_id, quote_ids=None):
+    """
+    Bring an RFQ's rows of the comparison matrix up to date.
+
+    Only the given quotes are scored again from their rows; the others keep
+    their stored scores and are just re-normalized and re-ranked, which
+    needs no query beyond reading the matrix. The RFQ row is locked so
+    concurrent updates of one RFQ are applied one after the other, and the
+    RFQ's page cache scope is bumped in the same transaction.
+
+    Args:
+        rfq_id (int): The RFQ.
+        quote_ids (list): The quotes added or changed, or None to score
+            every quote of the RFQ again.
+    """
+    with transaction.atomic():
+        rfq = RFQ.objects.select_for_update().filter(pk=rfq_id).first()
+        if rfq is None:
+            return
+        scores = {score.quote_id: score for score in QuoteScore.objects.filter(rfq_id=rfq_id)}
+        quotes = Quote.objects.filter(rfq_id=rfq_id)
+        if quote_ids is not None:
+            quotes = quotes.filter(id__in=quote_ids)
+        quotes = list(quotes.only("id", "price_per", "certifications", "minimum_order_quantity"))
+
+        if quote_ids is None:
+            stale = set(scores) - {quote.id for quote in quotes}
+            QuoteScore.objects.filter(quote_id__in=stale).delete()
+            scores = {quote_id: score for quote_id, score in scores.items() if quote_id not in stale}
+
+        # A quote moved here from another RFQ still has that RFQ's row
+        moved = {quote.id for quote in quotes if quote.id not in scores}
+        previous_rfqs = set(
+            QuoteScore.objects.filter(quote_id__in=moved).exclude(rfq_id=rfq_id).values_list("rfq_id", flat=True)
+        )
+        if previous_rfqs:
+            QuoteScore.objects.filter(quote_id__in=moved).delete()
+
+        created = []
+        for quote in quotes:
+            score = scores.get(quote.id)
+            if score is None:
+                score = scores[quote.id] = QuoteScore(quote_id=quote.id)
+                created.append(score)
+            _score_quote(score, quote, rfq)
+
+        changed = _rank(list(scores.values())) | {quote.id for quote in quotes}
+        QuoteScore.objects.bulk_create(created)
+        created_ids = {score.quote_id for score in created}
+        updated = [score for quote_id, score in scores.items() if quote_id in changed and quote_id not in created_ids]
+        if updated:
+            QuoteScore.objects.bulk_update(updated, [
+                "price_per", "price_score", "moq_fit", "certification_coverage", "missing_certifications",
+                "landed_cost", "score", "rank",
+            ])
+        # Bumped again after the matrix is written: a page cached between the
+        # quote's own bump and this one shows the old ranks under a stamp no
+        # longer current
+        bump_versions([rfq_scope(rfq_id)])
+
+    for previous_rfq in previous_rfqs:
+        update_quote_scores(previous_rfq, [])
+
+def rebuild_quote_scores():
+    """
+    Score every RFQ's quotes again, e.g. after changing the weights.
+
+    Returns:
+        int: The number of RFQs scored.
+    """
+    rfq_ids = list(RFQ.objects.filter(rfqs__isnull=False).distinct().values_list("id", flat=True))
+    for rfq_id in rfq_ids:
+        update_quote_scores(rfq_id)
+    return len(rfq_ids)
+
+# Quotes created or changed one at a time are scored in the same transaction,
+# so the matrix never shows a quote without its rank. Bulk writes send no
+# signals; their callers call update_quote_scores themselves.
+@receiver(post_save, sender=Quote, dispatch_uid="quote_score_save")
+def _score_saved_quote(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not SCORED_QUOTE_FIELDS & set(update_fields)):
+        return
+    update_quote_scores(instance.rfq_id, [instance.id])
+
+@receiver(post_delete, sender=Quote, dispatch_uid="quote_score_delete")
+def _rerank_after_delete(sender, instance, **kwargs):
+    # The quotes of an RFQ being deleted are deleted with their scores
+    if not is_rfq_being_deleted(instance.rfq_id):
+        update_quote_scores(instance.rfq_id, [])
+
+@receiver(post_save, sender=RFQ, dispatch_uid="quote_score_rfq_save")
+def _score_changed_rfq(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or created or (update_fields is not None and not SCORED_RFQ_FIELDS & set(update_fields)):
+        return
+    if QuoteScore.objects.filter(rfq_id=instance.id).exists():
+        update_quote_scores(instance.id)
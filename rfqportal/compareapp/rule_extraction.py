@@ -0,0 +1,365 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from email.utils import parseaddr, parsedate_to_datetime
+
+from django.conf import settings
+
+from .company_names import LEGAL_SUFFIXES
+from .llm_services import EmailData
+
+EXTRACTION_FIELDS = tuple(EmailData.model_fields)
+
+# Confidence of a value read from a labeled line such as "MOQ: 10,000 lbs"
+LABELED = 0.95
+# ...of the sender in the From header, which a labeled contact in the body overrides
+SENDER = 0.9
+# ...of a pattern that only ever means one thing, such as "$1.20/lb" or "Net 30"
+UNAMBIGUOUS_PATTERN = 0.9
+# ...of a value picked out of free text or a signature
+UNLABELED = 0.8
+# ...when several different values were found for the field
+AMBIGUOUS = 0.4
+# ...of an empty certification list when none are mentioned
+NO_CERTIFICATIONS = 0.5
+# Fields that get a default instead of an LLM call when the email has none;
+# the extraction prompt also asks for today's date in that case
+DEFAULTED_FIELDS = {"date_submitted": lambda: date.today().isoformat()}
+
+# Field label variants, compared after lowercasing and dropping punctuation
+FIELD_LABELS = {
+    "supplier_company_name": ("company", "company name", "supplier", "supplier name", "vendor"),
+    "main_contact_name": ("contact", "contact name", "contact person", "name"),
+    "main_contact_email": ("email", "e mail", "contact email", "email address"),
+    "main_contact_phone": ("phone", "tel", "telephone", "mobile", "contact phone", "phone number"),
+    "hq_address": ("address", "hq", "hq address", "headquarters", "head office", "headquarters address"),
+    "payment_terms": ("payment terms", "terms", "payment"),
+    "date_submitted": ("date", "quote date", "sent", "date submitted"),
+    "price_per": (
+        "price", "unit price", "cost", "price per lb", "price per pound", "price per kg", "price per gallon",
+        "price lb", "price kg", "price gal", "quoted price",
+    ),
+    "country_of_origin": ("country of origin", "origin", "coo", "country"),
+    "certifications": ("certifications", "certification", "certificates", "certs"),
+    "minimum_order_quantity": (
+        "moq", "minimum order", "minimum order quantity", "min order", "min order quantity", "minimum quantity",
+    ),
+}
+LABEL_FIELDS = {label: name for name, labels in FIELD_LABELS.items() for label in labels}
+
+LABELED_LINE = re.compile(r"^[ \t]*(?:[-*•][ \t]*)?([A-Za-z][A-Za-z ./()&-]{0,40}?)[ \t]*[:=][ \t]*(\S.*?)[ \t]*$", re.MULTILINE)
+LABEL_PUNCTUATION = re.compile(r"[^a-z]+")
+EMAIL_ADDRESS = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_NUMBER = re.compile(r"(?<![\w$.,])\+?\(?\d[\d ().-]{5,}\d(?![\w,])")
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
+MIN_PHONE_DIGITS = 7
+NUMBER = r"(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)"
+
+# Quote units normalized to the per pound / per gallon basis the Quote model uses
+WEIGHT_UNITS = {
+    "lb": 1.0, "lbs": 1.0, "pound": 1.0, "pounds": 1.0,
+    "kg": 2.20462262, "kgs": 2.20462262, "kilo": 2.20462262, "kilos": 2.20462262,
+    "kilogram": 2.20462262, "kilograms": 2.20462262,
+    "mt": 2204.62262, "tonne": 2204.62262, "tonnes": 2204.62262, "metric ton": 2204.62262, "metric tons": 2204.62262,
+    "ton": 2000.0, "tons": 2000.0,
+}
+VOLUME_UNITS = {
+    "gal": 1.0, "gals": 1.0, "gallon": 1.0, "gallons": 1.0,
+    "l": 0.264172052, "liter": 0.264172052, "liters": 0.264172052, "litre": 0.264172052, "litres": 0.264172052,
+}
+UNITS = {**WEIGHT_UNITS, **VOLUME_UNITS}
+UNIT = r"(metric tons?|tonnes?|mt|tons?|lbs?|pounds?|kgs?|kilos?|kilograms?|gals?|gallons?|liters?|litres?|l)\b"
+
+PRICE = re.compile(rf"(?:US\$|\$|USD)\s*{NUMBER}(?:\s*USD)?(?:\s*(?:/|per|a|an)\s*{UNIT})?", re.IGNORECASE)
+BARE_PRICE = re.compile(rf"^{NUMBER}(?:\s*(?:USD|dollars))?(?:\s*(?:/|per)\s*{UNIT})?", re.IGNORECASE)
+QUANTITY = re.compile(rf"{NUMBER}\s*(k\b)?\s*(?:{UNIT})?", re.IGNORECASE)
+MOQ_IN_TEXT = re.compile(
+    rf"\b(?:minimum order(?: quantity)?|MOQ)(?: is| of)?\s*:?\s*{NUMBER}\s*(k\b)?\s*(?:{UNIT})?", re.IGNORECASE
+)
+NET_TERMS = re.compile(r"\bnet[ -]?(\d{1,3})\b", re.IGNORECASE)
+ORIGIN_IN_TEXT = re.compile(
+    r"\b(?:product of|made in|grown in|produced in|sourced from|originates (?:from|in))\s+"
+    r"((?:the )?[A-Z][A-Za-z]+(?: [A-Z][A-Za-z]+){0,2})"
+)
+CERTIFICATION_SEPARATOR = re.compile(r"\s*(?:,|;|/|\band\b|&|\+)\s*", re.IGNORECASE)
+NO_VALUE = {"", "none", "n/a", "na", "-", "nil"}
+# Certifications recognized in free text, with the spelling to store
+KNOWN_CERTIFICATIONS = {
+    "organic": "Organic", "usda organic": "USDA Organic", "kosher": "Kosher", "halal": "Halal",
+    "non-gmo": "Non-GMO", "non gmo": "Non-GMO", "fair trade": "Fair Trade", "gluten-free": "Gluten-Free",
+    "gluten free": "Gluten-Free", "sqf": "SQF", "brc": "BRC", "brcgs": "BRCGS", "fssc 22000": "FSSC 22000",
+    "iso 22000": "ISO 22000", "iso 9001": "ISO 9001", "gfsi": "GFSI", "haccp": "HACCP",
+    "rainforest alliance": "Rainforest Alliance",
+}
+KNOWN_CERTIFICATION = re.compile(
+    r"\b(" + "|".join(sorted((re.escape(name) for name in KNOWN_CERTIFICATIONS), key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+SIGN_OFF = re.compile(
+    r"^[ \t]*(?:best|kind|warm)?[ \t]*(?:regards|wishes)|^[ \t]*(?:thanks|thank you|sincerely|cheers|respectfully)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+PERSON_NAME = re.compile(r"^[A-Z][a-zA-Z'.-]+(?: [A-Z][a-zA-Z'.-]+){1,3}$")
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%A, %B %d, %Y")
+
+@dataclass
+class RuleExtraction:
+    """
+    Fields read from an email by rules, each with a confidence from 0 to 1.
+    """
+    values: dict = field(default_factory=dict)
+    confidence: dict = field(default_factory=dict)
+
+    def set(self, name, value, confidence):
+        if value is None or confidence <= self.confidence.get(name, 0.0):
+            return
+        self.values[name] = value
+        self.confidence[name] = confidence
+
+    def confident_fields(self, threshold=None):
+        """
+        Returns:
+            list: Fields filled with at least the given confidence, which
+            defaults to RULE_EXTRACTION_MIN_CONFIDENCE.
+        """
+        threshold = settings.RULE_EXTRACTION_MIN_CONFIDENCE if threshold is None else threshold
+        return [name for name in EXTRACTION_FIELDS if self.confidence.get(name, 0.0) >= threshold]
+
+    def missing_fields(self, threshold=None):
+        """
+        Returns:
+            list: Fields the LLM is still needed for.
+        """
+        confident = set(self.confident_fields(threshold))
+        return [name for name in EXTRACTION_FIELDS if name not in confident and name not in DEFAULTED_FIELDS]
+
+    def is_complete(self, threshold=None):
+        return not self.missing_fields(threshold)
+
+    def as_extraction(self):
+        """
+        Validate a complete rule extraction against EmailData.
+
+        Fields in DEFAULTED_FIELDS the email did not give are defaulted.
+
+        Returns:
+            dict: The extracted data with its field_confidence record.
+        """
+        confident = set(self.confident_fields())
+        values, record = {}, {}
+        for name in EXTRACTION_FIELDS:
+            if name in confident:
+                values[name] = self.values[name]
+                record[name] = {"source": "rules", "confidence": self.confidence[name]}
+            else:
+                values[name] = DEFAULTED_FIELDS[name]()
+                record[name] = {"source": "default", "confidence": None}
+        data = EmailData(**values).dict()
+        data["field_confidence"] = record
+        return data
+
+    def merge(self, extracted_data_dict, threshold=None):
+        """
+        Fill the fields the rules could not confidently read from an LLM extraction.
+
+        Args:
+            extracted_data_dict (dict): The LLM's extraction of the same email.
+            threshold (float): Confidence a rule value needs to be kept.
+
+        Returns:
+            dict: The combined data with its field_confidence record.
+        """
+        confident = set(self.confident_fields(threshold))
+        data = {name: extracted_data_dict[name] for name in EXTRACTION_FIELDS}
+        record = {}
+        for name in EXTRACTION_FIELDS:
+            if name in confident:
+                data[name] = self.values[name]
+                record[name] = {"source": "rules", "confidence": self.confidence[name]}
+            else:
+                record[name] = {"source": "llm", "confidence": None}
+        data = EmailData(**data).dict()
+        data["field_confidence"] = record
+        return data
+
+def _label_field(label):
+    return LABEL_FIELDS.get(" ".join(LABEL_PUNCTUATION.sub(" ", label.lower()).split()))
+
+def _unit_in(text):
+    match = re.search(UNIT, text, re.IGNORECASE)
+    return match.group(1).lower() if match else None
+
+def _number(text):
+    return float(text.replace(",", ""))
+
+def parse_price(text, default_unit=None):
+    """
+    Read a price and convert it to a per pound or per gallon price.
+
+    Args:
+        text (str): Text such as "$2.64/kg" or "1.20 USD per lb".
+        default_unit (str): Unit to assume when the text has none, e.g.
+            from a "Price per kg" label.
+
+    Returns:
+        float: The normalized price, or None if no price was found.
+    """
+    match = PRICE.search(text) or BARE_PRICE.match(text.strip())
+    if not match:
+        return None
+    unit = (match.group(2) or default_unit or "lb").lower()
+    # A price per kg is the price of 2.2 lb, so it divides by the pounds per unit
+    return round(_number(match.group(1)) / UNITS.get(unit, 1.0), 4)
+
+def parse_quantity(text, default_unit=None):
+    """
+    Read a quantity and convert it to pounds or gallons.
+
+    Args:
+        text (str): Text such as "10,000 lbs", "5 MT" or "20k lb".
+
+    Returns:
+        int: The normalized quantity, or None if no number was found.
+    """
+    matches = list(QUANTITY.finditer(text))
+    if not matches:
+        return None
+    # "1 pallet (2,000 lbs)" is a quantity in pounds, not 1
+    match = next((match for match in matches if match.group(3)), matches[0])
+    quantity = _number(match.group(1)) * (1000 if match.group(2) else 1)
+    unit = (match.group(3) or default_unit or "lb").lower()
+    return int(round(quantity * UNITS.get(unit, 1.0)))
+
+def parse_date(text):
+    """
+    Read a date in one of the common email formats.
+
+    Returns:
+        str: The date as YYYY-MM-DD, or None.
+    """
+    text = text.strip().rstrip(".")
+    try:
+        return parsedate_to_datetime(text).date().isoformat()
+    except (TypeError, ValueError, IndexError):
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def parse_certifications(text):
+    """
+    Split a certification list such as "Organic, Kosher and Halal".
+
+    Returns:
+        list: The certification names, empty for "None" or "N/A".
+    """
+    if text.strip().lower().rstrip(".") in NO_VALUE:
+        return []
+    return [part.strip(" .") for part in CERTIFICATION_SEPARATOR.split(text) if part.strip(" .").lower() not in NO_VALUE]
+
+def _parse_labeled(name, label, text):
+    if name == "price_per":
+        return parse_price(text, _unit_in(label))
+    if name == "minimum_order_quantity":
+        return parse_quantity(text, _unit_in(label))
+    if name == "date_submitted":
+        return parse_date(text)
+    if name == "certifications":
+        return parse_certifications(text)
+    if name == "main_contact_email":
+        match = EMAIL_ADDRESS.search(text)
+        return match.group(0) if match else None
+    return text.strip() or None
+
+def _read_labeled_lines(email_text, extraction):
+    found = {}
+    for label, text in LABELED_LINE.findall(email_text):
+        if label.lower() == "from":
+            display_name, address = parseaddr(text)
+            if address and EMAIL_ADDRESS.fullmatch(address):
+                extraction.set("main_contact_email", address, SENDER)
+            if display_name and PERSON_NAME.match(display_name):
+                extraction.set("main_contact_name", display_name, SENDER)
+            continue
+        name = _label_field(label)
+        if name is None:
+            continue
+        value = _parse_labeled(name, label, text)
+        if value is not None:
+            found.setdefault(name, []).append(value)
+    for name, values in found.items():
+        extraction.set(name, *_single(values, LABELED))
+
+def _single(values, confidence):
+    distinct = list({repr(value): value for value in values}.values())
+    if not distinct:
+        return None, 0.0
+    return distinct[0], confidence if len(distinct) == 1 else AMBIGUOUS
+
+def _read_signature(email_text, extraction):
+    match = None
+    for match in SIGN_OFF.finditer(email_text):
+        pass
+    if match is None:
+        return
+    lines = [line.strip() for line in email_text[match.end():].splitlines()[1:] if line.strip()][:5]
+    if not lines or not PERSON_NAME.match(lines[0]):
+        return
+    extraction.set("main_contact_name", lines[0], UNLABELED)
+    for line in lines[1:]:
+        words = LABEL_PUNCTUATION.sub(" ", line.lower()).split()
+        if ":" not in line and words and words[-1] in LEGAL_SUFFIXES:
+            extraction.set("supplier_company_name", line, UNAMBIGUOUS_PATTERN)
+            return
+
+def _read_free_text(email_text, extraction):
+    prices = [parse_price(match.group(0)) for match in PRICE.finditer(email_text) if match.group(2)]
+    extraction.set("price_per", *_single(prices, UNAMBIGUOUS_PATTERN))
+
+    quantities = [parse_quantity(match.group(0)[match.start(1) - match.start():]) for match in MOQ_IN_TEXT.finditer(email_text)]
+    extraction.set("minimum_order_quantity", *_single(quantities, UNAMBIGUOUS_PATTERN))
+
+    terms = [f"Net {days}" for days in NET_TERMS.findall(email_text)]
+    extraction.set("payment_terms", *_single(terms, UNAMBIGUOUS_PATTERN))
+
+    origins = [country.removeprefix("the ") for country in ORIGIN_IN_TEXT.findall(email_text)]
+    extraction.set("country_of_origin", *_single(origins, UNLABELED))
+
+    extraction.set("main_contact_email", *_single(EMAIL_ADDRESS.findall(email_text), UNLABELED))
+    phones = [
+        phone.strip() for phone in PHONE_NUMBER.findall(email_text)
+        if sum(char.isdigit() for char in phone) >= MIN_PHONE_DIGITS and not ISO_DATE.search(phone)
+    ]
+    extraction.set("main_contact_phone", *_single(phones, UNLABELED))
+
+    certifications = list(dict.fromkeys(
+        KNOWN_CERTIFICATIONS[name.lower()] for name in KNOWN_CERTIFICATION.findall(email_text)
+    ))
+    extraction.set("certifications", certifications, UNLABELED if certifications else NO_CERTIFICATIONS)
+
+def extract_with_rules(email_text):
+    """
+    Read quote fields from an email with regexes and known field labels.
+
+    Labeled lines ("Price: $1.20/lb", "MOQ: 10,000 lbs") are trusted most,
+    then patterns that cannot mean anything else ("Net 30"), then values
+    picked out of free text and the signature. Prices and quantities are
+    converted to the per pound or per gallon basis used by Quote. Fields
+    found with different values in the same email get a low confidence, so
+    the LLM decides them.
+
+    Args:
+        email_text (str): The raw email content.
+
+    Returns:
+        RuleExtraction: The fields found and their confidence.
+    """
+    extraction = RuleExtraction()
+    email_text = email_text or ""
+    _read_labeled_lines(email_text, extraction)
+    _read_signature(email_text, extraction)
+    _read_free_text(email_text, extraction)
+    return extraction
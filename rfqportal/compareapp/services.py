@@ -1,7 +1,38 @@
 # Import necessary modules and models
-from .models import Supplier, RFQ, Quote, Email
-from .llm_services import extract_email_data
+from .models import Supplier, RFQ, Quote, Email, ExtractionJob, ExtractionBatch, ExtractionModelCall
+from .llm_services import DEFAULT_MODEL, is_missing
+from .llm_routing import (
+    aextract_with_routing, astream_with_routing, extract_with_routing, passed_validation, stream_with_routing,
+    validate_extraction,
+)
+from .llm_resilience import LLMUnavailableError
+from .llm_batch import TERMINAL_BATCH_STATUSES, build_batch_request, download_batch_file, parse_batch_result, retrieve_batch, submit_batch
+from .extraction_cache import cache_key, get_cached_extractions, store_extractions
+from .pagination import keyset_paginate
+from .benchmarking import percentile
+from .company_names import normalize_company_name
+from .supplier_resolution import resolve_supplier, resolve_suppliers
+from .quote_scoring import update_quote_scores
+from .completeness import CHECKED_FIELDS, SUPPLIER_CHECKED_FIELDS, masks_with, missing_field_names, missing_mask
+from .certifications import compliant_quotes, sync_quote_certifications
+from .page_cache import SUPPLIERS_SCOPE, bump_versions
+from .rule_extraction import extract_with_rules
+from .preprocessing import PreprocessedEmail, count_tokens, preprocess_email
+from .usage import ExtractionUsage
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+from django.db.models import Avg, Count, F, Q, Sum, Value
+from django.db.models.functions import Lower, TruncDate
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
 import json
+import logging
+import time
 
 # Define service functions for supplier operations
 def create_supplier(data):
@@ -43,7 +74,60 @@ def delete_supplier(pk):
     supplier = Supplier.objects.get(pk=pk)
     supplier.delete()
 
+# Suppliers are listed alphabetically; the (company_name, id) index serves the keyset seek
+SUPPLIER_LIST_ORDERING = ("company_name", "id")
+
+def list_suppliers(company_name=None, cursor=None, page_size=25):
+    """
+    Retrieve one page of suppliers.
+
+    Args:
+        company_name (str): Only suppliers whose name starts with this text.
+        cursor (str): Cursor returned with the previous page.
+        page_size (int): Number of suppliers per page.
+
+    Returns:
+        KeysetPage: The suppliers and the cursor for the next page.
+    """
+    suppliers = Supplier.objects.all()
+    if company_name:
+        suppliers = suppliers.filter(company_name__istartswith=company_name)
+    return keyset_paginate(suppliers, SUPPLIER_LIST_ORDERING, cursor, page_size)
+
 # Define service functions for RFQ operations
+# Newest RFQs first; due-date filters are served by the due_date index
+RFQ_LIST_ORDERING = ("-id",)
+
+def list_rfqs(status="active", item=None, due_after=None, due_before=None, cursor=None, page_size=25):
+    """
+    Retrieve one page of RFQs.
+
+    Args:
+        status (str): "active" (due today or later, or no due date),
+            "expired" (due date in the past) or "all".
+        item (str): Only RFQs whose item contains this text.
+        due_after (date): Only RFQs due on or after this date.
+        due_before (date): Only RFQs due on or before this date.
+        cursor (str): Cursor returned with the previous page.
+        page_size (int): Number of RFQs per page.
+
+    Returns:
+        KeysetPage: The RFQs and the cursor for the next page.
+    """
+    today = timezone.localdate()
+    rfqs = RFQ.objects.all()
+    if status == "active":
+        rfqs = rfqs.filter(Q(due_date__gte=today) | Q(due_date__isnull=True))
+    elif status == "expired":
+        rfqs = rfqs.filter(due_date__lt=today)
+    if item:
+        rfqs = rfqs.filter(item__icontains=item)
+    if due_after:
+        rfqs = rfqs.filter(due_date__gte=due_after)
+    if due_before:
+        rfqs = rfqs.filter(due_date__lte=due_before)
+    return keyset_paginate(rfqs, RFQ_LIST_ORDERING, cursor, page_size)
+
 def create_rfq(data):
     """
     Create a new RFQ.
@@ -97,6 +181,191 @@ def get_quotes_for_rfq(rfq_id):
     quotes = Quote.objects.filter(rfq_id=rfq_id).values()
     return list(quotes)
 
+# Columns shown on the quote comparison page (rfq_quotes.html)
+COMPARISON_QUOTE_FIELDS = (
+    "id", "supplier_id", "date_submitted", "price_per", "country_of_origin", "certifications", "minimum_order_quantity",
+)
+COMPARISON_SUPPLIER_FIELDS = ("company_name", "main_contact_name", "hq_address", "payment_terms")
+
+def _quote_comparison_queryset(rfq_id):
+    return Quote.objects.filter(rfq_id=rfq_id).order_by("id").values(
+        *COMPARISON_QUOTE_FIELDS, *(f"supplier__{field}" for field in COMPARISON_SUPPLIER_FIELDS)
+    )
+
+def _comparison_row(row):
+    quote = {field: row[field] for field in COMPARISON_QUOTE_FIELDS}
+    quote["supplier"] = {field: row[f"supplier__{field}"] for field in COMPARISON_SUPPLIER_FIELDS}
+    return quote
+
+def get_quote_comparison(rfq_id):
+    """
+    Retrieve the quotes for an RFQ with their suppliers for side-by-side comparison.
+
+    Quotes and suppliers are fetched in a single joined query, limited to the
+    columns the comparison table shows, so the cost does not grow with the
+    number of suppliers.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+
+    Returns:
+        list: Quote dicts, each with a nested "supplier" dict.
+    """
+    return [_comparison_row(row) for row in _quote_comparison_queryset(rfq_id)]
+
+async def aget_quote_comparison(rfq_id):
+    """
+    Async variant of get_quote_comparison.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+
+    Returns:
+        list: Quote dicts, each with a nested "supplier" dict.
+    """
+    return [_comparison_row(row) async for row in _quote_comparison_queryset(rfq_id)]
+
+# Precomputed scores shown on the comparison page (see compareapp.quote_scoring)
+MATRIX_SCORE_FIELDS = (
+    "rank", "score", "price_score", "moq_fit", "certification_coverage", "missing_certifications", "landed_cost",
+)
+
+def _quote_matrix_queryset(rfq_id, compliant_only=False):
+    quotes = _quote_comparison_queryset(rfq_id)
+    if compliant_only:
+        quotes = compliant_quotes(rfq_id, quotes)
+    return quotes.values(
+        *COMPARISON_QUOTE_FIELDS, *(f"supplier__{field}" for field in COMPARISON_SUPPLIER_FIELDS),
+        *(f"score__{field}" for field in MATRIX_SCORE_FIELDS),
+    ).order_by(F("score__rank").asc(nulls_last=True), "id")
+
+def _matrix_rows(rows):
+    """
+    Build matrix rows, or return None if a quote has not been scored yet.
+    """
+    if any(row["score__rank"] is None for row in rows):
+        return None
+    matrix = []
+    for row in rows:
+        quote = _comparison_row(row)
+        quote["score"] = {field: row[f"score__{field}"] for field in MATRIX_SCORE_FIELDS}
+        matrix.append(quote)
+    return matrix
+
+def get_quote_matrix(rfq_id, compliant_only=False):
+    """
+    Retrieve an RFQ's quotes ranked best first, with their precomputed
+    price, MOQ fit and certification scores.
+
+    The scores are read from the QuoteScore table in the same joined query
+    as the quotes. Quotes saved without being scored (e.g. before the table
+    existed) have the RFQ scored again first.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+        compliant_only (bool): Leave out quotes missing any certification
+            the RFQ requires.
+
+    Returns:
+        list: Quote dicts as from get_quote_comparison, each with a nested
+            "score" dict, in rank order.
+    """
+    matrix = _matrix_rows(list(_quote_matrix_queryset(rfq_id, compliant_only)))
+    if matrix is None:
+        update_quote_scores(rfq_id)
+        matrix = _matrix_rows(list(_quote_matrix_queryset(rfq_id, compliant_only)))
+    return matrix
+
+async def aget_quote_matrix(rfq_id, compliant_only=False):
+    """
+    Async variant of get_quote_matrix.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+        compliant_only (bool): Leave out quotes missing a required certification.
+
+    Returns:
+        list: Quote dicts with a nested "score" dict, in rank order.
+    """
+    matrix = _matrix_rows([row async for row in _quote_matrix_queryset(rfq_id, compliant_only)])
+    if matrix is None:
+        await sync_to_async(update_quote_scores)(rfq_id)
+        matrix = _matrix_rows([row async for row in _quote_matrix_queryset(rfq_id, compliant_only)])
+    return matrix
+
+@dataclass
+class _EmailExtraction:
+    """
+    One email on its way through process_email_text or one of its variants.
+
+    Attributes:
+        email_text (str): The email content.
+        rules (RuleExtraction): The rule-based extraction, or None when disabled.
+        known (dict): The fields the rules are confident of, when they could
+            not read the whole email.
+        prompt_text (str): The preprocessed email the LLM is sent.
+        data (dict): The extracted data; None while the LLM still has to be called.
+        usage (ExtractionUsage): What the extraction cost.
+    """
+    email_text: str
+    rules: object = None
+    known: dict = None
+    prompt_text: str = None
+    data: dict = None
+    usage: ExtractionUsage = None
+
+def _begin_extraction(email_text):
+    """
+    The steps before the LLM call: the rule-based extractor, then the extraction cache.
+
+    Args:
+        email_text (str): The email content.
+
+    Returns:
+        _EmailExtraction: With data set if the rules or the cache had it.
+    """
+    rules = _rule_extractions([email_text])[0]
+    data = _complete_rule_extraction(rules)
+    if data is not None:
+        return _EmailExtraction(email_text, rules, {}, data=data, usage=ExtractionUsage(source=Email.SOURCE_RULES))
+
+    prompt_text = _prompt_text(email_text)
+    return _EmailExtraction(
+        email_text, rules, _known_fields(rules), prompt_text,
+        data=_with_rules(rules, get_cached_extractions([prompt_text])[0]),
+        usage=ExtractionUsage(source=Email.SOURCE_CACHE),
+    )
+
+def _finish_extraction(extraction, rfq, outcome=None, started=None):
+    """
+    The steps after the LLM call: record the model calls, cache the output,
+    keep the confident rule values and save the rows.
+
+    Args:
+        extraction (_EmailExtraction): From _begin_extraction; its data is
+            set to what was saved.
+        rfq (RFQ): The RFQ object related to the email.
+        outcome (ExtractionOutcome): The routed LLM call, if one was made.
+        started (float): time.monotonic() when the call started.
+
+    Returns:
+        dict: Status and message of the processing result.
+    """
+    if outcome is not None:
+        _record_model_calls(outcome.calls)
+        if outcome.data is None:
+            return _extraction_failure()
+        data = outcome.data.dict()
+        extraction.usage = outcome.usage
+        extraction.usage.latency_ms = int((time.monotonic() - started) * 1000)
+        if outcome.validated:
+            store_extractions([(extraction.prompt_text, data, extraction.usage.latency_ms)])
+        extraction.data = _with_rules(extraction.rules, data)
+
+    quote = _save_extraction(extraction.email_text, rfq, extraction.data, extraction.usage)
+    return {"status": "success", "message": "Quote, Supplier, RFQ, and Email created successfully", "quote_id": quote.id}
+
+# The variants below differ only in how they call the model
 def process_email_text(email_text, rfq):
     """
     Process email text and extract data.
@@ -108,43 +377,574 @@ def process_email_text(email_text, rfq):
     Returns:
         dict: Status and message of the processing result.
     """
-    extracted_data = extract_email_data(email_text)
+    extraction = _begin_extraction(email_text)
+    outcome = started = None
+    if extraction.data is None:
+        started = time.monotonic()
+        try:
+            outcome = extract_with_routing(extraction.prompt_text, extraction.known)
+        except LLMUnavailableError as exc:
+            return _extraction_failure(exc)
+    return _finish_extraction(extraction, rfq, outcome, started)
+
+async def aprocess_email_text(email_text, rfq):
+    """
+    Async variant of process_email_text for the ASGI views.
+
+    The LLM call is awaited on the async OpenAI client, and the steps
+    around it run in a thread, so the event loop is never blocked on I/O.
+
+    Args:
+        email_text (str): The email content.
+        rfq (RFQ): The RFQ object related to the email.
+
+    Returns:
+        dict: Status and message of the processing result.
+    """
+    extraction = await sync_to_async(_begin_extraction)(email_text)
+    outcome = started = None
+    if extraction.data is None:
+        started = time.monotonic()
+        try:
+            outcome = await aextract_with_routing(extraction.prompt_text, extraction.known)
+        except LLMUnavailableError as exc:
+            return _extraction_failure(exc)
+    return await sync_to_async(_finish_extraction)(extraction, rfq, outcome, started)
+
+def _extraction_failure(error=None):
+    """
+    Build the result of a failed extraction.
+
+    Args:
+        error (LLMUnavailableError): The error if the LLM could not be
+            reached; the result is then marked retryable.
+
+    Returns:
+        dict: Status and message, plus retryable and retry_after (seconds)
+            when trying again later may succeed.
+    """
+    if isinstance(error, LLMUnavailableError):
+        return {
+            "status": "fail",
+            "message": "The extraction service is temporarily unavailable. Please try again shortly.",
+            "retryable": True,
+            "retry_after": error.retry_after,
+        }
+    return {"status": "fail", "message": "Failed to extract data from email."}
+
+def _displayed_fields(extracted_data_dict):
+    return {name: value for name, value in extracted_data_dict.items() if name != "field_confidence"}
+
+def _finished_events(extraction, result):
+    """
+    The last events of a streamed extraction: the saved values, then the result.
+    """
+    events = [("fields", _displayed_fields(extraction.data))] if result["status"] == "success" else []
+    return [*events, ("done", result)]
 
-    if extracted_data is None:
-        return {"status": "fail", "message": "Failed to extract data from email."}
+def stream_process_email_text(email_text, rfq):
+    """
+    Streaming variant of process_email_text.
+
+    Yields ("fields", dict) as supplier and quote fields are extracted, then
+    ("done", dict) with the same result process_email_text returns. Fields
+    the rule-based extractor is confident of are sent before the LLM call
+    starts. Rows are only written once the complete extraction has passed
+    EmailData validation; the last "fields" event carries the saved values.
+
+    Args:
+        email_text (str): The email content.
+        rfq (RFQ): The RFQ object related to the email.
+    """
+    extraction = _begin_extraction(email_text)
+    known = extraction.known
+    if known:
+        yield "fields", known
+    outcome = started = None
+    if extraction.data is None:
+        started = time.monotonic()
+        try:
+            for event, value in stream_with_routing(extraction.prompt_text, known):
+                if event == "fields":
+                    yield event, {**value, **known}
+                else:
+                    outcome = value
+        except LLMUnavailableError as exc:
+            yield "done", _extraction_failure(exc)
+            return
+    yield from _finished_events(extraction, _finish_extraction(extraction, rfq, outcome, started))
+
+async def astream_process_email_text(email_text, rfq):
+    """
+    Async variant of stream_process_email_text for the ASGI views.
+
+    Args:
+        email_text (str): The email content.
+        rfq (RFQ): The RFQ object related to the email.
+    """
+    extraction = await sync_to_async(_begin_extraction)(email_text)
+    known = extraction.known
+    if known:
+        yield "fields", known
+    outcome = started = None
+    if extraction.data is None:
+        started = time.monotonic()
+        try:
+            async for event, value in astream_with_routing(extraction.prompt_text, known):
+                if event == "fields":
+                    yield event, {**value, **known}
+                else:
+                    outcome = value
+        except LLMUnavailableError as exc:
+            yield "done", _extraction_failure(exc)
+            return
+    for event in _finished_events(extraction, await sync_to_async(_finish_extraction)(extraction, rfq, outcome, started)):
+        yield event
+
+def _save_extraction(email_text, rfq, extracted_data_dict, usage=None):
+    """
+    Write the supplier, quote and email for one extraction.
+
+    The rows are written in one transaction: one commit instead of three,
+    and a failure part way leaves no quote without its email.
+
+    Args:
+        usage (ExtractionUsage): What the extraction cost, stored on the email.
+
+    Returns:
+        Quote: The new quote.
+    """
+    extracted_data_dict = _clean_extraction(extracted_data_dict)
+    with transaction.atomic():
+        supplier = _get_or_create_supplier(extracted_data_dict)
+
+        quote = Quote.objects.create(rfq=rfq, supplier=supplier, **_quote_fields(extracted_data_dict))
+
+        Email.objects.create(
+            related_quote=quote,
+            extracted_data=json.dumps(extracted_data_dict),  # Store as JSON string
+            content=email_text,
+            **_email_token_fields(email_text),
+            **_email_usage_fields(usage)
+        )
+    return quote
+
+def _supplier_defaults(extracted_data_dict):
+    """
+    Map extracted email data onto Supplier fields.
+    """
+    return {
+        "main_contact_name": extracted_data_dict["main_contact_name"],
+        "main_contact_email": extracted_data_dict["main_contact_email"],
+        "main_contact_phone": extracted_data_dict["main_contact_phone"],
+        "hq_address": extracted_data_dict["hq_address"],
+        "payment_terms": extracted_data_dict["payment_terms"]
+    }
+
+def _supplier_lookup(extracted_data_dict):
+    """
+    get_or_create arguments matching a supplier by case-insensitive name.
+
+    The lookup uses the same LOWER(company_name) expression as the unique
+    constraint, so it is served by that index, and a concurrent insert of the
+    same supplier makes get_or_create fall back to fetching the winner's row.
+    """
+    name = extracted_data_dict["supplier_company_name"]
+    return {
+        "company_name__lower": Lower(Value(name)),
+        "defaults": {"company_name": name, **_supplier_defaults(extracted_data_dict)},
+    }
+
+def _get_or_create_supplier(extracted_data_dict):
+    """
+    Find the existing supplier an extraction refers to, or create it.
+
+    "ACME, Inc." and "Acme Incorporated" resolve to the same supplier; see
+    compareapp.supplier_resolution.
+    """
+    match = resolve_supplier(extracted_data_dict["supplier_company_name"], extracted_data_dict.get("main_contact_email"))
+    if match is not None:
+        return match.supplier
+    supplier, _ = Supplier.objects.get_or_create(**_supplier_lookup(extracted_data_dict))
+    return supplier
+
+def _supplier_key(company_name):
+    return normalize_company_name(company_name) or company_name.lower()
+
+def _get_or_create_suppliers(extracted_data_dicts):
+    """
+    Resolve the suppliers named in several extractions with bulk queries.
+
+    Args:
+        extracted_data_dicts (list): Extracted data dicts.
+
+    Returns:
+        dict: Supplier for each company name, keyed by _supplier_key.
+    """
+    first_seen = {}
+    for data in extracted_data_dicts:
+        first_seen.setdefault(_supplier_key(data["supplier_company_name"]), data)
+
+    matches = resolve_suppliers([
+        (data["supplier_company_name"], data.get("main_contact_email")) for data in first_seen.values()
+    ])
+    suppliers = {key: matches[key].supplier for key in first_seen if key in matches}
+    missing = {key: data for key, data in first_seen.items() if key not in suppliers}
+    if missing:
+        # bulk_create skips save(), so normalized_name and missing_fields are filled in here.
+        # Rows another worker inserted in the meantime are skipped here and picked up below
+        new_suppliers = [
+            Supplier(
+                company_name=data["supplier_company_name"],
+                normalized_name=normalize_company_name(data["supplier_company_name"]),
+                **_supplier_defaults(data)
+            )
+            for data in missing.values()
+        ]
+        for supplier in new_suppliers:
+            supplier.missing_fields = missing_mask(supplier, SUPPLIER_CHECKED_FIELDS)
+        Supplier.objects.bulk_create(new_suppliers, ignore_conflicts=True)
+        bump_versions([SUPPLIERS_SCOPE])
+        for supplier in Supplier.objects.filter(company_name__in=[data["supplier_company_name"] for data in missing.values()]):
+            suppliers.setdefault(_supplier_key(supplier.company_name), supplier)
+        for key, data in missing.items():
+            if key not in suppliers:
+                suppliers[key], _ = Supplier.objects.get_or_create(**_supplier_lookup(data))
+    return suppliers
+
+# Quote fields an extracted value can fail to convert to
+CLEANED_QUOTE_FIELDS = ("date_submitted", "price_per", "minimum_order_quantity")
+
+# What saving an extraction's rows can raise on a value that still does not fit
+SAVE_ERRORS = (DatabaseError, ValidationError, ValueError, TypeError, InvalidOperation)
+
+def _clean_extraction(extracted_data_dict):
+    """
+    Make an extraction's quote values fit their columns.
+
+    The last model tier's output is kept even if it failed validation, and
+    cached and rule extractions skip it, so a date can be blank or in
+    another format and a number can be text. A blank date becomes today,
+    as the prompt asks; any other value the column would reject is dropped,
+    and so reported as a missing field, rather than failing the save.
+
+    Returns:
+        dict: A cleaned copy of the extraction.
+    """
+    cleaned = dict(extracted_data_dict)
+    if is_missing(cleaned.get("date_submitted")):
+        cleaned["date_submitted"] = timezone.localdate().isoformat()
+    for name in CLEANED_QUOTE_FIELDS:
+        value = cleaned.get(name)
+        if value is None:
+            continue
+        field = Quote._meta.get_field(name)
+        try:
+            python_value = field.to_python(value)
+            if field.get_internal_type() == "DecimalField":
+                python_value = round(python_value, field.decimal_places)  # As the column stores it
+            field.run_validators(python_value)
+        except ValidationError:
+            logging.warning(f"Dropping the extracted {name} {value!r}: not a valid value.")
+            cleaned[name] = None
+    certifications = cleaned.get("certifications")
+    if not isinstance(certifications, list):
+        cleaned["certifications"] = [certifications] if isinstance(certifications, str) and certifications else []
+    return cleaned
+
+def _quote_fields(extracted_data_dict):
+    """
+    Map extracted email data onto Quote fields.
+    """
+    return {
+        "date_submitted": extracted_data_dict["date_submitted"],
+        "price_per": extracted_data_dict["price_per"],
+        "country_of_origin": extracted_data_dict["country_of_origin"],
+        "certifications": ",".join(extracted_data_dict["certifications"]),
+        "minimum_order_quantity": extracted_data_dict["minimum_order_quantity"]
+    }
+
+def _timed_extract(email_text, known=None):
+    """
+    Run extract_with_routing, treating any exception as a failed extraction.
 
+    Returns:
+        tuple: Extracted data as a dict (None if extraction failed, or the
+            LLMUnavailableError if the LLM could not be reached), the
+            latency in ms, the TierCall list of the models tried and the
+            ExtractionUsage of the calls.
+    """
+    started = time.monotonic()
+    try:
+        outcome = extract_with_routing(email_text, known)
+    except LLMUnavailableError as exc:
+        logging.warning(f"Extraction failed: {exc}")
+        return exc, int((time.monotonic() - started) * 1000), [], ExtractionUsage()
+    except Exception as exc:
+        logging.warning(f"Extraction failed: {exc}")
+        return None, int((time.monotonic() - started) * 1000), [], ExtractionUsage()
+    outcome.usage.latency_ms = latency_ms = int((time.monotonic() - started) * 1000)
     # Convert Pydantic model to dictionary
-    extracted_data_dict = extracted_data.dict()
-
-    # Parse extracted data and create or retrieve related objects
-    supplier, _ = Supplier.objects.get_or_create(
-        company_name=extracted_data_dict["supplier_company_name"],
-        defaults={
-            "main_contact_name": extracted_data_dict["main_contact_name"],
-            "main_contact_email": extracted_data_dict["main_contact_email"],
-            "main_contact_phone": extracted_data_dict["main_contact_phone"],
-            "hq_address": extracted_data_dict["hq_address"],
-            "payment_terms": extracted_data_dict["payment_terms"]
+    return (outcome.data.dict() if outcome.data is not None else None), latency_ms, outcome.calls, outcome.usage
+
+def _record_model_calls(calls):
+    """
+    Store the model routing calls of extractions, for get_model_routing_stats.
+    """
+    ExtractionModelCall.objects.bulk_create([
+        ExtractionModelCall(
+            model=call.model, tier=call.tier, latency_ms=call.latency_ms, accepted=call.accepted, problems=call.problems
+        )
+        for call in calls
+    ])
+
+def _email_usage_fields(usage):
+    """
+    Email fields recording what the extraction cost; left empty when unknown.
+    """
+    return usage.email_fields() if usage is not None else {}
+
+def _preprocess(email_text):
+    """
+    Reduce an email for the extraction prompt when EMAIL_PREPROCESSING_ENABLED is set.
+
+    Returns:
+        PreprocessedEmail: The text to send and its token counts.
+    """
+    if not settings.EMAIL_PREPROCESSING_ENABLED:
+        tokens = count_tokens(email_text)
+        return PreprocessedEmail(text=email_text, original_tokens=tokens, tokens=tokens)
+    return preprocess_email(email_text, settings.EMAIL_TOKEN_BUDGET or None)
+
+def _prompt_text(email_text):
+    return _preprocess(email_text).text
+
+def _email_token_fields(email_text):
+    """
+    Email fields recording how much preprocessing shrank the prompt.
+    """
+    preprocessed = _preprocess(email_text)
+    return {
+        "original_tokens": preprocessed.original_tokens,
+        "reduced_tokens": preprocessed.tokens,
+        "truncated": preprocessed.truncated,
+    }
+
+def _rule_extractions(email_texts):
+    """
+    Run the rule-based extractor over emails when RULE_EXTRACTION_ENABLED is set.
+
+    Returns:
+        list: RuleExtraction for each email, or None for each when disabled.
+    """
+    if not settings.RULE_EXTRACTION_ENABLED:
+        return [None] * len(email_texts)
+    # Preprocessing removes quoted replies and disclaimers the rules could misread
+    return [extract_with_rules(_prompt_text(email_text)) for email_text in email_texts]
+
+def _complete_rule_extraction(rules):
+    """
+    Returns:
+        dict: The rule extraction if every field was read confidently, else None.
+    """
+    if rules is None or not rules.is_complete():
+        return None
+    return rules.as_extraction()
+
+def _known_fields(rules):
+    """
+    Returns:
+        dict: The fields the rule-based extractor is confident of.
+    """
+    if rules is None:
+        return {}
+    return {name: rules.values[name] for name in rules.confident_fields()}
+
+def _with_rules(rules, extracted_data_dict):
+    """
+    Keep the confident rule values over an LLM extraction of the same email.
+    """
+    if rules is None or not isinstance(extracted_data_dict, dict):
+        return extracted_data_dict
+    return rules.merge(extracted_data_dict)
+
+def _extract_email_dicts(email_texts, max_workers=1):
+    """
+    Extract data for several emails, trying the rule-based extractor first.
+
+    Emails the rules read completely never reach the LLM. For the rest the
+    LLM (or the extraction cache) fills the fields the rules were unsure of.
+    Each result carries a field_confidence record of where its fields came from.
+
+    Args:
+        email_texts (list): The email contents.
+        max_workers (int): Maximum number of concurrent extraction calls.
+
+    Returns:
+        tuple: Extracted data dict for each email, or None where extraction
+            failed, or an LLMUnavailableError where the LLM could not be
+            reached; and the ExtractionUsage of each email.
+    """
+    rules = _rule_extractions(email_texts)
+    results = [_complete_rule_extraction(rule_extraction) for rule_extraction in rules]
+    usages = [ExtractionUsage(source=Email.SOURCE_RULES) for _ in email_texts]
+    remaining = [index for index, result in enumerate(results) if result is None]
+    if remaining:
+        llm_results, llm_usages = _llm_extract_email_dicts(
+            [email_texts[index] for index in remaining], max_workers, [_known_fields(rules[index]) for index in remaining]
+        )
+        for index, extracted_data_dict, usage in zip(remaining, llm_results, llm_usages):
+            results[index] = _with_rules(rules[index], extracted_data_dict)
+            usages[index] = usage
+    return results, usages
+
+def _llm_extract_email_dicts(email_texts, max_workers=1, known=None):
+    """
+    Extract data for several emails with the LLM, consulting the extraction cache first.
+
+    Cache lookups and writes happen on the calling thread; only the LLM calls
+    for distinct uncached emails are fanned out across max_workers threads.
+    Both the cache key and the prompt use the preprocessed email. Each email
+    goes to the cheapest model tier whose output passes validation.
+
+    Args:
+        email_texts (list): The email contents.
+        max_workers (int): Maximum number of concurrent extraction calls.
+        known (list): Confident rule-based fields for each email, if any.
+
+    Returns:
+        tuple: Extracted data dict for each email, or None where extraction
+            failed, or an LLMUnavailableError where the LLM could not be
+            reached; and the ExtractionUsage of each email.
+    """
+    email_texts = [_prompt_text(email_text) for email_text in email_texts]
+    results = get_cached_extractions(email_texts)
+    # Cache hits and duplicates cost nothing; the first of each LLM call's emails carries its cost
+    usages = [ExtractionUsage(source=Email.SOURCE_CACHE) for _ in email_texts]
+
+    # Duplicates within the batch only cost one LLM call
+    pending = {}
+    for index, (email_text, cached) in enumerate(zip(email_texts, results)):
+        if cached is None:
+            pending.setdefault(cache_key(email_text), []).append(index)
+    if not pending:
+        return results, usages
+
+    unique_texts = [email_texts[indexes[0]] for indexes in pending.values()]
+    # Rules read the same preprocessed text, so duplicates share their known fields too
+    unique_known = [known[indexes[0]] if known else None for indexes in pending.values()]
+    if len(unique_texts) == 1 or max_workers == 1:
+        outcomes = [_timed_extract(email_text, fields) for email_text, fields in zip(unique_texts, unique_known)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(unique_texts))) as executor:
+            outcomes = list(executor.map(_timed_extract, unique_texts, unique_known))
+
+    fresh = []
+    for indexes, email_text, (data, latency_ms, calls, usage) in zip(pending.values(), unique_texts, outcomes):
+        for index in indexes:
+            results[index] = data
+        usages[indexes[0]] = usage
+        if isinstance(data, dict) and passed_validation(calls):
+            fresh.append((email_text, data, latency_ms))
+    store_extractions(fresh)
+    _record_model_calls([call for _, _, calls, _ in outcomes for call in calls])
+    return results, usages
+
+def process_email_batch(email_texts, rfq, max_workers=None):
+    """
+    Process a batch of emails for an RFQ.
+
+    Extraction calls are fanned out across a bounded thread pool, so wall time
+    grows with len(email_texts) / max_workers rather than with the number of
+    emails. Emails already in the extraction cache skip the LLM call. All
+    resulting rows are then written with bulk_create inside one transaction;
+    if that fails, the emails are saved one by one and only those whose rows
+    cannot be written are reported as failed.
+
+    Args:
+        email_texts (list): The email contents.
+        rfq (RFQ): The RFQ object related to the emails.
+        max_workers (int): Maximum number of concurrent extraction calls
+            (defaults to settings.EXTRACTION_BATCH_CONCURRENCY).
+
+    Returns:
+        list: One result dict per email, in input order, with the same
+            status/message/quote_id keys as process_email_text.
+    """
+    if not email_texts:
+        return []
+
+    extracted, usages = _extract_email_dicts(email_texts, max(1, max_workers or settings.EXTRACTION_BATCH_CONCURRENCY))
+
+    results = [{"index": index, **_extraction_failure(data)} for index, data in enumerate(extracted)]
+    succeeded = [(index, _clean_extraction(data)) for index, data in enumerate(extracted) if isinstance(data, dict)]
+    if not succeeded:
+        return results
+
+    try:
+        quotes = _bulk_save_extractions(email_texts, rfq, succeeded, usages)
+    except SAVE_ERRORS as exc:
+        # The bulk insert is rolled back as a whole; saving one email at a
+        # time fails only the emails whose rows cannot be written
+        logging.warning(f"Saving the batch failed ({exc}); saving its emails one at a time.")
+        quotes = [_try_save_extraction(email_texts[index], rfq, data, usages[index]) for index, data in succeeded]
+
+    for (index, _), quote in zip(succeeded, quotes):
+        if quote is None:
+            results[index] = {"index": index, "status": "fail", "message": "Failed to save the extracted data."}
+            continue
+        results[index] = {
+            "index": index,
+            "status": "success",
+            "message": "Quote, Supplier, RFQ, and Email created successfully",
+            "quote_id": quote.id,
         }
-    )
+    return results
 
-    quote = Quote.objects.create(
-        rfq=rfq,
-        supplier=supplier,
-        date_submitted=extracted_data_dict["date_submitted"],
-        price_per=extracted_data_dict["price_per"],
-        country_of_origin=extracted_data_dict["country_of_origin"],
-        certifications=",".join(extracted_data_dict["certifications"]),
-        minimum_order_quantity=extracted_data_dict["minimum_order_quantity"]
-    )
+def _bulk_save_extractions(email_texts, rfq, succeeded, usages):
+    """
+    Write the suppliers, quotes and emails of a batch with bulk queries, in one transaction.
 
-    Email.objects.create(
-        related_quote=quote,
-        extracted_data=json.dumps(extracted_data_dict),  # Store as JSON string
-        content=email_text
-    )
+    Args:
+        succeeded (list): (index, cleaned extracted data dict) of each email to save.
+        usages (list): ExtractionUsage of every email in the batch.
 
-    return {"status": "success", "message": "Quote, Supplier, RFQ, and Email created successfully", "quote_id": quote.id}
+    Returns:
+        list: The new quotes, in the order of succeeded.
+    """
+    with transaction.atomic():
+        # Resolve every supplier named in the batch with one query, then create the rest in bulk
+        suppliers = _get_or_create_suppliers([data for _, data in succeeded])
+
+        quotes = [
+            Quote(rfq=rfq, supplier=suppliers[_supplier_key(data["supplier_company_name"])], **_quote_fields(data))
+            for _, data in succeeded
+        ]
+        for quote in quotes:
+            quote.missing_fields = quote.compute_missing_fields()  # bulk_create skips save()
+        quotes = Quote.objects.bulk_create(quotes)
+        Email.objects.bulk_create([
+            Email(
+                related_quote=quote, extracted_data=json.dumps(data), content=email_texts[index],
+                **_email_token_fields(email_texts[index]), **_email_usage_fields(usages[index])
+            )
+            for (index, data), quote in zip(succeeded, quotes)
+        ])
+        # bulk_create sends no post_save, so the new quotes are linked and scored
+        # here; scoring bumps the comparison page once the ranks are written
+        sync_quote_certifications(quotes)
+        update_quote_scores(rfq.id, [quote.id for quote in quotes])
+    return quotes
+
+def _try_save_extraction(email_text, rfq, extracted_data_dict, usage):
+    """
+    Run _save_extraction, returning None if the rows cannot be written.
+    """
+    try:
+        return _save_extraction(email_text, rfq, extracted_data_dict, usage)
+    except SAVE_ERRORS as exc:
+        logging.warning(f"Could not save the extracted data: {exc}")
+        return None
 
 def check_missing_fields_and_generate_email(quote_id):
     """
@@ -156,37 +956,653 @@ def check_missing_fields_and_generate_email(quote_id):
     Returns:
         dict: Status and email draft or error message.
     """
-    # Get the quote and related supplier
-    try:
-        quote = Quote.objects.get(id=quote_id)
-        supplier = quote.supplier
-    except Quote.DoesNotExist:
+    # The quote's stored missing_fields mask covers its supplier's fields too
+    row = _missing_fields_queryset().filter(id=quote_id).first()
+    if row is None:
         return {"status": "fail", "message": "Quote not found."}
+    return _missing_fields_result(row["supplier__company_name"], missing_field_names(row["missing_fields"]))
 
-    # Define required fields and check for missing values
-    required_fields = {
-        "main_contact_name": supplier.main_contact_name,
-        "main_contact_email": supplier.main_contact_email,
-        "main_contact_phone": supplier.main_contact_phone,
-        "hq_address": supplier.hq_address,
-        "payment_terms": supplier.payment_terms,
-        "date_submitted": quote.date_submitted,
-        "price_per": quote.price_per,
-        "country_of_origin": quote.country_of_origin,
-        "certifications": quote.certifications,
-        "minimum_order_quantity": quote.minimum_order_quantity,
-    }
+async def acheck_missing_fields_and_generate_email(quote_id):
+    """
+    Async variant of check_missing_fields_and_generate_email.
 
-    missing_fields = {field: value for field, value in required_fields.items() if not value}
+    Args:
+        quote_id (int): ID of the quote to check.
 
+    Returns:
+        dict: Status and email draft or error message.
+    """
+    row = await _missing_fields_queryset().filter(id=quote_id).afirst()
+    if row is None:
+        return {"status": "fail", "message": "Quote not found."}
+    return _missing_fields_result(row["supplier__company_name"], missing_field_names(row["missing_fields"]))
+
+# The line each missing field adds to a draft
+MISSING_FIELD_LINES = {field: f"- {field.replace('_', ' ').capitalize()}\n" for field in CHECKED_FIELDS}
+
+def _missing_fields_result(company_name, missing_fields):
+    """
+    Build the result for a quote missing the given fields, with its draft.
+    """
     if not missing_fields:
         return {"status": "success", "message": "No missing fields."}
 
     # Generate email draft
-    email_body = f"Dear {supplier.company_name},\n\n"
+    email_body = f"Dear {company_name},\n\n"
     email_body += "We noticed that some information is missing from your quote. Could you please provide the following details?\n\n"
-    for field in missing_fields:
-        email_body += f"- {field.replace('_', ' ').capitalize()}\n"
+    email_body += "".join(MISSING_FIELD_LINES[field] for field in missing_fields)
     email_body += "\nThank you for your prompt attention to this matter.\n\nBest regards,\n[Your Company Name]"
 
     return {"status": "missing", "email_body": email_body}
+
+def _missing_fields_queryset(rfq_id=None, open_rfqs=False):
+    quotes = Quote.objects.all()
+    if rfq_id is not None:
+        quotes = quotes.filter(rfq_id=rfq_id)
+    if open_rfqs:
+        today = timezone.localdate()
+        quotes = quotes.filter(Q(rfq__due_date__gte=today) | Q(rfq__due_date__isnull=True))
+    return quotes.values("id", "rfq_id", "supplier_id", "supplier__company_name", "missing_fields").order_by("rfq_id", "id")
+
+def _bulk_missing_fields(rows):
+    """
+    Build the results for quote rows from _missing_fields_queryset.
+    """
+    results = []
+    drafts = {}
+    for row in rows:
+        # Quotes from one supplier missing the same fields share a draft
+        draft_key = (row["supplier__company_name"], row["missing_fields"])
+        if draft_key not in drafts:
+            missing_fields = missing_field_names(row["missing_fields"])
+            drafts[draft_key] = (missing_fields, _missing_fields_result(row["supplier__company_name"], missing_fields))
+        missing_fields, result = drafts[draft_key]
+        results.append({
+            "quote_id": row["id"],
+            "rfq_id": row["rfq_id"],
+            "supplier_id": row["supplier_id"],
+            "company_name": row["supplier__company_name"],
+            "missing_fields": missing_fields,
+            **result,
+        })
+    return {"quotes": results, "missing": sum(result["status"] == "missing" for result in results)}
+
+def check_missing_fields_and_generate_emails(rfq_id=None):
+    """
+    Check every quote of an RFQ, or of all open RFQs, for missing fields
+    and generate the email drafts.
+
+    The quotes and their suppliers are read in one joined query, so the
+    cost does not grow with the number of quotes.
+
+    Args:
+        rfq_id (int): ID of the RFQ, or None for every RFQ due today or
+            later, or with no due date.
+
+    Returns:
+        dict: "quotes", a list with each quote's IDs, supplier name, missing
+        fields and the result of check_missing_fields_and_generate_email,
+        and "missing", the number of quotes with missing fields.
+    """
+    return _bulk_missing_fields(_missing_fields_queryset(rfq_id, open_rfqs=rfq_id is None))
+
+async def acheck_missing_fields_and_generate_emails(rfq_id=None):
+    """
+    Async variant of check_missing_fields_and_generate_emails.
+
+    Args:
+        rfq_id (int): ID of the RFQ, or None for every open RFQ.
+
+    Returns:
+        dict: The quotes' results and the number with missing fields.
+    """
+    return _bulk_missing_fields([row async for row in _missing_fields_queryset(rfq_id, open_rfqs=rfq_id is None)])
+
+def incomplete_quotes(rfq_id):
+    """
+    Retrieve the quotes of an RFQ missing any checked field, from the
+    (rfq, missing_fields) index.
+
+    Args:
+        rfq_id (int): ID of the RFQ.
+
+    Returns:
+        QuerySet: The incomplete quotes.
+    """
+    return Quote.objects.filter(rfq_id=rfq_id, missing_fields__gt=0)
+
+def suppliers_missing(field):
+    """
+    Retrieve the suppliers missing a field, e.g. "payment_terms", from the
+    missing_fields index.
+
+    Args:
+        field (str): One of completeness.SUPPLIER_CHECKED_FIELDS.
+
+    Returns:
+        QuerySet: The suppliers missing the field.
+    """
+    return Supplier.objects.filter(missing_fields__in=masks_with(field, SUPPLIER_CHECKED_FIELDS))
+
+def get_email_token_stats():
+    """
+    Summarize how much preprocessing shrank the emails sent for extraction.
+
+    Returns:
+        dict: Email count, original and reduced token totals, tokens saved
+        and the number of emails cut to EMAIL_TOKEN_BUDGET.
+    """
+    totals = Email.objects.exclude(original_tokens=None).aggregate(
+        emails=Count("id"),
+        original_tokens=Sum("original_tokens"),
+        reduced_tokens=Sum("reduced_tokens"),
+        truncated=Count("id", filter=Q(truncated=True)),
+    )
+    original, reduced = totals["original_tokens"] or 0, totals["reduced_tokens"] or 0
+    return {
+        "emails": totals["emails"],
+        "original_tokens": original,
+        "reduced_tokens": reduced,
+        "tokens_saved": original - reduced,
+        "reduction": round(1 - reduced / original, 4) if original else 0.0,
+        "truncated": totals["truncated"],
+    }
+
+def get_model_routing_stats(since=None):
+    """
+    Summarize model routing: calls, acceptance and latency per tier, and how
+    often extractions were escalated past the cheapest tier.
+
+    Args:
+        since (datetime): Only count calls made after this time.
+
+    Returns:
+        dict: Extraction and escalation counts, and a list of per-tier stats
+        with p50/p95 latency in ms.
+    """
+    calls = ExtractionModelCall.objects.all()
+    if since is not None:
+        calls = calls.filter(created_at__gte=since)
+    latencies = {}
+    for tier, model, latency_ms, accepted in calls.values_list("tier", "model", "latency_ms", "accepted"):
+        entry = latencies.setdefault((tier, model), {"latencies": [], "accepted": 0})
+        entry["latencies"].append(latency_ms)
+        entry["accepted"] += accepted
+
+    tiers = []
+    for (tier, model), entry in sorted(latencies.items()):
+        count = len(entry["latencies"])
+        tiers.append({
+            "tier": tier,
+            "model": model,
+            "calls": count,
+            "accepted": entry["accepted"],
+            "acceptance_rate": round(entry["accepted"] / count, 4),
+            "p50_latency_ms": percentile(entry["latencies"], 50),
+            "p95_latency_ms": percentile(entry["latencies"], 95),
+        })
+    # Every routed extraction starts at tier 0; the ones it did not accept were escalated
+    extractions = sum(entry["calls"] for entry in tiers if entry["tier"] == 0)
+    escalated = extractions - sum(entry["accepted"] for entry in tiers if entry["tier"] == 0)
+    return {
+        "extractions": extractions,
+        "escalated": escalated,
+        "escalation_rate": round(escalated / extractions, 4) if extractions else 0.0,
+        "tiers": tiers,
+    }
+
+
+def _usage_aggregates():
+    """
+    Aggregates summarizing what a group of emails' extractions cost.
+    """
+    return {
+        "emails": Count("id"),
+        "llm_extractions": Count("id", filter=Q(extraction_source=Email.SOURCE_LLM)),
+        "batch_extractions": Count("id", filter=Q(extraction_source=Email.SOURCE_BATCH)),
+        "cache_hits": Count("id", filter=Q(extraction_source=Email.SOURCE_CACHE)),
+        "rule_extractions": Count("id", filter=Q(extraction_source=Email.SOURCE_RULES)),
+        "input_tokens": Sum("input_tokens"),
+        "cached_tokens": Sum("cached_tokens"),
+        "output_tokens": Sum("output_tokens"),
+        "cost_usd": Sum("cost_usd"),
+        # Batch latency is hours of queueing, so only realtime calls are averaged
+        "avg_latency_ms": Avg("latency_ms", filter=Q(extraction_source=Email.SOURCE_LLM)),
+    }
+
+def _usage_row(row):
+    row.update({
+        "input_tokens": row["input_tokens"] or 0,
+        "cached_tokens": row["cached_tokens"] or 0,
+        "output_tokens": row["output_tokens"] or 0,
+        # Sums of decimals come back from SQLite with float noise; costs are stored to the micro-dollar
+        "cost_usd": (row["cost_usd"] or Decimal(0)).quantize(Decimal("0.000001")),
+        "avg_latency_ms": round(row["avg_latency_ms"]) if row["avg_latency_ms"] is not None else None,
+    })
+    return row
+
+def get_extraction_usage_report(since=None, limit=50):
+    """
+    Summarize extraction tokens, spend and latency in total, per RFQ, per
+    supplier and per day, from the usage stored on each email.
+
+    Each group has email counts by source (llm, batch, cache, rules), token
+    sums, cost in USD and the average latency of realtime LLM calls.
+
+    Args:
+        since (datetime): Only count emails stored after this time.
+        limit (int): Most expensive RFQs and suppliers to list.
+
+    Returns:
+        dict: totals, by_rfq and by_supplier (by spend, highest first), and
+        by_day (latest first).
+    """
+    emails = Email.objects.all()
+    if since is not None:
+        emails = emails.filter(created_at__gte=since)
+    by_rfq = (
+        emails.exclude(related_quote=None)
+        .values(rfq_id=F("related_quote__rfq_id"), item=F("related_quote__rfq__item"))
+        .annotate(**_usage_aggregates()).order_by("-cost_usd", "rfq_id")[:limit]
+    )
+    by_supplier = (
+        emails.exclude(related_quote=None)
+        .values(supplier_id=F("related_quote__supplier_id"), company_name=F("related_quote__supplier__company_name"))
+        .annotate(**_usage_aggregates()).order_by("-cost_usd", "supplier_id")[:limit]
+    )
+    by_day = (
+        emails.exclude(created_at=None)
+        .annotate(day=TruncDate("created_at")).values("day")
+        .annotate(**_usage_aggregates()).order_by("-day")
+    )
+    return {
+        "totals": _usage_row(emails.aggregate(**_usage_aggregates())),
+        "by_rfq": [_usage_row(row) for row in by_rfq],
+        "by_supplier": [_usage_row(row) for row in by_supplier],
+        "by_day": [_usage_row(row) for row in by_day],
+    }
+
+
+# Define service functions for the extraction job queue
+def enqueue_extraction_job(email_text, rfq, urgent=True):
+    """
+    Queue an email for background extraction.
+
+    Args:
+        email_text (str): The email content.
+        rfq (RFQ): The RFQ object related to the email.
+        urgent (bool): False to wait for the next OpenAI batch submission,
+            which is cheaper but can take up to 24 hours.
+
+    Returns:
+        ExtractionJob: The queued job.
+    """
+    mode = ExtractionJob.MODE_REALTIME if urgent else ExtractionJob.MODE_BATCH
+    return ExtractionJob.objects.create(rfq=rfq, email_text=email_text, mode=mode)
+
+def enqueue_extraction_jobs(email_texts, rfq, urgent=True):
+    """
+    Queue several emails for background extraction with one insert.
+
+    Args:
+        email_texts (list): The email contents.
+        rfq (RFQ): The RFQ object related to the emails.
+        urgent (bool): As for enqueue_extraction_job.
+
+    Returns:
+        list: The queued ExtractionJob objects.
+    """
+    mode = ExtractionJob.MODE_REALTIME if urgent else ExtractionJob.MODE_BATCH
+    return ExtractionJob.objects.bulk_create([
+        ExtractionJob(rfq=rfq, email_text=email_text, mode=mode) for email_text in email_texts
+    ])
+
+def claim_next_extraction_job():
+    """
+    Claim the oldest queued extraction job for the calling worker.
+
+    The claim is a conditional UPDATE on the job's status, so concurrent
+    workers (threads or processes) never run the same job twice and no
+    row-level locking support is needed from the database.
+
+    Returns:
+        ExtractionJob: The claimed job, or None if the queue is empty.
+    """
+    candidate_ids = (
+        ExtractionJob.objects.filter(mode=ExtractionJob.MODE_REALTIME, status=ExtractionJob.STATUS_QUEUED)
+        .filter(Q(run_after__isnull=True) | Q(run_after__lte=timezone.now()))
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)[:10]
+    )
+    for job_id in list(candidate_ids):
+        claimed = ExtractionJob.objects.filter(pk=job_id, status=ExtractionJob.STATUS_QUEUED).update(
+            status=ExtractionJob.STATUS_RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return ExtractionJob.objects.select_related("rfq").get(pk=job_id)
+    return None
+
+def run_extraction_job(job):
+    """
+    Run a claimed extraction job and record its outcome.
+
+    If the LLM could not be reached the job goes back on the queue, to be
+    claimed again once the provider may have recovered, until it has been
+    tried EXTRACTION_JOB_MAX_ATTEMPTS times.
+
+    Args:
+        job (ExtractionJob): The job to run, already marked as running.
+
+    Returns:
+        ExtractionJob: The finished job.
+    """
+    try:
+        result = process_email_text(job.email_text, job.rfq)
+    except Exception as exc:
+        logging.exception(f"Extraction job {job.id} crashed")
+        result = {"status": "fail", "message": str(exc)}
+
+    job.result = result
+    job.finished_at = timezone.now()
+    if result.get("status") == "success":
+        job.status = ExtractionJob.STATUS_SUCCEEDED
+        job.quote_id = result.get("quote_id")
+        job.error = None
+    elif result.get("retryable") and job.attempts < settings.EXTRACTION_JOB_MAX_ATTEMPTS:
+        job.status = ExtractionJob.STATUS_QUEUED
+        job.started_at = job.finished_at = None
+        job.run_after = timezone.now() + timedelta(seconds=result.get("retry_after") or settings.OPENAI_RETRY_MAX_DELAY)
+        job.error = result.get("message")
+    else:
+        job.status = ExtractionJob.STATUS_FAILED
+        job.error = result.get("message")
+    job.save(update_fields=["result", "finished_at", "status", "quote", "error", "started_at", "run_after"])
+    return job
+
+def requeue_stale_extraction_jobs(max_age_seconds):
+    """
+    Put running jobs back on the queue if their worker has gone away.
+
+    Batch jobs are left alone; they stay running until their batch is collected.
+
+    Args:
+        max_age_seconds (int): How long a job may run before it is considered stale.
+
+    Returns:
+        int: Number of jobs requeued.
+    """
+    cutoff = timezone.now() - timedelta(seconds=max_age_seconds)
+    return ExtractionJob.objects.filter(
+        mode=ExtractionJob.MODE_REALTIME, status=ExtractionJob.STATUS_RUNNING, started_at__lt=cutoff
+    ).update(status=ExtractionJob.STATUS_QUEUED, started_at=None)
+
+def get_extraction_job_status(job_id):
+    """
+    Retrieve the status of an extraction job.
+
+    Args:
+        job_id (int): ID of the job.
+
+    Returns:
+        dict: Job status, or None if the job does not exist.
+    """
+    job = ExtractionJob.objects.filter(pk=job_id).values(
+        "id", "rfq_id", "status", "mode", "attempts", "quote_id", "error", "created_at", "started_at", "finished_at",
+        "run_after", "batch_id", "batch__openai_status",
+    ).first()
+    if job is None:
+        return None
+    job["batch_status"] = job.pop("batch__openai_status")
+    job["queue_position"] = None
+    if job["status"] == ExtractionJob.STATUS_QUEUED:
+        job["queue_position"] = ExtractionJob.objects.filter(
+            mode=job["mode"], status=ExtractionJob.STATUS_QUEUED, created_at__lt=job["created_at"]
+        ).count() + 1
+    return job
+
+# Define service functions for OpenAI Batch API extraction
+def _batch_custom_id(job_id):
+    return f"job-{job_id}"
+
+def extraction_batch_due():
+    """
+    Whether enough non-urgent jobs are waiting, or the oldest has waited long
+    enough, to submit a batch.
+
+    Returns:
+        bool: True if submit_extraction_batch should run.
+    """
+    queued = ExtractionJob.objects.filter(mode=ExtractionJob.MODE_BATCH, status=ExtractionJob.STATUS_QUEUED)
+    oldest = queued.order_by("created_at").values_list("created_at", flat=True).first()
+    if oldest is None:
+        return False
+    if oldest <= timezone.now() - timedelta(seconds=settings.OPENAI_BATCH_MAX_WAIT):
+        return True
+    return queued[:settings.OPENAI_BATCH_MIN_REQUESTS].count() >= settings.OPENAI_BATCH_MIN_REQUESTS
+
+def submit_extraction_batch(max_requests=None):
+    """
+    Send queued non-urgent jobs to the OpenAI Batch API.
+
+    Jobs whose email the rule-based extractor reads completely, or that is
+    already in the extraction cache, are finished right away instead of
+    being sent. If the submission fails the jobs go back on
+    the queue.
+
+    Args:
+        max_requests (int): Most jobs to include, defaults to
+            OPENAI_BATCH_MAX_REQUESTS.
+
+    Returns:
+        ExtractionBatch: The batch, or None if no jobs were queued.
+    """
+    max_requests = max_requests or settings.OPENAI_BATCH_MAX_REQUESTS
+    candidate_ids = list(
+        ExtractionJob.objects.filter(mode=ExtractionJob.MODE_BATCH, status=ExtractionJob.STATUS_QUEUED)
+        .order_by("created_at", "id")
+        .values_list("id", flat=True)[:max_requests]
+    )
+    if not candidate_ids:
+        return None
+
+    batch = ExtractionBatch.objects.create(model=DEFAULT_MODEL)
+    # Conditional claim, as in claim_next_extraction_job, so concurrent submitters never share a job
+    ExtractionJob.objects.filter(pk__in=candidate_ids, status=ExtractionJob.STATUS_QUEUED).update(
+        status=ExtractionJob.STATUS_RUNNING,
+        batch=batch,
+        started_at=timezone.now(),
+        attempts=F("attempts") + 1,
+    )
+    jobs = list(batch.jobs.select_related("rfq").order_by("id"))
+
+    rules = _rule_extractions([job.email_text for job in jobs])
+    results = [_complete_rule_extraction(rule_extraction) for rule_extraction in rules]
+    prompt_texts = {job.id: _prompt_text(job.email_text) for job in jobs}
+    # Routed extractions first, then earlier batch results from the batch model
+    for model in (None, batch.model):
+        uncached = [index for index, result in enumerate(results) if result is None]
+        for index, cached in zip(uncached, get_cached_extractions([prompt_texts[jobs[index].id] for index in uncached], model)):
+            results[index] = _with_rules(rules[index], cached)
+
+    to_send = []
+    for job, rule_extraction, extracted_data_dict in zip(jobs, rules, results):
+        if extracted_data_dict is None:
+            to_send.append(job)
+            continue
+        source = Email.SOURCE_RULES if rule_extraction is not None and rule_extraction.is_complete() else Email.SOURCE_CACHE
+        try:
+            batch.succeeded_count += _finish_batch_job(job, batch, extracted_data_dict, ExtractionUsage(source=source))
+        except SAVE_ERRORS as exc:
+            logging.warning(f"Could not save the extracted data of job {job.id}: {exc}")
+            _retry_or_fail_batch_job(job, batch, f"Could not save the extracted data: {exc}")
+            batch.failed_count += 1
+
+    if not to_send:
+        batch.status = ExtractionBatch.STATUS_COMPLETED
+        batch.finished_at = timezone.now()
+        batch.save()
+        return batch
+
+    try:
+        remote = submit_batch(
+            [build_batch_request(_batch_custom_id(job.id), prompt_texts[job.id], batch.model) for job in to_send],
+            metadata={"extraction_batch_id": str(batch.id)},
+        )
+    except Exception as exc:
+        logging.warning(f"Batch submission failed: {exc}")
+        ExtractionJob.objects.filter(batch=batch, status=ExtractionJob.STATUS_RUNNING).update(
+            status=ExtractionJob.STATUS_QUEUED, batch=None, started_at=None
+        )
+        batch.status = ExtractionBatch.STATUS_FAILED
+        batch.error = str(exc)
+        batch.finished_at = timezone.now()
+        batch.save()
+        return batch
+
+    batch.openai_batch_id = remote.id
+    batch.openai_status = remote.status
+    batch.input_file_id = remote.input_file_id
+    batch.request_count = len(to_send)
+    batch.save()
+    return batch
+
+def poll_extraction_batches():
+    """
+    Check every submitted batch and collect the results of finished ones.
+
+    Returns:
+        list: The batches collected by this call.
+    """
+    collected = []
+    for batch in ExtractionBatch.objects.filter(status=ExtractionBatch.STATUS_SUBMITTED).exclude(openai_batch_id=None):
+        try:
+            remote = retrieve_batch(batch.openai_batch_id)
+        except Exception as exc:
+            logging.warning(f"Could not check batch {batch.openai_batch_id}: {exc}")
+            continue
+        if remote.status != batch.openai_status:
+            ExtractionBatch.objects.filter(pk=batch.pk).update(openai_status=remote.status)
+        if remote.status in TERMINAL_BATCH_STATUSES and collect_extraction_batch(batch, remote):
+            collected.append(batch)
+    return collected
+
+def collect_extraction_batch(batch, remote):
+    """
+    Map the results of a finished OpenAI batch back onto its jobs.
+
+    Successful results are saved exactly like process_email_text. Requests
+    that failed, results whose rows cannot be written, and requests that
+    the batch never got to (expired or cancelled batches), are queued for the next batch until OPENAI_BATCH_MAX_ATTEMPTS
+    is reached, then marked failed.
+
+    Args:
+        batch (ExtractionBatch): The local batch.
+        remote (Batch): The finished OpenAI batch.
+
+    Returns:
+        bool: False if another process is already collecting this batch, or
+        the result files could not be downloaded (it will be retried).
+    """
+    claimed = ExtractionBatch.objects.filter(pk=batch.pk, status=ExtractionBatch.STATUS_SUBMITTED).update(
+        status=ExtractionBatch.STATUS_COLLECTING
+    )
+    if not claimed:
+        return False
+
+    results = {}
+    try:
+        # The output file is read last so a success wins over an error for the same request
+        for file_id in (remote.error_file_id, remote.output_file_id):
+            if file_id:
+                for line in download_batch_file(file_id):
+                    result = parse_batch_result(line)
+                    results[result.custom_id] = result
+    except Exception as exc:
+        logging.warning(f"Could not download results of batch {remote.id}: {exc}")
+        ExtractionBatch.objects.filter(pk=batch.pk).update(status=ExtractionBatch.STATUS_SUBMITTED)
+        return False
+
+    succeeded, failed, cache_items = 0, 0, []
+    for job in batch.jobs.filter(status=ExtractionJob.STATUS_RUNNING).select_related("rfq"):
+        result = results.get(_batch_custom_id(job.id))
+        if result is not None and result.data is not None:
+            extracted_data_dict = result.data.dict()
+            rules = _rule_extractions([job.email_text])[0]
+            # Batch requests are not escalated, so only output that passes validation is cached
+            if not validate_extraction(result.data, _known_fields(rules)):
+                cache_items.append((_prompt_text(job.email_text), extracted_data_dict, 0))
+            extracted_data_dict = _with_rules(rules, extracted_data_dict)
+            try:
+                succeeded += _finish_batch_job(job, batch, extracted_data_dict, _batch_usage(job, result))
+            except SAVE_ERRORS as exc:
+                # Only this job's rows are rolled back; the rest of the batch is still collected
+                logging.warning(f"Could not save the extracted data of job {job.id}: {exc}")
+                _retry_or_fail_batch_job(job, batch, f"Could not save the extracted data: {exc}")
+                failed += 1
+        else:
+            error = result.error if result is not None else f"No result returned (batch {remote.status})"
+            _retry_or_fail_batch_job(job, batch, error)
+            failed += 1
+    store_extractions(cache_items, batch.model)
+
+    batch.status = ExtractionBatch.STATUS_COMPLETED if remote.status == "completed" else ExtractionBatch.STATUS_FAILED
+    batch.openai_status = remote.status
+    batch.output_file_id = remote.output_file_id
+    batch.error_file_id = remote.error_file_id
+    batch.succeeded_count += succeeded
+    batch.failed_count += failed
+    if remote.errors and remote.errors.data:
+        batch.error = "; ".join(error.message or error.code or "" for error in remote.errors.data)
+    batch.finished_at = timezone.now()
+    batch.save()
+    return True
+
+def _batch_usage(job, result):
+    """
+    What a batch job's extraction cost, at the Batch API price. Its latency
+    runs from enqueueing the job to collecting its result.
+    """
+    usage = ExtractionUsage(source=Email.SOURCE_BATCH, model=result.model)
+    if result.usage:
+        usage.add(result.model or "", result.usage, batch=True)
+    usage.latency_ms = int((timezone.now() - job.created_at).total_seconds() * 1000)
+    return usage
+
+def _finish_batch_job(job, batch, extracted_data_dict, usage=None):
+    """
+    Save the extraction of a batch job and mark the job succeeded.
+
+    The job's status change and its rows are committed together, and only if
+    the job is still running in this batch, so results are never saved twice.
+
+    Returns:
+        bool: True if this call finished the job.
+    """
+    with transaction.atomic():
+        finished = ExtractionJob.objects.filter(
+            pk=job.pk, batch=batch, status=ExtractionJob.STATUS_RUNNING
+        ).update(status=ExtractionJob.STATUS_SUCCEEDED, finished_at=timezone.now(), error=None)
+        if not finished:
+            return False
+        quote = _save_extraction(job.email_text, job.rfq, extracted_data_dict, usage)
+        ExtractionJob.objects.filter(pk=job.pk).update(quote=quote, result={
+            "status": "success", "message": "Quote, Supplier, RFQ, and Email created successfully", "quote_id": quote.id
+        })
+    return True
+
+def _retry_or_fail_batch_job(job, batch, error):
+    """
+    Queue a failed batch job for the next batch, or fail it after too many attempts.
+    """
+    running = ExtractionJob.objects.filter(pk=job.pk, batch=batch, status=ExtractionJob.STATUS_RUNNING)
+    if job.attempts < settings.OPENAI_BATCH_MAX_ATTEMPTS:
+        running.update(status=ExtractionJob.STATUS_QUEUED, batch=None, started_at=None, error=error)
+    else:
+        running.update(
+            status=ExtractionJob.STATUS_FAILED,
+            finished_at=timezone.now(),
+            error=error,
+            result={"status": "fail", "message": error},
+        )
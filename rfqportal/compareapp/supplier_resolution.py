@@ -0,0 +1,319 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .company_names import email_domain, normalize_company_name
+from .models import Supplier
+
+# Trigrams shared by more suppliers than this are too common to narrow the search
+MAX_POSTING_SIZE = 2000
+# The rarest trigrams of a name are always used for blocking, however common
+MIN_BLOCKING_TRIGRAMS = 3
+# Candidates left after blocking that are scored exactly
+MAX_CANDIDATES = 25
+# Added to the name similarity when the contact email domains match...
+DOMAIN_BONUS = 0.15
+# ...as long as the names are at least this similar
+DOMAIN_MIN_SIMILARITY = 0.5
+
+def name_trigrams(normalized_name):
+    """
+    Character trigrams of a normalized name, padded so word starts weigh more.
+
+    Args:
+        normalized_name (str): Output of normalize_company_name.
+
+    Returns:
+        frozenset: The trigrams.
+    """
+    padded = f"  {normalized_name} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def name_similarity(trigrams, other_trigrams):
+    """
+    Dice coefficient of two trigram sets, from 0.0 to 1.0.
+    """
+    if not trigrams or not other_trigrams:
+        return 0.0
+    return 2 * len(trigrams & other_trigrams) / (len(trigrams) + len(other_trigrams))
+
+@dataclass
+class SupplierMatch:
+    supplier_id: int
+    score: float
+    reason: str  # "exact", "similar" or "similar+domain"
+    supplier: Supplier = None
+
+class SupplierIndex:
+    """
+    In-memory blocking index for matching company names to suppliers.
+
+    Each supplier is posted under its normalized name, the trigrams of that
+    name and its contact email domain. A lookup only scores the suppliers
+    sharing the most of the name's rarer trigrams, so its cost depends on the
+    size of those posting lists rather than on the number of suppliers.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._names = {}
+        self._trigrams = {}
+        self._domains = {}
+        self._by_name = defaultdict(set)
+        self._by_trigram = defaultdict(set)
+        self._by_domain = defaultdict(set)
+        self.max_id = 0
+        self.built_at = time.monotonic()
+        self.refreshed_at = self.built_at
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, supplier_id, company_name, contact_email=None):
+        """
+        Index a supplier, replacing any previous entry for the same id.
+        """
+        normalized = normalize_company_name(company_name)
+        domain = email_domain(contact_email)
+        with self._lock:
+            self._discard(supplier_id)
+            self.max_id = max(self.max_id, supplier_id)
+            if not normalized:
+                return
+            trigrams = name_trigrams(normalized)
+            self._names[supplier_id] = normalized
+            self._trigrams[supplier_id] = trigrams
+            self._by_name[normalized].add(supplier_id)
+            for trigram in trigrams:
+                self._by_trigram[trigram].add(supplier_id)
+            if domain:
+                self._domains[supplier_id] = domain
+                self._by_domain[domain].add(supplier_id)
+
+    def remove(self, supplier_id):
+        """
+        Drop a supplier from the index.
+        """
+        with self._lock:
+            self._discard(supplier_id)
+
+    def _discard(self, supplier_id):
+        normalized = self._names.pop(supplier_id, None)
+        if normalized is None:
+            return
+        _unpost(self._by_name, normalized, supplier_id)
+        for trigram in self._trigrams.pop(supplier_id):
+            _unpost(self._by_trigram, trigram, supplier_id)
+        domain = self._domains.pop(supplier_id, None)
+        if domain:
+            _unpost(self._by_domain, domain, supplier_id)
+
+    def load(self, rows):
+        """
+        Index (id, company_name, main_contact_email) rows.
+        """
+        with self._lock:
+            for supplier_id, company_name, contact_email in rows:
+                self.add(supplier_id, company_name, contact_email)
+            self.refreshed_at = time.monotonic()
+
+    def indexed_name(self, supplier_id):
+        return self._names.get(supplier_id)
+
+    def match(self, company_name, contact_email=None, threshold=None):
+        """
+        Find the indexed supplier most likely to be this company.
+
+        Args:
+            company_name (str): The extracted company name.
+            contact_email (str): The extracted contact email, if any.
+            threshold (float): Minimum score to accept, defaults to
+                SUPPLIER_MATCH_THRESHOLD.
+
+        Returns:
+            SupplierMatch: The best match, or None if nothing scores at least
+            the threshold. Ties go to the oldest supplier.
+        """
+        threshold = settings.SUPPLIER_MATCH_THRESHOLD if threshold is None else threshold
+        normalized = normalize_company_name(company_name)
+        if not normalized:
+            return None
+        domain = email_domain(contact_email)
+
+        with self._lock:
+            exact = self._by_name.get(normalized)
+            if exact:
+                return SupplierMatch(min(exact), 1.0, "exact")
+
+            trigrams = name_trigrams(normalized)
+            shared = Counter()
+            postings = sorted((self._by_trigram.get(trigram, ()) for trigram in trigrams), key=len)
+            for position, posting in enumerate(postings):
+                if position >= MIN_BLOCKING_TRIGRAMS and len(posting) > MAX_POSTING_SIZE:
+                    break
+                shared.update(posting)
+            candidates = {supplier_id for supplier_id, _ in shared.most_common(MAX_CANDIDATES)}
+            if domain:
+                candidates |= self._by_domain.get(domain, set())
+
+            best = None
+            for supplier_id in candidates:
+                score = name_similarity(trigrams, self._trigrams[supplier_id])
+                reason = "similar"
+                if domain and self._domains.get(supplier_id) == domain and score >= DOMAIN_MIN_SIMILARITY:
+                    score = min(1.0, score + DOMAIN_BONUS)
+                    reason = "similar+domain"
+                if best is None or (score, -supplier_id) > (best.score, -best.supplier_id):
+                    best = SupplierMatch(supplier_id, score, reason)
+
+        if best is None or best.score < threshold:
+            return None
+        return best
+
+    def stats(self):
+        with self._lock:
+            return {
+                "suppliers": len(self._names),
+                "names": len(self._by_name),
+                "trigrams": len(self._by_trigram),
+                "domains": len(self._by_domain),
+                "max_id": self.max_id,
+            }
+
+def _unpost(postings, key, supplier_id):
+    ids = postings.get(key)
+    if ids is not None:
+        ids.discard(supplier_id)
+        if not ids:
+            del postings[key]
+
+def _supplier_rows(queryset):
+    return queryset.values_list("id", "company_name", "main_contact_email").iterator(chunk_size=2000)
+
+# The process-wide index is built lazily. Saves and deletes made in this
+# process are applied through signals; suppliers inserted by other processes
+# (or with bulk_create) are picked up by the periodic id catch-up, and the
+# whole index is rebuilt after SUPPLIER_INDEX_MAX_AGE seconds.
+_index = None
+_index_lock = threading.Lock()
+
+def build_supplier_index():
+    """
+    Build an index of every supplier.
+
+    Returns:
+        SupplierIndex: The new index.
+    """
+    index = SupplierIndex()
+    index.load(_supplier_rows(Supplier.objects.order_by("id")))
+    return index
+
+def get_supplier_index():
+    """
+    Return the process-wide supplier index, building or refreshing it as needed.
+
+    Returns:
+        SupplierIndex: The shared index.
+    """
+    global _index
+    with _index_lock:
+        now = time.monotonic()
+        if _index is None or now - _index.built_at > settings.SUPPLIER_INDEX_MAX_AGE:
+            _index = build_supplier_index()
+        elif now - _index.refreshed_at >= settings.SUPPLIER_INDEX_REFRESH_INTERVAL:
+            _index.load(_supplier_rows(Supplier.objects.filter(id__gt=_index.max_id).order_by("id")))
+        return _index
+
+def reset_supplier_index():
+    """
+    Discard the process-wide index so the next lookup rebuilds it.
+    """
+    global _index
+    with _index_lock:
+        _index = None
+
+@receiver(post_save, sender=Supplier, dispatch_uid="supplier_index_save")
+def _index_saved_supplier(sender, instance, **kwargs):
+    index = _index
+    if index is not None:
+        transaction.on_commit(lambda: index.add(instance.id, instance.company_name, instance.main_contact_email))
+
+@receiver(post_delete, sender=Supplier, dispatch_uid="supplier_index_delete")
+def _unindex_deleted_supplier(sender, instance, **kwargs):
+    index = _index
+    if index is not None:
+        supplier_id = instance.id
+        transaction.on_commit(lambda: index.remove(supplier_id))
+
+def resolve_suppliers(companies, threshold=None):
+    """
+    Resolve extracted companies to existing suppliers.
+
+    Exact normalized-name matches come straight from the database, so they
+    include suppliers just created by other processes. The rest are matched
+    by similarity through the supplier index.
+
+    Args:
+        companies (list): (company_name, contact_email) pairs.
+        threshold (float): Minimum similarity score, defaults to
+            SUPPLIER_MATCH_THRESHOLD.
+
+    Returns:
+        dict: SupplierMatch, with supplier set, for each normalized name that
+        matched. Names without a match are left out.
+    """
+    wanted = {}
+    for company_name, contact_email in companies:
+        normalized = normalize_company_name(company_name)
+        if normalized:
+            wanted.setdefault(normalized, (company_name, contact_email))
+    if not wanted:
+        return {}
+
+    matches = {}
+    # Newest first so the oldest supplier wins when several share a normalized name
+    for supplier in Supplier.objects.filter(normalized_name__in=list(wanted)).order_by("-id"):
+        matches[supplier.normalized_name] = SupplierMatch(supplier.id, 1.0, "exact", supplier)
+
+    remaining = {normalized: company for normalized, company in wanted.items() if normalized not in matches}
+    if remaining:
+        index = get_supplier_index()
+        similar = {}
+        for normalized, (company_name, contact_email) in remaining.items():
+            match = index.match(company_name, contact_email, threshold)
+            if match is not None:
+                similar[normalized] = match
+        found = Supplier.objects.in_bulk({match.supplier_id for match in similar.values()})
+        for normalized, match in similar.items():
+            supplier = found.get(match.supplier_id)
+            if supplier is None or supplier.normalized_name != index.indexed_name(match.supplier_id):
+                # The entry is stale (deleted or renamed elsewhere); correct it and treat the name as unmatched
+                if supplier is None:
+                    index.remove(match.supplier_id)
+                else:
+                    index.add(supplier.id, supplier.company_name, supplier.main_contact_email)
+                continue
+            match.supplier = supplier
+            matches[normalized] = match
+    return matches
+
+def resolve_supplier(company_name, contact_email=None, threshold=None):
+    """
+    Resolve one extracted company to an existing supplier.
+
+    Args:
+        company_name (str): The extracted company name.
+        contact_email (str): The extracted contact email, if any.
+        threshold (float): Minimum similarity score, defaults to
+            SUPPLIER_MATCH_THRESHOLD.
+
+    Returns:
+        SupplierMatch: The match with its supplier, or None.
+    """
+    matches = resolve_suppliers([(company_name, contact_email)], threshold)
+    return matches.get(normalize_company_name(company_name))
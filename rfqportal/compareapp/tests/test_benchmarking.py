@@ -0,0 +1,76 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..benchmarking import UsageRecorder, field_precision, same_value
+from ..fake_openai import FakeOpenAI
+from ..llm_client import set_transport
+from ..llm_services import extract_email_data
+from ..management.commands.benchmark_extraction import DEFAULT_CORPUS
+from ..models import RFQ, ExtractionModelCall, Supplier
+
+
+class FieldPrecisionTest(SimpleTestCase):
+    def test_same_value(self):
+        self.assertTrue(same_value(1.2, 1.2001))
+        self.assertTrue(same_value(["kosher", "Organic"], ["Organic", "Kosher"]))
+        self.assertTrue(same_value(" ACME ", "Acme"))
+        self.assertFalse(same_value("1.2", 1.2))
+
+    def test_precision_counts_filled_fields_only(self):
+        labels = [{"price_per": 1.5, "payment_terms": "Net 30"}] * 3
+        extractions = [{"price_per": 1.5, "payment_terms": ""}, {"price_per": 2.0, "payment_terms": "Net 30"}, None]
+        precision = field_precision(extractions, labels)
+        self.assertEqual(precision["price_per"], {"filled": 2, "correct": 1, "precision": 0.5})
+        self.assertEqual(precision["payment_terms"], {"filled": 1, "correct": 1, "precision": 1.0})
+        self.assertEqual(precision["overall"], {"filled": 3, "correct": 2, "precision": 0.6667})
+
+
+class UsageRecorderTest(SimpleTestCase):
+    def test_usage_is_summed(self):
+        recorder = UsageRecorder(FakeOpenAI().transport())
+        set_transport(recorder)
+        self.addCleanup(set_transport, None)
+        extract_email_data("first email")
+        extract_email_data("second email")
+        self.assertEqual(recorder.calls, 2)
+        self.assertGreater(recorder.usage["input_tokens"], 0)
+        self.assertGreater(recorder.usage["output_tokens"], 0)
+
+
+class BenchmarkExtractionCommandTest(TestCase):
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command("benchmark_extraction", "--concurrency", "1", *args, stdout=out)
+        return json.loads(out.getvalue())
+
+    def test_replaying_the_labels(self):
+        results = self.benchmark()
+        run = results["runs"][0]
+        self.assertEqual((run["requests"], run["failed"], run["concurrency"]), (results["emails"], 0, 1))
+        self.assertGreater(run["tokens_per_email"]["input_tokens"], 0)
+        self.assertEqual(results["precision"]["overall"]["precision"], 1.0)
+        self.assertFalse(RFQ.objects.exists())
+        self.assertFalse(Supplier.objects.exists())
+        self.assertFalse(ExtractionModelCall.objects.exists())
+
+    @override_settings(RULE_EXTRACTION_ENABLED=False)
+    def test_recorded_responses_and_output_file(self):
+        samples = json.loads(DEFAULT_CORPUS.read_text(encoding="utf-8"))
+        # A model that gets every country wrong and does not know the first email
+        recorded = [
+            {"email": sample["email"], "output": {**sample["expected"], "country_of_origin": "Atlantis"}}
+            for sample in samples[1:]
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            responses = Path(directory) / "responses.json"
+            responses.write_text(json.dumps(recorded), encoding="utf-8")
+            output = Path(directory) / "results.json"
+            results = self.benchmark("--responses", str(responses), "--output", str(output))
+            self.assertEqual(json.loads(output.read_text(encoding="utf-8")), results)
+
+        self.assertEqual(results["runs"][0]["failed"], 1)
+        self.assertEqual(results["precision"]["country_of_origin"], {"filled": len(recorded), "correct": 0, "precision": 0.0})
+        self.assertEqual(results["precision"]["supplier_company_name"]["precision"], 1.0)
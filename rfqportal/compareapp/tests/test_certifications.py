@@ -0,0 +1,91 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..certification_names import canonical_certification, certification_key, parse_certification_list
+from ..certifications import compliant_quotes
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from ..models import RFQ, Certification, Quote, QuoteCertification, Supplier
+from ..services import get_quote_matrix, process_email_batch
+
+
+class CertificationNamesTest(SimpleTestCase):
+    def test_key_ignores_case_accents_punctuation_and_filler(self):
+        self.assertEqual(certification_key("Certified FSSC-22000"), "fssc 22000")
+        self.assertEqual(certification_key("fssc22000"), "fssc 22000")
+        self.assertEqual(certification_key("Hálal."), "halal")
+
+    def test_aliases_resolve_to_one_spelling(self):
+        self.assertEqual(canonical_certification("OU Kosher"), ("kosher", "Kosher"))
+        self.assertEqual(canonical_certification("BRC"), ("brcgs", "BRCGS"))
+        self.assertEqual(canonical_certification("Rabbinical Council "), ("rabbinical council", "Rabbinical Council"))
+        self.assertIsNone(canonical_certification("none"))
+
+    def test_parse_certification_list(self):
+        self.assertEqual(
+            parse_certification_list("Certified Organic, OU Kosher and Kosher; Non GMO"),
+            {"organic": "Organic", "kosher": "Kosher", "non gmo": "Non-GMO"},
+        )
+        self.assertEqual(parse_certification_list("N/A"), {})
+        self.assertEqual(parse_certification_list(None), {})
+
+
+class CertificationCatalogTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Vanilla", required_certifications="Organic, Kosher")
+
+    def add_quote(self, name, certifications, rfq=None):
+        supplier = Supplier.objects.create(company_name=name)
+        return Quote.objects.create(rfq=rfq or self.rfq, supplier=supplier, price_per=2.5, certifications=certifications)
+
+    def names(self, owner):
+        return sorted(owner.catalog_certifications.values_list("name", flat=True))
+
+    def test_saves_link_to_one_catalog_entry_per_certification(self):
+        quote = self.add_quote("Acme", "certified organic, OU Kosher")
+        self.assertEqual(self.names(self.rfq), ["Kosher", "Organic"])
+        self.assertEqual(self.names(quote), ["Kosher", "Organic"])
+        self.assertEqual(Certification.objects.count(), 2)
+
+    def test_changing_the_text_relinks(self):
+        quote = self.add_quote("Acme", "Organic, Kosher")
+        quote.certifications = "Organic, Halal"
+        quote.save(update_fields=["certifications"])
+        self.assertEqual(self.names(quote), ["Halal", "Organic"])
+        quote.certifications = ""
+        quote.save()
+        self.assertFalse(QuoteCertification.objects.filter(quote=quote).exists())
+
+    def test_compliant_quotes_hold_every_required_certification(self):
+        full = self.add_quote("Full", "Organic, OU Kosher, Halal")
+        self.add_quote("Partial", "Organic")
+        self.add_quote("None", "")
+        with self.assertNumQueries(1):
+            self.assertEqual(list(compliant_quotes(self.rfq.id).values_list("id", flat=True)), [full.id])
+
+    def test_compliant_quotes_across_rfqs(self):
+        other = RFQ.objects.create(item="Cocoa")
+        elsewhere = self.add_quote("Elsewhere", "Kosher, Organic", rfq=other)
+        self.add_quote("Partial", "Kosher")
+        self.assertEqual(list(compliant_quotes(self.rfq.id, Quote.objects.all()).values_list("id", flat=True)), [elsewhere.id])
+
+    def test_rfq_without_requirements_accepts_every_quote(self):
+        rfq = RFQ.objects.create(item="Cocoa")
+        quote = self.add_quote("Acme", "", rfq=rfq)
+        self.assertEqual(list(compliant_quotes(rfq.id)), [quote])
+
+    def test_matrix_can_hide_noncompliant_quotes(self):
+        self.add_quote("Full", "Organic, Kosher")
+        self.add_quote("Partial", "Organic")
+        matrix = get_quote_matrix(self.rfq.id, compliant_only=True)
+        self.assertEqual([quote["supplier"]["company_name"] for quote in matrix], ["Full"])
+        response = self.client.get(f"/rfqs/{self.rfq.id}/quotes/?compliant=1")
+        self.assertContains(response, "Full")
+        self.assertNotContains(response, "Partial")
+
+    @override_settings(RULE_EXTRACTION_ENABLED=False, EXTRACTION_CACHE_ENABLED=False)
+    def test_bulk_created_quotes_are_linked(self):
+        set_transport(FakeOpenAI(responder=lambda email_text, body: {
+            **SAMPLE_EXTRACTION, "supplier_company_name": email_text, "certifications": ["USDA Organic", "Kosher"],
+        }).transport())
+        self.addCleanup(set_transport, None)
+        process_email_batch(["Acme"], self.rfq, max_workers=1)
+        self.assertEqual(self.names(Quote.objects.get()), ["Kosher", "USDA Organic"])
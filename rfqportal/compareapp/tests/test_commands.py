@@ -0,0 +1,86 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from ..models import RFQ, Email, ExtractionJob, Quote, QuoteScore, Supplier
+
+
+class RunExtractionWorkerCommandTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Test Item")
+        ExtractionJob.objects.create(rfq=self.rfq, email_text="first")
+        ExtractionJob.objects.create(rfq=self.rfq, email_text="second")
+
+    @patch("compareapp.services.process_email_text")
+    def test_worker_drains_queue(self, mock_process):
+        mock_process.return_value = {"status": "fail", "message": "Failed to extract data from email."}
+        out = StringIO()
+        call_command("run_extraction_worker", "--workers", "1", "--once", stdout=out)
+        self.assertIn("Processed 2 job(s).", out.getvalue())
+        self.assertFalse(ExtractionJob.objects.filter(status=ExtractionJob.STATUS_QUEUED).exists())
+        self.assertEqual(mock_process.call_count, 2)
+
+
+class RebuildSupplierIndexCommandTest(TestCase):
+    def test_rebuild_renormalizes_and_resolves(self):
+        supplier = Supplier.objects.create(company_name="Acme Inc.")
+        Supplier.objects.filter(pk=supplier.pk).update(normalized_name="stale")
+        out = StringIO()
+        call_command("rebuild_supplier_index", "--resolve", "ACME Incorporated", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["normalized_names_updated"], 1)
+        self.assertEqual(report["suppliers"], 1)
+        self.assertEqual(report["resolve"]["supplier_id"], supplier.pk)
+        self.assertEqual(report["resolve"]["reason"], "exact")
+
+
+class RebuildQuoteScoresCommandTest(TestCase):
+    def test_new_weights_rerank(self):
+        rfq = RFQ.objects.create(item="Vanilla", required_certifications="Organic")
+        cheap = Quote.objects.create(rfq=rfq, supplier=Supplier.objects.create(company_name="Cheap"), price_per=1)
+        Quote.objects.create(rfq=rfq, supplier=Supplier.objects.create(company_name="Organic"), price_per=1.5, certifications="Organic")
+        self.assertEqual(QuoteScore.objects.get(quote=cheap).rank, 2)
+
+        out = StringIO()
+        with override_settings(QUOTE_SCORE_PRICE_WEIGHT=1, QUOTE_SCORE_MOQ_WEIGHT=0, QUOTE_SCORE_CERTIFICATION_WEIGHT=0):
+            call_command("rebuild_quote_scores", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["rfqs"], 1)
+        self.assertEqual(QuoteScore.objects.get(quote=cheap).rank, 1)
+
+
+class RebuildCertificationCatalogCommandTest(TestCase):
+    def test_rebuild_relinks_and_drops_unused(self):
+        rfq = RFQ.objects.create(item="Vanilla", required_certifications="Kosher")
+        quote = Quote.objects.create(rfq=rfq, supplier=Supplier.objects.create(company_name="Acme"), certifications="Halal")
+        Quote.objects.filter(pk=quote.pk).update(certifications="OU Kosher")  # No signal
+        out = StringIO()
+        call_command("rebuild_certification_catalog", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["certifications"], 1)
+        self.assertEqual(list(quote.catalog_certifications.values_list("name", flat=True)), ["Kosher"])
+
+
+class RebuildMissingFieldsCommandTest(TestCase):
+    def test_rebuild_recomputes_masks(self):
+        rfq = RFQ.objects.create(item="Vanilla")
+        supplier = Supplier.objects.create(company_name="Acme")
+        quote = Quote.objects.create(rfq=rfq, supplier=supplier, price_per=2)
+        Supplier.objects.filter(pk=supplier.pk).update(missing_fields=0)  # No save()
+        Quote.objects.filter(pk=quote.pk).update(missing_fields=0)
+        out = StringIO()
+        call_command("rebuild_missing_fields", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual((report["suppliers_updated"], report["quotes_updated"], report["incomplete_quotes"]), (1, 1, 1))
+        quote.refresh_from_db()
+        self.assertNotEqual(quote.missing_fields, 0)
+
+
+class ExtractionUsageReportCommandTest(TestCase):
+    def test_report(self):
+        quote = Quote.objects.create(rfq=RFQ.objects.create(item="Vanilla"), supplier=Supplier.objects.create(company_name="Acme"))
+        Email.objects.create(related_quote=quote, extraction_source=Email.SOURCE_LLM, input_tokens=1000, cost_usd="0.0011")
+        out = StringIO()
+        call_command("extraction_usage_report", "--days", "0", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["totals"]["input_tokens"], 1000)
+        self.assertEqual(report["by_rfq"][0]["cost_usd"], "0.001100")
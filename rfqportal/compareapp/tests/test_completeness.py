@@ -0,0 +1,64 @@
+from datetime import date
+from django.test import SimpleTestCase, TestCase
+from ..completeness import FIELD_BITS, SUPPLIER_CHECKED_FIELDS, masks_with, missing_field_names
+from ..models import RFQ, Quote, Supplier
+from ..services import check_missing_fields_and_generate_email, incomplete_quotes, suppliers_missing, update_supplier
+
+COMPLETE_SUPPLIER = {
+    "main_contact_name": "Ann", "main_contact_email": "ann@acme.com", "main_contact_phone": "555",
+    "hq_address": "1 Main St", "payment_terms": "Net 30",
+}
+COMPLETE_QUOTE = {
+    "date_submitted": date(2025, 1, 2), "price_per": 2, "country_of_origin": "US",
+    "certifications": "Organic", "minimum_order_quantity": 100,
+}
+
+
+class MaskTest(SimpleTestCase):
+    def test_masks_with_covers_every_combination(self):
+        masks = masks_with("payment_terms", SUPPLIER_CHECKED_FIELDS)
+        self.assertEqual(len(masks), 16)
+        self.assertTrue(all(mask & FIELD_BITS["payment_terms"] for mask in masks))
+
+    def test_missing_field_names(self):
+        self.assertEqual(missing_field_names(FIELD_BITS["hq_address"] | FIELD_BITS["price_per"]), ["hq_address", "price_per"])
+
+
+class MissingFieldsTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Vanilla")
+        self.supplier = Supplier.objects.create(company_name="Acme", **COMPLETE_SUPPLIER)
+
+    def test_saving_a_quote_stores_its_and_its_suppliers_missing_fields(self):
+        quote = Quote.objects.create(rfq=self.rfq, supplier=self.supplier, **{**COMPLETE_QUOTE, "country_of_origin": None})
+        self.assertEqual(missing_field_names(quote.missing_fields), ["country_of_origin"])
+        quote.country_of_origin = "Madagascar"
+        quote.save(update_fields=["country_of_origin"])
+        quote.refresh_from_db()
+        self.assertEqual(quote.missing_fields, 0)
+
+    def test_supplier_changes_reach_its_quotes(self):
+        quote = Quote.objects.create(rfq=self.rfq, supplier=self.supplier, **COMPLETE_QUOTE)
+        update_supplier(self.supplier.pk, {"payment_terms": ""})
+        quote.refresh_from_db()
+        self.assertEqual(missing_field_names(quote.missing_fields), ["payment_terms"])
+        self.assertEqual(list(suppliers_missing("payment_terms")), [self.supplier])
+        self.assertFalse(suppliers_missing("hq_address").exists())
+
+    def test_unchanged_supplier_does_not_touch_quotes(self):
+        Quote.objects.create(rfq=self.rfq, supplier=self.supplier, **COMPLETE_QUOTE)
+        with self.assertNumQueries(3):  # Save, then bump the page cache of the supplier's RFQs, but no quote UPDATE
+            self.supplier.company_name = "Acme Foods"
+            self.supplier.save()
+
+    def test_incomplete_quotes(self):
+        Quote.objects.create(rfq=self.rfq, supplier=self.supplier, **COMPLETE_QUOTE)
+        incomplete = Quote.objects.create(rfq=self.rfq, supplier=self.supplier, price_per=3)
+        self.assertEqual(list(incomplete_quotes(self.rfq.id)), [incomplete])
+
+    def test_draft_reads_the_stored_mask(self):
+        quote = Quote.objects.create(rfq=self.rfq, supplier=self.supplier, **{**COMPLETE_QUOTE, "price_per": None})
+        with self.assertNumQueries(1):
+            result = check_missing_fields_and_generate_email(quote.id)
+        self.assertIn("- Price per\n", result["email_body"])
+        self.assertEqual(check_missing_fields_and_generate_email(9999)["status"], "fail")
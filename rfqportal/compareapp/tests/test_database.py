@@ -0,0 +1,62 @@
+import json
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from rfqportal.db_backends.sqlite3.base import DatabaseWrapper
+from ..models import RFQ, Supplier
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "test.sqlite3")
+
+    def wrapper(self, **options):
+        settings_dict = {**connection.settings_dict, "NAME": self.path, "OPTIONS": {"timeout": 0, **options}}
+        wrapper = DatabaseWrapper(settings_dict, alias="sqlite_backend_test")
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_wal_and_synchronous_normal_by_default(self):
+        with self.wrapper().cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "wal")
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_transactions_take_the_write_lock_up_front(self):
+        wrapper = self.wrapper()
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(sqlite3.OperationalError, "database is locked"):
+            other.execute("BEGIN IMMEDIATE")
+        wrapper.connection.execute("ROLLBACK")
+
+    def test_options_can_be_overridden(self):
+        with self.wrapper(journal_mode="delete", synchronous="full").cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "delete")
+
+    def test_invalid_option_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.wrapper(transaction_mode="whenever").ensure_connection()
+
+
+class BenchmarkDbWritesCommandTest(TestCase):
+    def test_benchmark_reports_and_cleans_up(self):
+        out = StringIO()
+        call_command("benchmark_db_writes", "--writes", "4", "--threads", "1", "--suppliers", "2", "--json", stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["requests"], 4)
+        self.assertEqual(results["failed"], 0)
+        self.assertEqual(results["database"]["vendor"], "sqlite")
+        self.assertFalse(RFQ.objects.exists())
+        self.assertFalse(Supplier.objects.exists())
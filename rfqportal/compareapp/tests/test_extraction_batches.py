@@ -0,0 +1,223 @@
+from io import StringIO
+from unittest.mock import patch
+from django.core.management import call_command
+from django.db import DataError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from openai.types import Batch
+from ..extraction_cache import get_cached_extraction, store_extraction
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI, response_payload
+from ..llm_batch import build_batch_request, parse_batch_result
+from ..llm_client import set_transport
+from ..models import RFQ, Quote, Supplier, ExtractionBatch, ExtractionJob
+from ..services import (
+    _save_extraction, claim_next_extraction_job, collect_extraction_batch, enqueue_extraction_job, extraction_batch_due,
+    poll_extraction_batches, submit_extraction_batch,
+)
+
+
+class BatchResultParsingTest(SimpleTestCase):
+    def test_build_batch_request(self):
+        line = build_batch_request("job-1", "Our price is $1.20/lb")
+        self.assertEqual((line["custom_id"], line["method"], line["url"]), ("job-1", "POST", "/v1/responses"))
+        self.assertIn("Our price is $1.20/lb", line["body"]["input"][-1]["content"])
+        self.assertEqual(line["body"]["text"]["format"]["name"], "EmailData")
+        self.assertTrue(line["body"]["text"]["format"]["strict"])
+
+    def test_successful_line(self):
+        result = parse_batch_result({
+            "custom_id": "job-1", "error": None,
+            "response": {"status_code": 200, "body": response_payload(SAMPLE_EXTRACTION)},
+        })
+        self.assertEqual(result.custom_id, "job-1")
+        self.assertEqual(result.data.supplier_company_name, "Acme Ingredients")
+        self.assertIsNone(result.error)
+
+    def test_failed_lines(self):
+        cases = [
+            ({"error": {"code": "batch_expired", "message": "Expired"}}, "batch_expired: Expired"),
+            ({"response": {"status_code": 429, "body": {"error": {"message": "Rate limited"}}}}, "Rate limited"),
+            ({"response": {"status_code": 200, "body": response_payload(
+                SAMPLE_EXTRACTION, status="incomplete", incomplete_reason="max_output_tokens"
+            )}}, "Incomplete response: max_output_tokens"),
+            ({"response": {"status_code": 200, "body": response_payload({"unexpected": True})}}, "did not match the schema"),
+        ]
+        for line, error in cases:
+            result = parse_batch_result({"custom_id": "job-1", "response": None, "error": None, **line})
+            self.assertIsNone(result.data)
+            self.assertIn(error, result.error)
+
+
+@override_settings(OPENAI_BATCH_MAX_ATTEMPTS=2, OPENAI_BATCH_MIN_REQUESTS=3, OPENAI_BATCH_MAX_WAIT=3600)
+class ExtractionBatchServicesTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Test Item")
+        self.use_fake(FakeOpenAI())
+
+    def use_fake(self, fake):
+        self.fake = fake
+        set_transport(fake.transport())
+        self.addCleanup(set_transport, None)
+
+    def queue(self, *email_texts):
+        return [enqueue_extraction_job(email_text, self.rfq, urgent=False) for email_text in email_texts]
+
+    def test_batch_round_trip(self):
+        jobs = self.queue("email 1", "email 2", "email 3")
+
+        batch = submit_extraction_batch()
+        self.assertEqual(batch.status, ExtractionBatch.STATUS_SUBMITTED)
+        self.assertEqual(batch.request_count, 3)
+        self.assertEqual(set(batch.jobs.values_list("status", flat=True)), {ExtractionJob.STATUS_RUNNING})
+
+        self.assertEqual(poll_extraction_batches(), [batch])
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.openai_status, batch.succeeded_count), ("completed", "completed", 3))
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.status, ExtractionJob.STATUS_SUCCEEDED)
+            self.assertEqual(job.quote.emails.get().content, job.email_text)
+        self.assertEqual(Supplier.objects.get().company_name, "Acme Ingredients")
+        # Keyed on the batch model, which answered without routing
+        self.assertIsNotNone(get_cached_extraction("email 1", batch.model))
+        self.assertIsNone(get_cached_extraction("email 1", "gpt-4.1-mini,o4-mini"))
+
+    def test_batch_stays_submitted_until_finished(self):
+        self.use_fake(FakeOpenAI(batch_polls=2))
+        self.queue("email 1")
+        batch = submit_extraction_batch()
+        self.assertEqual(poll_extraction_batches(), [])
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.openai_status), ("submitted", "in_progress"))
+        self.assertEqual(poll_extraction_batches(), [batch])
+
+    def test_partial_failures_are_retried_then_failed(self):
+        def respond(email_text, body):
+            if email_text == "bad email":
+                raise ValueError("Model error")
+            return SAMPLE_EXTRACTION
+        self.use_fake(FakeOpenAI(responder=respond, batch_limit=2))
+        good, bad, late = self.queue("good email", "bad email", "late email")
+
+        submit_extraction_batch()
+        batch = poll_extraction_batches()[0]
+        self.assertEqual((batch.status, batch.openai_status), ("failed", "expired"))
+        self.assertEqual((batch.succeeded_count, batch.failed_count), (1, 2))
+        for job in (good, bad, late):
+            job.refresh_from_db()
+        self.assertEqual(good.status, ExtractionJob.STATUS_SUCCEEDED)
+        self.assertEqual((bad.status, bad.batch), (ExtractionJob.STATUS_QUEUED, None))
+        self.assertIn("batch_expired", late.error)
+
+        # The second attempt runs both in a new batch; the bad email fails for good
+        submit_extraction_batch()
+        poll_extraction_batches()
+        bad.refresh_from_db()
+        late.refresh_from_db()
+        self.assertEqual((bad.status, bad.error), (ExtractionJob.STATUS_FAILED, "Model error"))
+        self.assertEqual(late.status, ExtractionJob.STATUS_SUCCEEDED)
+        self.assertEqual(Quote.objects.count(), 2)
+
+    def test_unsaveable_results_are_retried_and_the_batch_finishes(self):
+        def save(email_text, *args):
+            if email_text == "bad email":
+                raise DataError("value too long for type character varying(20)")
+            return _save_extraction(email_text, *args)
+        good, bad = self.queue("good email", "bad email")
+
+        submit_extraction_batch()
+        with patch("compareapp.services._save_extraction", side_effect=save):
+            batch = poll_extraction_batches()[0]
+        self.assertEqual((batch.status, batch.succeeded_count, batch.failed_count), ("completed", 1, 1))
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual(good.status, ExtractionJob.STATUS_SUCCEEDED)
+        self.assertEqual((bad.status, bad.batch), (ExtractionJob.STATUS_QUEUED, None))
+        self.assertIn("value too long", bad.error)
+        self.assertEqual(Quote.objects.count(), 1)
+
+        # The retry comes from the cache, and fails the job for good when its rows still cannot be written
+        with patch("compareapp.services._save_extraction", side_effect=save):
+            batch = submit_extraction_batch()
+        self.assertEqual((batch.status, batch.succeeded_count, batch.failed_count), ("completed", 0, 1))
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, ExtractionJob.STATUS_FAILED)
+
+    def test_cached_emails_are_not_sent(self):
+        store_extraction("email 1", dict(SAMPLE_EXTRACTION))
+        job, = self.queue("email 1")
+        batch = submit_extraction_batch()
+        self.assertEqual((batch.status, batch.request_count, batch.succeeded_count), ("completed", 0, 1))
+        self.assertEqual(self.fake.requests, [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExtractionJob.STATUS_SUCCEEDED)
+
+    @patch("compareapp.services.submit_batch", side_effect=RuntimeError("API unavailable"))
+    def test_failed_submission_requeues_jobs(self, mock_submit):
+        job, = self.queue("email 1")
+        batch = submit_extraction_batch()
+        self.assertEqual((batch.status, batch.error), ("failed", "API unavailable"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.batch), (ExtractionJob.STATUS_QUEUED, None))
+
+    def test_results_are_collected_once(self):
+        self.queue("email 1")
+        batch = submit_extraction_batch()
+        remote = self.fake.poll_batch(batch.openai_batch_id)
+        self.assertTrue(poll_extraction_batches())
+        self.assertFalse(collect_extraction_batch(batch, Batch.model_validate(remote)))
+        self.assertEqual(Quote.objects.count(), 1)
+
+    def test_realtime_workers_skip_batch_jobs(self):
+        self.queue("email 1")
+        self.assertIsNone(claim_next_extraction_job())
+        realtime = enqueue_extraction_job("email 2", self.rfq)
+        self.assertEqual(claim_next_extraction_job().id, realtime.id)
+
+    def test_extraction_batch_due(self):
+        self.assertFalse(extraction_batch_due())
+        self.queue("email 1", "email 2")
+        self.assertFalse(extraction_batch_due())
+        with self.settings(OPENAI_BATCH_MAX_WAIT=0):
+            self.assertTrue(extraction_batch_due())
+        self.queue("email 3")
+        self.assertTrue(extraction_batch_due())
+
+
+class ExtractionBatchEntryPointsTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Test Item")
+        set_transport(FakeOpenAI().transport())
+        self.addCleanup(set_transport, None)
+
+    def test_submit_non_urgent_email(self):
+        response = self.client.post(
+            reverse('submit-quote-email', args=[self.rfq.id]), {'email_content': 'Quote email', 'non_urgent': '1'}
+        )
+        job = ExtractionJob.objects.get()
+        self.assertRedirects(response, reverse('extraction-job-detail', args=[job.id]))
+        self.assertEqual(job.mode, ExtractionJob.MODE_BATCH)
+        status = self.client.get(reverse('extraction-job-status', args=[job.id])).json()
+        self.assertEqual((status["mode"], status["queue_position"]), ("batch", 1))
+
+    def test_bulk_ingest_non_urgent(self):
+        response = self.client.post(
+            reverse('bulk-email-ingest', args=[self.rfq.id]),
+            data={"emails": ["email 1", "email 2"], "urgent": False},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["queued"], 2)
+        self.assertEqual(
+            set(ExtractionJob.objects.values_list("id", flat=True)), set(response.json()["job_ids"])
+        )
+        self.assertFalse(Quote.objects.exists())
+
+    def test_run_extraction_batches_command(self):
+        enqueue_extraction_job("email 1", self.rfq, urgent=False)
+        out = StringIO()
+        call_command("run_extraction_batches", "--once", "--flush", stdout=out)
+        self.assertIn("1 request(s) sent", out.getvalue())
+        call_command("run_extraction_batches", "--once", stdout=out)
+        self.assertIn("1 succeeded, 0 failed", out.getvalue())
+        self.assertEqual(ExtractionJob.objects.get().status, ExtractionJob.STATUS_SUCCEEDED)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ..extraction_cache import (
+    cache_key, normalize_email_text, get_cached_extraction, store_extraction, evict_extraction_cache,
+    get_cache_stats, reset_cache_stats,
+)
+from ..models import RFQ, ExtractionCacheEntry
+from ..services import process_email_batch, process_email_text
+from .test_services import extracted_email
+
+
+class ExtractionCacheKeyTest(TestCase):
+    def test_near_identical_emails_share_a_key(self):
+        original = "Hello,\n\nOur price is $1.20/lb.\nMOQ 10,000 lbs.\n"
+        forwarded = "---------- Forwarded message ---------\n> HELLO,\n>\n>   our price is $1.20/lb.\n> MOQ 10,000 lbs."
+        self.assertEqual(normalize_email_text(original), normalize_email_text(forwarded))
+        self.assertEqual(cache_key(original), cache_key(forwarded))
+
+    def test_key_depends_on_model_and_prompt_version(self):
+        self.assertNotEqual(cache_key("email", model="o4-mini"), cache_key("email", model="gpt-4.1"))
+        self.assertNotEqual(cache_key("email", prompt_version="1"), cache_key("email", prompt_version="2"))
+
+    def test_key_depends_on_the_model_tiers(self):
+        with self.settings(EXTRACTION_MODEL_TIERS=["gpt-4.1-mini", "o4-mini"]):
+            routed = cache_key("email")
+        with self.settings(EXTRACTION_MODEL_TIERS=["gpt-4.1-mini"]):
+            self.assertNotEqual(cache_key("email"), routed)
+            self.assertEqual(cache_key("email"), cache_key("email", model="gpt-4.1-mini"))
+
+
+@override_settings(EXTRACTION_MODEL_TIERS=["gpt-4.1-mini", "o4-mini"])
+class ExtractionCacheTest(TestCase):
+    def setUp(self):
+        reset_cache_stats()
+        self.rfq = RFQ.objects.create(item="Test Item")
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_text_reuses_cached_extraction(self, mock_extract):
+        mock_extract.return_value = extracted_email()
+        self.assertEqual(process_email_text("Price is $1.20/lb", self.rfq)["status"], "success")
+        self.assertEqual(process_email_text("price is   $1.20/lb ", self.rfq)["status"], "success")
+        self.assertEqual(mock_extract.call_count, 1)
+
+        stats = get_cache_stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["total_hits"], 1)
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_failed_extractions_are_not_cached(self, mock_extract):
+        mock_extract.return_value = None
+        process_email_text("email", self.rfq)
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_escalation_failures_are_not_cached(self, mock_extract):
+        # Every tier gets the price wrong, so the last tier's output is saved but not cached
+        mock_extract.return_value = extracted_email(price_per=0)
+        self.assertEqual(process_email_text("Quote attached", self.rfq)["status"], "success")
+        process_email_batch(["Quote attached"], self.rfq)
+        self.assertEqual(mock_extract.call_count, 4)
+        self.assertFalse(ExtractionCacheEntry.objects.exists())
+
+        mock_extract.return_value = extracted_email()
+        process_email_text("Quote attached", self.rfq)
+        self.assertEqual(ExtractionCacheEntry.objects.get().model, "gpt-4.1-mini,o4-mini")
+
+    @override_settings(EXTRACTION_CACHE_TTL=60)
+    def test_expired_entries_are_ignored(self):
+        store_extraction("email", {"price_per": 1.2}, latency_ms=3000)
+        self.assertEqual(get_cached_extraction("email"), {"price_per": 1.2})
+        ExtractionCacheEntry.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertIsNone(get_cached_extraction("email"))
+
+    @override_settings(EXTRACTION_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        store_extraction("first", {"n": 1})
+        store_extraction("second", {"n": 2})
+        ExtractionCacheEntry.objects.filter(key=cache_key("first")).update(last_used_at=timezone.now() - timedelta(days=1))
+        store_extraction("third", {"n": 3})
+        self.assertIsNone(get_cached_extraction("first"))
+        self.assertEqual(get_cached_extraction("third"), {"n": 3})
+        self.assertEqual(evict_extraction_cache(), 0)
+
+    def test_latency_saved_is_reported(self):
+        store_extraction("email", {"n": 1}, latency_ms=2500)
+        get_cached_extraction("email")
+        get_cached_extraction("email")
+        stats = get_cache_stats()
+        self.assertEqual(stats["latency_saved_ms"], 5000)
+        self.assertEqual(stats["total_latency_saved_ms"], 5000)
+
+    @override_settings(EXTRACTION_CACHE_ENABLED=False)
+    def test_disabled_cache(self):
+        store_extraction("email", {"n": 1})
+        self.assertIsNone(get_cached_extraction("email"))
@@ -0,0 +1,122 @@
+import json
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_cassette import Cassette, CassetteTransport, request_key
+from ..llm_client import reset_client, set_transport
+from ..llm_services import aextract_email_data, extract_email_data, stream_email_data
+
+
+def numbered_responder():
+    """
+    Answer each request with a different price, so replays can be told apart.
+    """
+    calls = iter(range(1, 1000))
+    return lambda email_text, body: {**SAMPLE_EXTRACTION, "price_per": float(next(calls))}
+
+
+class CassetteTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "extraction.json"
+        self.fake = FakeOpenAI(responder=numbered_responder())
+        self.addCleanup(set_transport, None)
+
+    def use(self, mode, latency=0.0):
+        cassette = Cassette(self.path, mode, latency=latency)
+        set_transport(CassetteTransport(cassette, self.fake.transport()))
+        return cassette
+
+    def test_request_key_ignores_json_key_order(self):
+        self.assertEqual(request_key("POST", "/v1/responses", b'{"a": 1, "b": 2}'), request_key("POST", "/v1/responses", b'{"b":2,"a":1}'))
+        self.assertNotEqual(request_key("POST", "/v1/responses", b'{"a": 1}'), request_key("POST", "/v1/responses", b'{"a": 2}'))
+
+    def test_record_then_replay_without_the_api(self):
+        self.use("record")
+        recorded = [extract_email_data("first").price_per, extract_email_data("second").price_per]
+        streamed = list(stream_email_data("third"))
+        self.assertEqual(len(self.fake.requests), 3)
+        self.assertEqual(len(json.loads(self.path.read_text())["interactions"]), 3)
+
+        self.use("replay")
+        self.assertEqual([extract_email_data("first").price_per, extract_email_data("second").price_per], recorded)
+        self.assertEqual(list(stream_email_data("third"))[-1], streamed[-1])
+        self.assertEqual(len(self.fake.requests), 3)
+
+    async def test_async_record_and_replay(self):
+        self.use("record")
+        recorded = (await aextract_email_data("email")).price_per
+        self.use("replay")
+        self.assertEqual((await aextract_email_data("email")).price_per, recorded)
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_repeated_requests_replay_in_order(self):
+        self.use("record")
+        recorded = [extract_email_data("email").price_per for _ in range(2)]
+        self.use("replay")
+        replayed = [extract_email_data("email").price_per for _ in range(3)]
+        self.assertEqual(replayed, recorded + recorded[-1:])
+
+    def test_missing_request(self):
+        self.use("replay")
+        self.assertIsNone(extract_email_data("never recorded"))
+        self.assertEqual(self.fake.requests, [])
+
+    def test_auto_records_only_what_is_missing(self):
+        self.use("record")
+        extract_email_data("first")
+        cassette = self.use("auto")
+        extract_email_data("first")
+        extract_email_data("second")
+        self.assertEqual((len(self.fake.requests), len(cassette)), (2, 2))
+
+    def test_simulated_latency(self):
+        self.use("record")
+        extract_email_data("email")
+        self.use("replay", latency=0.05)
+        started = time.monotonic()
+        extract_email_data("email")
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+
+
+class CassetteSettingsTest(TestCase):
+    def test_client_records_and_replays_over_http(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cassette = str(Path(directory.name) / "http.json")
+        fake = FakeOpenAI(responder=numbered_responder())
+        self.addCleanup(reset_client)
+
+        with fake.serve() as base_url, override_settings(OPENAI_BASE_URL=base_url, OPENAI_CASSETTE=cassette, OPENAI_CASSETTE_MODE="record"):
+            reset_client()
+            recorded = extract_email_data("email").price_per
+        with override_settings(OPENAI_BASE_URL="http://127.0.0.1:9/v1", OPENAI_CASSETTE=cassette, OPENAI_CASSETTE_LATENCY=0.0):
+            reset_client()
+            self.assertEqual(extract_email_data("email").price_per, recorded)
+        self.assertEqual(len(fake.requests), 1)
+
+    def test_benchmark_records_and_replays_a_cassette(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cassette = str(Path(directory.name) / "benchmark.json")
+        fake = FakeOpenAI()
+
+        def benchmark(*args):
+            out = StringIO()
+            call_command("benchmark_extraction", "--concurrency", "1", "--cassette", cassette, *args, stdout=out)
+            return json.loads(out.getvalue())
+
+        with override_settings(RULE_EXTRACTION_ENABLED=False):
+            with fake.serve() as base_url, override_settings(OPENAI_BASE_URL=base_url):
+                recorded = benchmark("--live")
+            replayed = benchmark("--llm-latency", "0")
+        self.assertEqual(replayed["source"], "cassette_replay")
+        self.assertEqual(replayed["runs"][0]["llm_calls"], recorded["runs"][0]["llm_calls"])
+        self.assertEqual(replayed["runs"][0]["tokens"], recorded["runs"][0]["tokens"])
+        self.assertEqual(replayed["precision"], recorded["precision"])
+        self.assertEqual(len(fake.requests), recorded["runs"][0]["llm_calls"])
@@ -0,0 +1,217 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+import httpx
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI, Fault
+from ..llm_client import set_transport
+from ..llm_resilience import (
+    CircuitBreaker, CircuitOpenError, LLMUnavailableError, TokenBucket, acquire_rate_limit, backoff_delay,
+    aretrying, get_circuit_breaker, output_token_budgets, reset_circuit_breaker, retry_after, retrying,
+)
+from ..llm_services import aextract_email_data, extract_email_data, stream_email_data
+from ..models import RFQ, ExtractionJob
+from ..services import claim_next_extraction_job, enqueue_extraction_job, process_email_batch, run_extraction_job
+
+
+def error_with_headers(**headers):
+    return SimpleNamespace(response=httpx.Response(429, headers=headers))
+
+
+class BackoffTest(SimpleTestCase):
+    @override_settings(OPENAI_RETRY_BASE_DELAY=1.0, OPENAI_RETRY_MAX_DELAY=5.0)
+    def test_backoff_is_jittered_and_capped(self):
+        for attempt in range(6):
+            self.assertLessEqual(backoff_delay(attempt), min(5.0, 2 ** attempt))
+        self.assertGreaterEqual(backoff_delay(0, requested=3.0), 3.0)
+
+    def test_retry_after_headers(self):
+        self.assertEqual(retry_after(error_with_headers(**{"retry-after-ms": "250"})), 0.25)
+        self.assertEqual(retry_after(error_with_headers(**{"retry-after": "2"})), 2.0)
+        http_date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+        self.assertAlmostEqual(retry_after(error_with_headers(**{"retry-after": http_date})), 30, delta=2)
+        self.assertIsNone(retry_after(error_with_headers()))
+        self.assertIsNone(retry_after(ValueError()))
+
+    @override_settings(OPENAI_MAX_OUTPUT_TOKENS=3000, OPENAI_MAX_OUTPUT_TOKENS_LIMIT=10000)
+    def test_output_token_budgets(self):
+        self.assertEqual(output_token_budgets(), [3000, 6000, 10000])
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def test_opens_after_threshold_and_half_opens_after_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()  # The trial call
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()  # Only one at a time
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+@override_settings(OPENAI_RETRY_BASE_DELAY=0.001, OPENAI_MAX_RETRIES=2)
+class ResilientExtractionTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+
+    def test_rate_limit_and_timeout_are_retried(self):
+        self.fake.inject(Fault(status=429, retry_after=0.01), Fault(timeout=True))
+        data = extract_email_data("email")
+        self.assertEqual(data.supplier_company_name, SAMPLE_EXTRACTION["supplier_company_name"])
+        self.assertEqual(len(self.fake.requests), 3)
+
+    def test_exhausted_retries_raise_unavailable(self):
+        self.fake.inject(*[Fault(status=503)] * 3)
+        with self.assertRaises(LLMUnavailableError):
+            extract_email_data("email")
+        self.assertEqual(len(self.fake.requests), 3)
+
+    def test_long_retry_after_gives_up_at_once(self):
+        self.fake.inject(Fault(status=429, retry_after=120))
+        with self.assertRaises(LLMUnavailableError) as raised:
+            extract_email_data("email")
+        self.assertEqual(raised.exception.retry_after, 120)
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_client_errors_are_not_retried(self):
+        self.fake.inject(Fault(status=429, code="insufficient_quota"))
+        self.assertIsNone(extract_email_data("email"))
+        self.fake.inject(Fault(status=400))
+        self.assertIsNone(extract_email_data("email"))
+        self.assertEqual(len(self.fake.requests), 2)
+
+    @override_settings(OPENAI_CIRCUIT_FAILURE_THRESHOLD=3)
+    def test_open_circuit_fails_fast(self):
+        set_transport(self.fake.transport())  # Rebuild the breaker from the overridden settings
+        self.fake.inject(*[Fault(status=500)] * 3)
+        with self.assertRaises(LLMUnavailableError):
+            extract_email_data("email")
+        with self.assertRaises(CircuitOpenError):
+            extract_email_data("email")
+        self.assertEqual(len(self.fake.requests), 3)
+        self.assertEqual(get_circuit_breaker().state, CircuitBreaker.OPEN)
+
+    @override_settings(OPENAI_MAX_OUTPUT_TOKENS=1000, OPENAI_MAX_OUTPUT_TOKENS_LIMIT=4000)
+    def test_truncated_output_is_retried_with_a_larger_budget(self):
+        self.fake.inject(Fault(incomplete_reason="max_output_tokens"))
+        data = extract_email_data("email")
+        self.assertEqual(data.price_per, SAMPLE_EXTRACTION["price_per"])
+        self.assertEqual([request["body"]["max_output_tokens"] for request in self.fake.requests], [1000, 2000])
+
+    def test_content_filter_fails(self):
+        self.fake.inject(Fault(incomplete_reason="content_filter"))
+        self.assertIsNone(extract_email_data("email"))
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_async(self):
+        self.fake.inject(Fault(status=502), Fault(incomplete_reason="max_output_tokens"))
+        data = asyncio.run(aextract_email_data("email"))
+        self.assertEqual(data.minimum_order_quantity, SAMPLE_EXTRACTION["minimum_order_quantity"])
+        self.assertEqual(len(self.fake.requests), 3)
+
+    def test_stream(self):
+        self.fake.inject(Fault(status=503), Fault(incomplete_reason="max_output_tokens"))
+        events = list(stream_email_data("email"))
+        self.assertEqual(events[-1][1].price_per, SAMPLE_EXTRACTION["price_per"])
+        self.assertEqual(len(self.fake.requests), 3)
+
+
+class RateLimitTest(TestCase):
+    def test_token_bucket(self):
+        bucket = TokenBucket("test", rate=1.0, capacity=2)
+        self.assertEqual(bucket.try_take(1), 0)
+        self.assertEqual(bucket.try_take(1), 0)
+        self.assertGreater(bucket.try_take(1), 0.9)
+        self.assertEqual(TokenBucket("other", rate=1.0, capacity=2).try_take(2), 0)
+
+    @override_settings(OPENAI_RATE_LIMIT_RPM=6000, OPENAI_RATE_LIMIT_BURST=0.01)
+    def test_acquire_waits_for_refill(self):
+        started = time.monotonic()
+        for _ in range(3):
+            acquire_rate_limit()
+        self.assertGreaterEqual(time.monotonic() - started, 0.015)
+
+    @override_settings(OPENAI_RATE_LIMIT_RPM=1, OPENAI_RATE_LIMIT_BURST=1, OPENAI_RATE_LIMIT_MAX_WAIT=0.1)
+    def test_long_wait_raises_unavailable(self):
+        acquire_rate_limit()
+        with self.assertRaises(LLMUnavailableError):
+            acquire_rate_limit()
+
+    @override_settings(OPENAI_RATE_LIMIT_RPM=1, OPENAI_RATE_LIMIT_BURST=1, OPENAI_RATE_LIMIT_MAX_WAIT=0.1)
+    def test_half_open_trial_is_released_when_the_rate_limit_is_exhausted(self):
+        reset_circuit_breaker()
+        self.addCleanup(reset_circuit_breaker)
+        breaker = get_circuit_breaker()
+        breaker.opened_at = time.monotonic() - breaker.reset_timeout  # Half-open
+        acquire_rate_limit()
+
+        with self.assertRaises(LLMUnavailableError) as raised:
+            next(retrying())
+        self.assertNotIsInstance(raised.exception, CircuitOpenError)
+        self.assertFalse(breaker.trial_in_flight)
+
+        # The async limiter runs its query in another thread, out of this test's transaction
+        with patch("compareapp.llm_resilience.aacquire_rate_limit", side_effect=LLMUnavailableError("rate limit")):
+            with self.assertRaises(LLMUnavailableError) as raised:
+                asyncio.run(anext(aretrying()))
+        self.assertNotIsInstance(raised.exception, CircuitOpenError)
+        self.assertFalse(breaker.trial_in_flight)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+
+    @override_settings(OPENAI_RATE_LIMIT_TPM=1000, OPENAI_RATE_LIMIT_BURST=60, OPENAI_RATE_LIMIT_MAX_WAIT=0.1)
+    def test_tokens_per_minute(self):
+        acquire_rate_limit(tokens=900)
+        with self.assertRaises(LLMUnavailableError):
+            acquire_rate_limit(tokens=200)
+
+
+@override_settings(OPENAI_RETRY_BASE_DELAY=0.001, OPENAI_MAX_RETRIES=0, RULE_EXTRACTION_ENABLED=False)
+class UnavailableServicesTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+        self.rfq = RFQ.objects.create(item="Vanilla")
+
+    def test_job_is_requeued_while_the_llm_is_unavailable(self):
+        self.fake.inject(Fault(status=503, retry_after=5))
+        enqueue_extraction_job("email", self.rfq)
+        job = run_extraction_job(claim_next_extraction_job())
+        self.assertEqual(job.status, ExtractionJob.STATUS_QUEUED)
+        self.assertTrue(job.result["retryable"])
+        self.assertIsNotNone(job.run_after)
+        self.assertIsNone(claim_next_extraction_job())  # Not before run_after
+
+        ExtractionJob.objects.update(run_after=None)
+        job = run_extraction_job(claim_next_extraction_job())
+        self.assertEqual((job.status, job.attempts), (ExtractionJob.STATUS_SUCCEEDED, 2))
+
+    @override_settings(EXTRACTION_JOB_MAX_ATTEMPTS=1)
+    def test_job_fails_after_max_attempts(self):
+        self.fake.inject(Fault(status=503))
+        enqueue_extraction_job("email", self.rfq)
+        self.assertEqual(run_extraction_job(claim_next_extraction_job()).status, ExtractionJob.STATUS_FAILED)
+
+    def test_batch_results_are_marked_retryable(self):
+        self.fake.inject(Fault(status=500))
+        results = process_email_batch(["first", "second"], self.rfq, max_workers=1)
+        self.assertEqual([result["status"] for result in results], ["fail", "success"])
+        self.assertTrue(results[0]["retryable"])
@@ -0,0 +1,116 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from ..llm_routing import extract_with_routing, stream_with_routing, validate_extraction
+from ..llm_services import EmailData
+from ..models import RFQ, ExtractionModelCall
+from ..services import aprocess_email_text, get_model_routing_stats, process_email_batch, process_email_text
+
+TIERS = ["gpt-4.1-mini", "o4-mini"]
+
+
+def sloppy_cheap_model(email_text, body):
+    """
+    The cheap tier misses the MOQ of emails that mention "drums"; the strong tier does not.
+    """
+    if body["model"] == TIERS[0] and "drums" in email_text:
+        return {**SAMPLE_EXTRACTION, "minimum_order_quantity": 0}
+    return SAMPLE_EXTRACTION
+
+
+class ValidateExtractionTest(SimpleTestCase):
+    def validate(self, known=None, **overrides):
+        return validate_extraction(EmailData(**{**SAMPLE_EXTRACTION, **overrides}), known)
+
+    def test_valid(self):
+        self.assertEqual(self.validate(), [])
+
+    def test_problems(self):
+        self.assertEqual(self.validate(supplier_company_name="N/A"), ["supplier_company_name is missing"])
+        self.assertEqual(self.validate(price_per=0), ["price_per 0.0 is implausible"])
+        self.assertEqual(self.validate(minimum_order_quantity=10 ** 10), ["minimum_order_quantity 10000000000 is implausible"])
+        self.assertEqual(self.validate(main_contact_email="jane at acme"), ["main_contact_email 'jane at acme' is not an address"])
+        self.assertEqual(self.validate(date_submitted="last Tuesday"), ["date_submitted 'last Tuesday' is not a date"])
+        self.assertEqual(self.validate(main_contact_email="", date_submitted="null"), [])  # Optional fields may be empty
+
+    def test_known_fields_take_the_models_place(self):
+        self.assertEqual(self.validate(known={"price_per": 1.5}, price_per=0), [])
+
+
+@override_settings(EXTRACTION_MODEL_TIERS=TIERS)
+class ExtractWithRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI(responder=sloppy_cheap_model)
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+
+    def models_called(self):
+        return [request["body"]["model"] for request in self.fake.requests]
+
+    def test_cheap_model_is_enough(self):
+        outcome = extract_with_routing("Price: $1.20/lb")
+        self.assertEqual(self.models_called(), ["gpt-4.1-mini"])
+        self.assertEqual((outcome.model, outcome.escalated), ("gpt-4.1-mini", False))
+        self.assertTrue(outcome.calls[0].accepted)
+
+    def test_failed_validation_escalates(self):
+        outcome = extract_with_routing("$1.20/lb in drums")
+        self.assertEqual(self.models_called(), TIERS)
+        self.assertEqual(outcome.data.minimum_order_quantity, SAMPLE_EXTRACTION["minimum_order_quantity"])
+        self.assertEqual((outcome.model, outcome.escalated), ("o4-mini", True))
+        self.assertEqual(outcome.calls[0].problems, ["minimum_order_quantity 0 is implausible"])
+
+    def test_known_fields_avoid_escalation(self):
+        outcome = extract_with_routing("$1.20/lb in drums", known={"minimum_order_quantity": 4000})
+        self.assertFalse(outcome.escalated)
+
+    def test_last_tier_is_kept_even_if_it_fails_validation(self):
+        self.fake.responder = lambda email_text, body: {**SAMPLE_EXTRACTION, "price_per": 0}
+        outcome = extract_with_routing("email")
+        self.assertEqual(outcome.data.price_per, 0)
+        self.assertEqual([call.accepted for call in outcome.calls], [False, True])
+
+    @override_settings(EXTRACTION_MODEL_TIERS=["o4-mini"])
+    def test_single_tier(self):
+        extract_with_routing("$1.20/lb in drums")
+        self.assertEqual(self.models_called(), ["o4-mini"])
+
+    def test_stream_restarts_on_escalation(self):
+        events = list(stream_with_routing("$1.20/lb in drums"))
+        outcome = events[-1][1]
+        self.assertTrue(outcome.escalated)
+        self.assertGreater(sum(1 for event, _ in events if event == "fields"), 2)
+
+
+@override_settings(EXTRACTION_MODEL_TIERS=TIERS, RULE_EXTRACTION_ENABLED=False, EXTRACTION_CACHE_ENABLED=False)
+class ModelRoutingServicesTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI(responder=sloppy_cheap_model)
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+        self.rfq = RFQ.objects.create(item="Vanilla")
+
+    def test_calls_are_recorded(self):
+        process_email_text("$1.20/lb in drums", self.rfq)
+        self.assertEqual(
+            list(ExtractionModelCall.objects.order_by("tier").values_list("model", "accepted")),
+            [("gpt-4.1-mini", False), ("o4-mini", True)],
+        )
+
+    async def test_async(self):
+        result = await aprocess_email_text("$1.20/lb in drums", self.rfq)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(await ExtractionModelCall.objects.acount(), 2)
+
+    def test_routing_stats(self):
+        process_email_batch(["$1.20/lb", "$1.30/lb", "$1.40/lb", "$1.50/lb in drums"], self.rfq, max_workers=2)
+        stats = get_model_routing_stats()
+        self.assertEqual((stats["extractions"], stats["escalated"], stats["escalation_rate"]), (4, 1, 0.25))
+        self.assertEqual([(tier["model"], tier["calls"]) for tier in stats["tiers"]], [("gpt-4.1-mini", 4), ("o4-mini", 1)])
+
+        out = StringIO()
+        call_command("model_routing_stats", "--days", "1", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["escalated"], 1)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from datetime import date
+from django.test import SimpleTestCase, override_settings
+from ..fake_openai import FakeOpenAI, SAMPLE_EXTRACTION
+from ..llm_client import get_client, reset_client, set_transport
+from ..llm_services import (
+    EXTRACTION_TEXT_FORMAT, EmailData, _partial_fields, astream_email_data, extract_email_data, stream_email_data,
+)
+
+
+class ExtractEmailDataTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+
+    def tearDown(self):
+        set_transport(None)
+
+    def test_extract_email_data(self):
+        data = extract_email_data("Our price is $1.20/lb")
+        self.assertIsInstance(data, EmailData)
+        self.assertEqual(data.supplier_company_name, SAMPLE_EXTRACTION["supplier_company_name"])
+        self.assertEqual(data.certifications, ["Organic", "Kosher"])
+
+        request = self.fake.requests[0]
+        self.assertEqual(request["path"], "/v1/responses")
+        self.assertEqual(request["body"]["model"], "o4-mini")
+        self.assertEqual(request["body"]["text"]["format"]["name"], "EmailData")
+        self.assertIn("Our price is $1.20/lb", request["body"]["input"][1]["content"])
+
+    def test_client_is_shared(self):
+        client = get_client()
+        extract_email_data("first")
+        extract_email_data("second")
+        self.assertIs(get_client(), client)
+        self.assertEqual(len(self.fake.requests), 2)
+
+    def test_client_is_shared_across_threads(self):
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(get_client())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    @override_settings(OPENAI_MAX_CONCURRENCY=2)
+    def test_concurrency_limit(self):
+        reset_client()
+        self.fake.latency = 0.05
+        threads = [threading.Thread(target=extract_email_data, args=(f"email {i}",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.fake.requests), 6)
+        self.assertLessEqual(self.fake.max_in_flight, 2)
+
+    def test_strict_text_format(self):
+        self.assertEqual(EXTRACTION_TEXT_FORMAT["type"], "json_schema")
+        self.assertEqual(EXTRACTION_TEXT_FORMAT["name"], "EmailData")
+        self.assertIs(EXTRACTION_TEXT_FORMAT["strict"], True)
+        schema = EXTRACTION_TEXT_FORMAT["schema"]
+        self.assertIs(schema["additionalProperties"], False)
+        self.assertEqual(schema["required"], [
+            "supplier_company_name", "main_contact_name", "main_contact_email", "main_contact_phone", "hq_address",
+            "payment_terms", "date_submitted", "price_per", "country_of_origin", "certifications",
+            "minimum_order_quantity",
+        ])
+        self.assertEqual(schema["properties"]["price_per"]["type"], "number")
+        self.assertEqual(schema["properties"]["certifications"], {"items": {"type": "string"}, "title": "Certifications", "type": "array"})
+        self.assertEqual(schema["properties"]["minimum_order_quantity"]["type"], "integer")
+
+    def test_blank_date_is_today(self):
+        for blank in ("", "unknown"):
+            self.fake.responder = lambda email_text, body: {**SAMPLE_EXTRACTION, "date_submitted": blank}
+            self.assertEqual(extract_email_data("email").date_submitted, date.today().isoformat())
+
+    def test_api_error_returns_none(self):
+        self.fake.responder = lambda email_text, body: {"unexpected": True}
+        self.assertIsNone(extract_email_data("email"))
+
+
+class StreamEmailDataTest(SimpleTestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+
+    def tearDown(self):
+        set_transport(None)
+
+    def test_partial_fields(self):
+        self.assertEqual(_partial_fields('{"supplier_company_name": "Acme In'), {"supplier_company_name": "Acme In"})
+        self.assertEqual(_partial_fields('{"price_per": 1.2, "certifications": ["Org'), {"price_per": 1.2, "certifications": ["Org"]})
+        self.assertIsNone(_partial_fields(''))
+
+    def test_fields_arrive_before_the_validated_result(self):
+        events = list(stream_email_data("Our price is $1.20/lb"))
+        kinds = [event for event, _ in events]
+        self.assertEqual(kinds[-1], "result")
+        self.assertGreater(kinds.count("fields"), 1)
+        self.assertEqual(events[0][1]["supplier_company_name"][:1], "A")
+        self.assertIsInstance(events[-1][1], EmailData)
+        self.assertEqual(events[-1][1].minimum_order_quantity, 10000)
+        self.assertTrue(self.fake.requests[0]["body"]["stream"])
+
+    def test_invalid_output_yields_no_result(self):
+        self.fake.responder = lambda email_text, body: {"unexpected": True}
+        self.assertEqual(list(stream_email_data("email"))[-1], ("result", None))
+
+    def test_async_stream(self):
+        async def collect():
+            return [event async for event in astream_email_data("email")]
+        events = asyncio.run(collect())
+        self.assertEqual(events[-1][1].supplier_company_name, SAMPLE_EXTRACTION["supplier_company_name"])
+
+
+class FakeOpenAIServerTest(SimpleTestCase):
+    def tearDown(self):
+        reset_client()
+
+    def test_extract_over_local_server(self):
+        fake = FakeOpenAI()
+        with fake.serve() as base_url, override_settings(OPENAI_BASE_URL=base_url):
+            reset_client()
+            self.assertEqual(extract_email_data("email").price_per, SAMPLE_EXTRACTION["price_per"])
+            self.assertEqual(extract_email_data("email").minimum_order_quantity, 10000)
+        self.assertEqual(len(fake.requests), 2)
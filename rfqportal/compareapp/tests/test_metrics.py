@@ -0,0 +1,100 @@
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from ..fake_openai import FakeOpenAI, Fault
+from ..llm_client import set_transport
+from ..llm_resilience import LLMUnavailableError
+from ..llm_services import aextract_email_data, extract_email_data, stream_email_data
+from ..metrics import (
+    HTTP_DB_QUERIES, HTTP_REQUEST_DURATION, LLM_REQUEST_DURATION, LLM_RETRIES, LLM_TOKENS, LLM_UNAVAILABLE,
+    Counter, Histogram, render_metrics, reset_metrics,
+)
+from ..models import RFQ, ExtractionJob
+
+
+class ExpositionTest(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("test_latency_seconds", "Test latency.", ("view",), buckets=(0.1, 1.0), register=False)
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, view='say "hi"')
+        lines = histogram.render()
+        self.assertEqual(lines[1], "# TYPE test_latency_seconds histogram")
+        self.assertEqual(lines[2:], [
+            'test_latency_seconds_bucket{view="say \\"hi\\"",le="0.1"} 1',
+            'test_latency_seconds_bucket{view="say \\"hi\\"",le="1.0"} 3',
+            'test_latency_seconds_bucket{view="say \\"hi\\"",le="+Inf"} 4',
+            'test_latency_seconds_sum{view="say \\"hi\\""} 4.05',
+            'test_latency_seconds_count{view="say \\"hi\\""} 4',
+        ])
+
+    def test_labels_are_checked(self):
+        counter = Counter("test_total", "Test.", ("kind",), register=False)
+        with self.assertRaises(ValueError):
+            counter.inc(model="o4-mini")
+
+
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        reset_metrics()
+        self.rfq = RFQ.objects.create(item="Vanilla")
+
+    def test_views_are_timed_with_their_queries(self):
+        self.client.get(reverse("rfq-detail", args=[self.rfq.id]))
+        self.client.get(reverse("rfq-detail", args=[9999]))
+        self.client.get("/no-such-page/")
+        self.assertEqual(HTTP_REQUEST_DURATION.snapshot(view="rfq-detail", method="GET", status=200)["count"], 1)
+        self.assertEqual(HTTP_REQUEST_DURATION.snapshot(view="rfq-detail", method="GET", status=404)["count"], 1)
+        self.assertEqual(HTTP_REQUEST_DURATION.snapshot(view="unmatched", method="GET", status=404)["count"], 1)
+        self.assertGreaterEqual(HTTP_DB_QUERIES.snapshot(view="rfq-detail")["sum"], 2)
+
+    async def test_async_views_count_their_queries(self):
+        await self.async_client.get(reverse("async-rfq-quotes", args=[self.rfq.id]))
+        self.assertEqual(HTTP_REQUEST_DURATION.snapshot(view="async-rfq-quotes", method="GET", status=200)["count"], 1)
+        self.assertGreater(HTTP_DB_QUERIES.snapshot(view="async-rfq-quotes")["sum"], 0)
+
+    def test_endpoint(self):
+        ExtractionJob.objects.create(rfq=self.rfq, email_text="Price is $2.50/lb")
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertContains(response, 'rfqportal_extraction_jobs{mode="realtime",status="queued"} 1')
+        self.assertContains(response, 'rfqportal_extraction_jobs{mode="batch",status="running"} 0')
+        self.assertContains(response, "rfqportal_llm_requests_in_flight 0")
+        self.client.get(reverse("rfq-list"))
+        self.assertIn('rfqportal_http_request_duration_seconds_count{view="rfq-list",method="GET",status="200"} 1', render_metrics())
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        self.client.get(reverse("rfq-list"))
+        self.assertEqual(HTTP_REQUEST_DURATION.snapshot(view="rfq-list", method="GET", status=200)["count"], 0)
+
+
+@override_settings(OPENAI_RETRY_BASE_DELAY=0.001, OPENAI_MAX_RETRIES=2)
+class LLMMetricsTest(TestCase):
+    def setUp(self):
+        reset_metrics()
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+
+    def test_calls_tokens_and_retries(self):
+        self.fake.inject(Fault(status=429, retry_after=0.01))
+        extract_email_data("email")
+        self.assertEqual(LLM_REQUEST_DURATION.snapshot(endpoint="responses", status=429)["count"], 1)
+        self.assertEqual(LLM_REQUEST_DURATION.snapshot(endpoint="responses", status=200)["count"], 1)
+        self.assertEqual(LLM_RETRIES.value(error="429"), 1)
+        self.assertGreater(LLM_TOKENS.value(model="o4-mini", kind="input"), 0)
+        self.assertGreater(LLM_TOKENS.value(model="o4-mini", kind="output"), 0)
+
+        self.fake.inject(*[Fault(status=503)] * 3)
+        with self.assertRaises(LLMUnavailableError):
+            extract_email_data("email")
+        self.assertEqual(LLM_UNAVAILABLE.value(), 1)
+
+    def test_streamed_usage(self):
+        list(stream_email_data("email"))
+        self.assertEqual(LLM_REQUEST_DURATION.snapshot(endpoint="responses", status=200)["count"], 1)
+        self.assertGreater(LLM_TOKENS.value(model="o4-mini", kind="output"), 0)
+
+    async def test_async_calls(self):
+        await aextract_email_data("email")
+        self.assertGreater(LLM_TOKENS.value(model="o4-mini", kind="input"), 0)
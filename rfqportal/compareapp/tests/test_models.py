@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.test import TestCase
 from ..models import Supplier, RFQ, Quote, Email
 
@@ -20,6 +21,13 @@ class SupplierModelTest(TestCase):
         self.assertEqual(self.supplier.hq_address, "123 Test Street")
         self.assertEqual(self.supplier.payment_terms, "Net 30")
 
+    def test_company_name_is_unique_case_insensitively(self):
+        with self.assertRaises(IntegrityError):
+            Supplier.objects.create(company_name="TEST supplier")
+
+    def test_company_name_lower_lookup(self):
+        self.assertEqual(Supplier.objects.get(company_name__lower="test supplier"), self.supplier)
+
 class RFQModelTest(TestCase):
     def setUp(self):
         self.rfq = RFQ.objects.create(
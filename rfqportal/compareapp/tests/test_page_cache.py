@@ -0,0 +1,151 @@
+import tempfile
+from unittest.mock import patch
+from django.core.cache import caches
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from .. import quote_scoring
+from ..models import RFQ, Email, Quote, Supplier
+from ..page_cache import get_page_cache_stats, invalidate_all, reset_page_cache_stats
+from ..services import process_email_batch
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        caches["pages"].clear()
+        reset_page_cache_stats()
+        self.rfq = RFQ.objects.create(item="Vanilla")
+        self.supplier = Supplier.objects.create(company_name="Acme", payment_terms="Net 30")
+        self.quote = Quote.objects.create(rfq=self.rfq, supplier=self.supplier, price_per=2.50)
+
+    def quotes_page(self, rfq=None):
+        return self.client.get(reverse("rfq-quotes", args=[(rfq or self.rfq).id]))
+
+    def test_repeat_requests_are_served_from_the_cache(self):
+        self.quotes_page()
+        with self.assertNumQueries(1):  # Only the version stamps
+            response = self.quotes_page()
+        self.assertContains(response, "Acme")
+        self.client.get(reverse("supplier-list"))
+        self.client.get(reverse("supplier-list"))
+        stats = get_page_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+        self.assertEqual(stats["pages"]["rfq-quotes"]["hit_rate"], 0.5)
+
+    def test_no_stale_comparison_after_any_write(self):
+        self.quotes_page()
+
+        self.quote.price_per = 2.75
+        self.quote.save()
+        self.assertContains(self.quotes_page(), "2.75")
+
+        self.supplier.payment_terms = "Net 60"
+        self.supplier.save()
+        self.assertContains(self.quotes_page(), "Net 60")
+
+        self.rfq.item = "Bourbon Vanilla"
+        self.rfq.save()
+        self.assertContains(self.quotes_page(), "Bourbon Vanilla")
+
+        other = Quote.objects.create(rfq=self.rfq, supplier=Supplier.objects.create(company_name="Globex"), price_per=3)
+        self.assertContains(self.quotes_page(), "Globex")
+        other.delete()
+        self.assertNotContains(self.quotes_page(), "Globex")
+
+    def test_page_cached_before_rescoring_is_not_served(self):
+        cheaper = Quote.objects.create(rfq=self.rfq, supplier=Supplier.objects.create(company_name="Globex"), price_per=2.00)
+        self.quotes_page()
+        real_update = quote_scoring.update_quote_scores
+
+        def request_lands_first(*args, **kwargs):
+            self.quotes_page()  # Between the quote's page cache bump and the rescore
+            real_update(*args, **kwargs)
+        self.quote.price_per = 1.50
+        with patch("compareapp.quote_scoring.update_quote_scores", side_effect=request_lands_first):
+            self.quote.save()
+
+        quotes = self.quotes_page().context["quotes"]
+        self.assertEqual([quote["id"] for quote in quotes], [self.quote.id, cheaper.id])
+        self.assertEqual(quotes[0]["score"]["rank"], 1)
+
+    def test_moving_a_quote_refreshes_both_rfqs(self):
+        other = RFQ.objects.create(item="Cocoa")
+        self.quotes_page()
+        self.quotes_page(other)
+        self.quote.rfq = other
+        self.quote.save()
+        self.assertNotContains(self.quotes_page(), "Acme")
+        self.assertContains(self.quotes_page(other), "Acme")
+
+    def test_email_writes_refresh_the_comparison(self):
+        self.quotes_page()
+        Email.objects.create(related_quote_id=self.quote.id, content="Price is $2.50/lb")
+        self.assertEqual(get_page_cache_stats()["misses"], 1)
+        self.quotes_page()
+        self.assertEqual(get_page_cache_stats()["misses"], 2)
+
+    def test_a_failed_rfq_delete_does_not_stop_email_refreshes(self):
+        other = RFQ.objects.create(item="Cocoa")
+        Quote.objects.create(rfq=other, supplier=self.supplier)
+
+        def fail(sender, **kwargs):
+            raise DatabaseError("Simulated failure")
+        post_delete.connect(fail, sender=Quote, dispatch_uid="test_failed_rfq_delete")
+        self.addCleanup(post_delete.disconnect, sender=Quote, dispatch_uid="test_failed_rfq_delete")
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            other.delete()
+        post_delete.disconnect(sender=Quote, dispatch_uid="test_failed_rfq_delete")
+
+        self.quotes_page()
+        Email.objects.create(related_quote_id=self.quote.id, content="Price is $2.50/lb")
+        self.quotes_page()
+        self.assertEqual(get_page_cache_stats()["misses"], 2)
+
+    @override_settings(RULE_EXTRACTION_ENABLED=False, EXTRACTION_CACHE_ENABLED=False)
+    def test_bulk_ingested_quotes_appear(self):
+        set_transport(FakeOpenAI(responder=lambda email_text, body: {**SAMPLE_EXTRACTION, "supplier_company_name": email_text}).transport())
+        self.addCleanup(set_transport, None)
+        self.quotes_page()
+        self.client.get(reverse("supplier-list"))
+        process_email_batch(["Initech"], self.rfq, max_workers=1)
+        self.assertContains(self.quotes_page(), "Initech")
+        self.assertContains(self.client.get(reverse("supplier-list")), "Initech")
+
+    def test_list_pages_follow_their_rows(self):
+        self.assertNotContains(self.client.get(reverse("rfq-list")), "Saffron")
+        RFQ.objects.create(item="Saffron")
+        self.assertContains(self.client.get(reverse("rfq-list")), "Saffron")
+        self.assertContains(self.client.get(reverse("rfq-list"), {"item": "Saffron"}), "Saffron")
+        self.assertNotContains(self.client.get(reverse("rfq-list"), {"item": "Vanilla"}), "Saffron")
+
+    def test_invalidate_all(self):
+        self.quotes_page()
+        invalidate_all()
+        self.quotes_page()
+        self.assertEqual(get_page_cache_stats()["misses"], 2)
+
+    def test_file_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}
+            with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}, "pages": backend}):
+                self.quotes_page()
+                self.quote.price_per = 4.10
+                self.quote.save()
+                self.assertContains(self.quotes_page(), "4.10")
+                self.quotes_page()
+        self.assertEqual(get_page_cache_stats()["hits"], 1)
+
+    async def test_async_view_shares_the_cache(self):
+        await self.async_client.get(reverse("async-rfq-quotes", args=[self.rfq.id]))
+        response = await self.async_client.get(reverse("async-rfq-quotes", args=[self.rfq.id]))
+        self.assertContains(response, "Acme")
+        self.assertEqual(get_page_cache_stats()["hits"], 1)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        self.quotes_page()
+        self.quotes_page()
+        self.assertEqual(get_page_cache_stats()["hits"] + get_page_cache_stats()["misses"], 0)
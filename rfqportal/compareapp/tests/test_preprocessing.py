@@ -0,0 +1,136 @@
+import json
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import FakeOpenAI
+from ..llm_client import set_transport
+from ..models import RFQ, Email
+from ..preprocessing import count_tokens, html_to_text, preprocess_email
+from ..services import process_email_batch, process_email_text
+
+REPLY_EMAIL = """Hi,   thanks for the RFQ.
+
+Our price is $1.20/lb,    MOQ 10,000 lbs.
+______________________________
+
+Best regards,
+Jane Smith
+Sent from my iPhone
+
+CONFIDENTIALITY NOTICE: This email and any attachments are confidential and
+intended solely for the addressee.
+
+On Mon, Jan 13, 2025 at 9:00 AM Buyer <buyer@example.com>
+wrote:
+> Please quote vanilla extract.
+> Quantity: 5,000 lbs
+"""
+
+
+class PreprocessEmailTest(SimpleTestCase):
+    def test_reply_chain_boilerplate_and_whitespace_are_removed(self):
+        result = preprocess_email(REPLY_EMAIL)
+        self.assertEqual(
+            result.text,
+            "Hi, thanks for the RFQ.\n\nOur price is $1.20/lb, MOQ 10,000 lbs.\n\nBest regards,\nJane Smith",
+        )
+        self.assertLess(result.tokens, result.original_tokens)
+        self.assertFalse(result.truncated)
+
+    def test_outlook_reply_header(self):
+        text = "Price: $2/lb\n\nFrom: Buyer <buyer@example.com>\nSent: Monday\nSubject: RFQ\n\nOld request"
+        self.assertEqual(preprocess_email(text).text, "Price: $2/lb")
+
+    def test_headers_and_forwarded_messages_are_kept(self):
+        text = (
+            "From: Jane <jane@x.example>\nSubject: Fwd: quote\n\nSee below.\n\n"
+            "---------- Forwarded message ---------\nFrom: Sup <s@x.example>\nSubject: quote\n\nPrice: $1/lb"
+        )
+        self.assertEqual(preprocess_email(text).text, text)
+
+    def test_signature_tail_is_dropped(self):
+        signature = "\n".join(f"Line {i}" for i in range(10))
+        result = preprocess_email(f"Price: $1/lb\n-- \n{signature}\n[cid:image001.png]")
+        self.assertEqual(result.text.splitlines()[-1], "Line 5")
+
+    def test_html(self):
+        html = (
+            "<html><head><style>p {color: red}</style></head><body><p>Price: $1.20&nbsp;/lb</p>"
+            "<div>MOQ: 10,000 lbs</div><blockquote>Earlier message</blockquote></body></html>"
+        )
+        self.assertEqual(preprocess_email(html).text, "Price: $1.20 /lb\n\nMOQ: 10,000 lbs")
+        self.assertNotIn("Earlier", html_to_text(html))
+
+    def test_token_budget_keeps_head_and_tail(self):
+        text = "\n".join(f"Line {i} of a very long product catalogue" for i in range(400))
+        result = preprocess_email(text, token_budget=200)
+        self.assertTrue(result.truncated)
+        self.assertLessEqual(result.tokens, 200)
+        self.assertTrue(result.text.startswith("Line 0 "))
+        self.assertTrue(result.text.endswith("Line 399 of a very long product catalogue"))
+        self.assertIn("tokens omitted", result.text)
+
+    def test_token_budget_cuts_inside_a_single_long_line(self):
+        text = "Dear buyer, our price is $1.20/lb. " + "Catalogue entry. " * 3000 + "Regards, Jane Smith, Acme"
+        result = preprocess_email(text, token_budget=200)
+        self.assertTrue(result.truncated)
+        self.assertLessEqual(result.tokens, 200)
+        self.assertTrue(result.text.startswith("Dear buyer, our price is $1.20/lb."))
+        self.assertTrue(result.text.endswith("Regards, Jane Smith, Acme"))
+        self.assertIn("tokens omitted", result.text)
+
+    def test_email_of_only_quotes_is_sent_whole(self):
+        self.assertEqual(preprocess_email("> Price: $1/lb").text, "> Price: $1/lb")
+
+    def test_count_tokens(self):
+        self.assertEqual(count_tokens(""), 0)
+        self.assertGreater(count_tokens("Our price is $1.20/lb"), 3)
+
+
+@override_settings(RULE_EXTRACTION_ENABLED=False)
+class PreprocessingServicesTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+        self.rfq = RFQ.objects.create(item="Vanilla")
+
+    def test_llm_sees_the_reduced_email(self):
+        process_email_text(REPLY_EMAIL, self.rfq)
+        prompt = self.fake.requests[0]["body"]["input"][-1]["content"]
+        self.assertIn("Our price is $1.20/lb", prompt)
+        self.assertNotIn("Please quote vanilla extract", prompt)
+        self.assertNotIn("CONFIDENTIALITY", prompt)
+
+        email = Email.objects.get()
+        self.assertEqual(email.content, REPLY_EMAIL)
+        self.assertLess(email.reduced_tokens, email.original_tokens)
+        self.assertFalse(email.truncated)
+
+    def test_cache_is_keyed_on_the_reduced_email(self):
+        process_email_batch([REPLY_EMAIL, REPLY_EMAIL.replace("Please quote", "Kindly quote")], self.rfq)
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertEqual(Email.objects.count(), 2)
+
+    @override_settings(EMAIL_TOKEN_BUDGET=20)
+    def test_truncation_is_recorded(self):
+        process_email_text("Price: $1.20/lb\n" + "Filler line about our company history.\n" * 50, self.rfq)
+        email = Email.objects.get()
+        self.assertTrue(email.truncated)
+        self.assertLessEqual(email.reduced_tokens, 20)
+
+    @override_settings(EMAIL_PREPROCESSING_ENABLED=False)
+    def test_disabled(self):
+        process_email_text(REPLY_EMAIL, self.rfq)
+        self.assertIn("Please quote vanilla extract", self.fake.requests[0]["body"]["input"][-1]["content"])
+        email = Email.objects.get()
+        self.assertEqual(email.reduced_tokens, email.original_tokens)
+
+    def test_email_token_stats_command(self):
+        process_email_text(REPLY_EMAIL, self.rfq)
+        out = StringIO()
+        call_command("email_token_stats", stdout=out)
+        stats = json.loads(out.getvalue())
+        self.assertEqual(stats["emails"], 1)
+        self.assertGreater(stats["tokens_saved"], 0)
+        self.assertEqual(stats["tokens_saved"], stats["original_tokens"] - stats["reduced_tokens"])
@@ -0,0 +1,136 @@
+from decimal import Decimal
+from django.db import DatabaseError, transaction
+from django.db.models.signals import post_delete
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from ..models import RFQ, Quote, QuoteScore, Supplier
+from ..quote_scoring import certification_coverage, landed_cost, moq_fit, update_quote_scores
+from ..services import get_quote_matrix, process_email_batch
+
+
+class ScoringRulesTest(SimpleTestCase):
+    def test_moq_fit(self):
+        self.assertEqual(moq_fit(500, Decimal("1000")), 1.0)
+        self.assertEqual(moq_fit(4000, Decimal("1000")), 0.25)
+        self.assertEqual(moq_fit(None, Decimal("1000")), 0.5)
+        self.assertEqual(moq_fit(4000, None), 1.0)
+
+    def test_certification_coverage(self):
+        self.assertEqual(certification_coverage("Organic,Kosher", "organic, Halal"), (0.5, ["Halal"]))
+        self.assertEqual(certification_coverage("", None), (1.0, []))
+        self.assertEqual(certification_coverage("OU Kosher, BRC", "kosher; BRCGS"), (1.0, []))
+
+    def test_landed_cost_buys_at_least_the_moq(self):
+        self.assertEqual(landed_cost(Decimal("2.50"), 500, Decimal("1000")), Decimal("2500.00"))
+        self.assertEqual(landed_cost(Decimal("2.50"), 4000, Decimal("1000")), Decimal("10000.00"))
+        self.assertIsNone(landed_cost(None, 500, Decimal("1000")))
+
+
+@override_settings(QUOTE_SCORE_PRICE_WEIGHT=0.5, QUOTE_SCORE_MOQ_WEIGHT=0.25, QUOTE_SCORE_CERTIFICATION_WEIGHT=0.25)
+class QuoteScoreTableTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Vanilla", amount_required_lbs=1000, required_certifications="Organic, Kosher")
+
+    def add_quote(self, name, price, moq=500, certifications="Organic,Kosher"):
+        supplier = Supplier.objects.create(company_name=name)
+        return Quote.objects.create(
+            rfq=self.rfq, supplier=supplier, price_per=price, minimum_order_quantity=moq, certifications=certifications
+        )
+
+    def ranking(self):
+        return list(QuoteScore.objects.filter(rfq=self.rfq).order_by("rank").values_list("quote__supplier__company_name", "score"))
+
+    def test_quotes_are_scored_and_ranked_on_save(self):
+        self.add_quote("Cheap", 2.00, moq=4000)
+        self.add_quote("Fair", 2.50)
+        self.add_quote("Uncertified", 2.20, certifications="Organic")
+        self.assertEqual(self.ranking(), [("Fair", 0.9), ("Uncertified", 0.8295), ("Cheap", 0.8125)])
+        score = QuoteScore.objects.get(quote__supplier__company_name="Uncertified")
+        self.assertEqual((score.missing_certifications, score.landed_cost), (["Kosher"], Decimal("2200.00")))
+
+    def test_new_lowest_price_renormalizes_the_others(self):
+        fair = self.add_quote("Fair", 2.50)
+        self.assertEqual(QuoteScore.objects.get(quote=fair).price_score, 1.0)
+        self.add_quote("Cheaper", 1.25)
+        self.assertEqual(QuoteScore.objects.get(quote=fair).price_score, 0.5)
+        self.assertEqual(self.ranking()[0][0], "Cheaper")
+
+    def test_changes_and_deletes_rerank(self):
+        first = self.add_quote("First", 2.00)
+        self.add_quote("Second", 2.50)
+        first.price_per = 5.00
+        first.save()
+        self.assertEqual(self.ranking()[0][0], "Second")
+        first.delete()
+        self.assertEqual(self.ranking(), [("Second", 1.0)])
+
+    def test_unscored_fields_do_not_rescore(self):
+        quote = self.add_quote("Fair", 2.50)
+        with self.assertNumQueries(2):  # Save and the page cache bump
+            quote.country_of_origin = "Madagascar"
+            quote.save(update_fields=["country_of_origin"])
+
+    def test_rfq_requirements_rescore(self):
+        quote = self.add_quote("Fair", 2.50, moq=4000)
+        self.rfq.amount_required_lbs = 4000
+        self.rfq.required_certifications = "Organic, Kosher, Halal"
+        self.rfq.save()
+        score = QuoteScore.objects.get(quote=quote)
+        self.assertEqual((score.moq_fit, score.certification_coverage, score.missing_certifications), (1.0, 0.6667, ["Halal"]))
+
+    def test_adding_a_quote_costs_the_same_at_any_size(self):
+        self.add_quote("Supplier 0", 3.00)
+        supplier = Supplier.objects.create(company_name="Next")
+        with self.assertNumQueries(11):  # Insert, page cache bump, then lock, read, score, re-rank and bump again in a savepoint
+            Quote.objects.create(rfq=self.rfq, supplier=supplier, price_per=2.90)
+        for index in range(1, 30):
+            self.add_quote(f"Supplier {index}", 3.00 + index)
+        with self.assertNumQueries(11):
+            Quote.objects.create(rfq=self.rfq, supplier=supplier, price_per=2.80)
+
+    def test_deleting_the_rfq_does_not_rerank_each_quote(self):
+        for index in range(5):
+            self.add_quote(f"Supplier {index}", 3.00 + index)
+        with self.assertNumQueries(11):  # Collect and delete the related rows and bump the page cache, nothing per quote
+            self.rfq.delete()
+        self.assertFalse(QuoteScore.objects.exists())
+
+    def test_a_failed_rfq_delete_does_not_stop_reranking(self):
+        first = self.add_quote("First", 2.00)
+        self.add_quote("Second", 2.50)
+
+        def fail(sender, **kwargs):
+            raise DatabaseError("Simulated failure")
+        post_delete.connect(fail, sender=Quote, dispatch_uid="test_failed_rfq_delete")
+        self.addCleanup(post_delete.disconnect, sender=Quote, dispatch_uid="test_failed_rfq_delete")
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            self.rfq.delete()
+        post_delete.disconnect(sender=Quote, dispatch_uid="test_failed_rfq_delete")
+
+        first.delete()
+        self.assertEqual(self.ranking(), [("Second", 1.0)])
+
+    def test_matrix_scores_unscored_quotes(self):
+        self.add_quote("Fair", 2.50)
+        self.add_quote("Cheap", 2.00)
+        QuoteScore.objects.all().delete()
+        matrix = get_quote_matrix(self.rfq.id)
+        self.assertEqual([(quote["supplier"]["company_name"], quote["score"]["rank"]) for quote in matrix], [("Cheap", 1), ("Fair", 2)])
+        self.assertEqual(QuoteScore.objects.count(), 2)
+
+    @override_settings(RULE_EXTRACTION_ENABLED=False, EXTRACTION_CACHE_ENABLED=False)
+    def test_bulk_created_quotes_are_scored(self):
+        set_transport(FakeOpenAI(responder=lambda email_text, body: {
+            **SAMPLE_EXTRACTION, "supplier_company_name": email_text, "price_per": 2.0 if email_text == "Acme" else 3.0,
+        }).transport())
+        self.addCleanup(set_transport, None)
+        process_email_batch(["Acme", "Globex"], self.rfq, max_workers=1)
+        self.assertEqual([name for name, _ in self.ranking()], ["Acme", "Globex"])
+
+    def test_full_rescore_drops_stale_rows(self):
+        quote = self.add_quote("Fair", 2.50)
+        other = RFQ.objects.create(item="Other")
+        Quote.objects.filter(pk=quote.pk).update(rfq=other)  # No signal
+        update_quote_scores(self.rfq.id)
+        self.assertFalse(QuoteScore.objects.filter(rfq=self.rfq).exists())
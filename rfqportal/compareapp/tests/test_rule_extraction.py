@@ -0,0 +1,149 @@
+import json
+from datetime import date
+from io import StringIO
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from ..models import RFQ, Email, ExtractionJob
+from ..rule_extraction import (
+    extract_with_rules, parse_certifications, parse_date, parse_price, parse_quantity,
+)
+from ..services import enqueue_extraction_job, process_email_batch, process_email_text, submit_extraction_batch
+
+TEMPLATE_EMAIL = """From: Jane Smith <jane@acme.example>
+Date: Wed, 15 Jan 2025 10:00:00 +0000
+Subject: Re: RFQ vanilla extract
+
+Company: Acme Ingredients Inc.
+Price: $2.64/kg
+MOQ: 5 MT
+Country of origin: Madagascar
+Certifications: Organic, Kosher and Halal
+Payment terms: Net 30
+Phone: +1 (555) 010-0100
+Address: 1 Market St, Springfield, IL 62701
+
+Best regards,
+Jane Smith
+"""
+
+FREE_FORM_EMAIL = """Thanks for the RFQ. Our pea protein is $2.10/lb with a minimum order of 20,000 lbs.
+
+Best,
+Olivia"""
+
+
+class RuleParsingTest(SimpleTestCase):
+    def test_parse_price(self):
+        self.assertEqual(parse_price("$1.20/lb"), 1.2)
+        self.assertEqual(parse_price("USD 3.10 per lb FOB"), 3.1)
+        self.assertEqual(parse_price("$2.64/kg"), 1.1975)
+        self.assertEqual(parse_price("9.20", default_unit="gallon"), 9.2)
+        self.assertIsNone(parse_price("on request"))
+
+    def test_parse_quantity(self):
+        self.assertEqual(parse_quantity("10,000 lbs"), 10000)
+        self.assertEqual(parse_quantity("5 MT"), 11023)
+        self.assertEqual(parse_quantity("20k lb"), 20000)
+        self.assertEqual(parse_quantity("1 pallet (2,000 lbs)"), 2000)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date("Wed, 15 Jan 2025 10:00:00 +0000"), "2025-01-15")
+        self.assertEqual(parse_date("January 15, 2025"), "2025-01-15")
+        self.assertEqual(parse_date("01/15/2025"), "2025-01-15")
+        self.assertIsNone(parse_date("next week"))
+
+    def test_parse_certifications(self):
+        self.assertEqual(parse_certifications("Organic, Kosher and Halal"), ["Organic", "Kosher", "Halal"])
+        self.assertEqual(parse_certifications("N/A"), [])
+
+
+class ExtractWithRulesTest(SimpleTestCase):
+    def test_template_email_is_complete(self):
+        rules = extract_with_rules(TEMPLATE_EMAIL)
+        self.assertTrue(rules.is_complete())
+        data = rules.as_extraction()
+        self.assertEqual(data["supplier_company_name"], "Acme Ingredients Inc.")
+        self.assertEqual((data["price_per"], data["minimum_order_quantity"]), (1.1975, 11023))
+        self.assertEqual(data["date_submitted"], "2025-01-15")
+        self.assertEqual(data["field_confidence"]["price_per"], {"source": "rules", "confidence": 0.95})
+
+    def test_free_form_email_needs_the_llm(self):
+        rules = extract_with_rules(FREE_FORM_EMAIL)
+        self.assertEqual(rules.values["price_per"], 2.1)
+        self.assertEqual(rules.values["minimum_order_quantity"], 20000)
+        self.assertIn("supplier_company_name", rules.missing_fields())
+        self.assertNotIn("date_submitted", rules.missing_fields())  # Defaults to today, like the prompt
+
+    def test_conflicting_values_are_left_to_the_llm(self):
+        rules = extract_with_rules("We can do $3.40/lb on drums, or $3.10/lb for a full truckload.")
+        self.assertIn("price_per", rules.missing_fields())
+
+    def test_body_label_overrides_sender(self):
+        rules = extract_with_rules("From: Sales Team <sales@x.example>\n\nContact person: Ama Mensah\n")
+        self.assertEqual(rules.values["main_contact_name"], "Ama Mensah")
+
+    def test_merge_keeps_confident_rule_values(self):
+        llm = {**SAMPLE_EXTRACTION, "price_per": 9.99}
+        data = extract_with_rules(FREE_FORM_EMAIL).merge(llm)
+        self.assertEqual(data["price_per"], 2.1)
+        self.assertEqual(data["supplier_company_name"], SAMPLE_EXTRACTION["supplier_company_name"])
+        self.assertEqual(data["date_submitted"], SAMPLE_EXTRACTION["date_submitted"])
+        self.assertEqual(data["field_confidence"]["hq_address"], {"source": "llm", "confidence": None})
+        self.assertEqual(data["field_confidence"]["price_per"]["source"], "rules")
+
+    def test_defaulted_date(self):
+        rules = extract_with_rules(TEMPLATE_EMAIL.replace("Date: Wed, 15 Jan 2025 10:00:00 +0000\n", ""))
+        data = rules.as_extraction()
+        self.assertEqual(data["date_submitted"], date.today().isoformat())
+        self.assertEqual(data["field_confidence"]["date_submitted"]["source"], "default")
+
+
+class RuleExtractionServicesTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+        self.rfq = RFQ.objects.create(item="Vanilla")
+
+    def test_template_email_skips_the_llm(self):
+        result = process_email_text(TEMPLATE_EMAIL, self.rfq)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.fake.requests, [])
+        extracted = json.loads(Email.objects.get().extracted_data)
+        self.assertEqual(extracted["country_of_origin"], "Madagascar")
+        self.assertEqual(extracted["field_confidence"]["minimum_order_quantity"]["source"], "rules")
+
+    def test_llm_fills_the_remaining_fields(self):
+        process_email_batch([FREE_FORM_EMAIL], self.rfq)
+        self.assertEqual(len(self.fake.requests), 1)
+        extracted = json.loads(Email.objects.get().extracted_data)
+        self.assertEqual(extracted["price_per"], 2.1)
+        self.assertEqual(extracted["supplier_company_name"], SAMPLE_EXTRACTION["supplier_company_name"])
+        self.assertEqual(extracted["field_confidence"]["supplier_company_name"]["source"], "llm")
+
+    @override_settings(RULE_EXTRACTION_ENABLED=False)
+    def test_disabled(self):
+        process_email_text(TEMPLATE_EMAIL, self.rfq)
+        self.assertEqual(len(self.fake.requests), 1)
+        self.assertNotIn("field_confidence", json.loads(Email.objects.get().extracted_data))
+
+    def test_batch_jobs_read_by_rules_are_not_sent(self):
+        job = enqueue_extraction_job(TEMPLATE_EMAIL, self.rfq, urgent=False)
+        batch = submit_extraction_batch()
+        self.assertEqual((batch.status, batch.request_count, batch.succeeded_count), ("completed", 0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExtractionJob.STATUS_SUCCEEDED)
+
+
+class BenchmarkRuleExtractionCommandTest(TestCase):
+    def test_benchmark_over_sample_corpus(self):
+        out = StringIO()
+        call_command("benchmark_rule_extraction", "--llm-latency", "0", "--json", stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results["llm_only"]["llm_calls"], results["emails"])
+        self.assertGreater(results["llm_calls_avoided"], 0)
+        self.assertEqual(results["rules_first"]["failed"], 0)
+        self.assertEqual(results["rules"]["accuracy"], 1.0)
+        self.assertFalse(RFQ.objects.exists())
@@ -1,7 +1,12 @@
-from unittest.mock import patch
+from datetime import timedelta
+import time
+from unittest.mock import MagicMock, patch
 from django.test import TestCase
-from ..services import create_supplier, update_supplier, delete_supplier, create_rfq, update_rfq, delete_rfq, get_quotes_for_rfq, process_email_text
-from ..models import Supplier, RFQ, Quote, Email
+from django.utils import timezone
+from ..services import create_supplier, update_supplier, delete_supplier, create_rfq, update_rfq, delete_rfq, get_quotes_for_rfq, process_email_text, get_quote_comparison
+from ..services import list_rfqs, list_suppliers
+from ..services import process_email_batch, enqueue_extraction_job, claim_next_extraction_job, run_extraction_job, requeue_stale_extraction_jobs
+from ..models import Supplier, RFQ, Quote, Email, ExtractionJob
 
 class ServicesTestCase(TestCase):
 
@@ -56,4 +61,240 @@ class ServicesTestCase(TestCase):
     def test_get_quotes_for_rfq(self):
         rfq = create_rfq(self.rfq_data)
         quotes = get_quotes_for_rfq(rfq.id)
-        self.assertEqual(quotes, [])
\ No newline at end of file
+        self.assertEqual(quotes, [])
+
+    def test_get_quote_comparison(self):
+        rfq = create_rfq(self.rfq_data)
+        supplier = create_supplier(self.supplier_data)
+        quote = Quote.objects.create(rfq=rfq, supplier=supplier, price_per=1.25, certifications="ISO 9001")
+        with self.assertNumQueries(1):
+            quotes = get_quote_comparison(rfq.id)
+        self.assertEqual(quotes[0]["id"], quote.id)
+        self.assertEqual(quotes[0]["certifications"], "ISO 9001")
+        self.assertEqual(quotes[0]["supplier"], {
+            "company_name": "Test Supplier",
+            "main_contact_name": "John Doe",
+            "hq_address": "123 Test St",
+            "payment_terms": "Net 30",
+        })
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_text_reuses_supplier_case_insensitively(self, mock_extract):
+        rfq = create_rfq(self.rfq_data)
+        supplier = create_supplier(self.supplier_data)
+        mock_extract.return_value = extracted_email(supplier_company_name="TEST SUPPLIER")
+        with self.settings(EXTRACTION_CACHE_ENABLED=False):
+            result = process_email_text("Quote from TEST SUPPLIER", rfq)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(Supplier.objects.count(), 1)
+        self.assertEqual(Quote.objects.get(rfq=rfq).supplier, supplier)
+
+class ExtractionJobServicesTestCase(TestCase):
+
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Test Item")
+
+    def test_claim_next_extraction_job_is_fifo(self):
+        first = enqueue_extraction_job("first", self.rfq)
+        enqueue_extraction_job("second", self.rfq)
+        job = claim_next_extraction_job()
+        self.assertEqual(job.id, first.id)
+        self.assertEqual(job.status, ExtractionJob.STATUS_RUNNING)
+        self.assertEqual(job.attempts, 1)
+
+    def test_claim_next_extraction_job_empty_queue(self):
+        self.assertIsNone(claim_next_extraction_job())
+
+    def test_claimed_job_is_not_claimed_twice(self):
+        enqueue_extraction_job("only", self.rfq)
+        self.assertIsNotNone(claim_next_extraction_job())
+        self.assertIsNone(claim_next_extraction_job())
+
+    @patch("compareapp.services.process_email_text")
+    def test_run_extraction_job_success(self, mock_process):
+        quote = Quote.objects.create(rfq=self.rfq, supplier=Supplier.objects.create(company_name="Test Supplier"))
+        mock_process.return_value = {"status": "success", "message": "ok", "quote_id": quote.id}
+        enqueue_extraction_job("email", self.rfq)
+        job = run_extraction_job(claim_next_extraction_job())
+        self.assertEqual(job.status, ExtractionJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.quote, quote)
+        self.assertIsNotNone(job.finished_at)
+
+    @patch("compareapp.services.process_email_text")
+    def test_run_extraction_job_failure(self, mock_process):
+        mock_process.side_effect = RuntimeError("boom")
+        enqueue_extraction_job("email", self.rfq)
+        job = run_extraction_job(claim_next_extraction_job())
+        self.assertEqual(job.status, ExtractionJob.STATUS_FAILED)
+        self.assertEqual(job.error, "boom")
+
+    def test_requeue_stale_extraction_jobs(self):
+        enqueue_extraction_job("email", self.rfq)
+        job = claim_next_extraction_job()
+        ExtractionJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale_extraction_jobs(60), 1)
+        self.assertEqual(ExtractionJob.objects.get(pk=job.pk).status, ExtractionJob.STATUS_QUEUED)
+
+
+def extracted_email(**overrides):
+    """
+    Build a stand-in for the EmailData object returned by extract_email_data.
+    """
+    data = {
+        "supplier_company_name": "Test Supplier",
+        "main_contact_name": "John Doe",
+        "main_contact_email": "john@example.com",
+        "main_contact_phone": "1234567890",
+        "hq_address": "123 Test St",
+        "payment_terms": "Net 30",
+        "date_submitted": "2023-12-01",
+        "price_per": 1.2,
+        "country_of_origin": "USA",
+        "certifications": ["ISO 9001", "Organic"],
+        "minimum_order_quantity": 10000,
+    }
+    data.update(overrides)
+    extracted = MagicMock()
+    extracted.dict.return_value = data
+    return extracted
+
+
+class ProcessEmailBatchTestCase(TestCase):
+
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Test Item")
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch(self, mock_extract):
+        Supplier.objects.create(company_name="Existing Supplier")
+        replies = {
+            "email 1": extracted_email(supplier_company_name="Existing Supplier"),
+            "email 2": None,
+            "email 3": extracted_email(supplier_company_name="New Supplier"),
+            "email 4": extracted_email(supplier_company_name="New Supplier", price_per=1.1),
+        }
+        mock_extract.side_effect = replies.get
+
+        results = process_email_batch(list(replies), self.rfq, max_workers=2)
+
+        self.assertEqual([result["status"] for result in results], ["success", "fail", "success", "success"])
+        self.assertEqual([result["index"] for result in results], [0, 1, 2, 3])
+        self.assertEqual(Supplier.objects.count(), 2)
+        self.assertEqual(Quote.objects.filter(rfq=self.rfq).count(), 3)
+        quote = Quote.objects.get(pk=results[3]["quote_id"])
+        self.assertEqual(quote.supplier.company_name, "New Supplier")
+        self.assertEqual(quote.certifications, "ISO 9001,Organic")
+        self.assertEqual(quote.emails.get().content, "email 4")
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch_runs_extractions_concurrently(self, mock_extract):
+        def slow_extract(email_text, model=None):
+            time.sleep(0.2)
+            return extracted_email(supplier_company_name=email_text)
+        mock_extract.side_effect = slow_extract
+
+        started = time.monotonic()
+        results = process_email_batch([f"Supplier {i}" for i in range(8)], self.rfq, max_workers=8)
+        elapsed = time.monotonic() - started
+
+        self.assertTrue(all(result["status"] == "success" for result in results))
+        self.assertLess(elapsed, 0.8)  # Sequential extraction would take 1.6s
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch_matches_suppliers_case_insensitively(self, mock_extract):
+        existing = Supplier.objects.create(company_name="Acme Foods")
+        replies = {
+            "email 1": extracted_email(supplier_company_name="ACME FOODS"),
+            "email 2": extracted_email(supplier_company_name="Beta Farms"),
+            "email 3": extracted_email(supplier_company_name="beta farms"),
+        }
+        mock_extract.side_effect = replies.get
+
+        results = process_email_batch(list(replies), self.rfq, max_workers=1)
+
+        self.assertEqual(Supplier.objects.count(), 2)
+        quotes = [Quote.objects.get(pk=result["quote_id"]) for result in results]
+        self.assertEqual(quotes[0].supplier, existing)
+        self.assertEqual(quotes[1].supplier, quotes[2].supplier)
+        self.assertEqual(quotes[1].supplier.company_name, "Beta Farms")
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch_cleans_unsaveable_values(self, mock_extract):
+        replies = {
+            "email 1": extracted_email(supplier_company_name="Good Supplier"),
+            "email 2": extracted_email(supplier_company_name="Blank Date", date_submitted=""),
+            "email 3": extracted_email(supplier_company_name="Spelled Date", date_submitted="Dec 1, 2023"),
+            "email 4": extracted_email(supplier_company_name="Huge Price", price_per=1e12),
+        }
+        mock_extract.side_effect = replies.get
+
+        results = process_email_batch(list(replies), self.rfq, max_workers=1)
+
+        self.assertEqual([result["status"] for result in results], ["success"] * 4)
+        quotes = [Quote.objects.get(pk=result["quote_id"]) for result in results]
+        self.assertEqual(quotes[1].date_submitted, timezone.localdate())
+        self.assertIsNone(quotes[2].date_submitted)
+        self.assertIsNone(quotes[3].price_per)
+
+    @patch("compareapp.services._clean_extraction", side_effect=dict)
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch_fails_only_the_email_that_cannot_be_saved(self, mock_extract, mock_clean):
+        replies = {
+            "email 1": extracted_email(supplier_company_name="First Supplier"),
+            "email 2": extracted_email(supplier_company_name="Bad Supplier", date_submitted=""),
+            "email 3": extracted_email(supplier_company_name="Third Supplier"),
+        }
+        mock_extract.side_effect = replies.get
+
+        results = process_email_batch(list(replies), self.rfq, max_workers=1)
+
+        self.assertEqual([result["status"] for result in results], ["success", "fail", "success"])
+        self.assertEqual(
+            sorted(Quote.objects.filter(rfq=self.rfq).values_list("supplier__company_name", flat=True)),
+            ["First Supplier", "Third Supplier"],
+        )
+        self.assertEqual(Email.objects.count(), 2)
+
+    def test_process_email_batch_empty(self):
+        self.assertEqual(process_email_batch([], self.rfq), [])
+
+
+class ListPaginationTestCase(TestCase):
+
+    def setUp(self):
+        today = timezone.localdate()
+        self.active = [RFQ.objects.create(item=f"Active {i}", due_date=today + timedelta(days=i)) for i in range(5)]
+        self.undated = RFQ.objects.create(item="Undated")
+        self.expired = [RFQ.objects.create(item=f"Expired {i}", due_date=today - timedelta(days=i + 1)) for i in range(3)]
+
+    def walk(self, list_function, **filters):
+        seen, cursor = [], None
+        while True:
+            page = list_function(cursor=cursor, page_size=2, **filters)
+            seen.extend(page.items)
+            if not page.has_next:
+                return seen
+            cursor = page.next_cursor
+
+    def test_list_rfqs_hides_expired_by_default(self):
+        rfqs = self.walk(list_rfqs)
+        self.assertEqual({rfq.id for rfq in rfqs}, {rfq.id for rfq in self.active} | {self.undated.id})
+        self.assertEqual([rfq.id for rfq in rfqs], sorted((rfq.id for rfq in rfqs), reverse=True))
+
+    def test_list_rfqs_status_and_date_filters(self):
+        self.assertEqual({rfq.id for rfq in self.walk(list_rfqs, status="expired")}, {rfq.id for rfq in self.expired})
+        self.assertEqual(len(self.walk(list_rfqs, status="all")), 9)
+        rfqs = self.walk(list_rfqs, status="all", due_after=self.active[1].due_date, due_before=self.active[3].due_date)
+        self.assertEqual({rfq.id for rfq in rfqs}, {rfq.id for rfq in self.active[1:4]})
+        self.assertEqual([rfq.item for rfq in list_rfqs(item="undat").items], ["Undated"])
+
+    def test_list_suppliers_pages_in_name_order(self):
+        for name in ["Beta Co", "Alpha", "Beta", "Gamma", "Beta Foods"]:
+            Supplier.objects.create(company_name=name)
+        suppliers = self.walk(list_suppliers)
+        self.assertEqual([supplier.company_name for supplier in suppliers], ["Alpha", "Beta", "Beta Co", "Beta Foods", "Gamma"])
+        self.assertEqual(len({supplier.id for supplier in suppliers}), 5)
+        self.assertEqual(len(self.walk(list_suppliers, company_name="be")), 3)
+
+    def test_malformed_cursor_starts_from_first_page(self):
+        self.assertEqual(list_rfqs(cursor="not-a-cursor", page_size=2).items, list_rfqs(page_size=2).items)
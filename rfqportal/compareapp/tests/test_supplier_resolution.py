@@ -0,0 +1,136 @@
+import time
+from unittest.mock import patch
+from django.test import SimpleTestCase, TestCase, override_settings
+from ..company_names import email_domain, normalize_company_name
+from ..models import RFQ, Quote, Supplier
+from ..services import process_email_batch, process_email_text
+from ..supplier_resolution import SupplierIndex, get_supplier_index, reset_supplier_index, resolve_supplier
+from .test_services import extracted_email
+
+
+class CompanyNameTest(SimpleTestCase):
+    def test_legal_forms_case_and_punctuation_are_ignored(self):
+        for name in ["Acme Inc.", "ACME, Inc", "Acme Incorporated", "The Acme Co.", "Acme L.L.C.", "  acme  "]:
+            self.assertEqual(normalize_company_name(name), "acme", name)
+
+    def test_distinguishing_words_are_kept(self):
+        self.assertEqual(normalize_company_name("Smith & Sons Ltd"), "smith and sons")
+        self.assertEqual(normalize_company_name("Café Müller GmbH"), "cafe muller")
+        self.assertEqual(normalize_company_name("Inc."), "inc")
+        self.assertEqual(normalize_company_name(""), "")
+
+    def test_email_domain(self):
+        self.assertEqual(email_domain("Jane@Acme.Example"), "acme.example")
+        self.assertIsNone(email_domain("jane@gmail.com"))
+        self.assertIsNone(email_domain("not an email"))
+        self.assertIsNone(email_domain(None))
+
+
+@override_settings(SUPPLIER_MATCH_THRESHOLD=0.85)
+class SupplierIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = SupplierIndex()
+        self.index.load([
+            (1, "Acme Ingredients Inc.", "jane@acme.example"),
+            (2, "Acme Farms", None),
+            (3, "Blue River Foods", "sales@blueriver.example"),
+        ])
+
+    def test_exact_normalized_match(self):
+        match = self.index.match("ACME INGREDIENTS, LLC")
+        self.assertEqual((match.supplier_id, match.score, match.reason), (1, 1.0, "exact"))
+
+    def test_similar_name_match(self):
+        match = self.index.match("Acme Ingredient")
+        self.assertEqual(match.supplier_id, 1)
+        self.assertGreaterEqual(match.score, 0.85)
+        self.assertEqual(match.reason, "similar")
+
+    def test_different_company_is_not_matched(self):
+        self.assertIsNone(self.index.match("Acme Foods"))
+        self.assertIsNone(self.index.match("Red River Farms"))
+
+    def test_contact_domain_lifts_a_close_name_over_the_threshold(self):
+        self.assertIsNone(self.index.match("Blue River"))
+        match = self.index.match("Blue River", "orders@BlueRiver.example")
+        self.assertEqual((match.supplier_id, match.reason), (3, "similar+domain"))
+
+    def test_add_replaces_and_remove_drops_entries(self):
+        self.index.add(2, "Zenith Farms")
+        self.assertIsNone(self.index.match("Acme Farms"))
+        self.assertEqual(self.index.match("Zenith Farms").supplier_id, 2)
+        self.index.remove(2)
+        self.assertIsNone(self.index.match("Zenith Farms"))
+        self.assertEqual(self.index.stats()["suppliers"], 2)
+
+    def test_lookups_stay_fast_with_many_suppliers(self):
+        words = ["north", "south", "green", "valley", "river", "golden", "harvest", "prairie", "coastal", "summit"]
+        index = SupplierIndex()
+        index.load(
+            (i, f"{words[i % 10]} {words[i // 10 % 10]} {words[i // 100 % 10]} Supplier {i}", None)
+            for i in range(1, 30001)
+        )
+        started = time.monotonic()
+        for i in range(1, 30001, 150):
+            match = index.match(f"{words[i % 10]} {words[i // 10 % 10]} {words[i // 100 % 10]} Suppliers {i}")
+            self.assertEqual(match.supplier_id, i)
+        self.assertLess((time.monotonic() - started) / 200, 0.05)  # Well under 50ms per lookup
+
+
+@override_settings(SUPPLIER_MATCH_THRESHOLD=0.85, SUPPLIER_INDEX_REFRESH_INTERVAL=0, EXTRACTION_CACHE_ENABLED=False)
+class ResolveSupplierTest(TestCase):
+    def setUp(self):
+        reset_supplier_index()
+        self.addCleanup(reset_supplier_index)
+        self.rfq = RFQ.objects.create(item="Test Item")
+        self.acme = Supplier.objects.create(company_name="Acme Inc.", main_contact_email="jane@acme.example")
+
+    def test_normalized_name_is_stored_on_save(self):
+        self.assertEqual(self.acme.normalized_name, "acme")
+        self.acme.company_name = "Acme Ingredients LLC"
+        self.acme.save(update_fields=["company_name"])
+        self.acme.refresh_from_db()
+        self.assertEqual(self.acme.normalized_name, "acme ingredients")
+
+    def test_resolve_variants_to_one_supplier(self):
+        for name in ["ACME, Inc", "Acme Incorporated", "Acme"]:
+            self.assertEqual(resolve_supplier(name).supplier, self.acme, name)
+        self.assertIsNone(resolve_supplier("Apex Industries"))
+
+    def test_new_and_deleted_suppliers_are_seen(self):
+        get_supplier_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            beta = Supplier.objects.create(company_name="Beta Botanicals")
+        self.assertEqual(resolve_supplier("Beta Botanical").supplier, beta)
+        with self.captureOnCommitCallbacks(execute=True):
+            beta.delete()
+        self.assertIsNone(resolve_supplier("Beta Botanical"))
+
+    def test_stale_index_entry_is_not_trusted(self):
+        get_supplier_index().add(self.acme.id, "Zenith Foods")
+        self.assertIsNone(resolve_supplier("Zenith Food"))
+        self.assertEqual(get_supplier_index().indexed_name(self.acme.id), "acme")
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_text_reuses_resolved_supplier(self, mock_extract):
+        mock_extract.return_value = extracted_email(supplier_company_name="ACME, Incorporated")
+        self.assertEqual(process_email_text("email", self.rfq)["status"], "success")
+        self.assertEqual(Supplier.objects.count(), 1)
+        self.assertEqual(Quote.objects.get().supplier, self.acme)
+
+    @patch("compareapp.llm_routing.extract_email_data")
+    def test_process_email_batch_groups_name_variants(self, mock_extract):
+        replies = {
+            "email 1": extracted_email(supplier_company_name="acme incorporated"),
+            "email 2": extracted_email(supplier_company_name="Northwind Traders Ltd"),
+            "email 3": extracted_email(supplier_company_name="NORTHWIND TRADERS, LLC"),
+        }
+        mock_extract.side_effect = replies.get
+
+        results = process_email_batch(list(replies), self.rfq, max_workers=1)
+
+        quotes = [Quote.objects.get(pk=result["quote_id"]) for result in results]
+        self.assertEqual(quotes[0].supplier, self.acme)
+        self.assertEqual(quotes[1].supplier, quotes[2].supplier)
+        self.assertEqual(quotes[1].supplier.normalized_name, "northwind traders")
+        self.assertEqual(Supplier.objects.count(), 2)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ..fake_openai import SAMPLE_EXTRACTION, FakeOpenAI
+from ..llm_client import set_transport
+from ..models import RFQ, Email, ExtractionBatch, Quote, Supplier
+from ..services import (
+    aprocess_email_text, enqueue_extraction_job, get_extraction_usage_report, poll_extraction_batches,
+    process_email_batch, process_email_text, submit_extraction_batch,
+)
+from ..usage import ExtractionUsage, token_cost
+
+
+class TokenCostTest(SimpleTestCase):
+    def test_snapshot_names_use_their_models_prices(self):
+        # o4-mini: $1.10 input, $0.275 cached, $4.40 output per million
+        self.assertEqual(token_cost("o4-mini-2025-04-16", 1_000_000, 400_000, 100_000), Decimal("0.66") + Decimal("0.11") + Decimal("0.44"))
+        self.assertEqual(token_cost("gpt-4.1-mini", 1_000_000, 0, 0), token_cost("gpt-4.1-mini-2025-04-14", 1_000_000, 0, 0))
+        self.assertEqual(token_cost("o4-mini", 1_000_000, 0, 0, batch=True), Decimal("0.55"))
+
+    def test_unknown_models_cost_nothing(self):
+        with self.assertLogs(level="WARNING"):
+            self.assertEqual(token_cost("o4-minimal", 1000, 0, 1000), 0)
+
+    def test_usage_adds_every_call(self):
+        usage = ExtractionUsage()
+        usage.add("o4-mini", {"input_tokens": 1000, "input_tokens_details": {"cached_tokens": 200}, "output_tokens": 100})
+        usage.add("o4-mini", {"input_tokens": 1000, "output_tokens": 300})
+        self.assertEqual((usage.input_tokens, usage.cached_tokens, usage.output_tokens), (2000, 200, 400))
+        self.assertEqual(usage.cost_usd, token_cost("o4-mini", 2000, 200, 400))
+
+
+@override_settings(RULE_EXTRACTION_ENABLED=False, EXTRACTION_MODEL_TIERS=["o4-mini"])
+class ExtractionUsageTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Vanilla")
+        self.use_fake(FakeOpenAI())
+
+    def use_fake(self, fake):
+        self.fake = fake
+        set_transport(fake.transport())
+        self.addCleanup(set_transport, None)
+
+    def email(self, result):
+        return Email.objects.get(related_quote_id=result["quote_id"])
+
+    def test_llm_extraction_is_stored_with_its_usage(self):
+        email = self.email(process_email_text("Price is $1.20/lb", self.rfq))
+        self.assertEqual((email.extraction_source, email.extraction_model), (Email.SOURCE_LLM, "o4-mini"))
+        self.assertGreater(email.input_tokens, 0)
+        self.assertGreater(email.output_tokens, 0)
+        self.assertEqual(email.cost_usd, token_cost("o4-mini", email.input_tokens, email.cached_tokens, email.output_tokens).quantize(Decimal("0.000001")))
+        self.assertIsNotNone(email.latency_ms)
+        self.assertIsNotNone(email.created_at)
+
+        cached = self.email(process_email_text("Price is $1.20/lb", self.rfq))
+        self.assertEqual((cached.extraction_source, cached.input_tokens, cached.cost_usd, cached.latency_ms), (Email.SOURCE_CACHE, 0, 0, None))
+
+    @override_settings(EXTRACTION_MODEL_TIERS=["gpt-4.1-mini", "o4-mini"])
+    def test_escalated_extraction_counts_both_tiers(self):
+        def respond(email_text, body):
+            return {**SAMPLE_EXTRACTION, "price_per": None} if body["model"] == "gpt-4.1-mini" else SAMPLE_EXTRACTION
+        self.use_fake(FakeOpenAI(responder=respond))
+        email = self.email(process_email_text("Price is $1.20/lb", self.rfq))
+        self.assertEqual(email.extraction_model, "o4-mini")
+        self.assertEqual(len(self.fake.requests), 2)
+        per_call = email.input_tokens // 2
+        self.assertGreater(email.cost_usd, token_cost("o4-mini", per_call, 0, 0))
+
+    def test_batch_duplicates_cost_once(self):
+        results = process_email_batch(["Email A", "Email A", "Email B"], self.rfq, max_workers=2)
+        emails = [self.email(result) for result in results]
+        self.assertEqual([email.extraction_source for email in emails], [Email.SOURCE_LLM, Email.SOURCE_CACHE, Email.SOURCE_LLM])
+        self.assertEqual(emails[1].input_tokens, 0)
+        self.assertGreater(emails[2].input_tokens, 0)
+
+    async def test_async_extraction(self):
+        result = await aprocess_email_text("Price is $1.20/lb", self.rfq)
+        email = await Email.objects.aget(related_quote_id=result["quote_id"])
+        self.assertEqual(email.extraction_source, Email.SOURCE_LLM)
+        self.assertGreater(email.output_tokens, 0)
+
+    @override_settings(OPENAI_BATCH_MIN_REQUESTS=1)
+    def test_batch_api_extraction_is_billed_at_the_batch_price(self):
+        job = enqueue_extraction_job("Price is $1.20/lb", self.rfq, urgent=False)
+        submit_extraction_batch()
+        poll_extraction_batches()
+        job.refresh_from_db()
+        email = job.quote.emails.get()
+        self.assertEqual(email.extraction_source, Email.SOURCE_BATCH)
+        full_price = token_cost("o4-mini", email.input_tokens, email.cached_tokens, email.output_tokens)
+        self.assertEqual(email.cost_usd, (full_price / 2).quantize(Decimal("0.000001")))
+        self.assertEqual(ExtractionBatch.objects.get().succeeded_count, 1)
+
+
+class UsageReportTest(TestCase):
+    def setUp(self):
+        self.vanilla = RFQ.objects.create(item="Vanilla")
+        self.cocoa = RFQ.objects.create(item="Cocoa")
+        self.acme = Supplier.objects.create(company_name="Acme")
+        self.globex = Supplier.objects.create(company_name="Globex")
+        self.add_email(self.vanilla, self.acme, Email.SOURCE_LLM, "0.02", 1000, 1200)
+        self.add_email(self.vanilla, self.globex, Email.SOURCE_LLM, "0.01", 500, 800)
+        self.add_email(self.cocoa, self.acme, Email.SOURCE_CACHE, "0", 0, None)
+        old = self.add_email(self.cocoa, self.globex, Email.SOURCE_BATCH, "0.005", 600, 3_600_000)
+        Email.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=40))
+
+    def add_email(self, rfq, supplier, source, cost, input_tokens, latency_ms):
+        quote = Quote.objects.create(rfq=rfq, supplier=supplier)
+        return Email.objects.create(
+            related_quote=quote, extraction_source=source, extraction_model="o4-mini" if input_tokens else None,
+            input_tokens=input_tokens, output_tokens=input_tokens // 10, cost_usd=Decimal(cost), latency_ms=latency_ms,
+        )
+
+    def test_report(self):
+        report = get_extraction_usage_report()
+        totals = report["totals"]
+        self.assertEqual((totals["emails"], totals["llm_extractions"], totals["batch_extractions"], totals["cache_hits"]), (4, 2, 1, 1))
+        self.assertEqual(totals["cost_usd"], Decimal("0.035"))
+        self.assertEqual(totals["avg_latency_ms"], 1000)  # Realtime calls only
+        self.assertEqual([(row["item"], row["cost_usd"]) for row in report["by_rfq"]], [("Vanilla", Decimal("0.03")), ("Cocoa", Decimal("0.005"))])
+        self.assertEqual([row["company_name"] for row in report["by_supplier"]], ["Acme", "Globex"])
+        self.assertEqual(len(report["by_day"]), 2)
+
+        recent = get_extraction_usage_report(since=timezone.now() - timedelta(days=30))
+        self.assertEqual(recent["totals"]["emails"], 3)
+        self.assertEqual(recent["by_day"][0]["day"], timezone.localdate())
+
+    def test_page(self):
+        response = self.client.get(reverse("usage-report"))
+        self.assertContains(response, "$0.0300")
+        self.assertContains(response, "Vanilla")
+        self.assertEqual(response.context["days"], 30)
+        response = self.client.get(reverse("usage-report"), {"days": 60})
+        self.assertContains(response, "$0.0350")
@@ -1,9 +1,38 @@
 from datetime import date
+from unittest.mock import patch
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase, Client
 from django.urls import reverse
-from ..models import Supplier, RFQ, Quote
+from ..models import Supplier, RFQ, Quote, ExtractionJob
 import json
 from ..forms import RFQForm
+from ..fake_openai import FakeOpenAI, SAMPLE_EXTRACTION
+from ..llm_client import set_transport
+
+class ListViewsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+    def test_rfq_list_paginates_and_hides_expired(self):
+        for index in range(30):
+            RFQ.objects.create(item=f"Item {index}", due_date=date(2999, 1, 1))
+        RFQ.objects.create(item="Old Item", due_date=date(2000, 1, 1))
+        response = self.client.get(reverse('rfq-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rfqs']), 25)
+        self.assertNotContains(response, "Old Item")
+        response = self.client.get(reverse('rfq-list') + '?' + response.context['next_query'])
+        self.assertEqual(len(response.context['rfqs']), 5)
+        self.assertIsNone(response.context['next_query'])
+        response = self.client.get(reverse('rfq-list'), {'status': 'expired'})
+        self.assertContains(response, "Old Item")
+
+    def test_supplier_list_filter(self):
+        Supplier.objects.create(company_name="Acme")
+        Supplier.objects.create(company_name="Globex")
+        response = self.client.get(reverse('supplier-list'), {'company_name': 'glo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([supplier.company_name for supplier in response.context['suppliers']], ["Globex"])
 
 class SupplierDetailViewTest(TestCase):
     def setUp(self):
@@ -20,6 +49,12 @@ class SupplierDetailViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()["company_name"], "Updated-Supplier")
 
+    def test_put_supplier_duplicate_name(self):
+        Supplier.objects.create(company_name="Supplier-B")
+        data = {"company_name": "supplier-b"}
+        response = self.client.put(reverse('supplier-detail', args=[self.supplier.pk]), data=json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
     def test_delete_supplier(self):
         response = self.client.delete(reverse('supplier-detail', args=[self.supplier.pk]))
         self.assertEqual(response.status_code, 204)
@@ -43,6 +78,33 @@ class RFQDetailViewTest(TestCase):
         response = self.client.delete(reverse('rfq-detail', args=[self.rfq.id]))
         self.assertEqual(response.status_code, 204)
 
+class RFQQuotesViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.rfq = RFQ.objects.create(item="Item A")
+
+    def add_quotes(self, count):
+        start = Quote.objects.filter(rfq=self.rfq).count()
+        for index in range(start, start + count):
+            supplier = Supplier.objects.create(company_name=f"Supplier {index}", payment_terms="Net 30")
+            Quote.objects.create(rfq=self.rfq, supplier=supplier, price_per=10 + index)
+
+    def test_get_rfq_quotes(self):
+        self.add_quotes(2)
+        response = self.client.get(reverse('rfq-quotes', args=[self.rfq.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Supplier 1")
+        self.assertEqual(response.context['quotes'][0]['supplier']['payment_terms'], "Net 30")
+
+    def test_query_count_is_constant(self):
+        self.add_quotes(1)
+        with self.assertNumQueries(3):  # Page cache versions, RFQ lookup + joined quote/supplier/score query
+            self.client.get(reverse('rfq-quotes', args=[self.rfq.id]))
+        self.add_quotes(50)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('rfq-quotes', args=[self.rfq.id]))
+        self.assertEqual(len(response.context['quotes']), 51)
+
 class SubmitQuoteEmailViewTest(TestCase):
     def setUp(self):
         self.client = Client()
@@ -51,7 +113,135 @@ class SubmitQuoteEmailViewTest(TestCase):
     def test_post_submit_quote_email(self):
         data = {"email_content": "Sample email content"}
         response = self.client.post(reverse('submit-quote-email', args=[self.rfq.id]), data=data)
-        self.assertEqual(response.status_code, 302)  # Redirects to RFQ list
+        self.assertEqual(response.status_code, 302)  # Redirects to the job status page
+        job = ExtractionJob.objects.get(rfq=self.rfq)
+        self.assertEqual(job.status, ExtractionJob.STATUS_QUEUED)
+        self.assertEqual(job.email_text, "Sample email content")
+        self.assertRedirects(response, reverse('extraction-job-detail', args=[job.id]))
+
+    def test_post_submit_quote_email_empty(self):
+        response = self.client.post(reverse('submit-quote-email', args=[self.rfq.id]), data={"email_content": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(ExtractionJob.objects.exists())
+
+class StreamQuoteEmailViewTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.addCleanup(set_transport, None)
+        self.rfq = RFQ.objects.create(item="Item A")
+
+    def events(self, response):
+        content = b"".join(response.streaming_content).decode()
+        frames = [frame.splitlines() for frame in content.split("\n\n") if frame.startswith("event: ")]
+        return [(lines[0][7:], json.loads(lines[1][6:])) for lines in frames]
+
+    def test_stream_quote_email(self):
+        response = self.client.post(reverse('stream-quote-email', args=[self.rfq.id]), {"email_content": "Price is $1.20/lb"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertFalse(Quote.objects.exists())  # Nothing is written until the stream is consumed
+        events = self.events(response)
+        self.assertEqual(events[0], ("fields", {"price_per": 1.2}))  # Read by the rules before the LLM answers
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(events[-1][1]["status"], "success")
+        self.assertEqual(events[-2], ("fields", SAMPLE_EXTRACTION))
+        self.assertGreater(len(events), 3)
+        quote = Quote.objects.get(pk=events[-1][1]["quote_id"])
+        self.assertEqual(quote.supplier.company_name, SAMPLE_EXTRACTION["supplier_company_name"])
+
+    def test_cached_email_is_not_streamed_from_the_model(self):
+        url = reverse('stream-quote-email', args=[self.rfq.id])
+        self.events(self.client.post(url, {"email_content": "Price is $1.20/lb"}))
+        events = self.events(self.client.post(url, {"email_content": "Price is $1.20/lb"}))
+        # Only the price is read by the rules; the rest comes from the cache
+        self.assertEqual(events, [
+            ("fields", {"price_per": 1.2}), ("fields", SAMPLE_EXTRACTION), events[-1],
+        ])
+        self.assertEqual(len(self.fake.requests), 1)
+
+    def test_invalid_extraction_creates_no_quote(self):
+        self.fake.responder = lambda email_text, body: {"unexpected": True}
+        events = self.events(self.client.post(reverse('stream-quote-email', args=[self.rfq.id]), {"email_content": "email"}))
+        self.assertEqual(events[-1], ("done", {"status": "fail", "message": "Failed to extract data from email."}))
+        self.assertFalse(Quote.objects.exists())
+
+    def test_empty_email(self):
+        response = self.client.post(reverse('stream-quote-email', args=[self.rfq.id]), {"email_content": ""})
+        self.assertEqual(response.status_code, 400)
+
+class ExtractionJobStatusViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.rfq = RFQ.objects.create(item="Item A")
+        self.first = ExtractionJob.objects.create(rfq=self.rfq, email_text="first")
+        self.second = ExtractionJob.objects.create(rfq=self.rfq, email_text="second")
+
+    def test_get_job_status(self):
+        response = self.client.get(reverse('extraction-job-status', args=[self.second.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "queued")
+        self.assertEqual(response.json()["queue_position"], 2)
+
+    def test_get_missing_job_status(self):
+        response = self.client.get(reverse('extraction-job-status', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_get_job_detail(self):
+        response = self.client.get(reverse('extraction-job-detail', args=[self.first.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f"Job #{self.first.id}")
+
+class BulkEmailIngestViewTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.rfq = RFQ.objects.create(item="Item A")
+
+    @patch("compareapp.views.process_email_batch")
+    def test_post_json_emails(self, mock_batch):
+        mock_batch.return_value = [
+            {"index": 0, "status": "success", "message": "ok", "quote_id": 1},
+            {"index": 1, "status": "fail", "message": "Failed to extract data from email."},
+        ]
+        response = self.client.post(
+            reverse('bulk-email-ingest', args=[self.rfq.id]),
+            data=json.dumps({"emails": ["first", "second"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["succeeded"], 1)
+        self.assertEqual(response.json()["failed"], 1)
+        mock_batch.assert_called_once_with(["first", "second"], self.rfq)
+
+    def test_post_invalid_json(self):
+        response = self.client.post(
+            reverse('bulk-email-ingest', args=[self.rfq.id]),
+            data=json.dumps({"emails": "not a list"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @patch("compareapp.views.process_email_batch")
+    def test_post_mbox_and_eml_upload(self, mock_batch):
+        mock_batch.side_effect = lambda emails, rfq: [
+            {"index": index, "status": "fail", "message": "x"} for index in range(len(emails))
+        ]
+        mbox = (
+            b"From sales@acme.com Mon Jan  1 00:00:00 2024\n"
+            b"From: Acme Sales <sales@acme.com>\nSubject: Quote\n\nPrice is $1.20/lb\n>From our farm\n\n"
+            b"From sales@globex.com Mon Jan  1 00:00:00 2024\n"
+            b"From: Globex <sales@globex.com>\nSubject: Re: RFQ\n\nPrice is $1.10/lb\n"
+        )
+        eml = b"From: Initech <sales@initech.com>\nSubject: Quote\n\nPrice is $1.30/lb\n"
+        response = self.client.post(reverse('bulk-email-ingest', args=[self.rfq.id]), data={
+            "files": [SimpleUploadedFile("replies.mbox", mbox), SimpleUploadedFile("reply.eml", eml)],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 3)
+        emails = mock_batch.call_args[0][0]
+        self.assertIn("From: Acme Sales <sales@acme.com>", emails[0])
+        self.assertIn("From our farm", emails[0])
+        self.assertIn("$1.10/lb", emails[1])
+        self.assertIn("sales@initech.com", emails[2])
 
 class CreateRFQViewTest(TestCase):
     def setUp(self):
@@ -118,3 +308,101 @@ class GenerateEmailViewTest(TestCase):
         self.assertIn("email_body", response.json())
         self.assertNotIn("missing", response.json())
 
+
+class GenerateEmailsViewTest(TestCase):
+    def setUp(self):
+        self.rfq = RFQ.objects.create(item="Item A")
+        complete = Supplier.objects.create(
+            company_name="Complete", main_contact_name="Ann", main_contact_email="ann@complete.com",
+            main_contact_phone="555", hq_address="1 Main St", payment_terms="Net 30",
+        )
+        self.complete = Quote.objects.create(
+            rfq=self.rfq, supplier=complete, date_submitted=date(2025, 1, 2), price_per=2, country_of_origin="US",
+            certifications="Organic", minimum_order_quantity=100,
+        )
+        for index in range(5):
+            Quote.objects.create(rfq=self.rfq, supplier=Supplier.objects.create(company_name=f"Supplier {index}"), price_per=10.5)
+
+    def test_drafts_every_quote_in_constant_queries(self):
+        with self.assertNumQueries(2):  # The RFQ, then its quotes joined to their suppliers
+            response = self.client.post(reverse('rfq-generate-emails', args=[self.rfq.id]))
+        data = response.json()
+        self.assertEqual((len(data["quotes"]), data["missing"]), (6, 5))
+        complete = next(quote for quote in data["quotes"] if quote["quote_id"] == self.complete.id)
+        self.assertEqual((complete["status"], complete["missing_fields"]), ("success", []))
+        missing = next(quote for quote in data["quotes"] if quote["company_name"] == "Supplier 0")
+        self.assertIn("payment_terms", missing["missing_fields"])
+        self.assertNotIn("price_per", missing["missing_fields"])
+        single = self.client.post(reverse('generate-email', args=[missing["quote_id"]])).json()
+        self.assertEqual(missing["email_body"], single["email_body"])
+
+    def test_open_rfqs_only(self):
+        expired = RFQ.objects.create(item="Item B", due_date=date(2000, 1, 1))
+        Quote.objects.create(rfq=expired, supplier=Supplier.objects.create(company_name="Late"))
+        data = self.client.post(reverse('generate-emails')).json()
+        self.assertEqual({quote["rfq_id"] for quote in data["quotes"]}, {self.rfq.id})
+
+    def test_unknown_rfq(self):
+        self.assertEqual(self.client.post(reverse('rfq-generate-emails', args=[9999])).status_code, 404)
+
+    async def test_async_generate_emails(self):
+        response = await self.async_client.post(reverse('async-rfq-generate-emails', args=[self.rfq.id]))
+        self.assertEqual(response.json()["missing"], 5)
+
+
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        self.fake = FakeOpenAI()
+        set_transport(self.fake.transport())
+        self.rfq = RFQ.objects.create(item="Item A")
+
+    def tearDown(self):
+        set_transport(None)
+
+    async def test_async_submit_quote_email(self):
+        response = await self.async_client.post(
+            reverse('async-submit-quote-email', args=[self.rfq.id]), data={"email_content": "Price is $1.20/lb"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.url, reverse('async-rfq-quotes', args=[self.rfq.id]))
+        quote = await Quote.objects.select_related('supplier').aget(rfq=self.rfq)
+        self.assertEqual(quote.supplier.company_name, SAMPLE_EXTRACTION["supplier_company_name"])
+        self.assertEqual(len(self.fake.requests), 1)
+
+    async def test_async_submit_quote_email_failure(self):
+        self.fake.responder = lambda email_text, body: {"unexpected": True}
+        response = await self.async_client.post(
+            reverse('async-submit-quote-email', args=[self.rfq.id]), data={"email_content": "Price is $1.20/lb"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Failed to process email content")
+
+    async def test_async_stream_quote_email(self):
+        response = await self.async_client.post(
+            reverse('async-stream-quote-email', args=[self.rfq.id]), data={"email_content": "Price is $1.20/lb"}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn("event: fields", content)
+        self.assertIn('"status": "success"', content)
+        self.assertTrue(await Quote.objects.filter(rfq=self.rfq).aexists())
+
+    async def test_async_rfq_quotes(self):
+        supplier = await Supplier.objects.acreate(company_name="Supplier A", payment_terms="Net 45")
+        await Quote.objects.acreate(rfq=self.rfq, supplier=supplier, price_per=10.5)
+        response = await self.async_client.get(reverse('async-rfq-quotes', args=[self.rfq.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Supplier A")
+        self.assertContains(response, "Net 45")
+
+    async def test_async_rfq_quotes_missing_rfq(self):
+        response = await self.async_client.get(reverse('async-rfq-quotes', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_generate_email(self):
+        supplier = await Supplier.objects.acreate(company_name="Supplier A")
+        quote = await Quote.objects.acreate(rfq=self.rfq, supplier=supplier, price_per=10.5)
+        response = await self.async_client.post(reverse('async-generate-email', args=[quote.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "missing")
+        self.assertIn("Payment terms", response.json()["email_body"])
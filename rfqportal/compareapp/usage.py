@@ -0,0 +1,141 @@
+import contextvars
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+
+from .models import Email
+
+TOKENS_PER_PRICE_UNIT = 1_000_000
+
+# The usage the LLM calls made in this context are added to, if any
+_collector = contextvars.ContextVar("extraction_usage", default=None)
+
+def model_prices(model):
+    """
+    Look up a model's prices in OPENAI_MODEL_PRICES.
+
+    The API answers with dated snapshot names (e.g. "o4-mini-2025-04-16"),
+    so the longest configured name the model starts with is used.
+
+    Args:
+        model (str): The model name.
+
+    Returns:
+        tuple: USD per million input, cached input and output tokens, or
+            None if the model has no prices.
+    """
+    names = [name for name in settings.OPENAI_MODEL_PRICES if model == name or model.startswith(f"{name}-")]
+    if not names:
+        return None
+    return settings.OPENAI_MODEL_PRICES[max(names, key=len)]
+
+def token_cost(model, input_tokens, cached_tokens, output_tokens, batch=False):
+    """
+    What a call cost, at OPENAI_MODEL_PRICES.
+
+    Cached tokens are part of the input tokens and billed at the cached
+    rate. Reasoning tokens are part of the output tokens.
+
+    Args:
+        model (str): The model that answered.
+        batch (bool): True for Batch API calls, billed at OPENAI_BATCH_PRICE_FACTOR.
+
+    Returns:
+        Decimal: The cost in USD; 0 if the model has no prices.
+    """
+    prices = model_prices(model)
+    if prices is None:
+        logging.warning(f"No prices configured for {model}; its calls are counted at no cost.")
+        return Decimal(0)
+    input_price, cached_price, output_price = (Decimal(str(price)) for price in prices)
+    cost = (
+        (input_tokens - cached_tokens) * input_price + cached_tokens * cached_price + output_tokens * output_price
+    ) / TOKENS_PER_PRICE_UNIT
+    if batch:
+        cost *= Decimal(str(settings.OPENAI_BATCH_PRICE_FACTOR))
+    return cost
+
+@dataclass
+class ExtractionUsage:
+    """
+    The tokens, cost and time one email's extraction took, stored on its
+    Email row.
+
+    Attributes:
+        source (str): Where the data came from, one of Email.SOURCE_CHOICES.
+        model (str): The model whose output was kept, if any.
+        latency_ms (int): Time the extraction took; None when no LLM was called.
+    """
+    source: str = Email.SOURCE_LLM
+    model: str = None
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: Decimal = Decimal(0)
+    latency_ms: int = None
+
+    def add(self, model, usage, batch=False):
+        """
+        Add a call's usage block. Every call counts, including retries of
+        incomplete responses and tiers whose output was escalated.
+
+        Args:
+            model (str): The model that answered.
+            usage (dict): The response's usage block.
+            batch (bool): True for Batch API calls.
+        """
+        input_tokens = usage.get("input_tokens") or 0
+        cached_tokens = (usage.get("input_tokens_details") or {}).get("cached_tokens") or 0
+        output_tokens = usage.get("output_tokens") or 0
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += token_cost(model, input_tokens, cached_tokens, output_tokens, batch)
+
+    def email_fields(self):
+        """
+        Returns:
+            dict: The Email fields recording this usage.
+        """
+        return {
+            "extraction_source": self.source,
+            "extraction_model": self.model,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": self.cost_usd,
+            "latency_ms": self.latency_ms,
+        }
+
+@contextmanager
+def collecting_usage(usage):
+    """
+    Add the usage of the LLM calls made in this context to usage.
+
+    The previous collector is restored rather than reset by token, so this
+    can be held across the yields of a generator.
+
+    Args:
+        usage (ExtractionUsage): Where the calls are added.
+    """
+    previous = _collector.get()
+    _collector.set(usage)
+    try:
+        yield usage
+    finally:
+        _collector.set(previous)
+
+def record_usage(model, usage):
+    """
+    Add a Responses API call's usage to the current collector, if any.
+
+    Args:
+        model (str): The model that answered.
+        usage (dict): The response's usage block.
+    """
+    collector = _collector.get()
+    if collector is not None:
+        collector.add(model, usage)
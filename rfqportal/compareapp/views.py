@@ -1,21 +1,66 @@
 # Import necessary modules and classes
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, Http404, StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from django.views import View
-from .models import Supplier, RFQ
+from django.urls import reverse
+from django.db import IntegrityError, transaction
+from .models import Supplier, RFQ, ExtractionJob
 from django.forms.models import model_to_dict
 import json
-from .services import get_quotes_for_rfq, process_email_text, check_missing_fields_and_generate_email
-from .forms import RFQForm
+from .services import list_rfqs, list_suppliers, get_extraction_usage_report
+from .services import get_quote_matrix, aget_quote_matrix, check_missing_fields_and_generate_email, check_missing_fields_and_generate_emails, enqueue_extraction_job, enqueue_extraction_jobs, get_extraction_job_status, process_email_batch
+from .services import aprocess_email_text, acheck_missing_fields_and_generate_email, acheck_missing_fields_and_generate_emails
+from .services import stream_process_email_text, astream_process_email_text
+from .email_parsing import parse_email_upload
+from django.conf import settings
+from .forms import RFQForm, RFQFilterForm, SupplierFilterForm, UsageReportForm
+from .page_cache import RFQS_SCOPE, SUPPLIERS_SCOPE, acached_page, cached_page, rfq_scope
+from . import metrics
+from django.utils import timezone
+from datetime import timedelta
+
+DEFAULT_PAGE_SIZE = 25
+
+def _next_page_query(request, page):
+    """
+    Build the query string for the page after this one, keeping the filters.
+    """
+    if not page.has_next:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = page.next_cursor
+    return params.urlencode()
+
+def _query_params(request):
+    """
+    The query string as part of a page cache key, in a stable order.
+    """
+    return sorted(request.GET.lists())
 
 # Define views for handling supplier-related operations
 class SupplierListView(View):
     """
-    View to list all suppliers.
+    View to list suppliers, one page at a time. Rendered pages are cached
+    until a supplier changes.
     """
     def get(self, request):
-        suppliers = Supplier.objects.all()
-        return render(request, 'compareapp/supplier_list.html', {'suppliers': suppliers})
+        content = cached_page('supplier-list', [SUPPLIERS_SCOPE], _query_params(request), lambda: self.render_page(request).content)
+        return HttpResponse(content)
+
+    def render_page(self, request):
+        form = SupplierFilterForm(request.GET)
+        filters = form.cleaned_data if form.is_valid() else {}
+        page = list_suppliers(
+            company_name=filters.get('company_name'),
+            cursor=filters.get('cursor'),
+            page_size=filters.get('page_size') or DEFAULT_PAGE_SIZE,
+        )
+        return render(request, 'compareapp/supplier_list.html', {
+            'suppliers': page.items,
+            'form': form,
+            'next_query': _next_page_query(request, page),
+        })
 
 class SupplierDetailView(View):
     """
@@ -28,7 +73,11 @@ class SupplierDetailView(View):
     def post(self, request):
         # Create a new supplier
         data = json.loads(request.body)
-        supplier = Supplier.objects.create(**data)
+        try:
+            with transaction.atomic():
+                supplier = Supplier.objects.create(**data)
+        except IntegrityError:
+            return JsonResponse({"error": "A supplier with this company name already exists"}, status=409)
         return JsonResponse(model_to_dict(supplier), status=201)
 
     def put(self, request, pk):
@@ -37,7 +86,11 @@ class SupplierDetailView(View):
         data = json.loads(request.body)
         for field, value in data.items():
             setattr(supplier, field, value)
-        supplier.save()
+        try:
+            with transaction.atomic():
+                supplier.save()
+        except IntegrityError:
+            return JsonResponse({"error": "A supplier with this company name already exists"}, status=409)
         return JsonResponse(model_to_dict(supplier))
 
     def delete(self, request, pk):
@@ -49,11 +102,30 @@ class SupplierDetailView(View):
 # Define views for handling RFQ-related operations
 class RFQListView(View):
     """
-    View to list all RFQs.
+    View to list RFQs, one page at a time. Expired RFQs are hidden by default.
+    Rendered pages are cached until an RFQ changes or the date does.
     """
     def get(self, request):
-        rfqs = RFQ.objects.all()
-        return render(request, 'compareapp/rfq_list.html', {'rfqs': rfqs})
+        params = [_query_params(request), timezone.localdate()]
+        content = cached_page('rfq-list', [RFQS_SCOPE], params, lambda: self.render_page(request).content)
+        return HttpResponse(content)
+
+    def render_page(self, request):
+        form = RFQFilterForm(request.GET)
+        filters = form.cleaned_data if form.is_valid() else {'status': RFQFilterForm.STATUS_ACTIVE}
+        page = list_rfqs(
+            status=filters.get('status'),
+            item=filters.get('item'),
+            due_after=filters.get('due_after'),
+            due_before=filters.get('due_before'),
+            cursor=filters.get('cursor'),
+            page_size=filters.get('page_size') or DEFAULT_PAGE_SIZE,
+        )
+        return render(request, 'compareapp/rfq_list.html', {
+            'rfqs': page.items,
+            'form': form,
+            'next_query': _next_page_query(request, page),
+        })
 
 class RFQDetailView(View):
     """
@@ -88,23 +160,18 @@ class RFQDetailView(View):
 class RFQQuotesView(View):
     """
     View to display quotes for a specific RFQ.
+
+    The RFQ and its quote matrix are cached until the RFQ, its quotes or
+    their suppliers change. The page itself is rendered for each request,
+    as it holds the user's CSRF token.
     """
     def get(self, request, pk):
-        rfq = get_object_or_404(RFQ, pk=pk)
-        quotes = get_quotes_for_rfq(pk)
-        # Add supplier object to each quote if not already present
-        for quote in quotes:
-            if 'supplier' not in quote:
-                supplier = Supplier.objects.get(pk=quote['supplier_id'])
-                quote['supplier'] = {
-                    'company_name': supplier.company_name,
-                    'main_contact_name': supplier.main_contact_name,
-                    'main_contact_email': supplier.main_contact_email,
-                    'main_contact_phone': supplier.main_contact_phone,
-                    'hq_address': supplier.hq_address,
-                    'payment_terms': supplier.payment_terms
-                }
-        return render(request, 'compareapp/rfq_quotes.html', {'rfq': rfq, 'quotes': quotes})
+        compliant_only = request.GET.get('compliant') == '1'
+        context = cached_page('rfq-quotes', [rfq_scope(pk)], [pk, compliant_only], lambda: {
+            'rfq': get_object_or_404(RFQ, pk=pk),
+            'quotes': get_quote_matrix(pk, compliant_only=compliant_only),
+        })
+        return render(request, 'compareapp/rfq_quotes.html', {**context, 'compliant_only': compliant_only})
 
 # Define views for processing email submissions
 class SubmitQuoteEmailView(View):
@@ -116,13 +183,120 @@ class SubmitQuoteEmailView(View):
         return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq})
 
     def post(self, request, pk):
-        # Process the submitted email content
+        # Queue the submitted email content for the extraction workers
         email_content = request.POST.get('email_content')
         rfq = get_object_or_404(RFQ, pk=pk)
-        result = process_email_text(email_content, rfq)
-        if result.get('status') == 'success':
-            return redirect('rfq-list')
-        return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq, 'error': 'Failed to process email content'})
+        if not email_content:
+            return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq, 'error': 'Email content is required'})
+        job = enqueue_extraction_job(email_content, rfq, urgent=not request.POST.get('non_urgent'))
+        return redirect('extraction-job-detail', pk=job.id)
+
+def _sse_event(event, data):
+    """
+    Format one server-sent event with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+def _sse_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Keep nginx from holding events back
+    return response
+
+class StreamQuoteEmailView(View):
+    """
+    View to extract a quote from an email while streaming the fields to the
+    browser as server-sent events.
+
+    Emits "fields" events with the fields extracted so far, then a single
+    "done" event with the processing result.
+    """
+    def post(self, request, pk):
+        email_content = request.POST.get('email_content')
+        rfq = get_object_or_404(RFQ, pk=pk)
+        if not email_content:
+            return JsonResponse({'error': 'Email content is required'}, status=400)
+
+        def events():
+            yield ": extracting\n\n"  # Flush the headers before the model replies
+            for event, data in stream_process_email_text(email_content, rfq):
+                yield _sse_event(event, data)
+
+        return _sse_response(events())
+
+class BulkEmailIngestView(View):
+    """
+    View to ingest a batch of supplier emails for a specific RFQ.
+
+    Accepts either a JSON body (a list of email texts, or an object with an
+    "emails" list) or a multipart upload of .eml / .mbox files under "files".
+
+    Emails are extracted before the response is sent, unless "urgent" is
+    false (a JSON object key or form field): then they are queued for the
+    next OpenAI batch and the job IDs are returned with status 202.
+    """
+    def post(self, request, pk):
+        rfq = get_object_or_404(RFQ, pk=pk)
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+            except json.JSONDecodeError:
+                return JsonResponse({"status": "fail", "message": "Invalid JSON body."}, status=400)
+            emails = data.get('emails') if isinstance(data, dict) else data
+            if not isinstance(emails, list) or not all(isinstance(email, str) for email in emails):
+                return JsonResponse({"status": "fail", "message": "Expected a list of email texts."}, status=400)
+            urgent = data.get('urgent', True) is not False if isinstance(data, dict) else True
+        else:
+            emails = []
+            for uploaded_file in request.FILES.getlist('files'):
+                emails.extend(parse_email_upload(uploaded_file))
+            urgent = request.POST.get('urgent', 'true').lower() not in ('false', '0', 'no')
+
+        if not emails:
+            return JsonResponse({"status": "fail", "message": "No emails provided."}, status=400)
+        if len(emails) > settings.EXTRACTION_BATCH_MAX_EMAILS:
+            return JsonResponse(
+                {"status": "fail", "message": f"At most {settings.EXTRACTION_BATCH_MAX_EMAILS} emails per request."},
+                status=400,
+            )
+
+        if not urgent:
+            jobs = enqueue_extraction_jobs(emails, rfq, urgent=False)
+            return JsonResponse({
+                "rfq_id": rfq.id,
+                "total": len(jobs),
+                "queued": len(jobs),
+                "job_ids": [job.id for job in jobs],
+            }, status=202)
+
+        results = process_email_batch(emails, rfq)
+        succeeded = sum(1 for result in results if result['status'] == 'success')
+        return JsonResponse({
+            "rfq_id": rfq.id,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        })
+
+# Define views for tracking background extraction jobs
+class ExtractionJobDetailView(View):
+    """
+    View to display the progress of an extraction job.
+    """
+    def get(self, request, pk):
+        job = get_object_or_404(ExtractionJob.objects.select_related('rfq'), pk=pk)
+        return render(request, 'compareapp/extraction_job.html', {'job': job})
+
+class ExtractionJobStatusView(View):
+    """
+    View to poll the status of an extraction job.
+    """
+    def get(self, request, pk):
+        status = get_extraction_job_status(pk)
+        if status is None:
+            raise Http404("Extraction job not found")
+        return JsonResponse(status)
 
 # Define views for creating RFQs
 class CreateRFQView(View):
@@ -161,3 +335,126 @@ class GenerateEmailView(View):
         """
         result = check_missing_fields_and_generate_email(pk)
         return JsonResponse(result)
+
+class GenerateEmailsView(View):
+    """
+    View to generate the missing-field email drafts for every quote of an
+    RFQ, or of all open RFQs, in one request.
+    """
+    def post(self, request, pk=None):
+        """
+        Handle POST requests to generate the email drafts.
+
+        Args:
+            request (HttpRequest): The HTTP request object.
+            pk (int): The primary key of the RFQ, or None for all open RFQs.
+
+        Returns:
+            JsonResponse: The drafts by quote, or a 404 for an unknown RFQ.
+        """
+        if pk is not None:
+            get_object_or_404(RFQ, pk=pk)
+        return JsonResponse(check_missing_fields_and_generate_emails(pk))
+
+class UsageReportView(View):
+    """
+    View to report extraction tokens, spend and latency per RFQ, per
+    supplier and per day, over the last ?days= days.
+    """
+    def get(self, request):
+        form = UsageReportForm(request.GET)
+        days = form.cleaned_data['days'] if form.is_valid() else UsageReportForm.DEFAULT_DAYS
+        report = get_extraction_usage_report(since=timezone.now() - timedelta(days=days))
+        return render(request, 'compareapp/usage_report.html', {**report, 'days': days})
+
+class MetricsView(View):
+    """
+    View to expose this process's metrics in the Prometheus text format.
+    """
+    def get(self, request):
+        if not settings.METRICS_ENABLED:
+            raise Http404("Metrics are disabled")
+        return HttpResponse(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
+
+
+# Define async (ASGI) variants of the extraction and quote views.
+# Served under /async/; run the project with an ASGI server (rfqportal.asgi)
+# so that one worker can hold many in-flight LLM calls.
+async def _aget_rfq_or_404(pk):
+    try:
+        return await RFQ.objects.aget(pk=pk)
+    except RFQ.DoesNotExist:
+        raise Http404("RFQ not found")
+
+def _async_submit_urls(rfq):
+    return {
+        'stream_url': reverse('async-stream-quote-email', args=[rfq.id]),
+        'quotes_url': reverse('async-rfq-quotes', args=[rfq.id]),
+    }
+
+class AsyncRFQQuotesView(View):
+    """
+    Async view to display quotes for a specific RFQ.
+    """
+    async def get(self, request, pk):
+        compliant_only = request.GET.get('compliant') == '1'
+
+        async def compute():
+            rfq = await _aget_rfq_or_404(pk)
+            return {'rfq': rfq, 'quotes': await aget_quote_matrix(pk, compliant_only=compliant_only)}
+
+        context = await acached_page('rfq-quotes', [rfq_scope(pk)], [pk, compliant_only], compute)
+        return render(request, 'compareapp/rfq_quotes.html', {**context, 'compliant_only': compliant_only})
+
+class AsyncSubmitQuoteEmailView(View):
+    """
+    Async view to extract a quote from an email while the request waits.
+    """
+    async def get(self, request, pk):
+        rfq = await _aget_rfq_or_404(pk)
+        return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq, **_async_submit_urls(rfq)})
+
+    async def post(self, request, pk):
+        email_content = request.POST.get('email_content')
+        rfq = await _aget_rfq_or_404(pk)
+        if not email_content:
+            return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq, 'error': 'Email content is required', **_async_submit_urls(rfq)})
+        result = await aprocess_email_text(email_content, rfq)
+        if result.get('status') == 'success':
+            return redirect('async-rfq-quotes', pk=rfq.id)
+        return render(request, 'compareapp/submit_quote_email.html', {'rfq': rfq, 'error': 'Failed to process email content', **_async_submit_urls(rfq)})
+
+class AsyncStreamQuoteEmailView(View):
+    """
+    Async view to stream a quote extraction as server-sent events.
+    """
+    async def post(self, request, pk):
+        email_content = request.POST.get('email_content')
+        rfq = await _aget_rfq_or_404(pk)
+        if not email_content:
+            return JsonResponse({'error': 'Email content is required'}, status=400)
+
+        async def events():
+            yield ": extracting\n\n"
+            async for event, data in astream_process_email_text(email_content, rfq):
+                yield _sse_event(event, data)
+
+        return _sse_response(events())
+
+class AsyncGenerateEmailView(View):
+    """
+    Async view to generate an email draft for missing fields in a quote.
+    """
+    async def post(self, request, pk):
+        result = await acheck_missing_fields_and_generate_email(pk)
+        return JsonResponse(result)
+
+class AsyncGenerateEmailsView(View):
+    """
+    Async view to generate the missing-field email drafts for every quote
+    of an RFQ, or of all open RFQs.
+    """
+    async def post(self, request, pk=None):
+        if pk is not None:
+            await _aget_rfq_or_404(pk)
+        return JsonResponse(await acheck_missing_fields_and_generate_emails(pk))
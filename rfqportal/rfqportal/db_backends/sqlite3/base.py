@@ -0,0 +1,54 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TRANSACTION_MODES = {"DEFERRED", "IMMEDIATE", "EXCLUSIVE"}
+# OPTIONS applied by this backend instead of being passed to sqlite3.connect(): default and allowed values
+EXTRA_OPTIONS = {
+    "journal_mode": ("WAL", JOURNAL_MODES),
+    "synchronous": ("NORMAL", SYNCHRONOUS_MODES),
+    "transaction_mode": ("IMMEDIATE", TRANSACTION_MODES),
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend tuned for several processes and threads writing at once.
+
+    - journal_mode=WAL lets readers and the single writer proceed without
+      blocking each other.
+    - synchronous=NORMAL is durable across application crashes in WAL mode
+      and skips the fsync on every commit.
+    - transaction_mode=IMMEDIATE takes the write lock when a transaction
+      starts. A deferred transaction that reads and then writes cannot wait
+      for the lock (SQLite fails it at once with "database is locked");
+      an immediate one waits up to the "timeout" option instead.
+
+    Each can be overridden in the database OPTIONS.
+    """
+    def _extra_option(self, name):
+        default, allowed = EXTRA_OPTIONS[name]
+        value = str(self.settings_dict["OPTIONS"].get(name, default)).upper()
+        if value not in allowed:
+            raise ImproperlyConfigured(
+                f"DATABASES OPTIONS {name}={value!r} is not one of {', '.join(sorted(allowed))}."
+            )
+        return value
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in EXTRA_OPTIONS:
+            self._extra_option(name)  # Fail on connect rather than on the first transaction
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        if not self.is_in_memory_db():
+            conn.execute(f"PRAGMA journal_mode = {self._extra_option('journal_mode')}")
+        conn.execute(f"PRAGMA synchronous = {self._extra_option('synchronous')}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(f"BEGIN {self._extra_option('transaction_mode')}")
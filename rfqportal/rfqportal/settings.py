@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Choices, Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'compareapp.middleware.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,12 +76,49 @@ WSGI_APPLICATION = 'rfqportal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (default) suits a single node; use postgres when several
+# web processes or extraction workers write at the same time.
+DB_ENGINE = config('DB_ENGINE', default='sqlite', cast=Choices(['sqlite', 'postgres']))
+
+# Seconds a connection is kept open for reuse by later requests (0 closes it after each request)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+if DB_ENGINE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='rfqportal'),
+            'USER': config('DB_USER', default='rfqportal'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            # Check persistent connections before reuse, so a restarted server does not fail the next request
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            # Required when connecting through PgBouncer in transaction pooling mode
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_POOLER', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=10, cast=int),
+                'sslmode': config('DB_SSLMODE', default='prefer'),
+                'application_name': 'rfqportal',
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            # Django's SQLite backend with WAL journaling and write-locking transactions (see rfqportal/db_backends)
+            'ENGINE': 'rfqportal.db_backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': config('DB_SQLITE_TIMEOUT', default=20.0, cast=float),  # Seconds to wait for the write lock
+                'journal_mode': config('DB_SQLITE_JOURNAL_MODE', default='WAL'),
+                'synchronous': config('DB_SQLITE_SYNCHRONOUS', default='NORMAL'),
+                'transaction_mode': config('DB_SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -125,4 +163,113 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # OpenAI API key
-OPENAI_API_KEY = config('OPENAI_API_KEY')
\ No newline at end of file
+OPENAI_API_KEY = config('OPENAI_API_KEY')
+# Background extraction workers (python manage.py run_extraction_worker)
+EXTRACTION_WORKER_CONCURRENCY = config('EXTRACTION_WORKER_CONCURRENCY', default=4, cast=int)
+EXTRACTION_WORKER_POLL_INTERVAL = config('EXTRACTION_WORKER_POLL_INTERVAL', default=1.0, cast=float)
+EXTRACTION_JOB_TIMEOUT = config('EXTRACTION_JOB_TIMEOUT', default=600, cast=int)  # Seconds before a running job is requeued
+
+# Bulk email ingestion (POST /rfqs/<pk>/emails/bulk/)
+EXTRACTION_BATCH_CONCURRENCY = config('EXTRACTION_BATCH_CONCURRENCY', default=16, cast=int)  # Concurrent LLM calls per batch
+EXTRACTION_BATCH_MAX_EMAILS = config('EXTRACTION_BATCH_MAX_EMAILS', default=1000, cast=int)
+
+# Non-urgent extraction through the OpenAI Batch API (python manage.py run_extraction_batches)
+OPENAI_BATCH_MIN_REQUESTS = config('OPENAI_BATCH_MIN_REQUESTS', default=50, cast=int)  # Submit once this many jobs are waiting...
+OPENAI_BATCH_MAX_WAIT = config('OPENAI_BATCH_MAX_WAIT', default=3600, cast=int)  # ...or the oldest has waited this many seconds
+OPENAI_BATCH_MAX_REQUESTS = config('OPENAI_BATCH_MAX_REQUESTS', default=5000, cast=int)  # Per batch
+OPENAI_BATCH_POLL_INTERVAL = config('OPENAI_BATCH_POLL_INTERVAL', default=60.0, cast=float)
+OPENAI_BATCH_MAX_ATTEMPTS = config('OPENAI_BATCH_MAX_ATTEMPTS', default=3, cast=int)  # Batches a job may go through before it fails
+
+# Cache of LLM extraction results, keyed by normalized email text, model and prompt version
+EXTRACTION_CACHE_ENABLED = config('EXTRACTION_CACHE_ENABLED', default=True, cast=bool)
+EXTRACTION_CACHE_TTL = config('EXTRACTION_CACHE_TTL', default=30 * 24 * 3600, cast=int)  # Seconds
+EXTRACTION_CACHE_MAX_ENTRIES = config('EXTRACTION_CACHE_MAX_ENTRIES', default=50000, cast=int)
+
+# Cache of rendered list pages and quote comparison data (compareapp.page_cache). Entries are
+# keyed by version stamps kept in the database, so writes from any process invalidate them.
+PAGE_CACHE_ENABLED = config('PAGE_CACHE_ENABLED', default=True, cast=bool)
+PAGE_CACHE_BACKEND = config('PAGE_CACHE_BACKEND', default='locmem', cast=Choices(['locmem', 'file']))  # 'file' shares entries between processes
+PAGE_CACHE_LOCATION = config('PAGE_CACHE_LOCATION', default=str(BASE_DIR / 'page_cache'))  # Directory used by the file backend
+PAGE_CACHE_TTL = config('PAGE_CACHE_TTL', default=600, cast=int)  # Seconds
+PAGE_CACHE_MAX_ENTRIES = config('PAGE_CACHE_MAX_ENTRIES', default=1000, cast=int)  # Per process (locmem) or directory (file)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'pages': {
+        'BACKEND': {
+            'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+            'file': 'django.core.cache.backends.filebased.FileBasedCache',
+        }[PAGE_CACHE_BACKEND],
+        'LOCATION': PAGE_CACHE_LOCATION if PAGE_CACHE_BACKEND == 'file' else 'pages',
+        'TIMEOUT': PAGE_CACHE_TTL,
+        'OPTIONS': {'MAX_ENTRIES': PAGE_CACHE_MAX_ENTRIES},
+    },
+}
+
+# Request, database and LLM metrics exposed at /metrics/ for Prometheus (compareapp.metrics)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+
+# Preprocessing of emails before they are sent to the LLM (compareapp.preprocessing)
+EMAIL_PREPROCESSING_ENABLED = config('EMAIL_PREPROCESSING_ENABLED', default=True, cast=bool)
+EMAIL_TOKEN_BUDGET = config('EMAIL_TOKEN_BUDGET', default=4000, cast=int)  # Longer emails lose their middle; 0 for no limit
+
+# Rule-based extraction that runs before the LLM (compareapp.rule_extraction)
+RULE_EXTRACTION_ENABLED = config('RULE_EXTRACTION_ENABLED', default=True, cast=bool)
+RULE_EXTRACTION_MIN_CONFIDENCE = config('RULE_EXTRACTION_MIN_CONFIDENCE', default=0.9, cast=float)  # Below this the LLM decides the field
+
+# Model routing for extraction (compareapp.llm_routing)
+EXTRACTION_MODEL_TIERS = config('EXTRACTION_MODEL_TIERS', default='gpt-4.1-mini,o4-mini', cast=Csv())  # Cheapest first; the next is used when validation fails
+EXTRACTION_MAX_PLAUSIBLE_PRICE = config('EXTRACTION_MAX_PLAUSIBLE_PRICE', default=10000.0, cast=float)  # Per lb or gallon
+EXTRACTION_MAX_PLAUSIBLE_QUANTITY = config('EXTRACTION_MAX_PLAUSIBLE_QUANTITY', default=100000000, cast=int)
+
+# Matching extracted company names to existing suppliers (compareapp.supplier_resolution)
+SUPPLIER_MATCH_THRESHOLD = config('SUPPLIER_MATCH_THRESHOLD', default=0.85, cast=float)  # Name similarity from 0 to 1
+SUPPLIER_INDEX_REFRESH_INTERVAL = config('SUPPLIER_INDEX_REFRESH_INTERVAL', default=5.0, cast=float)  # Seconds between checks for new suppliers
+SUPPLIER_INDEX_MAX_AGE = config('SUPPLIER_INDEX_MAX_AGE', default=900, cast=int)  # Seconds before a full rebuild
+
+# Ranking quotes on the comparison page (compareapp.quote_scoring); weights are relative
+QUOTE_SCORE_PRICE_WEIGHT = config('QUOTE_SCORE_PRICE_WEIGHT', default=0.5, cast=float)
+QUOTE_SCORE_MOQ_WEIGHT = config('QUOTE_SCORE_MOQ_WEIGHT', default=0.25, cast=float)
+QUOTE_SCORE_CERTIFICATION_WEIGHT = config('QUOTE_SCORE_CERTIFICATION_WEIGHT', default=0.25, cast=float)
+
+# Shared OpenAI client (compareapp.llm_client)
+OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='')  # Point at a local fake server for testing
+OPENAI_TIMEOUT = config('OPENAI_TIMEOUT', default=60.0, cast=float)  # Seconds
+OPENAI_CONNECT_TIMEOUT = config('OPENAI_CONNECT_TIMEOUT', default=10.0, cast=float)
+OPENAI_MAX_CONNECTIONS = config('OPENAI_MAX_CONNECTIONS', default=32, cast=int)
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = config('OPENAI_MAX_KEEPALIVE_CONNECTIONS', default=16, cast=int)
+OPENAI_KEEPALIVE_EXPIRY = config('OPENAI_KEEPALIVE_EXPIRY', default=60.0, cast=float)
+OPENAI_MAX_CONCURRENCY = config('OPENAI_MAX_CONCURRENCY', default=16, cast=int)  # LLM calls in flight per process
+OPENAI_ASYNC_MAX_CONNECTIONS = config('OPENAI_ASYNC_MAX_CONNECTIONS', default=256, cast=int)  # Per event loop, used by the async views
+OPENAI_ASYNC_MAX_CONCURRENCY = config('OPENAI_ASYNC_MAX_CONCURRENCY', default=256, cast=int)
+
+# Token prices for the extraction cost report (compareapp.usage), in USD per million
+# input, cached input and output tokens. Update them when OpenAI's prices change;
+# stored costs keep the prices of the day they were incurred.
+OPENAI_MODEL_PRICES = {
+    'gpt-4.1-mini': (0.40, 0.10, 1.60),
+    'gpt-4.1': (2.00, 0.50, 8.00),
+    'o4-mini': (1.10, 0.275, 4.40),
+}
+OPENAI_BATCH_PRICE_FACTOR = config('OPENAI_BATCH_PRICE_FACTOR', default=0.5, cast=float)  # Batch API calls cost this share of the price
+
+# Recording and replaying OpenAI API calls (compareapp.llm_cassette)
+OPENAI_CASSETTE = config('OPENAI_CASSETTE', default='')  # Cassette file path; empty to always call the API
+OPENAI_CASSETTE_MODE = config('OPENAI_CASSETTE_MODE', default='replay')  # replay, record or auto (record what is missing)
+OPENAI_CASSETTE_LATENCY = config('OPENAI_CASSETTE_LATENCY', default=-1.0, cast=float)  # Seconds per replayed call; negative for the recorded time
+
+# Retries, rate limiting and circuit breaking around LLM calls (compareapp.llm_resilience)
+OPENAI_MAX_RETRIES = config('OPENAI_MAX_RETRIES', default=4, cast=int)  # Retries of timeouts, 429s and 5xx per call
+OPENAI_RETRY_BASE_DELAY = config('OPENAI_RETRY_BASE_DELAY', default=0.5, cast=float)  # Seconds, doubled per retry, with jitter
+OPENAI_RETRY_MAX_DELAY = config('OPENAI_RETRY_MAX_DELAY', default=20.0, cast=float)  # Longer Retry-After waits give up instead
+OPENAI_RATE_LIMIT_RPM = config('OPENAI_RATE_LIMIT_RPM', default=0, cast=int)  # Requests per minute across all processes (0 for no limit)
+OPENAI_RATE_LIMIT_TPM = config('OPENAI_RATE_LIMIT_TPM', default=0, cast=int)  # Estimated tokens per minute (0 for no limit)
+OPENAI_RATE_LIMIT_BURST = config('OPENAI_RATE_LIMIT_BURST', default=5.0, cast=float)  # Seconds of allowance that may be used at once
+OPENAI_RATE_LIMIT_MAX_WAIT = config('OPENAI_RATE_LIMIT_MAX_WAIT', default=30.0, cast=float)  # Seconds a call waits for the rate limit
+OPENAI_CIRCUIT_FAILURE_THRESHOLD = config('OPENAI_CIRCUIT_FAILURE_THRESHOLD', default=5, cast=int)  # Consecutive failures that open the circuit
+OPENAI_CIRCUIT_RESET_TIMEOUT = config('OPENAI_CIRCUIT_RESET_TIMEOUT', default=30.0, cast=float)  # Seconds before a trial call
+OPENAI_MAX_OUTPUT_TOKENS = config('OPENAI_MAX_OUTPUT_TOKENS', default=4096, cast=int)  # Includes reasoning tokens
+OPENAI_MAX_OUTPUT_TOKENS_LIMIT = config('OPENAI_MAX_OUTPUT_TOKENS_LIMIT', default=16384, cast=int)  # Doubled up to this when output runs out
+EXTRACTION_JOB_MAX_ATTEMPTS = config('EXTRACTION_JOB_MAX_ATTEMPTS', default=5, cast=int)  # Runs of a job while the LLM is unavailable
@@ -1,5 +1,6 @@
 from django.urls import path
-from compareapp.views import SupplierListView, SupplierDetailView, RFQListView, RFQDetailView, RFQQuotesView, SubmitQuoteEmailView, CreateRFQView, GenerateEmailView
+from compareapp.views import SupplierListView, SupplierDetailView, RFQListView, RFQDetailView, RFQQuotesView, SubmitQuoteEmailView, CreateRFQView, GenerateEmailView, GenerateEmailsView, UsageReportView, MetricsView, ExtractionJobDetailView, ExtractionJobStatusView, BulkEmailIngestView, StreamQuoteEmailView
+from compareapp.views import AsyncRFQQuotesView, AsyncSubmitQuoteEmailView, AsyncGenerateEmailView, AsyncGenerateEmailsView, AsyncStreamQuoteEmailView
 
 urlpatterns = [
     path('',RFQListView.as_view(), name='home'),
@@ -9,6 +10,20 @@ urlpatterns = [
     path('rfqs/<int:pk>/', RFQDetailView.as_view(), name='rfq-detail'),
     path('rfqs/<int:pk>/quotes/', RFQQuotesView.as_view(), name='rfq-quotes'),
     path('rfqs/<int:pk>/submit-quote-email/', SubmitQuoteEmailView.as_view(), name='submit-quote-email'),
+    path('rfqs/<int:pk>/submit-quote-email/stream/', StreamQuoteEmailView.as_view(), name='stream-quote-email'),
+    path('rfqs/<int:pk>/emails/bulk/', BulkEmailIngestView.as_view(), name='bulk-email-ingest'),
     path('rfqs/create/', CreateRFQView.as_view(), name='create-rfq'),
     path('generate-email/<int:pk>/', GenerateEmailView.as_view(), name='generate-email'),
+    path('rfqs/<int:pk>/generate-emails/', GenerateEmailsView.as_view(), name='rfq-generate-emails'),
+    path('rfqs/generate-emails/', GenerateEmailsView.as_view(), name='generate-emails'),
+    path('jobs/<int:pk>/', ExtractionJobDetailView.as_view(), name='extraction-job-detail'),
+    path('jobs/<int:pk>/status/', ExtractionJobStatusView.as_view(), name='extraction-job-status'),
+    path('usage/', UsageReportView.as_view(), name='usage-report'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('async/rfqs/<int:pk>/quotes/', AsyncRFQQuotesView.as_view(), name='async-rfq-quotes'),
+    path('async/rfqs/<int:pk>/submit-quote-email/', AsyncSubmitQuoteEmailView.as_view(), name='async-submit-quote-email'),
+    path('async/rfqs/<int:pk>/submit-quote-email/stream/', AsyncStreamQuoteEmailView.as_view(), name='async-stream-quote-email'),
+    path('async/generate-email/<int:pk>/', AsyncGenerateEmailView.as_view(), name='async-generate-email'),
+    path('async/rfqs/<int:pk>/generate-emails/', AsyncGenerateEmailsView.as_view(), name='async-rfq-generate-emails'),
+    path('async/rfqs/generate-emails/', AsyncGenerateEmailsView.as_view(), name='async-generate-emails'),
 ]
\ No newline at end of file